@@ -2,45 +2,79 @@
 """
 Batch operations for efficient multi-file processing.
 Extract patterns, search, and aggregate across files in single passes.
+
+Queries run against the workspace index in cache.py: each command first
+refreshes it (a stat walk that re-reads only files changed since the last
+run), then file lists, headers and definitions come straight from SQLite and
+pattern searches only open files whose indexed content can contain the text.
 """
 
 import argparse
-import fnmatch
 import os
 import re
 import sys
-from pathlib import Path
 
-def find_files(pattern: str, root: str = "/home/workspace") -> list[str]:
+from cache import WORKSPACE, WorkspaceIndex
+from structure import language
+
+DEFINITION_KINDS = ("function", "method", "class", "arrow_fn")
+
+def open_index(root: str = WORKSPACE, refresh: bool = True) -> WorkspaceIndex:
+    """Workspace index, brought up to date for root unless refresh is off."""
+    index = WorkspaceIndex()
+    if refresh:
+        index.refresh(root)
+    return index
+
+def find_files(pattern: str, root: str = WORKSPACE, index: WorkspaceIndex = None) -> list[str]:
     """Find files matching a glob pattern."""
-    matches = []
-    for dirpath, dirnames, filenames in os.walk(root):
-        # Skip common non-content directories
-        dirnames[:] = [d for d in dirnames if d not in {
-            '.git', 'node_modules', '__pycache__', '.venv', 'venv',
-            'dist', 'build', '.next', 'Trash', '.z'
-        }]
-        
-        for filename in filenames:
-            if fnmatch.fnmatch(filename, pattern):
-                matches.append(os.path.join(dirpath, filename))
-    
-    return sorted(matches)
+    index = index or open_index(root)
+    return index.files(pattern, root)
 
-def extract_pattern(files: list[str], pattern: str, context: int = 0) -> dict:
+def split_lines(content: str) -> list[str]:
+    """Indexed content as readlines() would give it, minus the newlines."""
+    lines = content.split('\n')
+    if lines and lines[-1] == '':
+        lines.pop()
+    return lines
+
+def read_lines(filepath: str) -> list[str] | None:
+    """Lines of a file too large for the index, read from disk."""
+    try:
+        with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
+            return [l.rstrip('\n') for l in f]
+    except Exception:
+        return None
+
+def extract_pattern(files: list[str], pattern: str, context: int = 0, index: WorkspaceIndex = None) -> dict:
     """Extract lines matching a pattern from multiple files."""
+    index = index or open_index()
     results = {}
+    is_regex = pattern.startswith('^') or '\\' in pattern
+    
+    # Binary files are skipped; plain substrings narrow the indexed files down
+    # with FTS, and regexes are tried against whole files before any line split
+    flags = index.flags(files)
+    files = [f for f in files if f in flags and not flags[f][1]]
+    candidates = None if is_regex else index.containing(pattern)
+    if candidates is not None:
+        files = [f for f in files if f in candidates or not flags[f][0]]
+    whole_file = re.compile(pattern, re.M) if is_regex and not re.search(r'\\[AZ]', pattern) else None
     
     for filepath in files:
-        try:
-            with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
-                lines = f.readlines()
-        except Exception as e:
-            continue
+        content = index.text(filepath) if flags[filepath][0] else None
+        if content is not None:
+            if whole_file is not None and not whole_file.search(content):
+                continue
+            lines = split_lines(content)
+        else:
+            lines = read_lines(filepath)
+            if lines is None:
+                continue
         
         matches = []
         for i, line in enumerate(lines):
-            if re.search(pattern, line) if pattern.startswith('^') or '\\' in pattern else pattern in line:
+            if re.search(pattern, line) if is_regex else pattern in line:
                 match_data = {
                     "line": i + 1,
                     "content": line.rstrip()
@@ -59,72 +93,27 @@ def extract_pattern(files: list[str], pattern: str, context: int = 0) -> dict:
     
     return results
 
-def aggregate_headers(files: list[str]) -> dict:
+def aggregate_headers(files: list[str], index: WorkspaceIndex = None) -> dict:
     """Aggregate all headers/sections from markdown files."""
-    all_headers = {}
-    
-    for filepath in files:
-        if not filepath.endswith(('.md', '.markdown')):
-            continue
-        
-        try:
-            with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
-                lines = f.readlines()
-        except Exception:
-            continue
-        
-        headers = []
-        for i, line in enumerate(lines):
-            if line.startswith('#'):
-                level = len(line) - len(line.lstrip('#'))
-                title = line.lstrip('#').strip()
-                headers.append({"line": i + 1, "level": level, "title": title})
-        
-        if headers:
-            all_headers[filepath] = headers
-    
-    return all_headers
+    index = index or open_index()
+    files = [f for f in files if f.endswith(('.md', '.markdown'))]
+    return {
+        filepath: [{"line": line, "level": level, "title": title}
+                   for line, _, level, title, _, _ in symbols]
+        for filepath, symbols in index.symbols(files, ("section",)).items()
+    }
 
-def search_definitions(files: list[str], name_pattern: str = None) -> dict:
+def search_definitions(files: list[str], name_pattern: str = None, index: WorkspaceIndex = None) -> dict:
     """Search for function/class definitions across files."""
+    index = index or open_index()
+    files = [f for f in files if language(f) in ("python", "js")]
     results = {}
-    
-    patterns = [
-        (r'^(async\s+)?def\s+(\w+)', 'function'),
-        (r'^class\s+(\w+)', 'class'),
-        (r'^(export\s+)?(async\s+)?function\s+(\w+)', 'function'),
-        (r'^(export\s+)?class\s+(\w+)', 'class'),
-        (r'^(export\s+)?(const|let)\s+(\w+)\s*=.*=>', 'arrow_fn'),
-    ]
-    
-    for filepath in files:
-        ext = Path(filepath).suffix
-        if ext not in ['.py', '.js', '.ts', '.tsx', '.jsx']:
-            continue
-        
-        try:
-            with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
-                lines = f.readlines()
-        except Exception:
-            continue
-        
-        definitions = []
-        for i, line in enumerate(lines):
-            for pattern, kind in patterns:
-                match = re.match(pattern, line.strip())
-                if match:
-                    groups = [g for g in match.groups() if g and not g.isspace()]
-                    name = groups[-1] if groups else None
-                    
-                    if name and (name_pattern is None or re.search(name_pattern, name, re.I)):
-                        definitions.append({
-                            "line": i + 1,
-                            "type": kind,
-                            "name": name,
-                            "signature": line.strip()[:100]
-                        })
-                    break
-        
+    for filepath, symbols in index.symbols(files, DEFINITION_KINDS).items():
+        definitions = [
+            {"line": line, "type": kind, "name": name, "signature": signature, "parent": parent}
+            for line, kind, _, name, signature, parent in symbols
+            if name_pattern is None or re.search(name_pattern, name, re.I)
+        ]
         if definitions:
             results[filepath] = definitions
     
@@ -150,7 +139,8 @@ def format_results(results: dict, mode: str) -> str:
                 indent = "  " * (m['level'] - 1)
                 out.append(f"  {indent}L{m['line']}: {m['title']}")
             elif mode == "definitions":
-                out.append(f"  L{m['line']}: {m['type']} `{m['name']}`")
+                name = f"{m['parent']}.{m['name']}" if m.get('parent') else m['name']
+                out.append(f"  L{m['line']}: {m['type']} `{name}`")
         
         if len(matches) > 20:
             out.append(f"  ... and {len(matches) - 20} more")
@@ -162,51 +152,50 @@ def main():
     parser = argparse.ArgumentParser(description="Batch file operations")
     subparsers = parser.add_subparsers(dest="command", required=True)
     
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--root", default=WORKSPACE, help="Root directory")
+    common.add_argument("--no-refresh", action="store_true",
+                        help="Query the index as-is, without checking for changed files")
+    
     # extract-pattern
-    extract_p = subparsers.add_parser("extract-pattern", help="Extract lines matching a pattern")
+    extract_p = subparsers.add_parser("extract-pattern", parents=[common], help="Extract lines matching a pattern")
     extract_p.add_argument("file_pattern", help="Glob pattern for files (e.g. '*.md')")
     extract_p.add_argument("search_pattern", help="Pattern to search for in files")
     extract_p.add_argument("--context", "-c", type=int, default=0, help="Lines of context")
-    extract_p.add_argument("--root", default="/home/workspace", help="Root directory")
     
     # headers
-    headers_p = subparsers.add_parser("headers", help="Aggregate headers from markdown files")
+    headers_p = subparsers.add_parser("headers", parents=[common], help="Aggregate headers from markdown files")
     headers_p.add_argument("file_pattern", nargs="?", default="*.md", help="Glob pattern")
-    headers_p.add_argument("--root", default="/home/workspace", help="Root directory")
     
     # definitions
-    defs_p = subparsers.add_parser("definitions", help="Find function/class definitions")
+    defs_p = subparsers.add_parser("definitions", parents=[common], help="Find function/class definitions")
     defs_p.add_argument("file_pattern", nargs="?", default="*.py", help="Glob pattern")
     defs_p.add_argument("--name", "-n", help="Filter by name pattern (regex)")
-    defs_p.add_argument("--root", default="/home/workspace", help="Root directory")
     
     # list-files
-    list_p = subparsers.add_parser("list-files", help="List files matching pattern")
+    list_p = subparsers.add_parser("list-files", parents=[common], help="List files matching pattern")
     list_p.add_argument("file_pattern", help="Glob pattern")
-    list_p.add_argument("--root", default="/home/workspace", help="Root directory")
     
     args = parser.parse_args()
+    index = open_index(args.root, refresh=not args.no_refresh)
+    files = find_files(args.file_pattern, args.root, index)
     
     if args.command == "extract-pattern":
-        files = find_files(args.file_pattern, args.root)
         if not files:
             print(f"No files matching: {args.file_pattern}")
             sys.exit(1)
-        results = extract_pattern(files, args.search_pattern, args.context)
+        results = extract_pattern(files, args.search_pattern, args.context, index)
         print(format_results(results, "pattern"))
     
     elif args.command == "headers":
-        files = find_files(args.file_pattern, args.root)
-        results = aggregate_headers(files)
+        results = aggregate_headers(files, index)
         print(format_results(results, "headers"))
     
     elif args.command == "definitions":
-        files = find_files(args.file_pattern, args.root)
-        results = search_definitions(files, args.name)
+        results = search_definitions(files, args.name, index)
         print(format_results(results, "definitions"))
     
     elif args.command == "list-files":
-        files = find_files(args.file_pattern, args.root)
         print(f"Found {len(files)} files:\n")
         for f in files[:100]:
             print(os.path.relpath(f, args.root))
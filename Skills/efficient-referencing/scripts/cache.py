@@ -2,176 +2,555 @@
 """
 Intelligent file caching for efficient referencing.
 Stores full content with structure indexing — no information loss.
+
+The cache is one SQLite workspace index (workspace.db): file metadata, an FTS5
+table over content (each file stored once) and a symbols table of the
+sections, definitions and imports from structure.py. Files are re-read and
+re-hashed only when their mtime or size changed; `refresh` walks a tree with
+stat calls and re-indexes just the files that were touched, extracting their
+structure in batches over a process pool.
 """
 
 import argparse
+import bisect
+import fnmatch
 import hashlib
-import json
+import mmap
 import os
 import re
+import sqlite3
 import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
+from structure import PARALLEL_MIN, WORKERS, StructureMemo, extract_many
+
 CACHE_DIR = Path("/home/.z/cache/file-refs")
 CACHE_DIR.mkdir(parents=True, exist_ok=True)
+INDEX_DB = CACHE_DIR / "workspace.db"
+WORKSPACE = "/home/workspace"
+SKIP_DIRS = {
+    '.git', 'node_modules', '__pycache__', '.venv', 'venv',
+    'dist', 'build', '.next', 'Trash', '.z'
+}
+MAX_INDEX_BYTES = 8 * 1024 * 1024  # bigger (or binary) files are tracked but not content-indexed
+BATCH_BYTES = 32 * 1024 * 1024  # content held in memory per extraction batch during a refresh
+INDEX_VERSION = 3
+NEWLINE = re.compile(rb'\n')
+SEARCH_CHUNK = 16 * 1024 * 1024  # bytes of a mapped file lowered at a time by LineSource.search
 
-def get_cache_path(filepath: str) -> Path:
-    """Get cache file path for a given file."""
-    abs_path = os.path.abspath(filepath)
-    hash_key = hashlib.md5(abs_path.encode()).hexdigest()[:12]
-    name = Path(filepath).stem[:30]
-    return CACHE_DIR / f"{name}_{hash_key}.json"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    name TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    file_hash TEXT NOT NULL,
+    line_count INTEGER,
+    byte_size INTEGER,
+    cached_at TEXT NOT NULL,
+    indexed INTEGER NOT NULL,
+    binary INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS symbols (
+    file_id INTEGER NOT NULL,
+    line INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    level INTEGER,
+    name TEXT NOT NULL,
+    signature TEXT,
+    parent TEXT,
+    end_line INTEGER
+);
+CREATE TABLE IF NOT EXISTS lines (
+    file_id INTEGER PRIMARY KEY,
+    typecode TEXT NOT NULL,
+    offsets BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS symbols_file ON symbols (file_id);
+CREATE INDEX IF NOT EXISTS symbols_kind ON symbols (kind, name);
+"""
 
 def get_file_hash(filepath: str) -> str:
     """Get content hash to detect changes."""
-    with open(filepath, 'rb') as f:
-        return hashlib.md5(f.read()).hexdigest()
+    buf = map_file(filepath)
+    try:
+        return hashlib.md5(buf).hexdigest()
+    finally:
+        if isinstance(buf, mmap.mmap):
+            buf.close()
 
-def extract_structure(content: str, filepath: str) -> dict:
-    """Extract navigable structure from content."""
-    lines = content.split('\n')
-    ext = Path(filepath).suffix.lower()
-    
-    structure = {
-        "sections": [],
-        "definitions": [],
-        "key_lines": {}
-    }
-    
-    for i, line in enumerate(lines, 1):
-        stripped = line.strip()
-        
-        # Markdown headers
-        if ext in ['.md', '.markdown'] and stripped.startswith('#'):
-            level = len(stripped) - len(stripped.lstrip('#'))
-            title = stripped.lstrip('#').strip()
-            structure["sections"].append({
-                "line": i,
-                "level": level,
-                "title": title
-            })
+def decode_text(data: bytes) -> str:
+    """Decode file bytes the way open(..., errors='replace') reads them (universal newlines)."""
+    return data.decode('utf-8', errors='replace').replace('\r\n', '\n').replace('\r', '\n')
+
+def is_binary(data: bytes) -> bool:
+    return b'\0' in data[:8192]
+
+def line_offsets(buf) -> array:
+    """Byte offset where each line starts, as a compact array (4 bytes a line below 4 GiB)."""
+    offsets = array('I' if len(buf) < 2 ** 32 else 'Q', [0])
+    offsets.extend(m.end() for m in NEWLINE.finditer(buf))
+    return offsets
+
+def map_file(path: str):
+    """Read-only mmap of a file (b'' for an empty one)."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+class LineSource:
+    """A cached file's lines, sliced out of an mmap of the file through its line-offset array.
+
+    Only the requested lines are decoded; nothing holds the whole file as
+    Python strings. Built from `text` instead (a deleted file served from the
+    index), it falls back to an in-memory list of lines.
+    """
+
+    def __init__(self, path: str, offsets: array = None, text: str = None):
+        self.path = path
+        self.offsets = offsets
+        self._lines = text.split('\n') if text is not None else None
+        self._buf = None
+
+    def __len__(self):
+        return len(self._lines) if self._lines is not None else len(self.offsets)
+
+    @property
+    def buf(self):
+        if self._buf is None:
+            self._buf = map_file(self.path)
+        return self._buf
+
+    def _decode(self, start_idx: int, end_idx: int) -> list[str]:
+        """Lines [start_idx, end_idx) (0-based) from one slice of the map."""
+        if start_idx >= end_idx:
+            return []
+        lo = self.offsets[start_idx]
+        hi = self.offsets[end_idx] - 1 if end_idx < len(self.offsets) else len(self.buf)
+        return [l[:-1] if l.endswith('\r') else l
+                for l in self.buf[lo:hi].decode('utf-8', errors='replace').split('\n')]
+
+    def lines(self, start: int, end: int) -> list[str]:
+        """Lines start..end, 1-indexed and inclusive, clipped to the file."""
+        start_idx = max(0, start - 1)
+        end_idx = min(len(self), end)
+        if self._lines is not None:
+            return self._lines[start_idx:end_idx]
+        return self._decode(start_idx, end_idx)
+
+    def text(self) -> str:
+        if self._lines is not None:
+            return '\n'.join(self._lines)
+        return decode_text(bytes(self.buf))
+
+    def search(self, query: str, context: int = 2) -> list:
+        """Case-insensitive substring search, matches with context.
+
+        ASCII queries lower line-aligned chunks of the map and search them
+        in C, decoding only the matching lines; anything else is compared
+        line by line in decoded chunks.
+        """
+        results = []
+        count = len(self)
+        if self._lines is None and query and query.isascii() and '\n' not in query:
+            needle = query.lower().encode()
+            buf, pos, size = self.buf, 0, len(self.buf)
+            while pos < size:
+                end = min(size, pos + SEARCH_CHUNK)
+                if end < size:
+                    nl = buf.rfind(b'\n', pos, end)
+                    if nl == -1:
+                        nl = buf.find(b'\n', end)
+                    end = size if nl == -1 else nl + 1
+                hay = buf[pos:end].lower()
+                j = hay.find(needle)
+                while j != -1:
+                    i = bisect.bisect_right(self.offsets, pos + j) - 1
+                    results.append(self._match(i, context, count))
+                    if i + 1 >= count:
+                        break
+                    j = hay.find(needle, self.offsets[i + 1] - pos)
+                pos = end
+            return results
         
-        # Python
-        elif ext == '.py':
-            if stripped.startswith('def '):
-                match = re.match(r'def\s+(\w+)', stripped)
-                if match:
-                    structure["definitions"].append({
-                        "line": i,
-                        "type": "function",
-                        "name": match.group(1)
-                    })
-            elif stripped.startswith('class '):
-                match = re.match(r'class\s+(\w+)', stripped)
-                if match:
-                    structure["definitions"].append({
-                        "line": i,
-                        "type": "class",
-                        "name": match.group(1)
-                    })
+        query_lower = query.lower()
+        for chunk_start in range(0, count, 10000):
+            chunk = self.lines(chunk_start + 1, chunk_start + 10000)
+            for j, line in enumerate(chunk):
+                if query_lower in line.lower():
+                    results.append(self._match(chunk_start + j, context, count))
+        return results
+
+    def _match(self, i: int, context: int, count: int) -> dict:
+        start = max(0, i - context)
+        end = min(count, i + context + 1)
+        window = self.lines(start + 1, end)
+        return {
+            "line": i + 1,
+            "match": window[i - start],
+            "context": window,
+            "context_start": start + 1
+        }
+
+    def close(self):
+        if isinstance(self._buf, mmap.mmap):
+            self._buf.close()
+        self._buf = None
+
+def under(root: str) -> tuple[str, str]:
+    """Path range [lo, hi) covering everything below root, for indexed prefix queries."""
+    root = os.path.abspath(root).rstrip('/') + '/'
+    return root, root[:-1] + '0'  # '0' sorts right after '/'
+
+class WorkspaceIndex:
+    """SQLite index of workspace files: metadata, FTS5 content and structure symbols."""
+
+    def __init__(self, path: str = None):
+        self.path = str(path or INDEX_DB)
+        self.db = sqlite3.connect(self.path, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+            # Older layout or extractor: it's a cache, rebuild it
+            self.db.executescript("DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS symbols; "
+                                  "DROP TABLE IF EXISTS content; DROP TABLE IF EXISTS lines;")
+            self.db.execute("VACUUM")
+            self.db.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        self.db.executescript(SCHEMA)
+        # Trigram tokens let MATCH prefilter arbitrary substrings (SQLite 3.34+)
+        try:
+            self.db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS content USING fts5(text, tokenize='trigram')")
+        except sqlite3.OperationalError:
+            self.db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS content USING fts5(text)")
+        sql = self.db.execute("SELECT sql FROM sqlite_master WHERE name = 'content'").fetchone()[0]
+        self.trigram = 'trigram' in sql
+        self.memo = StructureMemo(self.db)
+
+    def _row(self, path: str):
+        return self.db.execute(
+            "SELECT f.id, f.mtime_ns, f.size, f.file_hash, l.file_id IS NOT NULL "
+            "FROM files f LEFT JOIN lines l ON l.file_id = f.id WHERE f.path = ?", (path,)
+        ).fetchone()
+
+    def _load(self, path: str, st: os.stat_result, force: bool = False) -> dict | None:
+        """Map a file whose mtime/size moved; hashes only then. None if its content is unchanged.
+
+        Text files get a line-offset array; small ones also get their content
+        indexed. `force` builds the offsets for binary files too.
+        """
+        row = self._row(path)
+        if row and row[1] == st.st_mtime_ns and row[2] == st.st_size and (row[4] or not force):
+            return None
+        buf = map_file(path)
+        try:
+            file_hash = hashlib.md5(buf).hexdigest()
+            binary = is_binary(buf[:8192])
+            with_lines = force or not binary
+            if row and row[3] == file_hash and (row[4] or not with_lines):
+                # Touched but identical: just remember the new stat
+                self.db.execute("UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?",
+                                (st.st_mtime_ns, st.st_size, row[0]))
+                return None
+            indexed = not binary and len(buf) <= MAX_INDEX_BYTES
+            return {"path": path, "st": st, "row": row, "hash": file_hash, "binary": binary,
+                    "offsets": line_offsets(buf) if with_lines else None,
+                    "content": decode_text(bytes(buf)) if indexed else None}
+        finally:
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+
+    def _store(self, record: dict):
+        path, st, row, content = record["path"], record["st"], record["row"], record["content"]
+        offsets = record["offsets"]
+        indexed = content is not None
+        lines = content.split('\n') if indexed else None
+        values = (path, os.path.basename(path), st.st_mtime_ns, st.st_size, record["hash"],
+                  len(offsets) if offsets is not None else None,
+                  len(content.encode('utf-8')) if indexed else st.st_size,
+                  datetime.now().isoformat(), int(indexed), int(record["binary"]))
+        if row:
+            file_id = row[0]
+            self.db.execute("UPDATE files SET path = ?, name = ?, mtime_ns = ?, size = ?, file_hash = ?, "
+                            "line_count = ?, byte_size = ?, cached_at = ?, indexed = ?, binary = ? WHERE id = ?",
+                            values + (file_id,))
+            self.db.execute("DELETE FROM content WHERE rowid = ?", (file_id,))
+            self.db.execute("DELETE FROM symbols WHERE file_id = ?", (file_id,))
+            self.db.execute("DELETE FROM lines WHERE file_id = ?", (file_id,))
+        else:
+            file_id = self.db.execute(
+                "INSERT INTO files (path, name, mtime_ns, size, file_hash, line_count, byte_size, "
+                "cached_at, indexed, binary) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", values).lastrowid
+        if offsets is not None:
+            self.db.execute("INSERT INTO lines VALUES (?, ?, ?)", (file_id, offsets.typecode, offsets.tobytes()))
+        if not indexed:
+            return
         
-        # JavaScript/TypeScript
-        elif ext in ['.js', '.ts', '.jsx', '.tsx']:
-            if 'function ' in stripped:
-                match = re.search(r'function\s+(\w+)', stripped)
-                if match:
-                    structure["definitions"].append({
-                        "line": i,
-                        "type": "function",
-                        "name": match.group(1)
-                    })
-            elif re.match(r'(export\s+)?(const|let|var)\s+\w+\s*=\s*(async\s+)?\(', stripped):
-                match = re.search(r'(const|let|var)\s+(\w+)', stripped)
-                if match:
-                    structure["definitions"].append({
-                        "line": i,
-                        "type": "arrow_fn",
-                        "name": match.group(2)
-                    })
-    
-    return structure
+        self.db.execute("INSERT INTO content (rowid, text) VALUES (?, ?)", (file_id, content))
+        structure = record["structure"]
+        symbols = [(file_id, s["line"], "section", s["level"], s["title"], None, None, None)
+                   for s in structure["sections"]]
+        symbols += [(file_id, d["line"], d["type"], None, d["name"], lines[d["line"] - 1].strip()[:100],
+                     d.get("parent"), d.get("end_line"))
+                    for d in structure["definitions"]]
+        symbols += [(file_id, 0, "import", None, imp, None, None, None) for imp in structure["imports"]]
+        self.db.executemany("INSERT INTO symbols VALUES (?, ?, ?, ?, ?, ?, ?, ?)", symbols)
+
+    def _index(self, changed: list[tuple], force: bool = False, pool=None) -> int:
+        """Load and store (path, stat) pairs in batches, extracting structure for each batch at once."""
+        updated = 0
+        batch, batch_bytes = [], 0
+        for n, (path, st) in enumerate(changed, 1):
+            try:
+                record = self._load(path, st, force)
+            except OSError:
+                record = None
+            if record is not None:
+                batch.append(record)
+                batch_bytes += len(record["content"] or "")
+            if batch and (batch_bytes >= BATCH_BYTES or n == len(changed)):
+                texts = [r for r in batch if r["content"] is not None]
+                structures = extract_many([(r["path"], r["content"], r["hash"]) for r in texts],
+                                          memo=self.memo, pool=pool)
+                for record, structure in zip(texts, structures):
+                    record["structure"] = structure
+                for record in batch:
+                    self._store(record)
+                updated += len(batch)
+                batch, batch_bytes = [], 0
+        return updated
+
+    def _drop(self, file_ids: list):
+        for file_id in file_ids:
+            self.db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+            self.db.execute("DELETE FROM content WHERE rowid = ?", (file_id,))
+            self.db.execute("DELETE FROM symbols WHERE file_id = ?", (file_id,))
+            self.db.execute("DELETE FROM lines WHERE file_id = ?", (file_id,))
+
+    def update(self, filepath: str, force: bool = False) -> bool:
+        """Index one file now; `force` builds line offsets even for binary files."""
+        path = os.path.abspath(filepath)
+        changed = self._index([(path, os.stat(path))], force)
+        self.db.commit()
+        return bool(changed)
+
+    def refresh(self, root: str = WORKSPACE, workers: int = WORKERS) -> dict:
+        """Bring everything under root up to date: stat every file, re-index only touched ones."""
+        lo, hi = under(root)
+        known = {path: (file_id, mtime, size) for file_id, path, mtime, size in self.db.execute(
+            "SELECT id, path, mtime_ns, size FROM files WHERE path >= ? AND path < ?", (lo, hi))}
+        stats = {"files": 0, "updated": 0, "removed": 0}
+        changed = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            for filename in filenames:
+                path = os.path.join(os.path.abspath(dirpath), filename)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                stats["files"] += 1
+                prev = known.pop(path, None)
+                if not (prev and prev[1] == st.st_mtime_ns and prev[2] == st.st_size):
+                    changed.append((path, st))
+        if workers > 1 and len(changed) >= PARALLEL_MIN:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                stats["updated"] = self._index(changed, pool=pool)
+        else:
+            stats["updated"] = self._index(changed)
+        self._drop([file_id for file_id, _, _ in known.values()])
+        stats["removed"] = len(known)
+        self.db.commit()
+        return stats
+
+    def refresh_paths(self, paths: list[str]) -> dict:
+        """Re-index just these files (e.g. the ones an edit touched); missing files are dropped."""
+        stats = {"files": len(paths), "updated": 0, "removed": 0}
+        changed, gone = [], []
+        for filepath in paths:
+            path = os.path.abspath(filepath)
+            try:
+                changed.append((path, os.stat(path)))
+            except FileNotFoundError:
+                row = self._row(path)
+                if row:
+                    gone.append(row[0])
+        stats["updated"] = self._index(changed)
+        self._drop(gone)
+        stats["removed"] = len(gone)
+        self.db.commit()
+        return stats
+
+    def entry(self, filepath: str) -> dict | None:
+        """Cached entry for a file with line offsets, regardless of freshness.
+
+        Lines are read through entry["source"] (a LineSource over the file);
+        a file deleted since it was cached is served from its indexed content.
+        """
+        row = self.db.execute(
+            "SELECT f.id, f.path, f.name, f.cached_at, f.file_hash, f.line_count, f.byte_size, "
+            "l.typecode, l.offsets FROM files f JOIN lines l ON l.file_id = f.id WHERE f.path = ?",
+            (os.path.abspath(filepath),)).fetchone()
+        if row is None:
+            return None
+        file_id, path, name, cached_at, file_hash, line_count, byte_size, typecode, blob = row
+        if os.path.exists(path):
+            offsets = array(typecode)
+            offsets.frombytes(blob)
+            source = LineSource(path, offsets)
+        else:
+            text = self.text(path)
+            if text is None:
+                return None
+            source = LineSource(path, text=text)
+        structure = {"sections": [], "definitions": [], "imports": [], "key_lines": {}}
+        for line, kind, level, sym, parent, end_line in self.db.execute(
+                "SELECT line, kind, level, name, parent, end_line FROM symbols WHERE file_id = ? ORDER BY rowid",
+                (file_id,)):
+            if kind == "section":
+                structure["sections"].append({"line": line, "level": level, "title": sym})
+            elif kind == "import":
+                structure["imports"].append(sym)
+            else:
+                d = {"line": line, "type": kind, "name": sym}
+                if parent:
+                    d["parent"] = parent
+                if end_line:
+                    d["end_line"] = end_line
+                structure["definitions"].append(d)
+        return {
+            "filepath": path,
+            "filename": name,
+            "cached_at": cached_at,
+            "file_hash": file_hash,
+            "line_count": line_count,
+            "byte_size": byte_size,
+            "source": source,
+            "structure": structure
+        }
+
+    def is_fresh(self, filepath: str) -> bool:
+        """mtime+size check; on a mismatch the file is hashed to tell a touch from an edit."""
+        path = os.path.abspath(filepath)
+        row = self._row(path)
+        if row is None:
+            return False
+        if not os.path.exists(path):
+            return True  # keep serving the last copy of a deleted file
+        st = os.stat(path)
+        if row[1] == st.st_mtime_ns and row[2] == st.st_size:
+            return True
+        if get_file_hash(path) != row[3]:
+            return False
+        self.db.execute("UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?",
+                        (st.st_mtime_ns, st.st_size, row[0]))
+        self.db.commit()
+        return True
 
-def cache_file(filepath: str) -> dict:
+    def files(self, pattern: str = "*", root: str = WORKSPACE) -> list[str]:
+        """Indexed paths under root whose filename matches a glob, sorted."""
+        lo, hi = under(root)
+        rows = self.db.execute("SELECT path, name FROM files WHERE path >= ? AND path < ? ORDER BY path",
+                               (lo, hi))
+        return [path for path, name in rows if fnmatch.fnmatch(name, pattern)]
+
+    def flags(self, paths: list[str]) -> dict:
+        """path -> (indexed, binary) for the given paths."""
+        wanted = set(paths)
+        return {path: (bool(indexed), bool(binary)) for path, indexed, binary in self.db.execute(
+            "SELECT path, indexed, binary FROM files") if path in wanted}
+
+    def containing(self, literal: str) -> set[str] | None:
+        """Paths whose content may contain `literal` (case-insensitive superset).
+        None when the index can't narrow it down (no trigram tokenizer, or < 3 chars)."""
+        if not self.trigram or len(literal) < 3:
+            return None
+        phrase = '"' + literal.replace('"', '""') + '"'
+        return {path for (path,) in self.db.execute(
+            "SELECT f.path FROM content JOIN files f ON f.id = content.rowid WHERE content MATCH ?",
+            (phrase,))}
+
+    def text(self, filepath: str) -> str | None:
+        row = self.db.execute("SELECT c.text FROM files f JOIN content c ON c.rowid = f.id WHERE f.path = ?",
+                              (os.path.abspath(filepath),)).fetchone()
+        return row[0] if row else None
+
+    def symbols(self, paths: list[str], kinds: tuple) -> dict:
+        """path -> [(line, kind, level, name, signature, parent)] for the given symbol kinds, in line order."""
+        wanted = set(paths)
+        marks = ", ".join("?" * len(kinds))
+        results = {}
+        for path, *symbol in self.db.execute(
+                f"SELECT f.path, s.line, s.kind, s.level, s.name, s.signature, s.parent FROM symbols s "
+                f"JOIN files f ON f.id = s.file_id WHERE s.kind IN ({marks}) ORDER BY f.path, s.line",
+                kinds):
+            if path in wanted:
+                results.setdefault(path, []).append(tuple(symbol))
+        return results
+
+    def remove(self, filepath: str) -> bool:
+        row = self._row(os.path.abspath(filepath))
+        if row:
+            self._drop([row[0]])
+            self.db.commit()
+        return row is not None
+
+    def clear(self) -> int:
+        count = self.db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        self.db.execute("DELETE FROM files")
+        self.db.execute("DELETE FROM content")
+        self.db.execute("DELETE FROM symbols")
+        self.db.execute("DELETE FROM lines")
+        self.db.commit()
+        return count
+
+    def stats(self) -> dict:
+        files, indexed, size = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(indexed), 0), COALESCE(SUM(size), 0) FROM files").fetchone()
+        symbols = self.db.execute("SELECT COUNT(*) FROM symbols").fetchone()[0]
+        return {"files": files, "indexed": indexed, "bytes": size, "symbols": symbols,
+                "db_bytes": os.path.getsize(self.path)}
+
+    def close(self):
+        self.db.close()
+
+def cache_file(filepath: str, index: WorkspaceIndex = None) -> dict:
     """Cache a file with full content and structure."""
     if not os.path.exists(filepath):
         print(f"Error: File not found: {filepath}", file=sys.stderr)
         sys.exit(1)
     
-    with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
-        content = f.read()
-    
-    lines = content.split('\n')
-    structure = extract_structure(content, filepath)
-    
-    entry = {
-        "filepath": os.path.abspath(filepath),
-        "filename": os.path.basename(filepath),
-        "cached_at": datetime.now().isoformat(),
-        "file_hash": get_file_hash(filepath),
-        "line_count": len(lines),
-        "byte_size": len(content.encode('utf-8')),
-        "content": content,
-        "lines": lines,
-        "structure": structure
-    }
-    
-    cache_path = get_cache_path(filepath)
-    with open(cache_path, 'w') as f:
-        json.dump(entry, f)
-    
-    return entry
+    index = index or WorkspaceIndex()
+    index.update(filepath, force=True)
+    return index.entry(filepath)
 
-def lookup_cache(filepath: str) -> dict | None:
+def lookup_cache(filepath: str, index: WorkspaceIndex = None) -> dict | None:
     """Look up cached file, returns None if stale or missing."""
-    cache_path = get_cache_path(filepath)
-    
-    if not cache_path.exists():
+    index = index or WorkspaceIndex()
+    if not index.is_fresh(filepath):
         return None
-    
-    with open(cache_path, 'r') as f:
-        entry = json.load(f)
-    
-    # Check if file changed
-    if os.path.exists(filepath):
-        current_hash = get_file_hash(filepath)
-        if current_hash != entry.get("file_hash"):
-            return None  # Stale cache
-    
-    return entry
+    return index.entry(filepath)
 
 def get_or_cache(filepath: str) -> dict:
     """Get from cache or cache if needed."""
-    entry = lookup_cache(filepath)
+    index = WorkspaceIndex()
+    entry = lookup_cache(filepath, index)
     if entry is None:
-        entry = cache_file(filepath)
+        entry = cache_file(filepath, index)
     return entry
 
 def search_content(entry: dict, query: str, context: int = 2) -> list:
     """Search cached content, return matches with context."""
-    results = []
-    lines = entry["lines"]
-    query_lower = query.lower()
-    
-    for i, line in enumerate(lines):
-        if query_lower in line.lower():
-            start = max(0, i - context)
-            end = min(len(lines), i + context + 1)
-            results.append({
-                "line": i + 1,
-                "match": line,
-                "context": lines[start:end],
-                "context_start": start + 1
-            })
-    
-    return results
+    return entry["source"].search(query, context)
 
 def get_lines(entry: dict, start: int, end: int) -> list:
     """Get specific line range from cache."""
-    lines = entry["lines"]
-    start_idx = max(0, start - 1)
-    end_idx = min(len(lines), end)
-    return lines[start_idx:end_idx]
+    return entry["source"].lines(start, end)
 
 def get_section(entry: dict, section_query: str) -> dict | None:
     """Find a section by name and return its content."""
@@ -192,7 +571,7 @@ def get_section(entry: dict, section_query: str) -> dict | None:
     start_line = section["line"]
     
     # Find end (next section at same or higher level, or EOF)
-    end_line = len(entry["lines"])
+    end_line = len(entry["source"])
     for s in sections[match_idx + 1:]:
         if s["level"] <= section["level"]:
             end_line = s["line"] - 1
@@ -203,7 +582,7 @@ def get_section(entry: dict, section_query: str) -> dict | None:
         "level": section["level"],
         "start_line": start_line,
         "end_line": end_line,
-        "content": "\n".join(entry["lines"][start_line - 1:end_line])
+        "content": "\n".join(entry["source"].lines(start_line, end_line))
     }
 
 def format_structure(entry: dict) -> str:
@@ -221,12 +600,88 @@ def format_structure(entry: dict) -> str:
     if entry["structure"]["definitions"]:
         output.append("\nDefinitions:")
         for d in entry["structure"]["definitions"][:20]:
-            output.append(f"  L{d['line']}: {d['type']} {d['name']}")
+            name = f"{d['parent']}.{d['name']}" if d.get("parent") else d["name"]
+            output.append(f"  L{d['line']}: {d['type']} {name}")
         if len(entry["structure"]["definitions"]) > 20:
             output.append(f"  ... and {len(entry['structure']['definitions']) - 20} more")
     
     return "\n".join(output)
 
+def benchmark(size_mb: int = 300, workdir: str = "/tmp") -> dict:
+    """Old per-file JSON cache (content + lines) vs the line-offset index on a generated log.
+
+    Each operation is timed, then re-run under tracemalloc for its peak Python
+    heap (mapped file pages are page cache, not heap).
+    """
+    import json
+    import tracemalloc
+
+    def measure(fn):
+        t = time.perf_counter()
+        fn()
+        seconds = time.perf_counter() - t
+        tracemalloc.start()
+        result = fn()
+        peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+        return seconds, peak, result
+
+    path = os.path.join(workdir, f"efficient-referencing-bench-{size_mb}mb.log")
+    if not os.path.exists(path) or os.path.getsize(path) < size_mb * 1024 * 1024:
+        with open(path, 'w') as f:
+            i = 0
+            while f.tell() < size_mb * 1024 * 1024:
+                level = "ERROR needle timeout" if i % 50000 == 0 else "INFO"
+                f.write(f"2026-01-01T00:00:{i % 60:02d} {level} worker-{i % 16} processed batch {i} "
+                        f"in {i % 997} ms\n")
+                i += 1
+    report = {"file_mb": os.path.getsize(path) / 1024 / 1024}
+    db_path = os.path.join(workdir, "efficient-referencing-bench.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.unlink(db_path + suffix)
+    index = WorkspaceIndex(db_path)
+    t = time.perf_counter()
+    index.update(path, force=True)
+    report["index_build"] = time.perf_counter() - t
+    line_count = index.entry(path)["line_count"]
+    middle = line_count // 2
+
+    def offsets_lines():
+        entry = lookup_cache(path, index)
+        return get_lines(entry, middle, middle + 49)
+
+    def offsets_search():
+        entry = lookup_cache(path, index)
+        return [r["line"] for r in search_content(entry, "NEEDLE", 2)]
+
+    legacy_path = os.path.join(workdir, "efficient-referencing-bench-legacy.json")
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        content = f.read()
+    with open(legacy_path, 'w') as f:
+        json.dump({"content": content, "lines": content.split('\n')}, f)
+    del content
+
+    def legacy_lines():
+        with open(legacy_path) as f:
+            return json.load(f)["lines"][middle - 1:middle + 49]
+
+    def legacy_search():
+        with open(legacy_path) as f:
+            lines = json.load(f)["lines"]
+        return [i + 1 for i, line in enumerate(lines) if "needle" in line.lower()]
+
+    results = {}
+    for name, fn in (("offsets_get_lines", offsets_lines), ("offsets_search", offsets_search),
+                     ("legacy_get_lines", legacy_lines), ("legacy_search", legacy_search)):
+        seconds, peak, results[name] = measure(fn)
+        report[name] = (seconds, peak)
+    report["same_results"] = (results["offsets_get_lines"] == results["legacy_get_lines"]
+                              and results["offsets_search"] == results["legacy_search"])
+    os.unlink(legacy_path)
+    index.close()
+    return report
+
 def main():
     parser = argparse.ArgumentParser(description="Intelligent file cache")
     subparsers = parser.add_subparsers(dest="command", required=True)
@@ -261,6 +716,19 @@ def main():
     clear_p = subparsers.add_parser("clear", help="Clear cache")
     clear_p.add_argument("filepath", nargs="?", help="Specific file, or all if omitted")
     
+    # Refresh command
+    refresh_p = subparsers.add_parser("refresh", help="Re-index files changed since the last refresh")
+    refresh_p.add_argument("paths", nargs="*", help="Only these files (default: everything under --root)")
+    refresh_p.add_argument("--root", default=WORKSPACE, help="Root directory")
+    
+    # Stats command
+    subparsers.add_parser("stats", help="Show index size")
+    
+    # Bench command
+    bench_p = subparsers.add_parser("bench", help="Benchmark line access on a generated large file")
+    bench_p.add_argument("--size-mb", type=int, default=300, help="Size of the generated log")
+    bench_p.add_argument("--dir", default="/tmp", help="Where to put the log and scratch index")
+    
     args = parser.parse_args()
     
     if args.command == "cache":
@@ -308,19 +776,40 @@ def main():
             sys.exit(1)
             
     elif args.command == "clear":
+        index = WorkspaceIndex()
         if args.filepath:
-            cache_path = get_cache_path(args.filepath)
-            if cache_path.exists():
-                cache_path.unlink()
+            if index.remove(args.filepath):
                 print(f"Cleared cache for: {args.filepath}")
             else:
                 print(f"No cache found for: {args.filepath}")
         else:
-            count = 0
-            for f in CACHE_DIR.glob("*.json"):
+            count = index.clear()
+            for f in CACHE_DIR.glob("*.json"):  # pre-index per-file caches
                 f.unlink()
-                count += 1
             print(f"Cleared {count} cache entries")
+            
+    elif args.command == "refresh":
+        index = WorkspaceIndex()
+        if args.paths:
+            stats = index.refresh_paths(args.paths)
+        else:
+            stats = index.refresh(args.root)
+        print(f"Scanned {stats['files']} files: {stats['updated']} re-indexed, {stats['removed']} removed")
+        
+    elif args.command == "stats":
+        stats = WorkspaceIndex().stats()
+        print(f"Files: {stats['files']} ({stats['indexed']} content-indexed, {stats['bytes']} bytes)")
+        print(f"Symbols: {stats['symbols']}")
+        print(f"Index: {INDEX_DB} ({stats['db_bytes']} bytes)")
+        
+    elif args.command == "bench":
+        report = benchmark(args.size_mb, args.dir)
+        print(f"{report['file_mb']:.0f} MB log, offset index built in {report['index_build']:.2f}s\n")
+        for label, key in (("get 50 lines", "get_lines"), ("search", "search")):
+            (o_s, o_mb), (l_s, l_mb) = report[f"offsets_{key}"], report[f"legacy_{key}"]
+            print(f"  {label:<13} offsets+mmap {o_s:7.3f}s {o_mb:8.1f}MB heap   "
+                  f"legacy JSON {l_s:7.3f}s {l_mb:8.1f}MB heap")
+        print(f"  same results: {report['same_results']}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Structure extraction engine shared by cache.py, summarize.py and batch.py.
+Sections, definitions and imports per file, parsed per language:
+
+- Python: the `ast` module — nested functions, methods, async defs and
+  decorated definitions with their end lines; files that don't parse fall
+  back to the line scanner.
+- JS/TS: a tokenizer that skips strings and comments and tracks braces, so
+  class methods, class fields holding arrows and nested functions are found
+  and get a parent.
+- Markdown: ATX headers outside fenced code blocks.
+
+Results are memoized by content hash in the workspace index database, and
+extract_many() spreads cache misses over a process pool.
+
+Usage:
+    python3 structure.py <file> [--json]
+    python3 structure.py bench [--root DIR] [--workers N]
+"""
+
+import argparse
+import ast
+import bisect
+import json
+import os
+import re
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+VERSION = 1  # bump when extractor output changes; memoized results are keyed by it
+WORKERS = os.cpu_count() or 1
+PARALLEL_MIN = 32  # fewer misses than this are extracted in-process
+MEMO_MAX = 50000
+
+PYTHON_EXTS = {'.py'}
+JS_EXTS = {'.js', '.ts', '.jsx', '.tsx', '.mjs', '.cjs'}
+MARKDOWN_EXTS = {'.md', '.markdown'}
+
+JS_TOKEN = re.compile(r"""
+    (?P<comment>//[^\n]*|/\*.*?\*/)
+   |(?P<string>'(?:\\.|[^'\\\n])*'|"(?:\\.|[^"\\\n])*"|`(?:\\.|[^`\\])*`)
+   |(?P<ident>[A-Za-z_$][\w$]*)
+   |(?P<punct>=>|[{}()\[\]=;,:*.])
+""", re.S | re.X)
+JS_NOT_METHODS = {'if', 'for', 'while', 'switch', 'catch', 'return', 'function', 'new', 'typeof', 'await', 'super'}
+FENCE = re.compile(r'(`{3,}|~{3,})')
+HEADER = re.compile(r'(#{1,6})(?:\s+(.*?))?(?:\s+#+)?\s*$')
+
+MEMO_SCHEMA = """
+CREATE TABLE IF NOT EXISTS structures (
+    key TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+"""
+
+def language(filepath: str) -> str | None:
+    ext = Path(filepath).suffix.lower()
+    if ext in PYTHON_EXTS:
+        return "python"
+    if ext in JS_EXTS:
+        return "js"
+    if ext in MARKDOWN_EXTS:
+        return "markdown"
+    return None
+
+def empty_structure() -> dict:
+    return {"sections": [], "definitions": [], "imports": [], "key_lines": {}}
+
+def _definition(line: int, kind: str, name: str, parent: str = None, end_line: int = None) -> dict:
+    d = {"line": line, "type": kind, "name": name}
+    if parent:
+        d["parent"] = parent
+    if end_line:
+        d["end_line"] = end_line
+    return d
+
+def python_structure(content: str) -> dict:
+    """Definitions and imports from the Python AST. Raises SyntaxError/ValueError if it doesn't parse."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        tree = ast.parse(content)
+    lines = content.split('\n')
+    structure = empty_structure()
+
+    def visit(node, parent, in_class):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, ast.ClassDef):
+                structure["definitions"].append(
+                    _definition(child.lineno, "class", child.name, parent, child.end_lineno))
+                visit(child, f"{parent}.{child.name}" if parent else child.name, True)
+            elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                d = _definition(child.lineno, "method" if in_class else "function", child.name,
+                                parent, child.end_lineno)
+                if isinstance(child, ast.AsyncFunctionDef):
+                    d["async"] = True
+                structure["definitions"].append(d)
+                visit(child, f"{parent}.{child.name}" if parent else child.name, False)
+            elif isinstance(child, (ast.Import, ast.ImportFrom)):
+                structure["imports"].append(lines[child.lineno - 1].strip())
+            elif isinstance(child, (ast.stmt, ast.excepthandler, ast.match_case)):
+                visit(child, parent, in_class)
+
+    visit(tree, None, False)
+    structure["definitions"].sort(key=lambda d: d["line"])
+    return structure
+
+def js_structure(content: str) -> dict:
+    """Functions, classes, methods and arrow functions from a JS/TS token stream."""
+    structure = empty_structure()
+    newlines = [m.start() for m in re.finditer('\n', content)]
+    lines = content.split('\n')
+    toks = [(m.lastgroup, m.group(), m.start()) for m in JS_TOKEN.finditer(content) if m.lastgroup != "comment"]
+    n = len(toks)
+
+    def line_of(i):
+        return bisect.bisect(newlines, toks[i][2]) + 1
+
+    def text(i):
+        return toks[i][1] if i < n else None
+
+    def is_ident(i):
+        return i < n and toks[i][0] == "ident"
+
+    def close_paren(i):
+        """Index of the ')' matching the '(' at i (or n)."""
+        depth = 0
+        for j in range(i, n):
+            if toks[j][1] == '(':
+                depth += 1
+            elif toks[j][1] == ')':
+                depth -= 1
+                if depth == 0:
+                    return j
+        return n
+
+    def body_brace(i):
+        """Index of the '{' opening a body at or after i, before any ';' / '}' / '=>'."""
+        for j in range(i, n):
+            if toks[j][1] == '{':
+                return j
+            if toks[j][1] in (';', '}', '=>'):
+                return None
+        return None
+
+    stack = []   # (definition or None, qualified name or None) per open brace
+    bodies = {}  # brace index -> definition it opens
+
+    def parent():
+        for _, qual in reversed(stack):
+            if qual:
+                return qual
+        return None
+
+    def add(i, kind, name, brace):
+        d = _definition(line_of(i), kind, name, parent())
+        structure["definitions"].append(d)
+        if brace is not None:
+            bodies[brace] = d
+
+    def in_class():
+        return bool(stack) and stack[-1][0] is not None and stack[-1][0]["type"] == "class"
+
+    for i, (kind, tok, _) in enumerate(toks):
+        if tok == '{':
+            d = bodies.pop(i, None)
+            qual = None
+            if d is not None:
+                qual = f"{d['parent']}.{d['name']}" if d.get("parent") else d["name"]
+            stack.append((d, qual))
+        elif tok == '}':
+            if stack:
+                d, _ = stack.pop()
+                if d is not None:
+                    d["end_line"] = line_of(i)
+        elif kind != "ident" or text(i - 1) == '.':
+            continue
+        elif tok == 'function':
+            j = i + 2 if text(i + 1) == '*' else i + 1
+            if is_ident(j) and text(j + 1) == '(':
+                add(j, "function", toks[j][1], body_brace(close_paren(j + 1) + 1))
+        elif tok == 'class' and is_ident(i + 1):
+            add(i + 1, "class", toks[i + 1][1], body_brace(i + 2))
+        elif tok in ('const', 'let', 'var') and is_ident(i + 1) and text(i + 2) == '=':
+            j = i + 4 if text(i + 3) == 'async' else i + 3
+            if text(j) == 'function':
+                k = j + 2 if is_ident(j + 1) else j + 1
+                if text(k) == '(':
+                    add(i + 1, "function", toks[i + 1][1], body_brace(close_paren(k) + 1))
+            elif text(j) == '(':
+                k = close_paren(j) + 1
+                if text(k) == ':':  # TS return type
+                    k = next((m for m in range(k, n) if toks[m][1] in ('=>', ';', '{', '}')), n)
+                if text(k) == '=>':
+                    add(i + 1, "arrow_fn", toks[i + 1][1], k + 1 if text(k + 1) == '{' else None)
+            elif is_ident(j) and text(j + 1) == '=>':
+                add(i + 1, "arrow_fn", toks[i + 1][1], j + 2 if text(j + 2) == '{' else None)
+        elif tok == 'import' and not stack and text(i + 1) not in ('(', '.'):
+            structure["imports"].append(lines[line_of(i) - 1].strip()[:100])
+        elif in_class() and tok not in JS_NOT_METHODS:
+            if text(i + 1) == '(':
+                brace = body_brace(close_paren(i + 1) + 1)
+                if brace is not None:
+                    add(i, "method", tok, brace)
+            elif text(i + 1) == '=' and (text(i + 2) == '(' or text(i + 2) == 'async'):
+                j = i + 3 if text(i + 2) == 'async' else i + 2
+                k = close_paren(j) + 1 if text(j) == '(' else n
+                if text(k) == '=>':
+                    add(i, "method", tok, k + 1 if text(k + 1) == '{' else None)
+
+    return structure
+
+def markdown_structure(content: str) -> dict:
+    """ATX headers, ignoring '#' lines inside fenced code blocks."""
+    structure = empty_structure()
+    fence = None
+    for i, line in enumerate(content.split('\n'), 1):
+        stripped = line.strip()
+        if fence:
+            if stripped.startswith(fence):
+                fence = None
+            continue
+        m = FENCE.match(stripped)
+        if m:
+            fence = m.group(1)
+            continue
+        m = HEADER.match(stripped)
+        if m:
+            structure["sections"].append({
+                "line": i,
+                "level": len(m.group(1)),
+                "title": (m.group(2) or "").strip()
+            })
+    return structure
+
+def regex_structure(content: str, filepath: str) -> dict:
+    """Line-by-line regex scan: the fallback for Python that doesn't parse, and the benchmark baseline."""
+    structure = empty_structure()
+    ext = Path(filepath).suffix.lower()
+    for i, line in enumerate(content.split('\n'), 1):
+        stripped = line.strip()
+        if ext in MARKDOWN_EXTS and stripped.startswith('#'):
+            structure["sections"].append({
+                "line": i,
+                "level": len(stripped) - len(stripped.lstrip('#')),
+                "title": stripped.lstrip('#').strip()
+            })
+        elif ext in PYTHON_EXTS:
+            match = re.match(r'(?:async\s+)?(def|class)\s+(\w+)', stripped)
+            if match:
+                kind = "class" if match.group(1) == "class" else "function"
+                structure["definitions"].append(_definition(i, kind, match.group(2)))
+            elif stripped.startswith(('import ', 'from ')):
+                structure["imports"].append(stripped)
+        elif ext in JS_EXTS:
+            match = re.search(r'function\s+(\w+)', stripped)
+            if match:
+                structure["definitions"].append(_definition(i, "function", match.group(1)))
+            elif re.match(r'(export\s+)?(const|let|var)\s+\w+\s*=\s*(async\s+)?\(', stripped):
+                match = re.search(r'(const|let|var)\s+(\w+)', stripped)
+                structure["definitions"].append(_definition(i, "arrow_fn", match.group(2)))
+    return structure
+
+def extract_structure(content: str, filepath: str) -> dict:
+    """Extract navigable structure from content."""
+    lang = language(filepath)
+    if lang == "python":
+        try:
+            return python_structure(content)
+        except (SyntaxError, ValueError, RecursionError):
+            return regex_structure(content, filepath)
+    if lang == "js":
+        return js_structure(content)
+    if lang == "markdown":
+        return markdown_structure(content)
+    return empty_structure()
+
+def _extract_job(job: tuple) -> dict:
+    content, filepath = job
+    return extract_structure(content, filepath)
+
+class StructureMemo:
+    """Extracted structures keyed by (extractor version, language, content hash) in a SQLite db."""
+
+    def __init__(self, db):
+        self.db = db
+        self.db.executescript(MEMO_SCHEMA)
+
+    @staticmethod
+    def key(filepath: str, content_hash: str) -> str:
+        return f"{VERSION}:{language(filepath)}:{content_hash}"
+
+    def get_many(self, keys: list[str]) -> dict:
+        found = {}
+        keys = list(set(keys))
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            marks = ", ".join("?" * len(chunk))
+            for key, data in self.db.execute(f"SELECT key, data FROM structures WHERE key IN ({marks})", chunk):
+                found[key] = json.loads(data)
+        return found
+
+    def put_many(self, items: dict):
+        self.db.executemany("INSERT OR REPLACE INTO structures (key, data) VALUES (?, ?)",
+                            ((k, json.dumps(v)) for k, v in items.items()))
+        self.db.execute("DELETE FROM structures WHERE rowid <= (SELECT MAX(rowid) FROM structures) - ?",
+                        (MEMO_MAX,))
+
+def extract_many(items: list[tuple], memo: StructureMemo = None, pool: ProcessPoolExecutor = None,
+                 workers: int = WORKERS) -> list[dict]:
+    """Structures for [(filepath, content, content_hash)], in order.
+
+    Memo hits are returned as stored; misses are extracted (over `pool`, or a
+    pool of `workers` made for the call when there are enough of them) and
+    written back to the memo. The caller commits the memo's connection.
+    """
+    results = [None] * len(items)
+    keys = {}
+    for i, (filepath, content, content_hash) in enumerate(items):
+        if language(filepath) is None:
+            results[i] = empty_structure()
+        elif memo is not None and content_hash:
+            keys[i] = StructureMemo.key(filepath, content_hash)
+    hits = memo.get_many(list(keys.values())) if keys else {}
+    misses = []
+    for i, (filepath, content, _) in enumerate(items):
+        if results[i] is None:
+            if keys.get(i) in hits:
+                results[i] = hits[keys[i]]
+            else:
+                misses.append(i)
+
+    jobs = [(items[i][1], items[i][0]) for i in misses]
+    if pool is None and workers > 1 and len(jobs) >= PARALLEL_MIN:
+        with ProcessPoolExecutor(max_workers=workers) as own_pool:
+            extracted = list(own_pool.map(_extract_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    elif pool is not None and len(jobs) >= PARALLEL_MIN:
+        extracted = list(pool.map(_extract_job, jobs, chunksize=max(1, len(jobs) // (WORKERS * 4))))
+    else:
+        extracted = [_extract_job(job) for job in jobs]
+
+    fresh = {}
+    for i, structure in zip(misses, extracted):
+        results[i] = structure
+        if i in keys:
+            fresh[keys[i]] = structure
+    if memo is not None and fresh:
+        memo.put_many(fresh)
+    return results
+
+def benchmark(root: str, workers: int = WORKERS) -> dict:
+    """Time the line scanner against the engine (serial, pooled, memoized) over every parsable file under root."""
+    import hashlib
+    import sqlite3
+    from cache import SKIP_DIRS, decode_text
+
+    items = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            if language(path) is None:
+                continue
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except OSError:
+                continue
+            items.append((path, decode_text(data), hashlib.md5(data).hexdigest()))
+
+    def count(structures):
+        return sum(len(s["definitions"]) + len(s["sections"]) for s in structures)
+
+    report = {"files": len(items), "bytes": sum(len(c) for _, c, _ in items), "workers": workers}
+    t = time.perf_counter()
+    baseline = [regex_structure(c, p) for p, c, _ in items]
+    report["regex_scan"] = (time.perf_counter() - t, count(baseline))
+    t = time.perf_counter()
+    serial = extract_many(items, workers=1)
+    report["engine_serial"] = (time.perf_counter() - t, count(serial))
+    t = time.perf_counter()
+    pooled = extract_many(items, workers=workers)
+    report["engine_pool"] = (time.perf_counter() - t, count(pooled))
+    memo = StructureMemo(sqlite3.connect(":memory:"))
+    extract_many(items, memo=memo, workers=1)
+    t = time.perf_counter()
+    warm = extract_many(items, memo=memo, workers=1)
+    report["engine_memo_warm"] = (time.perf_counter() - t, count(warm))
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("target", help="File to parse, or 'bench'")
+    parser.add_argument("--json", action="store_true", help="Output as JSON")
+    parser.add_argument("--root", default="/home/workspace", help="Benchmark root directory")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Benchmark pool size")
+    args = parser.parse_args()
+
+    if args.target == "bench":
+        report = benchmark(args.root, args.workers)
+        print(f"{report['files']} files, {report['bytes']:,} chars, {report['workers']} workers\n")
+        for name in ("regex_scan", "engine_serial", "engine_pool", "engine_memo_warm"):
+            seconds, found = report[name]
+            print(f"  {name:<17} {seconds:8.3f}s  {found:>7} sections/definitions")
+        return
+
+    if not os.path.exists(args.target):
+        print(f"Error: File not found: {args.target}", file=sys.stderr)
+        sys.exit(1)
+    with open(args.target, 'r', encoding='utf-8', errors='replace') as f:
+        structure = extract_structure(f.read(), args.target)
+    if args.json:
+        print(json.dumps(structure, indent=2))
+        return
+    for s in structure["sections"]:
+        print(f"{'  ' * (s['level'] - 1)}L{s['line']}: {s['title']}")
+    for d in structure["definitions"]:
+        name = f"{d['parent']}.{d['name']}" if d.get("parent") else d["name"]
+        print(f"L{d['line']}-{d.get('end_line', d['line'])}: {d['type']} {name}")
+
+if __name__ == "__main__":
+    main()
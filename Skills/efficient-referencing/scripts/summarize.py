@@ -11,96 +11,32 @@ import sys
 from pathlib import Path
 from collections import Counter
 
+from cache import get_or_cache
+
 def extract_summary(filepath: str) -> dict:
     """Extract a lightweight summary from a file."""
-    with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
-        content = f.read()
-    
-    lines = content.split('\n')
-    ext = Path(filepath).suffix.lower()
+    # Structure comes from the shared engine via the workspace index
+    entry = get_or_cache(filepath)
+    content = entry["source"].text()
+    structure = entry["structure"]
     
     summary = {
         "file": os.path.basename(filepath),
         "path": os.path.abspath(filepath),
-        "extension": ext,
-        "total_lines": len(lines),
-        "size_bytes": len(content.encode('utf-8')),
-        "sections": [],
-        "definitions": [],
+        "extension": Path(filepath).suffix.lower(),
+        "total_lines": entry["line_count"],
+        "size_bytes": entry["byte_size"],
+        "sections": structure["sections"],
+        "definitions": structure["definitions"],
         "imports": [],
         "key_terms": [],
         "line_index": {}  # section_name -> line_range
     }
     
-    # Track sections for line index
-    current_section = None
-    current_section_start = 1
-    
-    for i, line in enumerate(lines, 1):
-        stripped = line.strip()
-        
-        # Markdown headers
-        if ext in ['.md', '.markdown'] and stripped.startswith('#'):
-            level = len(stripped) - len(stripped.lstrip('#'))
-            title = stripped.lstrip('#').strip()
-            
-            # Close previous section
-            if current_section:
-                summary["line_index"][current_section] = (current_section_start, i - 1)
-            
-            summary["sections"].append({
-                "line": i,
-                "level": level,
-                "title": title
-            })
-            current_section = title
-            current_section_start = i
-        
-        # Python
-        elif ext == '.py':
-            if stripped.startswith(('def ', 'class ', 'async def ')):
-                match = re.match(r'(async\s+)?(def|class)\s+(\w+)', stripped)
-                if match:
-                    summary["definitions"].append({
-                        "line": i,
-                        "type": match.group(2),
-                        "name": match.group(3)
-                    })
-            elif stripped.startswith(('import ', 'from ')):
-                summary["imports"].append(stripped)
-        
-        # JavaScript/TypeScript
-        elif ext in ['.js', '.ts', '.tsx', '.jsx']:
-            if re.match(r'^(export\s+)?(async\s+)?function\s+\w+', stripped):
-                match = re.search(r'function\s+(\w+)', stripped)
-                if match:
-                    summary["definitions"].append({
-                        "line": i,
-                        "type": "function",
-                        "name": match.group(1)
-                    })
-            elif re.match(r'^(export\s+)?class\s+\w+', stripped):
-                match = re.search(r'class\s+(\w+)', stripped)
-                if match:
-                    summary["definitions"].append({
-                        "line": i,
-                        "type": "class",
-                        "name": match.group(1)
-                    })
-            elif re.match(r'^(export\s+)?(const|let|var)\s+\w+\s*=\s*(async\s+)?\(', stripped):
-                match = re.search(r'(const|let|var)\s+(\w+)', stripped)
-                if match:
-                    summary["definitions"].append({
-                        "line": i,
-                        "type": "arrow_fn",
-                        "name": match.group(2)
-                    })
-            elif stripped.startswith('import '):
-                summary["imports"].append(stripped[:100])
-    
-    # Close final section
-    if current_section:
-        summary["line_index"][current_section] = (current_section_start, len(lines))
+    # Each section runs until the next header, the last one to EOF
+    sections = structure["sections"]
+    for sec, nxt in zip(sections, sections[1:] + [None]):
+        summary["line_index"][sec["title"]] = (sec["line"], nxt["line"] - 1 if nxt else entry["line_count"])
     
     # Extract key terms (frequent capitalized words, excluding common ones)
     common_words = {'The', 'This', 'That', 'There', 'These', 'When', 'Where', 'What', 
@@ -111,7 +47,7 @@ def extract_summary(filepath: str) -> dict:
     summary["key_terms"] = [term for term, count in word_counts.most_common(20) if count >= 2]
     
     # Dedupe imports
-    summary["imports"] = list(dict.fromkeys(summary["imports"]))[:20]
+    summary["imports"] = [imp[:100] for imp in dict.fromkeys(structure["imports"])][:20]
     
     return summary
 
@@ -134,7 +70,8 @@ def format_summary(summary: dict, verbose: bool = False) -> str:
     if summary["definitions"]:
         out.append("## Definitions")
         for defn in summary["definitions"][:30]:
-            out.append(f"- L{defn['line']}: {defn['type']} `{defn['name']}`")
+            name = f"{defn['parent']}.{defn['name']}" if defn.get("parent") else defn["name"]
+            out.append(f"- L{defn['line']}: {defn['type']} `{name}`")
         if len(summary["definitions"]) > 30:
             out.append(f"- ... and {len(summary['definitions']) - 30} more")
         out.append("")
@@ -7,15 +7,24 @@ Improved cross-referencing:
 2. Extracts core topics from prediction market questions
 3. Uses multi-term matching with partial overlap scoring
 4. Tracks raw tweet/post text for context in the output
+
+Two modes:
+  python3 aggregate.py            # one pass over the latest scan files
+  python3 aggregate.py --stream   # tail data/events.db (see event_log.py): rolling
+                                  # 1h/6h/24h topic windows, alerts within seconds
 """
 
+import argparse
 import json
 import os
 import glob
 import re
 import sys
+import time
 from datetime import datetime, timezone, timedelta
-from collections import defaultdict
+from collections import defaultdict, deque
+
+from event_log import EventLog
 
 DATA_DIR = "/home/workspace/Skills/sentiment-scanner/data"
 OUTPUT_DIR = "/home/workspace/Skills/sentiment-scanner/data/signals"
@@ -79,6 +88,73 @@ def load_latest_scan(prefix: str) -> dict | None:
             return json.load(f)
     return None
 
+KNOWN_ENTITIES = [
+    "bitcoin", "ethereum", "solana",
+    "trump", "biden", "elon musk", "spacex", "tesla",
+    "polymarket", "kalshi", "fomc", "inflation",
+    "interest rate", "rate cut", "rate hike",
+    "election", "congress", "senate",
+    "gensler", "blackrock", "spot etf",
+    "openai", "chatgpt", "nvidia",
+    "super bowl", "olympics", "world cup",
+    "ukraine", "russia", "taiwan", "iran", "israel",
+    "tariff", "trade war",
+    "recession", "unemployment", "jobs report",
+    "spx6900", "dogecoin",
+    "raydium", "jupiter",
+]
+
+TOKEN_PATTERN = re.compile(r'\$([A-Z]{2,10})')
+MENTION_PATTERN = re.compile(r'@(\w+)')
+WORD_PATTERN = re.compile(r'\w+')
+NON_ALPHA = re.compile(r'[^a-zA-Z]')
+NON_ALNUM = re.compile(r'[^a-zA-Z0-9]')
+
+def _trie_pattern(node):
+    """Prefix-factored alternation, e.g. rate cut|rate hike → rate\\ (?:cut|hike)."""
+    alts = [re.escape(ch) + _trie_pattern(sub) for ch, sub in sorted(node.items()) if ch]
+    if not alts:
+        return ""
+    if len(alts) == 1 and "" not in node:
+        return alts[0]
+    return "(?:" + "|".join(alts) + ")" + ("?" if "" in node else "")
+
+class EntityMatcher:
+    """Every known phrase that occurs as a substring of a lowercased text, overlaps included.
+
+    Built once per run. A capturing lookahead over the prefix-factored trie
+    regex visits, in a single C-level scan, every position where some phrase
+    starts and captures the longest phrase there (the optional groups are
+    greedy). Shorter phrases starting at the same position are prefixes of
+    that one and are precomputed, so overlaps ("interest rate cut" → interest
+    rate, rate cut) come out exactly like `[e for e in phrases if e in text]`.
+    """
+
+    def __init__(self, phrases):
+        self.phrases = list(dict.fromkeys(phrases))
+        self._prefixes = {
+            p: frozenset(i for i, q in enumerate(self.phrases) if p.startswith(q))
+            for p in self.phrases
+        }
+        trie = {}
+        for i, phrase in enumerate(self.phrases):
+            node = trie
+            for ch in phrase:
+                node = node.setdefault(ch, {})
+            node[""] = i
+        self._starts = re.compile("(?=(" + _trie_pattern(trie) + "))") if self.phrases else None
+
+    def find(self, text_lower: str) -> list[str]:
+        """Matched phrases in list order."""
+        if self._starts is None or not text_lower:
+            return []
+        hits = set()
+        for longest in self._starts.findall(text_lower):
+            hits |= self._prefixes[longest]
+        return [self.phrases[i] for i in sorted(hits)]
+
+ENTITY_MATCHER = EntityMatcher(KNOWN_ENTITIES)
+
 def extract_entities_from_text(text: str) -> dict:
     """Extract meaningful entities from text for cross-referencing."""
     entities = {
@@ -90,42 +166,24 @@ def extract_entities_from_text(text: str) -> dict:
         return entities
     
     # Extract $TOKEN mentions
-    tokens = re.findall(r'\$([A-Z]{2,10})', text)
+    tokens = TOKEN_PATTERN.findall(text)
     entities["tokens"] = list(set(tokens))
     
     # Extract @mentions
-    mentions = re.findall(r'@(\w+)', text)
+    mentions = MENTION_PATTERN.findall(text)
     entities["names"].extend(mentions)
     
     # Extract capitalized proper nouns (2+ chars, not all-caps noise)
     words = text.split()
     for word in words:
-        clean = re.sub(r'[^a-zA-Z]', '', word)
+        clean = NON_ALPHA.sub('', word)
         if (len(clean) >= 3 and clean[0].isupper() and not clean.isupper()
                 and clean.lower() not in STOP_WORDS 
                 and clean.lower() not in GENERIC_CRYPTO_KEYWORDS):
             entities["names"].append(clean)
     
     # Extract key topic phrases: known entities
-    known_entities = [
-        "bitcoin", "ethereum", "solana",
-        "trump", "biden", "elon musk", "spacex", "tesla",
-        "polymarket", "kalshi", "fomc", "inflation",
-        "interest rate", "rate cut", "rate hike",
-        "election", "congress", "senate",
-        "gensler", "blackrock", "spot etf",
-        "openai", "chatgpt", "nvidia",
-        "super bowl", "olympics", "world cup",
-        "ukraine", "russia", "taiwan", "iran", "israel",
-        "tariff", "trade war",
-        "recession", "unemployment", "jobs report",
-        "spx6900", "dogecoin",
-        "raydium", "jupiter",
-    ]
-    text_lower = text.lower()
-    for entity in known_entities:
-        if entity in text_lower:
-            entities["topics"].append(entity)
+    entities["topics"] = ENTITY_MATCHER.find(text.lower())
     
     entities["names"] = list(set(entities["names"]))
     entities["topics"] = list(set(entities["topics"]))
@@ -137,217 +195,241 @@ def extract_market_keywords(question: str, description: str = "") -> set[str]:
     combined = (question + " " + description).lower()
     
     # First check for known entities
-    known_matches = set()
-    known_entities = [
-        "bitcoin", "ethereum", "solana",
-        "trump", "biden", "elon musk", "spacex", "tesla",
-        "polymarket", "kalshi", "fomc", "inflation",
-        "interest rate", "rate cut", "rate hike",
-        "election", "congress", "senate",
-        "gensler", "blackrock", "spot etf",
-        "openai", "chatgpt", "nvidia",
-        "super bowl", "olympics", "world cup",
-        "ukraine", "russia", "taiwan", "iran", "israel",
-        "tariff", "trade war",
-        "recession", "unemployment", "jobs report",
-        "spx6900", "dogecoin",
-        "raydium", "jupiter",
-    ]
-    for entity in known_entities:
-        if entity in combined:
-            known_matches.add(entity)
+    known_matches = set(ENTITY_MATCHER.find(combined))
     
     # Also extract capitalized words as potential entity matches
     words = (question + " " + description).split()
     for word in words:
-        clean = re.sub(r'[^a-zA-Z0-9]', '', word).lower()
+        clean = NON_ALNUM.sub('', word).lower()
         if (len(clean) >= 3 and clean not in STOP_WORDS 
                 and clean not in GENERIC_CRYPTO_KEYWORDS):
             known_matches.add(clean)
     
     return known_matches
 
-def extract_topics_from_x(x_data: dict) -> dict[str, dict]:
-    """Extract trending topics/tokens from X signals with entity extraction."""
-    topics = defaultdict(lambda: {
+# Generic sentiment keywords tracked from X text (lower priority)
+X_SENTIMENT_KEYWORDS = [
+    "pump", "moon", "bullish", "bearish", "dump",
+    "launch", "listing", "airdrop", "breakout",
+]
+
+# Topics that are useful for market matching but not actionable signals
+NOISE_SIGNAL_TOPICS = {
+    "bitcoin", "ethereum", "solana", "polymarket", "kalshi",
+    "pump", "bullish", "bearish", "moon", "launch", "listing",
+    "airdrop", "breakout", "dump",
+}
+
+def _new_topic() -> dict:
+    return {
         "mentions": 0, "total_engagement": 0, "top_authors": [],
         "top_tweets": [], "sentiment_hints": [], "platforms": set(),
         "entities": {"tokens": [], "names": [], "topics": []},
         "sample_texts": [],
-    })
-
-    all_signals = x_data.get("account_signals", []) + x_data.get("search_signals", [])
-
-    token_pattern = re.compile(r'\$([A-Z]{2,10})')
+    }
 
-    for sig in all_signals:
-        text = sig.get("text", "")
-        text_lower = text.lower()
-        author = sig.get("author", "")
-        engagement = sig.get("engagement_score", 0)
-        tier = sig.get("tier", "unknown")
-
-        # Extract entities from this tweet
-        entities = extract_entities_from_text(text)
-
-        # Track by $TOKEN mentions
-        tokens = token_pattern.findall(text)
-        for token in tokens:
-            t = topics[f"${token}"]
-            t["mentions"] += 1
-            t["total_engagement"] += engagement
-            t["platforms"].add("x")
-            if author and author != "unknown" and author not in t["top_authors"]:
-                t["top_authors"].append(author)
-            if text[:200] not in t["sample_texts"]:
-                t["sample_texts"].append(text[:200])
+def x_topic_hits(sig: dict) -> list[tuple]:
+    """(topic, mentions, engagement, author, sample_text, entities) contributed by one X signal.
+    author/sample_text/entities are None where the topic doesn't record them."""
+    text = sig.get("text", "")
+    text_lower = text.lower()
+    author = sig.get("author", "")
+    author = author if author and author != "unknown" else None
+    engagement = sig.get("engagement_score", 0)
+    # tier1 callers count triple on $TOKEN mentions
+    weight = 3 if sig.get("tier", "unknown") == "tier1_caller" else 1
+
+    # Extract entities from this tweet
+    entities = extract_entities_from_text(text)
+    hits = []
+
+    # Track by $TOKEN mentions
+    for token in TOKEN_PATTERN.findall(text):
+        hits.append((f"${token}", weight, engagement * weight, author, text[:200], entities))
+
+    # Track by topic entities (more useful for market matching)
+    for topic in entities["topics"]:
+        hits.append((topic, 1, engagement, author, text[:200], entities))
+
+    # Also track generic sentiment keywords (lower priority)
+    for kw in X_SENTIMENT_KEYWORDS:
+        if kw in text_lower:
+            hits.append((kw, 1, engagement, None, None, None))
+    return hits
+
+def tiktok_topic_hits(sig: dict) -> list[tuple]:
+    """Same as x_topic_hits for one crypto-relevant TikTok signal."""
+    caption = sig.get("caption", "")
+    transcript = sig.get("transcript", "")
+    creator = sig.get("creator", "") or None
+    engagement = sig.get("engagement_score", 0)
+    combined_text = caption + " " + transcript
+
+    entities = extract_entities_from_text(combined_text)
+    hits = []
+
+    for hashtag in sig.get("hashtags", []):
+        if hashtag in GENERIC_CRYPTO_KEYWORDS:
+            continue
+        hits.append((f"#{hashtag}", 1, engagement, creator, None, None))
+
+    for token in TOKEN_PATTERN.findall(combined_text.upper()):
+        hits.append((f"${token}", 1, engagement, creator, None, None))
+
+    for topic in entities["topics"]:
+        hits.append((topic, 1, engagement, creator, combined_text[:200], None))
+    return hits
+
+def fold_topic_hits(topics: dict, platform: str, hits: list[tuple]):
+    for topic, mentions, engagement, author, sample, entities in hits:
+        t = topics[topic]
+        t["mentions"] += mentions
+        t["total_engagement"] += engagement
+        t["platforms"].add(platform)
+        if author and author not in t["top_authors"]:
+            t["top_authors"].append(author)
+        if sample is not None and sample not in t["sample_texts"]:
+            t["sample_texts"].append(sample)
+        if entities:
             # Merge entities
             for k in entities:
                 t["entities"][k] = list(set(t["entities"].get(k, []) + entities[k]))
-            if tier == "tier1_caller":
-                t["mentions"] += 2
-                t["total_engagement"] += engagement * 2
-
-        # Track by topic entities (more useful for market matching)
-        for topic in entities["topics"]:
-            t = topics[topic]
-            t["mentions"] += 1
-            t["total_engagement"] += engagement
-            t["platforms"].add("x")
-            if author and author != "unknown" and author not in t["top_authors"]:
-                t["top_authors"].append(author)
-            if text[:200] not in t["sample_texts"]:
-                t["sample_texts"].append(text[:200])
-            for k in entities:
-                t["entities"][k] = list(set(t["entities"].get(k, []) + entities[k]))
-
-        # Also track generic sentiment keywords (lower priority)
-        topic_keywords = [
-            "pump", "moon", "bullish", "bearish", "dump",
-            "launch", "listing", "airdrop", "breakout",
-        ]
-        for kw in topic_keywords:
-            if kw in text_lower:
-                t = topics[kw]
-                t["mentions"] += 1
-                t["total_engagement"] += engagement
-                t["platforms"].add("x")
 
+def extract_topics_from_x(x_data: dict) -> dict[str, dict]:
+    """Extract trending topics/tokens from X signals with entity extraction."""
+    topics = defaultdict(_new_topic)
+    all_signals = x_data.get("account_signals", []) + x_data.get("search_signals", [])
+    for sig in all_signals:
+        fold_topic_hits(topics, "x", x_topic_hits(sig))
     return topics
 
 def extract_topics_from_tiktok(tt_data: dict) -> dict[str, dict]:
     """Extract trending topics from TikTok signals."""
-    topics = defaultdict(lambda: {
-        "mentions": 0, "total_engagement": 0, "top_authors": [],
-        "top_tweets": [], "sentiment_hints": [], "platforms": set(),
-        "entities": {"tokens": [], "names": [], "topics": []},
-        "sample_texts": [],
-    })
-
-    token_pattern = re.compile(r'\$([A-Z]{2,10})')
-
+    topics = defaultdict(_new_topic)
     for sig in tt_data.get("hashtag_signals", []):
         if not sig.get("crypto_relevant"):
             continue
-        caption = sig.get("caption", "")
-        transcript = sig.get("transcript", "")
-        creator = sig.get("creator", "")
-        engagement = sig.get("engagement_score", 0)
-        combined_text = caption + " " + transcript
+        fold_topic_hits(topics, "tiktok", tiktok_topic_hits(sig))
+    return topics
 
-        entities = extract_entities_from_text(combined_text)
+class MarketIndex:
+    """Inverted indexes over one venue's markets, built once per run.
+
+    A social term matches a market when it is one of the market's keywords, or
+    (4+ chars) appears on word boundaries in the market text. Keyword hits come
+    straight from the keyword index. For boundary hits, every \\w-run of the
+    term must be a whole token of the text, so intersecting the term's token
+    postings leaves a handful of candidates for the term's single compiled
+    `\\b…\\b` regex instead of one fresh regex per (term × market).
+    """
+
+    def __init__(self, texts: list[str], keywords: list[set[str]]):
+        self.texts = texts
+        self._by_keyword = defaultdict(list)
+        self._by_token = defaultdict(set)
+        for i, (text, kws) in enumerate(zip(texts, keywords)):
+            for kw in kws:
+                self._by_keyword[kw].append(i)
+            for tok in set(WORD_PATTERN.findall(text)):
+                self._by_token[tok].add(i)
+
+    def lookup(self, term: str) -> set[int]:
+        """Indexes of the markets `term` matches."""
+        hits = set(self._by_keyword.get(term, ()))
+        if len(term) < 4:
+            return hits
+        tokens = set(WORD_PATTERN.findall(term))
+        if tokens:
+            postings = sorted((self._by_token.get(t, set()) for t in tokens), key=len)
+            candidates = set.intersection(*postings)
+        else:
+            candidates = set(range(len(self.texts)))
+        candidates -= hits
+        if candidates:
+            pattern = re.compile(r'\b' + re.escape(term) + r'\b')
+            hits.update(i for i in candidates if pattern.search(self.texts[i]))
+        return hits
+
+def build_market_index(platform: str, markets: list[dict]) -> MarketIndex:
+    """Polymarket matches on question + description, Kalshi on title."""
+    if platform == "polymarket":
+        return MarketIndex(
+            [(m.get("question", "") + " " + m.get("description", "")).lower() for m in markets],
+            [extract_market_keywords(m.get("question", ""), m.get("description", "")) for m in markets],
+        )
+    return MarketIndex(
+        [m.get("title", "").lower() for m in markets],
+        [extract_market_keywords(m.get("title", "")) for m in markets],
+    )
+
+def social_term(topic_name: str) -> str | None:
+    """Cleaned term used to match a topic against markets, or None if too short/generic."""
+    clean = topic_name.replace("$", "").replace("#", "").lower()
+    if len(clean) < 3 or clean in GENERIC_CRYPTO_KEYWORDS:
+        return None
+    return clean
 
-        for hashtag in sig.get("hashtags", []):
-            if hashtag in GENERIC_CRYPTO_KEYWORDS:
-                continue
-            t = topics[f"#{hashtag}"]
-            t["mentions"] += 1
-            t["total_engagement"] += engagement
-            t["platforms"].add("tiktok")
-            if creator and creator not in t["top_authors"]:
-                t["top_authors"].append(creator)
-
-        tokens = token_pattern.findall(combined_text.upper())
-        for token in tokens:
-            t = topics[f"${token}"]
-            t["mentions"] += 1
-            t["total_engagement"] += engagement
-            t["platforms"].add("tiktok")
-            if creator and creator not in t["top_authors"]:
-                t["top_authors"].append(creator)
-
-        for topic in entities["topics"]:
-            t = topics[topic]
-            t["mentions"] += 1
-            t["total_engagement"] += engagement
-            t["platforms"].add("tiktok")
-            if creator and creator not in t["top_authors"]:
-                t["top_authors"].append(creator)
-            if combined_text[:200] not in t["sample_texts"]:
-                t["sample_texts"].append(combined_text[:200])
+def _social_terms(topics: dict) -> dict[str, str]:
+    """Cleaned social term → topic name, for every topic usable in market matching."""
+    terms = {}
+    for topic_name in topics:
+        clean = social_term(topic_name)
+        if clean:
+            terms[clean] = topic_name
+    return terms
 
-    return topics
+def _matching_topics(index: MarketIndex, social_terms: dict) -> list[list[str]]:
+    """Per market, the social terms it matches (in social term order)."""
+    matching = [[] for _ in index.texts]
+    for social_term in social_terms:
+        for i in index.lookup(social_term):
+            matching[i].append(social_term)
+    return matching
+
+def _score_match(matching_topics: list[str], topics: dict, social_terms: dict) -> dict:
+    social_engagement = sum(
+        topics.get(social_terms.get(t, t), {}).get("total_engagement", 0)
+        for t in matching_topics
+    )
+    social_mentions = sum(
+        topics.get(social_terms.get(t, t), {}).get("mentions", 0)
+        for t in matching_topics
+    )
+
+    # Better scoring: more matching topics = higher quality
+    match_quality = (
+        len(matching_topics) * 15 +
+        min(social_engagement / 10, 50) +
+        min(social_mentions * 3, 30)
+    )
+
+    # Get sample social content for context
+    sample_texts = []
+    for t in matching_topics[:3]:
+        topic_key = social_terms.get(t, t)
+        texts = topics.get(topic_key, {}).get("sample_texts", [])
+        sample_texts.extend(texts[:2])
+
+    return {
+        "social_engagement": social_engagement,
+        "social_mentions": social_mentions,
+        "match_quality": round(match_quality),
+        "social_context": sample_texts[:3],
+    }
 
 def find_prediction_market_matches(topics: dict, poly_data: dict, kalshi_data: dict) -> list[dict]:
     """Find prediction markets related to trending social topics.
     Uses multi-term overlap scoring instead of strict keyword matching."""
     matches = []
-
-    # Build a set of all social terms for matching
-    social_terms = {}
-    for topic_name, topic_data in topics.items():
-        clean = topic_name.replace("$", "").replace("#", "").lower()
-        if len(clean) < 3:
-            continue
-        if clean in GENERIC_CRYPTO_KEYWORDS:
-            continue
-        social_terms[clean] = topic_name
+    social_terms = _social_terms(topics)
 
     # Check Polymarket
-    for market in poly_data.get("markets_with_edge", []):
-        question = market.get("question", "")
-        desc = market.get("description", "")
-        market_keywords = extract_market_keywords(question, desc)
-        
-        # Find overlap between social terms and market keywords
-        # Use word boundary matching to avoid "sol" matching "console" etc
-        matching_topics = []
-        market_text_lower = (question + " " + desc).lower()
-        for social_term in social_terms:
-            if social_term in market_keywords:
-                matching_topics.append(social_term)
-            elif len(social_term) >= 4:
-                # Word boundary check in actual market text
-                pattern = r'\b' + re.escape(social_term) + r'\b'
-                if re.search(pattern, market_text_lower):
-                    matching_topics.append(social_term)
-
+    poly_markets = poly_data.get("markets_with_edge", [])
+    index = build_market_index("polymarket", poly_markets)
+    for market, matching_topics in zip(poly_markets, _matching_topics(index, social_terms)):
         if not matching_topics:
             continue
-
-        social_engagement = sum(
-            topics.get(social_terms.get(t, t), {}).get("total_engagement", 0)
-            for t in matching_topics
-        )
-        social_mentions = sum(
-            topics.get(social_terms.get(t, t), {}).get("mentions", 0)
-            for t in matching_topics
-        )
-        
-        # Better scoring: more matching topics = higher quality
-        match_quality = (
-            len(matching_topics) * 15 +
-            min(social_engagement / 10, 50) +
-            min(social_mentions * 3, 30)
-        )
-
-        # Get sample social content for context
-        sample_texts = []
-        for t in matching_topics[:3]:
-            topic_key = social_terms.get(t, t)
-            texts = topics.get(topic_key, {}).get("sample_texts", [])
-            sample_texts.extend(texts[:2])
-
+        score = _score_match(matching_topics, topics, social_terms)
         matches.append({
             "type": "polymarket",
             "question": market["question"],
@@ -355,50 +437,16 @@ def find_prediction_market_matches(topics: dict, poly_data: dict, kalshi_data: d
             "matching_social_topics": matching_topics,
             "cheap_outcomes": market.get("cheap_outcomes", []),
             "volume_24h": market.get("volume_24h", 0),
-            "social_engagement": social_engagement,
-            "social_mentions": social_mentions,
-            "match_quality": round(match_quality),
-            "social_context": sample_texts[:3],
+            **score,
         })
 
     # Check Kalshi
-    for market in kalshi_data.get("markets_with_edge", []):
-        title = market.get("title", "")
-        market_keywords = extract_market_keywords(title)
-        
-        matching_topics = []
-        title_lower = title.lower()
-        for social_term in social_terms:
-            if social_term in market_keywords:
-                matching_topics.append(social_term)
-            elif len(social_term) >= 4:
-                pattern = r'\b' + re.escape(social_term) + r'\b'
-                if re.search(pattern, title_lower):
-                    matching_topics.append(social_term)
-
+    kalshi_markets = kalshi_data.get("markets_with_edge", [])
+    index = build_market_index("kalshi", kalshi_markets)
+    for market, matching_topics in zip(kalshi_markets, _matching_topics(index, social_terms)):
         if not matching_topics:
             continue
-
-        social_engagement = sum(
-            topics.get(social_terms.get(t, t), {}).get("total_engagement", 0)
-            for t in matching_topics
-        )
-        social_mentions = sum(
-            topics.get(social_terms.get(t, t), {}).get("mentions", 0)
-            for t in matching_topics
-        )
-        match_quality = (
-            len(matching_topics) * 15 +
-            min(social_engagement / 10, 50) +
-            min(social_mentions * 3, 30)
-        )
-
-        sample_texts = []
-        for t in matching_topics[:3]:
-            topic_key = social_terms.get(t, t)
-            texts = topics.get(topic_key, {}).get("sample_texts", [])
-            sample_texts.extend(texts[:2])
-
+        score = _score_match(matching_topics, topics, social_terms)
         matches.append({
             "type": "kalshi",
             "question": market["title"],
@@ -406,10 +454,7 @@ def find_prediction_market_matches(topics: dict, poly_data: dict, kalshi_data: d
             "matching_social_topics": matching_topics,
             "cheap_sides": market.get("cheap_sides", []),
             "volume_24h": market.get("volume_24h", 0),
-            "social_engagement": social_engagement,
-            "social_mentions": social_mentions,
-            "match_quality": round(match_quality),
-            "social_context": sample_texts[:3],
+            **score,
         })
 
     matches.sort(key=lambda x: (x["match_quality"], x["social_engagement"]), reverse=True)
@@ -498,13 +543,6 @@ def run_aggregation() -> dict:
         for k in data.get("entities", {}):
             t["entities"][k] = list(set(t["entities"].get(k, []) + data["entities"].get(k, [])))
 
-    # Topics that are useful for market matching but not actionable signals
-    NOISE_SIGNAL_TOPICS = {
-        "bitcoin", "ethereum", "solana", "polymarket", "kalshi",
-        "pump", "bullish", "bearish", "moon", "launch", "listing",
-        "airdrop", "breakout", "dump",
-    }
-
     # Score all topics
     scored = []
     for name, data in all_topics.items():
@@ -612,14 +650,252 @@ def run_aggregation() -> dict:
 
     return results
 
+# --- Streaming mode ---
+# Rolling windows kept by `aggregate.py --stream`, newest scanner events first.
+STREAM_WINDOWS = {"1h": 3600, "6h": 6 * 3600, "24h": 24 * 3600}
+CONFIDENCE_RANK = {None: 0, "low": 1, "medium": 2, "high": 3}
+
+def _bump(counts: dict, key, sign: int):
+    counts[key] = counts.get(key, 0) + sign
+    if counts[key] <= 0:
+        del counts[key]
+
+class TopicWindows:
+    """Per-topic mentions/engagement over several rolling windows, kept incrementally.
+
+    Each window holds its topic hits in arrival order; advancing the clock pops
+    expired hits off the front and subtracts them, so an update costs only the
+    hits entering or leaving a window. Authors, platforms and sample texts are
+    reference-counted so they disappear with the last hit that carried them.
+    """
+
+    def __init__(self, windows: dict[str, int] = None):
+        self.windows = windows or STREAM_WINDOWS
+        self._hits = {name: deque() for name in self.windows}
+        self.topics = {name: {} for name in self.windows}
+
+    def _apply(self, window: str, platform: str, hit: tuple, sign: int):
+        topic, mentions, engagement, author, sample, _ = hit
+        t = self.topics[window].get(topic)
+        if t is None:
+            t = self.topics[window][topic] = {"mentions": 0, "total_engagement": 0,
+                                              "platforms": {}, "authors": {}, "samples": {}}
+        t["mentions"] += sign * mentions
+        t["total_engagement"] += sign * engagement
+        _bump(t["platforms"], platform, sign)
+        if author:
+            _bump(t["authors"], author, sign)
+        if sample is not None:
+            _bump(t["samples"], sample, sign)
+        if not t["platforms"]:
+            del self.topics[window][topic]
+
+    def add(self, ts: float, platform: str, hits: list[tuple], now: float) -> set:
+        """Record one signal's hits; returns the (window, topic) pairs that changed."""
+        touched = set()
+        for window, span in self.windows.items():
+            if ts < now - span:
+                continue
+            for hit in hits:
+                self._hits[window].append((ts, platform, hit))
+                self._apply(window, platform, hit, +1)
+                touched.add((window, hit[0]))
+        return touched
+
+    def expire(self, now: float) -> set:
+        touched = set()
+        for window, span in self.windows.items():
+            q = self._hits[window]
+            while q and q[0][0] < now - span:
+                _, platform, hit = q.popleft()
+                self._apply(window, platform, hit, -1)
+                touched.add((window, hit[0]))
+        return touched
+
+    def topic_data(self, window: str, topic: str) -> dict | None:
+        """The topic in the shape score_signal expects, or None once it has aged out."""
+        t = self.topics[window].get(topic)
+        if t is None:
+            return None
+        return {
+            "mentions": t["mentions"],
+            "total_engagement": t["total_engagement"],
+            "platforms": set(t["platforms"]),
+            "top_authors": list(t["authors"]),
+            "sample_texts": list(t["samples"]),
+        }
+
+class SignalStream:
+    """Tails the shared event log into TopicWindows and reports confidence crossings."""
+
+    def __init__(self, log: EventLog, windows: dict[str, int] = None):
+        self.log = log
+        self.windows = TopicWindows(windows)
+        self.last_id = 0
+        self.live = False          # replaying the retained log: track levels, don't alert
+        self.levels = {}           # (window, topic) -> last confidence seen
+        self.markets = {}          # platform -> live edge markets (latest batch)
+        self._batches = {}
+        self._indexes = {}
+
+    def _ingest(self, rows: list[tuple], now: float) -> set:
+        touched, changed_markets = set(), set()
+        for event_id, ts, platform, kind, _, batch, data in rows:
+            self.last_id = event_id
+            if kind == "market":
+                if self._batches.get(platform) != batch:
+                    self._batches[platform] = batch
+                    self.markets[platform] = []
+                    changed_markets.add(platform)
+                if data:
+                    self.markets[platform].append(data)
+                continue
+            if platform == "x":
+                hits = x_topic_hits(data)
+            elif platform == "tiktok" and data.get("crypto_relevant"):
+                hits = tiktok_topic_hits(data)
+            else:
+                continue
+            touched |= self.windows.add(ts, platform, hits, now)
+        for platform in changed_markets:
+            self._indexes[platform] = build_market_index(platform, self.markets[platform])
+        return touched
+
+    def market_matches(self, topic: str, limit: int = 3) -> list[dict]:
+        """Live edge markets matching a topic, highest 24h volume first."""
+        term = social_term(topic)
+        if not term:
+            return []
+        found = []
+        for platform, index in self._indexes.items():
+            for i in index.lookup(term):
+                m = self.markets[platform][i]
+                found.append({
+                    "type": platform,
+                    "question": m.get("question", m.get("title", "")),
+                    "url": m.get("url", ""),
+                    "volume_24h": m.get("volume_24h", 0),
+                    "cheap": m.get("cheap_outcomes", m.get("cheap_sides", [])),
+                })
+        found.sort(key=lambda m: m["volume_24h"], reverse=True)
+        return found[:limit]
+
+    def poll(self, now: float = None) -> list[dict]:
+        """Ingest everything appended since the last poll; signals whose confidence just rose to medium/high."""
+        now = now or time.time()
+        touched = set()
+        while True:
+            rows = self.log.since(self.last_id)
+            if not rows:
+                break
+            touched |= self._ingest(rows, now)
+        touched |= self.windows.expire(now)
+
+        emitted = []
+        order = list(self.windows.windows)
+        for window, topic in sorted(touched, key=lambda wt: (order.index(wt[0]), wt[1])):
+            data = self.windows.topic_data(window, topic)
+            level, signal = None, None
+            if (data and data["mentions"] >= 2
+                    and topic.replace("$", "").replace("#", "").lower() not in NOISE_SIGNAL_TOPICS):
+                signal = score_signal(topic, data, len(self.windows.topics[window]))
+                level = signal["confidence"]
+            prev = self.levels.get((window, topic))
+            if level is None:
+                self.levels.pop((window, topic), None)
+            else:
+                self.levels[(window, topic)] = level
+            if (self.live and CONFIDENCE_RANK[level] > CONFIDENCE_RANK[prev]
+                    and level in ("medium", "high")):
+                emitted.append({
+                    **signal,
+                    "window": window,
+                    "previous_confidence": prev,
+                    "prediction_markets": self.market_matches(topic),
+                    "emitted_at": datetime.now(timezone.utc).isoformat(),
+                })
+        return emitted
+
+    def snapshot(self, top: int = 30) -> dict:
+        """Current top signals per window, same filters as run_aggregation."""
+        windows = {}
+        for window, topics in self.windows.topics.items():
+            scored = []
+            for topic in topics:
+                data = self.windows.topic_data(window, topic)
+                if data["mentions"] < 2:
+                    continue
+                if topic.replace("$", "").replace("#", "").lower() in NOISE_SIGNAL_TOPICS:
+                    continue
+                scored.append(score_signal(topic, data, len(topics)))
+            scored.sort(key=lambda x: x["score"], reverse=True)
+            windows[window] = scored[:top]
+        return {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "last_event_id": self.last_id,
+            "live_markets": {p: len(m) for p, m in self.markets.items()},
+            "windows": windows,
+        }
+
+def run_stream(poll_interval: float = 1.0, snapshot_every: float = 10.0, prune_every: float = 3600.0):
+    """Long-running aggregator over the shared event log (Ctrl-C to stop).
+
+    Signals are appended to signals/stream.jsonl the moment they cross into
+    medium/high confidence; signals/live.json holds the current top signals
+    per window.
+    """
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    log = EventLog()
+    stream = SignalStream(log)
+    t0 = time.time()
+    stream.poll()
+    stream.live = True
+    tracked = {w: len(t) for w, t in stream.windows.topics.items()}
+    print(f"Replayed event log up to #{stream.last_id} in {time.time() - t0:.1f}s — topics per window: {tracked}")
+    print(f"Streaming (poll {poll_interval}s); alerts → {os.path.join(OUTPUT_DIR, 'stream.jsonl')}")
+
+    stream_file = os.path.join(OUTPUT_DIR, "stream.jsonl")
+    live_file = os.path.join(OUTPUT_DIR, "live.json")
+    last_snapshot = last_prune = 0.0
+    try:
+        while True:
+            emitted = stream.poll()
+            if emitted:
+                with open(stream_file, "a") as f:
+                    for sig in emitted:
+                        f.write(json.dumps(sig, default=str) + "\n")
+                for sig in emitted:
+                    markets = "; ".join(m["question"][:50] for m in sig["prediction_markets"])
+                    print(f"  [{sig['confidence'].upper():6s}] {sig['window']:>3} {sig['topic']:20s} | "
+                          f"Score: {sig['score']:3d} | Mentions: {sig['mentions']:3d} | "
+                          f"Platforms: {', '.join(sig['platforms'])}" + (f" | Markets: {markets}" if markets else ""))
+            now = time.time()
+            if now - last_snapshot >= snapshot_every:
+                tmp = live_file + ".tmp"
+                with open(tmp, "w") as f:
+                    json.dump(stream.snapshot(), f, indent=2, default=str)
+                os.replace(tmp, live_file)
+                last_snapshot = now
+            if now - last_prune >= prune_every:
+                log.prune()
+                last_prune = now
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print("\nStopped.")
+    finally:
+        log.close()
+
 def social_terms_debug(topics):
     """Debug helper to show what social terms would be used for matching."""
-    terms = {}
-    for topic_name in topics:
-        clean = topic_name.replace("$", "").replace("#", "").lower()
-        if len(clean) >= 3 and clean not in GENERIC_CRYPTO_KEYWORDS:
-            terms[clean] = topic_name
-    return terms
+    return _social_terms(topics)
 
 if __name__ == "__main__":
-    run_aggregation()
+    parser = argparse.ArgumentParser(description="Cross-platform signal aggregator")
+    parser.add_argument("--stream", action="store_true",
+                        help="long-running mode over the shared event log (rolling 1h/6h/24h windows)")
+    parser.add_argument("--poll", type=float, default=1.0, help="seconds between event log polls (--stream)")
+    args = parser.parse_args()
+    if args.stream:
+        run_stream(args.poll)
+    else:
+        run_aggregation()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Shared sentiment event log (data/events.db).
+
+Every scanner appends normalized events when it finishes a scan;
+`aggregate.py --stream` tails the log and keeps rolling topic windows, so a
+signal surfaces seconds after the scan that carried it instead of on the next
+aggregation run. SQLite in WAL mode: scanner processes append while the
+aggregator reads.
+
+Event envelope: id (monotonic), ts (first seen, epoch seconds), platform,
+kind, source_id, batch, data (the scanner's own signal / market dict as JSON).
+
+- kind "post" (X, TikTok) is deduped on (platform, source_id): a tweet or video
+  that shows up again in the next scan counts once, at the time it was first
+  seen.
+- kind "market" (Polymarket, Kalshi) is state, not a count: a scan appends its
+  whole edge list under one batch id in one transaction, and the latest batch
+  per platform is the live market set.
+
+Usage:
+    python3 event_log.py --stats              # events per platform/kind, newest first-seen
+    python3 event_log.py --prune              # drop events past the retention window
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+DATA_DIR = "/home/workspace/Skills/sentiment-scanner/data"
+DB_FILE = os.path.join(DATA_DIR, "events.db")
+RETENTION = 48 * 3600   # seconds kept; the longest aggregation window is 24h
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    platform TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    source_id TEXT,
+    batch TEXT,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS events_post ON events (platform, source_id) WHERE kind = 'post';
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+"""
+
+
+def post_id(signal: dict, *fields) -> str:
+    """First non-empty id field, else a hash of author + text."""
+    for f in fields:
+        if signal.get(f):
+            return str(signal[f])
+    author = signal.get("author") or signal.get("creator") or ""
+    text = signal.get("text") or signal.get("caption") or ""
+    return "h:" + hashlib.sha1(f"{author}\n{text}".encode()).hexdigest()[:16]
+
+
+class EventLog:
+    def __init__(self, path: str = None):
+        self.path = path or DB_FILE
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def append_posts(self, platform: str, signals: list[dict], *id_fields) -> int:
+        """Append X/TikTok signals; ones already logged are skipped. Returns how many were new."""
+        now = time.time()
+        rows = [(now, platform, "post", post_id(s, *id_fields), None, json.dumps(s, default=str))
+                for s in signals]
+        self.db.execute("BEGIN IMMEDIATE")
+        before = self.db.total_changes
+        self.db.executemany("INSERT OR IGNORE INTO events (ts, platform, kind, source_id, batch, data) "
+                            "VALUES (?, ?, ?, ?, ?, ?)", rows)
+        added = self.db.total_changes - before
+        self.db.execute("COMMIT")
+        return added
+
+    def append_markets(self, platform: str, markets: list[dict], key) -> str:
+        """Append a scan's edge markets as one batch, the platform's new live set. Returns the batch id."""
+        now = time.time()
+        batch = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S.%f")
+        rows = [(now, platform, "market", str(key(m)), batch, json.dumps(m, default=str)) for m in markets]
+        if not rows:   # an empty batch still has to replace the previous live set
+            rows = [(now, platform, "market", None, batch, "null")]
+        self.db.execute("BEGIN IMMEDIATE")
+        self.db.executemany("INSERT INTO events (ts, platform, kind, source_id, batch, data) "
+                            "VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self.db.execute("COMMIT")
+        return batch
+
+    def since(self, last_id: int, limit: int = 5000) -> list[tuple]:
+        """(id, ts, platform, kind, source_id, batch, data) after `last_id`, oldest first."""
+        rows = self.db.execute("SELECT id, ts, platform, kind, source_id, batch, data FROM events "
+                               "WHERE id > ? ORDER BY id LIMIT ?", (last_id, limit)).fetchall()
+        return [(i, ts, p, k, sid, b, json.loads(d)) for i, ts, p, k, sid, b, d in rows]
+
+    def prune(self, retention: float = RETENTION) -> int:
+        """Drop events older than `retention`, keeping each platform's latest market batch."""
+        cutoff = time.time() - retention
+        self.db.execute("BEGIN IMMEDIATE")
+        cur = self.db.execute(
+            "DELETE FROM events WHERE ts < ? AND NOT (kind = 'market' AND batch = "
+            "(SELECT MAX(batch) FROM events e WHERE e.kind = 'market' AND e.platform = events.platform))",
+            (cutoff,))
+        self.db.execute("COMMIT")
+        return cur.rowcount
+
+    def stats(self) -> list[tuple]:
+        return self.db.execute("SELECT platform, kind, COUNT(*), MAX(ts) FROM events "
+                               "GROUP BY platform, kind ORDER BY MAX(ts) DESC").fetchall()
+
+    def close(self):
+        self.db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stats", action="store_true")
+    parser.add_argument("--prune", action="store_true")
+    args = parser.parse_args()
+    log = EventLog()
+    if args.prune:
+        print(f"Pruned {log.prune()} events")
+    for platform, kind, count, last in log.stats():
+        age = (time.time() - last) / 60
+        print(f"  {platform:<11} {kind:<7} {count:>7} events, newest {age:.0f} min ago")
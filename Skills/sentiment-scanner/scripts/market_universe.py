@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""Prediction-market universe fetcher shared by scan_polymarket and scan_kalshi.
+
+Pulls a venue's whole open-market universe instead of the first few hundred:
+
+- one pooled requests.Session per venue (keep-alive, retries with backoff that
+  honour Retry-After on 429/5xx);
+- conditional requests: pages that came back with an ETag / Last-Modified are
+  kept in the snapshot DB and re-requested with If-None-Match /
+  If-Modified-Since, so an unchanged page is a 304 with no body;
+- concurrent pagination: offset listings (Polymarket Gamma) keep `workers`
+  pages in flight until one comes back short; cursor listings (Kalshi) are
+  serial per chain, so the caller splits the universe into partitions whose
+  chains run side by side;
+- a local snapshot (data/markets.db) of every market's price/volume
+  fingerprint and last analysis, so run_scan re-runs analyze_market only on
+  markets that moved since the previous scan.
+
+A page that still fails after the retries raises out of the paginators, so a
+scan never mistakes a partial universe for the whole one (which would mark
+every unseen market as removed from the snapshot).
+
+Usage (from the scanners):
+    store = SnapshotStore(os.path.join(DATA_DIR, "markets.db"))
+    fetcher = Fetcher(GAMMA_API, workers=8, store=store)
+    markets = paginate_offset(lambda off: fetch_active_markets(100, off, fetcher, strict=True), 100, workers=8)
+    analyses, stats = analyze_changed(store, "polymarket", markets, market_key,
+                                      lambda m: market_fingerprint(m, MARKET_FIELDS), analyze_market)
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+TIMEOUT = 30
+RETRIES = 3
+PAGE_TTL = 86400   # cached pages older than this are pruned (cursor keys change every scan)
+
+
+class Fetcher:
+    """JSON GETs against one API base over a pooled session, with conditional requests."""
+
+    def __init__(self, base: str, workers: int = 8, store: "SnapshotStore" = None, timeout: int = TIMEOUT):
+        self.base = base.rstrip("/")
+        self.store = store
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(total=RETRIES, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=("GET",), respect_retry_after_header=True)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(workers, 10), max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.requests = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+
+    def get(self, path: str, params: dict = None):
+        """GET base+path and decode JSON. Raises requests exceptions like requests.get would."""
+        url = self.base + path
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        key = url + "?" + urlencode(sorted(params.items()))
+        cached = self.store.page(key) if self.store else None
+        headers = {}
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        resp = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+        with self._lock:
+            self.requests += 1
+            if resp.status_code == 304 and cached:
+                self.not_modified += 1
+        if resp.status_code == 304 and cached:
+            return json.loads(cached[2])
+        resp.raise_for_status()
+        data = resp.json()
+        etag, last_modified = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+        if self.store and (etag or last_modified):
+            self.store.save_page(key, etag, last_modified, resp.text)
+        return data
+
+    def close(self):
+        self.session.close()
+
+
+def paginate_offset(fetch_page, page_size: int, workers: int = 8, max_items: int = None,
+                    log=print) -> list:
+    """All items of an offset-paginated listing, `workers` pages in flight.
+
+    fetch_page(offset) -> list. Pages are consumed in offset order; the first
+    short page ends the listing and the requests already in flight past it
+    are dropped. A page that raises cancels the rest and re-raises.
+    """
+    items = []
+    pending = deque()
+    next_offset = 0
+
+    def more():
+        return max_items is None or next_offset < max_items
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while len(pending) < workers and more():
+            pending.append(pool.submit(fetch_page, next_offset))
+            next_offset += page_size
+        while pending:
+            try:
+                page = pending.popleft().result()
+            except Exception:
+                for f in pending:
+                    f.cancel()
+                raise
+            items.extend(page)
+            if len(page) < page_size:
+                for f in pending:
+                    f.cancel()
+                break
+            if len(items) // page_size % 10 == 0:
+                log(f"  Fetched {len(items)} markets so far...")
+            if more():
+                pending.append(pool.submit(fetch_page, next_offset))
+                next_offset += page_size
+    return items[:max_items] if max_items is not None else items
+
+
+def paginate_cursor(fetch_page, partitions: list, workers: int = 8, max_items: int = None,
+                    log=print) -> list:
+    """All items of a cursor-paginated listing, one cursor chain per partition.
+
+    fetch_page(partition, cursor) -> (items, next_cursor). Chains run
+    concurrently; results come back in partition order, then page order.
+    Partitions may overlap — callers dedupe by market id. A page that
+    raises stops the other chains and re-raises.
+    """
+    results = [[] for _ in partitions]
+    total = [0]
+    lock = threading.Lock()
+    failed = threading.Event()
+
+    def chain(i):
+        cursor = None
+        while not failed.is_set():
+            with lock:
+                if max_items is not None and total[0] >= max_items:
+                    return
+            try:
+                batch, cursor = fetch_page(partitions[i], cursor)
+            except Exception:
+                failed.set()
+                raise
+            results[i].extend(batch)
+            with lock:
+                before = total[0]
+                total[0] += len(batch)
+                if total[0] // 1000 > before // 1000:
+                    log(f"  Fetched {total[0]} markets so far...")
+            if not batch or not cursor:
+                return
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(partitions)))) as pool:
+        list(pool.map(chain, range(len(partitions))))
+    items = [m for part in results for m in part]
+    return items[:max_items] if max_items is not None else items
+
+
+class SnapshotStore:
+    """SQLite snapshot of the last scan: market fingerprints/analyses and cached pages."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS markets (
+            platform TEXT NOT NULL, market_id TEXT NOT NULL, fingerprint TEXT NOT NULL,
+            analysis TEXT, updated_at REAL NOT NULL, PRIMARY KEY (platform, market_id))""")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS pages (
+            key TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body TEXT NOT NULL,
+            fetched_at REAL NOT NULL)""")
+        self.db.execute("DELETE FROM pages WHERE fetched_at < ?", (time.time() - PAGE_TTL,))
+        self._lock = threading.Lock()
+
+    def page(self, key: str):
+        with self._lock:
+            return self.db.execute("SELECT etag, last_modified, body FROM pages WHERE key = ?",
+                                   (key,)).fetchone()
+
+    def save_page(self, key: str, etag, last_modified, body: str):
+        with self._lock:
+            self.db.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+                            (key, etag, last_modified, body, time.time()))
+
+    def snapshot(self, platform: str) -> dict:
+        """market_id -> (fingerprint, analysis JSON) from the previous scan."""
+        with self._lock:
+            rows = self.db.execute("SELECT market_id, fingerprint, analysis FROM markets WHERE platform = ?",
+                                   (platform,)).fetchall()
+        return {mid: (fp, analysis) for mid, fp, analysis in rows}
+
+    def replace(self, platform: str, rows: list) -> int:
+        """Make (market_id, fingerprint, analysis JSON) rows the platform's snapshot.
+        Returns how many markets from the previous snapshot are gone."""
+        now = time.time()
+        with self._lock:
+            self.db.execute("BEGIN")
+            self.db.execute("CREATE TEMP TABLE IF NOT EXISTS seen (market_id TEXT PRIMARY KEY)")
+            self.db.execute("DELETE FROM seen")
+            self.db.executemany("INSERT OR IGNORE INTO seen VALUES (?)", ((r[0],) for r in rows))
+            removed = self.db.execute(
+                "DELETE FROM markets WHERE platform = ? AND market_id NOT IN (SELECT market_id FROM seen)",
+                (platform,)).rowcount
+            self.db.executemany("INSERT OR REPLACE INTO markets VALUES (?, ?, ?, ?, ?)",
+                                ((platform, mid, fp, analysis, now) for mid, fp, analysis in rows))
+            self.db.execute("COMMIT")
+        return removed
+
+    def close(self):
+        self.db.close()
+
+
+def market_fingerprint(market: dict, fields) -> str:
+    """Stable string of the fields analyze_market reads (prices, volume, labels)."""
+    return json.dumps([market.get(f) for f in fields], sort_keys=True, default=str)
+
+
+def analyze_changed(store: SnapshotStore, platform: str, markets: list, key, fingerprint,
+                    analyze, full: bool = False, save: bool = True) -> tuple[list, dict]:
+    """analyze(market) for markets that are new or moved since the last snapshot.
+
+    Unchanged markets reuse the stored analysis (None included); a reused
+    analysis gets this scan's `scanned_at` and keeps the time it was computed
+    as `analyzed_at`. Returns the analyses in market order and counts of
+    new / changed / unchanged / removed markets; the snapshot is replaced
+    with this scan's universe, so `markets` must be the complete universe.
+    A partial list (a capped fetch) passes save=False: the snapshot is only
+    read, and `removed` is None.
+    """
+    scanned_at = datetime.now(timezone.utc).isoformat()
+    previous = {} if full else store.snapshot(platform)
+    analyses, rows, seen = [], [], set()
+    stats = {"new": 0, "changed": 0, "unchanged": 0}
+    for market in markets:
+        mid = str(key(market))
+        if mid in seen:
+            continue
+        seen.add(mid)
+        fp = fingerprint(market)
+        prev = previous.get(mid)
+        if prev is not None and prev[0] == fp:
+            analysis = json.loads(prev[1]) if prev[1] else None
+            if isinstance(analysis, dict) and "scanned_at" in analysis:
+                analysis["analyzed_at"] = analysis.get("analyzed_at") or analysis["scanned_at"]
+                analysis["scanned_at"] = scanned_at
+            stats["unchanged"] += 1
+        else:
+            analysis = analyze(market)
+            stats["changed" if prev is not None else "new"] += 1
+        rows.append((mid, fp, json.dumps(analysis, default=str) if analysis is not None else None))
+        analyses.append(analysis)
+    stats["removed"] = store.replace(platform, rows) if save else None
+    return analyses, stats
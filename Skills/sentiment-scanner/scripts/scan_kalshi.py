@@ -1,47 +1,111 @@
 #!/usr/bin/env python3
 """Kalshi scanner — finds active markets with underpriced outcomes.
-Free API, no auth needed for reading market data."""
+Free API, no auth needed for reading market data.
 
-import requests
+Fetches the full open-market universe: Kalshi pages by cursor, so the universe
+is split into close-time windows whose cursor chains run concurrently over one
+pooled session. Only markets whose prices, volume or labels changed since the
+previous scan are re-analyzed (snapshot in data/markets.db).
+
+Usage:
+    python3 scan_kalshi.py                  # full universe
+    python3 scan_kalshi.py --max 500        # stop after ~500 markets
+    python3 scan_kalshi.py --full           # ignore the snapshot, re-analyze everything
+"""
+
+import argparse
 import json
 import os
 import sys
+import time
 from datetime import datetime, timezone
 
+import requests
+
+from event_log import EventLog
+from market_universe import Fetcher, SnapshotStore, analyze_changed, market_fingerprint, paginate_cursor
+
 DATA_DIR = "/home/workspace/Skills/sentiment-scanner/data"
 KALSHI_API = "https://api.elections.kalshi.com/trade-api/v2"
 
-def fetch_events(limit: int = 50, cursor: str = None) -> tuple[list[dict], str | None]:
-    params = {"limit": limit, "status": "open"}
-    if cursor:
-        params["cursor"] = cursor
+PAGE_SIZE = 1000   # API maximum for /markets
+WORKERS = 8
+
+# Close-time window edges (days from now) that split the universe into cursor chains.
+CLOSE_WINDOWS_DAYS = (1, 3, 7, 14, 30, 90, 365)
+
+# Everything analyze_market reads; a market is re-analyzed when any of these moves.
+MARKET_FIELDS = (
+    "title", "subtitle", "event_ticker", "yes_bid", "yes_ask", "no_bid", "no_ask",
+    "volume", "volume_24h", "open_interest", "last_price", "liquidity",
+)
+
+_KALSHI = None
+
+def kalshi() -> Fetcher:
+    """Shared pooled session for callers that don't bring their own."""
+    global _KALSHI
+    if _KALSHI is None:
+        _KALSHI = Fetcher(KALSHI_API)
+    return _KALSHI
+
+def fetch_events(limit: int = 50, cursor: str = None, fetcher: Fetcher = None) -> tuple[list[dict], str | None]:
+    params = {"limit": limit, "status": "open", "cursor": cursor}
     try:
-        resp = requests.get(f"{KALSHI_API}/events", params=params, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
+        data = (fetcher or kalshi()).get("/events", params=params)
         return data.get("events", []), data.get("cursor", None)
     except Exception as e:
         print(f"Error fetching events: {e}")
         return [], None
 
 def fetch_markets(event_ticker: str = None, series_ticker: str = None,
-                  status: str = "open", limit: int = 100, cursor: str = None) -> tuple[list[dict], str | None]:
-    params = {"limit": limit, "status": status}
-    if event_ticker:
-        params["event_ticker"] = event_ticker
-    if series_ticker:
-        params["series_ticker"] = series_ticker
-    if cursor:
-        params["cursor"] = cursor
+                  status: str = "open", limit: int = 100, cursor: str = None,
+                  min_close_ts: int = None, max_close_ts: int = None,
+                  fetcher: Fetcher = None, strict: bool = False) -> tuple[list[dict], str | None]:
+    """One page of markets and the next cursor. Errors print and return ([], None) unless `strict`."""
+    params = {"limit": limit, "status": status, "event_ticker": event_ticker,
+              "series_ticker": series_ticker, "cursor": cursor or None,
+              "min_close_ts": min_close_ts, "max_close_ts": max_close_ts}
     try:
-        resp = requests.get(f"{KALSHI_API}/markets", params=params, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
+        data = (fetcher or kalshi()).get("/markets", params=params)
         return data.get("markets", []), data.get("cursor", None)
     except Exception as e:
+        if strict:
+            raise
         print(f"Error fetching markets: {e}")
         return [], None
 
+def close_windows(now: float = None) -> list[dict]:
+    """min/max_close_ts filters covering all close times, one per cursor chain.
+    Neighbouring windows share their edge second; duplicates are dropped by ticker."""
+    now = int(now or time.time())
+    edges = [now + d * 86400 for d in CLOSE_WINDOWS_DAYS]
+    windows = [{"max_close_ts": edges[0]}]
+    windows += [{"min_close_ts": lo, "max_close_ts": hi} for lo, hi in zip(edges, edges[1:])]
+    windows.append({"min_close_ts": edges[-1]})
+    return windows
+
+def fetch_universe(fetcher: Fetcher, max_markets: int = None, workers: int = WORKERS) -> list[dict]:
+    """Every open market, deduped by ticker."""
+    windows = close_windows()
+    try:
+        fetcher.get("/markets", params={"limit": 1, "status": "open", **windows[0]})
+    except requests.HTTPError as e:
+        if e.response is not None and e.response.status_code == 400:
+            print("  Close-time filters rejected alongside status=open; walking a single cursor chain")
+            windows = [{}]
+    except Exception:
+        pass  # reported by the page fetches below
+
+    def page(window, cursor):
+        return fetch_markets(status="open", limit=PAGE_SIZE, cursor=cursor, fetcher=fetcher, strict=True, **window)
+
+    markets = paginate_cursor(page, windows, workers=workers, max_items=max_markets)
+    unique = {}
+    for m in markets:
+        unique.setdefault(m.get("ticker", ""), m)
+    return list(unique.values())
+
 def analyze_market(market: dict) -> dict | None:
     ticker = market.get("ticker", "")
     title = market.get("title", market.get("subtitle", ""))
@@ -101,7 +165,7 @@ def analyze_market(market: dict) -> dict | None:
         "scanned_at": datetime.now(timezone.utc).isoformat(),
     }
 
-def run_scan(max_markets: int = 500) -> dict:
+def run_scan(max_markets: int = None, workers: int = WORKERS, full: bool = False) -> dict:
     os.makedirs(DATA_DIR, exist_ok=True)
     results = {
         "scan_time": datetime.now(timezone.utc).isoformat(),
@@ -110,21 +174,33 @@ def run_scan(max_markets: int = 500) -> dict:
         "summary": {}
     }
 
-    print(f"Fetching active Kalshi markets...")
-    all_markets = []
-    cursor = None
-    while len(all_markets) < max_markets:
-        batch, cursor = fetch_markets(status="open", limit=100, cursor=cursor)
-        if not batch:
-            break
-        all_markets.extend(batch)
-        print(f"  Fetched {len(all_markets)} markets...")
-        if not cursor:
-            break
-
-    print(f"Analyzing {len(all_markets)} markets...")
-    for market in all_markets:
-        analysis = analyze_market(market)
+    store = SnapshotStore(os.path.join(DATA_DIR, "markets.db"))
+    fetcher = Fetcher(KALSHI_API, workers=workers, store=store)
+    print(f"Fetching {f'up to {max_markets}' if max_markets else 'all'} active Kalshi markets...")
+    t0 = time.time()
+    try:
+        all_markets = fetch_universe(fetcher, max_markets, workers)
+    except Exception as e:
+        print(f"Error fetching markets: {e}\nScan aborted; snapshot left unchanged")
+        fetcher.close()
+        store.close()
+        results["summary"] = {"error": str(e)}
+        return results
+    print(f"  {len(all_markets)} markets in {time.time() - t0:.1f}s "
+          f"({fetcher.requests} requests, {fetcher.not_modified} not modified)")
+
+    # A capped fetch isn't the whole universe; saving it would drop every unseen market.
+    truncated = max_markets is not None and len(all_markets) >= max_markets
+    analyses, diff = analyze_changed(store, "kalshi", all_markets, lambda m: m.get("ticker", ""),
+                                     lambda m: market_fingerprint(m, MARKET_FIELDS), analyze_market, full=full,
+                                     save=not truncated)
+    fetcher.close()
+    store.close()
+    print(f"Analyzed {diff['new'] + diff['changed']} new/changed markets, "
+          f"reused {diff['unchanged']} unchanged, "
+          + (f"{diff['removed']} gone since last scan" if diff["removed"] is not None
+             else f"snapshot not saved (capped at {max_markets})"))
+    for analysis in analyses:
         if analysis is None:
             continue
 
@@ -139,6 +215,9 @@ def run_scan(max_markets: int = 500) -> dict:
 
     results["summary"] = {
         "total_scanned": len(all_markets),
+        "reanalyzed": diff["new"] + diff["changed"],
+        "unchanged": diff["unchanged"],
+        "removed_since_last_scan": diff["removed"],
         "markets_with_cheap_outcomes": len(results["markets_with_edge"]),
         "high_volume_markets": len(results["high_volume_markets"]),
     }
@@ -148,6 +227,9 @@ def run_scan(max_markets: int = 500) -> dict:
         json.dump(results, f, indent=2, default=str)
 
     print(f"\nSaved to {outfile}")
+    log = EventLog()
+    log.append_markets("kalshi", results["markets_with_edge"], lambda m: m["ticker"])
+    log.close()
     print(f"Markets with cheap outcomes (<30¢): {len(results['markets_with_edge'])}")
     print(f"High volume markets: {len(results['high_volume_markets'])}")
 
@@ -162,4 +244,9 @@ def run_scan(max_markets: int = 500) -> dict:
     return results
 
 if __name__ == "__main__":
-    run_scan()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max", type=int, dest="max_markets", help="cap on markets fetched (default: all)")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="concurrent cursor chains")
+    parser.add_argument("--full", action="store_true", help="re-analyze every market, ignoring the snapshot")
+    args = parser.parse_args()
+    run_scan(args.max_markets, args.workers, args.full)
@@ -1,14 +1,27 @@
 #!/usr/bin/env python3
 """Polymarket scanner — finds active markets with potential sentiment edges.
 Focuses on markets where odds < 30% (cheap bets with upside multiples)
-and markets with recent volume spikes indicating smart money movement."""
+and markets with recent volume spikes indicating smart money movement.
 
-import requests
+Fetches the full open-market universe (Gamma offset pages, several in flight
+over one pooled session) and re-analyzes only markets whose prices, volume or
+labels changed since the previous scan (snapshot in data/markets.db).
+
+Usage:
+    python3 scan_polymarket.py              # full universe
+    python3 scan_polymarket.py 200          # cap at the top 200 by 24h volume
+    python3 scan_polymarket.py --full       # ignore the snapshot, re-analyze everything
+"""
+
+import argparse
 import json
 import os
-import sys
+import time
 from datetime import datetime, timezone, timedelta
 
+from event_log import EventLog
+from market_universe import Fetcher, SnapshotStore, analyze_changed, market_fingerprint, paginate_offset
+
 DATA_DIR = "/home/workspace/Skills/sentiment-scanner/data"
 GAMMA_API = "https://gamma-api.polymarket.com"
 CLOB_API = "https://clob.polymarket.com"
@@ -19,45 +32,68 @@ INTERESTING_TAGS = [
     "Sports", "Entertainment", "Science"
 ]
 
-def fetch_active_markets(limit: int = 100, offset: int = 0) -> list[dict]:
+PAGE_SIZE = 100
+WORKERS = 8
+
+# Everything analyze_market reads; a market is re-analyzed when any of these moves.
+MARKET_FIELDS = (
+    "question", "description", "slug", "market_slug", "outcomePrices", "outcomes",
+    "volume24hr", "volume", "liquidity", "endDate", "end_date_iso", "tags",
+)
+
+_GAMMA = None
+
+def gamma() -> Fetcher:
+    """Shared pooled session for callers that don't bring their own."""
+    global _GAMMA
+    if _GAMMA is None:
+        _GAMMA = Fetcher(GAMMA_API)
+    return _GAMMA
+
+def fetch_active_markets(limit: int = 100, offset: int = 0, fetcher: Fetcher = None,
+                         strict: bool = False) -> list[dict]:
+    """One page of active markets. Errors print and return [] unless `strict`."""
     try:
-        resp = requests.get(
-            f"{GAMMA_API}/markets",
-            params={
-                "limit": limit,
-                "offset": offset,
-                "active": "true",
-                "closed": "false",
-                "order": "volume24hr",
-                "ascending": "false",
-            },
-            timeout=30
-        )
-        resp.raise_for_status()
-        return resp.json()
+        return (fetcher or gamma()).get("/markets", params={
+            "limit": limit,
+            "offset": offset,
+            "active": "true",
+            "closed": "false",
+            "order": "volume24hr",
+            "ascending": "false",
+        })
     except Exception as e:
+        if strict:
+            raise
         print(f"Error fetching markets: {e}")
         return []
 
-def fetch_market_events(limit: int = 50) -> list[dict]:
+def fetch_market_events(limit: int = 50, fetcher: Fetcher = None) -> list[dict]:
     try:
-        resp = requests.get(
-            f"{GAMMA_API}/events",
-            params={
-                "limit": limit,
-                "active": "true",
-                "closed": "false",
-                "order": "volume24hr",
-                "ascending": "false",
-            },
-            timeout=30
-        )
-        resp.raise_for_status()
-        return resp.json()
+        return (fetcher or gamma()).get("/events", params={
+            "limit": limit,
+            "active": "true",
+            "closed": "false",
+            "order": "volume24hr",
+            "ascending": "false",
+        })
     except Exception as e:
         print(f"Error fetching events: {e}")
         return []
 
+def market_key(market: dict) -> str:
+    return str(market.get("id") or market.get("conditionId") or market.get("slug", ""))
+
+def fetch_universe(fetcher: Fetcher, max_markets: int = None, workers: int = WORKERS) -> list[dict]:
+    """Every active market, highest 24h volume first, deduped by id."""
+    markets = paginate_offset(lambda offset: fetch_active_markets(PAGE_SIZE, offset, fetcher, strict=True),
+                              PAGE_SIZE, workers=workers, max_items=max_markets)
+    # Offsets shift while volume-ordered pages are in flight; keep the first copy.
+    unique = {}
+    for m in markets:
+        unique.setdefault(market_key(m), m)
+    return list(unique.values())
+
 def analyze_market(market: dict) -> dict | None:
     question = market.get("question", "")
     desc = market.get("description", "")[:300]
@@ -129,7 +165,7 @@ def analyze_market(market: dict) -> dict | None:
         "scanned_at": datetime.now(timezone.utc).isoformat(),
     }
 
-def run_scan(max_markets: int = 200) -> dict:
+def run_scan(max_markets: int = None, workers: int = WORKERS, full: bool = False) -> dict:
     os.makedirs(DATA_DIR, exist_ok=True)
     results = {
         "scan_time": datetime.now(timezone.utc).isoformat(),
@@ -138,18 +174,33 @@ def run_scan(max_markets: int = 200) -> dict:
         "summary": {}
     }
 
-    print(f"Fetching up to {max_markets} active Polymarket markets...")
-    all_markets = []
-    for offset in range(0, max_markets, 100):
-        batch = fetch_active_markets(limit=100, offset=offset)
-        if not batch:
-            break
-        all_markets.extend(batch)
-        print(f"  Fetched {len(all_markets)} markets so far...")
-
-    print(f"Analyzing {len(all_markets)} markets...")
-    for market in all_markets:
-        analysis = analyze_market(market)
+    store = SnapshotStore(os.path.join(DATA_DIR, "markets.db"))
+    fetcher = Fetcher(GAMMA_API, workers=workers, store=store)
+    print(f"Fetching {f'up to {max_markets}' if max_markets else 'all'} active Polymarket markets...")
+    t0 = time.time()
+    try:
+        all_markets = fetch_universe(fetcher, max_markets, workers)
+    except Exception as e:
+        print(f"Error fetching markets: {e}\nScan aborted; snapshot left unchanged")
+        fetcher.close()
+        store.close()
+        results["summary"] = {"error": str(e)}
+        return results
+    print(f"  {len(all_markets)} markets in {time.time() - t0:.1f}s "
+          f"({fetcher.requests} requests, {fetcher.not_modified} not modified)")
+
+    # A capped fetch isn't the whole universe; saving it would drop every unseen market.
+    truncated = max_markets is not None and len(all_markets) >= max_markets
+    analyses, diff = analyze_changed(store, "polymarket", all_markets, market_key,
+                                     lambda m: market_fingerprint(m, MARKET_FIELDS), analyze_market, full=full,
+                                     save=not truncated)
+    fetcher.close()
+    store.close()
+    print(f"Analyzed {diff['new'] + diff['changed']} new/changed markets, "
+          f"reused {diff['unchanged']} unchanged, "
+          + (f"{diff['removed']} gone since last scan" if diff["removed"] is not None
+             else f"snapshot not saved (capped at {max_markets})"))
+    for analysis in analyses:
         if analysis is None:
             continue
 
@@ -165,6 +216,9 @@ def run_scan(max_markets: int = 200) -> dict:
 
     results["summary"] = {
         "total_scanned": len(all_markets),
+        "reanalyzed": diff["new"] + diff["changed"],
+        "unchanged": diff["unchanged"],
+        "removed_since_last_scan": diff["removed"],
         "markets_with_cheap_outcomes": len(results["markets_with_edge"]),
         "volume_spike_markets": len(results["volume_spike_markets"]),
         "top_5_edge": [
@@ -182,6 +236,9 @@ def run_scan(max_markets: int = 200) -> dict:
         json.dump(results, f, indent=2, default=str)
 
     print(f"\nSaved to {outfile}")
+    log = EventLog()
+    log.append_markets("polymarket", results["markets_with_edge"], lambda m: m.get("slug") or m["question"])
+    log.close()
     print(f"Markets with cheap outcomes (<30¢): {len(results['markets_with_edge'])}")
     print(f"Volume spike markets (>3x avg): {len(results['volume_spike_markets'])}")
 
@@ -196,5 +253,9 @@ def run_scan(max_markets: int = 200) -> dict:
     return results
 
 if __name__ == "__main__":
-    max_m = int(sys.argv[1]) if len(sys.argv) > 1 else 200
-    run_scan(max_m)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("max_markets", nargs="?", type=int, help="cap on markets fetched (default: all)")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="pages in flight")
+    parser.add_argument("--full", action="store_true", help="re-analyze every market, ignoring the snapshot")
+    args = parser.parse_args()
+    run_scan(args.max_markets, args.workers, args.full)
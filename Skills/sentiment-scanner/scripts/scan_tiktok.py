@@ -1,62 +1,142 @@
 #!/usr/bin/env python3
 """TikTok trending crypto/memecoin scanner.
 Uses agent-browser CLI to scrape public TikTok hashtag pages.
-Falls back to Zo web_search for TikTok content if scraping fails."""
+Falls back to Zo web_search for TikTok content if scraping fails.
 
+Hashtags are spread over a few long-lived agent-browser sessions that scrape
+concurrently; each page is polled for readiness (creator handles appearing and
+settling) instead of fixed waits, and snapshots are parsed in a process pool.
+Processed videos are cached in data/tiktok_video_cache.json, so a video that
+shows up under several hashtags (or unchanged in the next scan) skips
+process_video and is recorded once per scan.
+
+Usage:
+    python3 scan_tiktok.py                       # scan CRYPTO_HASHTAGS
+    python3 scan_tiktok.py --sessions 4 --browser-tags 8
+    python3 scan_tiktok.py --transcribe          # + transcripts for the top videos
+"""
+
+import argparse
+import hashlib
 import subprocess
 import json
 import os
+import queue
 import re
-import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timezone
 
+from event_log import EventLog
+
 DATA_DIR = "/home/workspace/Skills/sentiment-scanner/data"
+VIDEO_CACHE = os.path.join(DATA_DIR, "tiktok_video_cache.json")
+VIDEO_CACHE_TTL = 7 * 86400
 
 CRYPTO_HASHTAGS = [
     "memecoin", "solana", "crypto", "cryptotok", "defi",
     "altcoin", "web3", "pumpdotfun", "degen", "bitcoin",
     "memecoins", "solanamemecoin", "cryptotrading", "100x",
 ]
+# A video is crypto-relevant when it carries any of the tracked hashtags
+CRYPTO_RELEVANT_TAGS = frozenset(CRYPTO_HASHTAGS)
 
-def scrape_tiktok_hashtag(hashtag: str) -> list[dict]:
-    """Use agent-browser to open TikTok hashtag page and extract video info."""
+SESSIONS = 3            # long-lived agent-browser sessions
+BROWSER_HASHTAGS = 5    # hashtags scraped in the browser; the rest go to web search
+READY_TIMEOUT = 12.0    # seconds for the first videos to render
+SCROLL_TIMEOUT = 6.0    # seconds for the post-scroll batch to settle
+SCROLL_GRACE = 2.0      # minimum wait for lazy-loaded videos before accepting no growth
+POLL_INTERVAL = 0.5
+
+_HANDLE = re.compile(r'@\w+')
+
+def _browser(session: str, *args, timeout: int = 30) -> subprocess.CompletedProcess:
+    return subprocess.run(["agent-browser", "--session", session, *args],
+                          capture_output=True, text=True, timeout=timeout)
+
+def _snapshot(session: str) -> str:
+    result = _browser(session, "snapshot", "--compact")
+    return result.stdout if result.returncode == 0 else ""
+
+def _wait_for_videos(session: str, baseline: int, timeout: float, grace: float = 0.0) -> str:
+    """Poll snapshots until the creator-handle count is above `baseline` and stops
+    changing, or (after `grace` seconds) just stops changing. Returns the last snapshot."""
+    start = time.time()
+    last, snap = -1, ""
+    while True:
+        snap = _snapshot(session)
+        count = len(_HANDLE.findall(snap))
+        settled = count == last
+        if settled and (count > baseline or time.time() - start >= grace):
+            return snap
+        if time.time() - start >= timeout:
+            return snap
+        last = count
+        time.sleep(POLL_INTERVAL)
+
+def fetch_hashtag_snapshot(hashtag: str, session: str) -> str:
+    """Load a hashtag page in `session`, scroll once for more videos, return the snapshot text."""
     url = f"https://www.tiktok.com/tag/{hashtag}"
-    session = f"tiktok_{hashtag}"
     try:
-        # Open the page
-        subprocess.run(
-            ["agent-browser", "--session", session, "open", url],
-            capture_output=True, text=True, timeout=30
-        )
-        # Wait for content to load
-        subprocess.run(
-            ["agent-browser", "--session", session, "wait", "3000"],
-            capture_output=True, text=True, timeout=10
-        )
-        # Scroll to load more content
-        subprocess.run(
-            ["agent-browser", "--session", session, "scroll", "down", "2000"],
-            capture_output=True, text=True, timeout=10
-        )
-        subprocess.run(
-            ["agent-browser", "--session", session, "wait", "2000"],
-            capture_output=True, text=True, timeout=10
-        )
-        # Get the page text
-        result = subprocess.run(
-            ["agent-browser", "--session", session, "snapshot", "--compact"],
-            capture_output=True, text=True, timeout=30
-        )
-        if result.returncode == 0 and result.stdout.strip():
-            return parse_tiktok_snapshot(result.stdout, hashtag)
+        _browser(session, "open", url, timeout=30)
+        # No early exit on an empty page: wait for the first videos or READY_TIMEOUT
+        first = _wait_for_videos(session, 0, READY_TIMEOUT, READY_TIMEOUT)
+        _browser(session, "scroll", "down", "2000", timeout=10)
+        after = _wait_for_videos(session, len(_HANDLE.findall(first)), SCROLL_TIMEOUT, SCROLL_GRACE)
+        return after if after.strip() else first
     except subprocess.TimeoutExpired:
         print(f"  Timeout scraping #{hashtag}")
     except FileNotFoundError:
         print("  agent-browser not found")
     except Exception as e:
         print(f"  Error scraping #{hashtag}: {e}")
+    return ""
+
+def scrape_tiktok_hashtag(hashtag: str, session: str = None) -> list[dict]:
+    """Use agent-browser to open TikTok hashtag page and extract video info."""
+    snapshot = fetch_hashtag_snapshot(hashtag, session or f"tiktok_{hashtag}")
+    if snapshot.strip():
+        return parse_tiktok_snapshot(snapshot, hashtag)
     return []
 
+def scrape_hashtags(hashtags: list[str], sessions: int = SESSIONS,
+                    browser_limit: int = BROWSER_HASHTAGS) -> dict[str, list[dict]]:
+    """Raw videos per hashtag (input order). The first `browser_limit` hashtags are
+    scraped across `sessions` concurrent browser sessions, parsed in a process pool;
+    any hashtag the browser can't fill falls back to web search."""
+    free = queue.Queue()
+    for i in range(max(1, sessions)):
+        free.put(f"tiktok_{i}")
+    used = set()
+
+    with ProcessPoolExecutor(max_workers=max(1, min(sessions, os.cpu_count() or 1))) as parsers:
+        def one(i_tag):
+            i, tag = i_tag
+            videos = []
+            if i < browser_limit:
+                session = free.get()
+                used.add(session)
+                try:
+                    snapshot = fetch_hashtag_snapshot(tag, session)
+                finally:
+                    free.put(session)
+                if snapshot.strip():
+                    videos = parsers.submit(parse_tiktok_snapshot, snapshot, tag).result()
+            if not videos:
+                print(f"  #{tag}: browser scrape got 0, trying web search fallback...")
+                videos = fallback_web_search(tag)
+            return tag, videos
+
+        with ThreadPoolExecutor(max_workers=max(1, sessions)) as pool:
+            found = dict(pool.map(one, enumerate(hashtags)))
+
+    for session in used:
+        try:
+            _browser(session, "close", timeout=10)
+        except Exception:
+            pass
+    return found
+
 def parse_tiktok_snapshot(snapshot: str, source_hashtag: str) -> list[dict]:
     """Parse agent-browser snapshot output to extract video info."""
     videos = []
@@ -192,10 +272,7 @@ def process_video(video: dict, source_hashtag: str = "") -> dict:
     if source_hashtag and source_hashtag not in hashtags:
         hashtags.append(source_hashtag)
 
-    crypto_relevant = any(h in ["crypto", "memecoin", "solana", "bitcoin", "defi", "web3",
-                                "altcoin", "degen", "pumpdotfun", "memecoins", "100x",
-                                "cryptotok", "cryptotrading", "solanamemecoin"]
-                         for h in hashtags)
+    crypto_relevant = any(h in CRYPTO_RELEVANT_TAGS for h in hashtags)
 
     return {
         "platform": "tiktok",
@@ -213,7 +290,76 @@ def process_video(video: dict, source_hashtag: str = "") -> dict:
         "scanned_at": datetime.now(timezone.utc).isoformat(),
     }
 
-def run_scan(hashtags: list[str] = None) -> dict:
+def video_key(video: dict) -> str:
+    """id / url when the source has one; snapshot-parsed videos fall back to creator + caption."""
+    for field in ("id", "video_id", "url", "video_url", "link", "source_url"):
+        if video.get(field):
+            return str(video[field])
+    creator = video.get("username", video.get("creator", video.get("user", "")))
+    caption = video.get("caption", video.get("description", video.get("text", "")))
+    return "h:" + hashlib.sha1(f"{creator}\n{caption}".encode()).hexdigest()[:16]
+
+class VideoCache:
+    """Processed videos keyed by video_key, persisted across scans.
+
+    Within a scan, a video that reappears under another hashtag is merged into
+    its first record (the hashtag is added) instead of being processed and
+    counted again. Across scans, a video whose raw fields and source hashtag are
+    unchanged reuses its cached record.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or VIDEO_CACHE
+        self.entries = {}
+        self.hits = self.repeats = 0
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            pass
+        cutoff = time.time() - VIDEO_CACHE_TTL
+        self.entries = {k: e for k, e in self.entries.items() if e.get("seen", 0) >= cutoff}
+        self._scan = {}
+
+    def process(self, video: dict, tag: str) -> dict | None:
+        """The processed record for a video, or None if this scan already recorded it."""
+        key = video_key(video)
+        record = self._scan.get(key)
+        if record is not None:
+            self.repeats += 1
+            if tag and tag not in record["hashtags"]:
+                record["hashtags"].append(tag)
+                record["crypto_relevant"] = record["crypto_relevant"] or tag in CRYPTO_RELEVANT_TAGS
+            return None
+        raw = json.dumps([video, tag], sort_keys=True, default=str)
+        entry = self.entries.get(key)
+        if entry and entry.get("raw") == raw:
+            record = dict(entry["record"], scanned_at=datetime.now(timezone.utc).isoformat())
+            record["hashtags"] = list(record["hashtags"])
+            self.hits += 1
+        else:
+            record = process_video(dict(video, hashtags=list(video.get("hashtags", []))), source_hashtag=tag)
+        self.entries[key] = {"raw": raw, "record": dict(record, hashtags=list(record["hashtags"])),
+                             "seen": time.time()}
+        self._scan[key] = record
+        return record
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.entries, f, default=str)
+        os.replace(tmp, self.path)
+
+def log_events(results: dict) -> int:
+    """Append this scan's videos to the shared event log; returns how many were new."""
+    log = EventLog()
+    added = log.append_posts("tiktok", results["hashtag_signals"], "video_id", "video_url")
+    log.close()
+    print(f"Logged {added} new videos to the event log")
+    return added
+
+def run_scan(hashtags: list[str] = None, log: bool = True, sessions: int = SESSIONS,
+             browser_limit: int = BROWSER_HASHTAGS) -> dict:
     os.makedirs(DATA_DIR, exist_ok=True)
     if hashtags is None:
         hashtags = CRYPTO_HASHTAGS
@@ -225,22 +371,25 @@ def run_scan(hashtags: list[str] = None) -> dict:
         "summary": {}
     }
 
-    print(f"Scanning {len(hashtags)} TikTok hashtags...")
-    
-    # Try agent-browser first for top 5 hashtags, fall back to web search
-    for i, tag in enumerate(hashtags):
-        videos = []
-        if i < 5:  # Only browser-scrape top 5 to save time
-            videos = scrape_tiktok_hashtag(tag)
-        
-        if not videos:
-            print(f"  #{tag}: browser scrape got 0, trying web search fallback...")
-            videos = fallback_web_search(tag)
-        
+    print(f"Scanning {len(hashtags)} TikTok hashtags "
+          f"({min(browser_limit, len(hashtags))} in {sessions} browser sessions)...")
+    t0 = time.time()
+    found = scrape_hashtags(hashtags, sessions, browser_limit)
+
+    cache = VideoCache()
+    for tag in hashtags:
+        videos = found.get(tag, [])
+        repeats = 0
         for v in videos:
-            processed = process_video(v, source_hashtag=tag)
-            results["hashtag_signals"].append(processed)
-        print(f"  #{tag}: {len(videos)} videos")
+            processed = cache.process(v, tag)
+            if processed is None:
+                repeats += 1
+            else:
+                results["hashtag_signals"].append(processed)
+        print(f"  #{tag}: {len(videos)} videos" + (f" ({repeats} already seen this scan)" if repeats else ""))
+    cache.save()
+    print(f"Scraped in {time.time() - t0:.1f}s; {cache.hits} videos unchanged since the last scan, "
+          f"{cache.repeats} repeat appearances merged")
 
     crypto_signals = [s for s in results["hashtag_signals"] if s.get("crypto_relevant")]
     results["hashtag_signals"].sort(key=lambda x: x.get("engagement_score", 0), reverse=True)
@@ -262,23 +411,31 @@ def run_scan(hashtags: list[str] = None) -> dict:
     print(f"\nSaved to {outfile}")
     print(f"Total videos: {len(results['hashtag_signals'])} | Crypto relevant: {len(crypto_signals)}")
 
+    if log:
+        log_events(results)
     return results
 
 if __name__ == "__main__":
-    transcribe = "--transcribe" in sys.argv
-    results = run_scan()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transcribe", action="store_true", help="transcribe the top crypto videos")
+    parser.add_argument("--sessions", type=int, default=SESSIONS, help="concurrent browser sessions")
+    parser.add_argument("--browser-tags", type=int, default=BROWSER_HASHTAGS,
+                        help="hashtags scraped in the browser (the rest use web search)")
+    args = parser.parse_args()
+    transcribe = args.transcribe
+    # With --transcribe, log after transcripts are attached so the stream sees them
+    results = run_scan(log=not transcribe, sessions=args.sessions, browser_limit=args.browser_tags)
     
     if transcribe:
         print("\n--- Running transcription on top videos ---")
-        from transcribe_tiktok import transcribe_video
+        from transcribe_tiktok import transcribe_videos
         top_videos = [s for s in results["hashtag_signals"] 
                       if s.get("video_url") and s.get("crypto_relevant")]
         top_videos.sort(key=lambda x: x.get("engagement_score", 0), reverse=True)
+        top_videos = top_videos[:10]
         
-        for v in top_videos[:10]:
-            url = v["video_url"]
-            print(f"\nTranscribing: {url}")
-            t = transcribe_video(url)
+        transcripts = transcribe_videos([v["video_url"] for v in top_videos])
+        for v, t in zip(top_videos, transcripts):
             if t.get("transcript"):
                 v["transcript"] = t["transcript"]
                 v["transcript_method"] = t["method"]
@@ -288,3 +445,4 @@ if __name__ == "__main__":
         with open(outfile, "w") as f:
             json.dump(results, f, indent=2, default=str)
         print(f"\nSaved transcribed scan to {outfile}")
+        log_events(results)
@@ -10,6 +10,8 @@ import asyncio
 import aiohttp
 from datetime import datetime, timezone, timedelta
 
+from event_log import EventLog
+
 TIER1_CALLERS = [
     "MustStopMurad", "RookieXBT", "cometcalls", "thisisdjen", "free_electron0",
     "flooksta", "levigem", "gammichan", "Palgrani2", "_Shadow36"
@@ -258,6 +260,11 @@ async def run_full_scan_async(mode: str = "full") -> dict:
     print(f"\nSaved to {outfile}")
     print(f"Total signals: {total} | High engagement: {results['summary']['high_engagement']} | Tier1: {results['summary']['tier1_signals']}")
 
+    log = EventLog()
+    added = log.append_posts("x", results["account_signals"] + results["search_signals"], "tweet_id")
+    log.close()
+    print(f"Logged {added} new posts to the event log")
+
     return results
 
 def run_full_scan(mode: str = "full") -> dict:
@@ -3,26 +3,43 @@
 Phase 1: Extract existing auto-captions via yt-dlp (free, fast)
 Phase 2: Download audio + transcribe with faster-whisper for uncaptioned videos
 
+Batches run as a pipeline: yt-dlp caption checks and audio downloads run on a
+thread pool ahead of transcription, and whisper runs on a process pool (one
+per CPU core by default) where each worker loads the model once and keeps it.
+Local media files (and a sidecar .vtt next to them, used as auto-captions) skip
+yt-dlp entirely, so the pipeline runs offline against fixtures.
+
 Usage:
   python3 transcribe_tiktok.py <tiktok_url>              # Single video
   python3 transcribe_tiktok.py --batch <urls_file>        # Batch from file
   python3 transcribe_tiktok.py --from-scan                # Process latest scan data
   python3 transcribe_tiktok.py --from-scan --top 20       # Top 20 by engagement
+  python3 transcribe_tiktok.py --local <media_dir>        # Local files, no network
+  python3 transcribe_tiktok.py --batch urls.txt --workers 4 --download-workers 8
 """
 
+import argparse
 import subprocess
 import json
+import multiprocessing
 import os
 import sys
 import glob
 import tempfile
 import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 
 DATA_DIR = "/home/workspace/Skills/sentiment-scanner/data"
 TRANSCRIPT_DIR = "/home/workspace/Skills/sentiment-scanner/data/transcripts"
 WHISPER_MODEL = "base"
+WHISPER_COMPUTE = "int8"
+DOWNLOAD_WORKERS = 4
+MEDIA_EXTS = (".mp4", ".m4a", ".mp3", ".wav", ".webm", ".mov", ".aac", ".ogg", ".opus")
+
 
 def extract_captions_ytdlp(url: str, work_dir: str) -> str | None:
     """Phase 1: Try to get existing TikTok auto-captions via yt-dlp."""
@@ -34,12 +51,10 @@ def extract_captions_ytdlp(url: str, work_dir: str) -> str | None:
         )
         vtt_files = glob.glob(os.path.join(work_dir, "*.vtt"))
         if vtt_files:
-            import webvtt
-            captions = webvtt.read(vtt_files[0])
-            text = " ".join(c.text.strip() for c in captions if c.text.strip())
+            text = read_vtt(vtt_files[0])
             for f in vtt_files:
                 os.remove(f)
-            return text if text else None
+            return text
     except subprocess.TimeoutExpired:
         pass
     except Exception as e:
@@ -47,33 +62,98 @@ def extract_captions_ytdlp(url: str, work_dir: str) -> str | None:
     return None
 
 
-def transcribe_with_whisper(url: str, work_dir: str) -> str | None:
-    """Phase 2: Download audio and transcribe with faster-whisper."""
+def read_vtt(path: str) -> str | None:
+    import webvtt
+    captions = webvtt.read(path)
+    text = " ".join(c.text.strip() for c in captions if c.text.strip())
+    return text if text else None
+
+
+def download_audio(url: str, work_dir: str) -> str | None:
+    """Phase 2 download: best audio stream as-is (whisper decodes it, no mp3 re-encode)."""
     audio_path = os.path.join(work_dir, "audio")
     try:
-        result = subprocess.run(
-            ["yt-dlp", "-x", "--audio-format", "mp3",
-             "-o", audio_path + ".%(ext)s", url],
+        subprocess.run(
+            ["yt-dlp", "-f", "bestaudio/best", "-o", audio_path + ".%(ext)s", url],
             capture_output=True, text=True, timeout=60
         )
-        mp3_files = glob.glob(audio_path + ".*")
-        if not mp3_files:
-            return None
-
-        audio_file = mp3_files[0]
-        from faster_whisper import WhisperModel
-        model = WhisperModel(WHISPER_MODEL, device="cpu", compute_type="int8")
-        segments, info = model.transcribe(audio_file, beam_size=5)
-        text = " ".join(s.text.strip() for s in segments)
-
-        for f in mp3_files:
-            os.remove(f)
-        return text if text else None
     except subprocess.TimeoutExpired:
-        pass
-    except Exception as e:
-        print(f"  Whisper transcription failed: {e}")
-    return None
+        return None
+    files = [f for f in glob.glob(audio_path + ".*") if not f.endswith(".part")]
+    return files[0] if files else None
+
+
+# --- Whisper worker pool ---
+_MODEL = None  # one per worker process, loaded by the pool initializer
+
+
+def _init_whisper(model_name: str, cpu_threads: int):
+    global _MODEL
+    from faster_whisper import WhisperModel
+    _MODEL = WhisperModel(model_name, device="cpu", compute_type=WHISPER_COMPUTE, cpu_threads=cpu_threads)
+
+
+def _whisper_file(audio_file: str) -> tuple[str, float, float]:
+    """Runs in a pool worker: (text, audio seconds, transcription seconds)."""
+    t0 = time.perf_counter()
+    segments, info = _MODEL.transcribe(audio_file, beam_size=5)
+    text = " ".join(s.text.strip() for s in segments)
+    return text, info.duration, time.perf_counter() - t0
+
+
+class WhisperPool:
+    """Process pool of faster-whisper workers, each holding a loaded model.
+
+    Workers start (and load the model) on first use, so a batch that is all
+    auto-captions never pays for it. CPU threads are split across workers.
+    """
+
+    def __init__(self, workers: int | None = None, model: str = WHISPER_MODEL):
+        cores = os.cpu_count() or 1
+        self.workers = workers or cores
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_whisper, initargs=(model, max(1, cores // self.workers)))
+
+    def submit(self, audio_file: str):
+        return self.pool.submit(_whisper_file, audio_file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.pool.shutdown(cancel_futures=exc[0] is not None)
+
+
+class StageStats:
+    """Per-stage item counts and busy time, for the throughput report."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.started = time.perf_counter()
+
+    def add(self, stage: str, seconds: float, **extra):
+        with self.lock:
+            s = self.stages.setdefault(stage, {"n": 0, "secs": 0.0})
+            s["n"] += 1
+            s["secs"] += seconds
+            for k, v in extra.items():
+                s[k] = s.get(k, 0) + v
+
+    def report(self, workers: dict) -> str:
+        wall = time.perf_counter() - self.started
+        lines = [f"  Wall time: {wall:.1f}s"]
+        for stage, s in self.stages.items():
+            w = workers.get(stage, 1)
+            line = (f"  {stage:<9} {s['n']:>4} items  {s['secs']:.1f}s busy on {w} worker(s)  "
+                    f"{s['n'] / wall * 60:.1f}/min")
+            if s.get("bytes"):
+                line += f"  {s['bytes'] / 1e6:.1f} MB"
+            if s.get("audio_sec"):
+                line += f"  {s['audio_sec'] / 60:.1f} min audio ({s['audio_sec'] / max(s['secs'], 1e-9):.1f}x realtime)"
+            lines.append(line)
+        return "\n".join(lines)
 
 
 def extract_video_id(url: str) -> str:
@@ -83,36 +163,121 @@ def extract_video_id(url: str) -> str:
     return url.split("/")[-1].split("?")[0]
 
 
-def transcribe_video(url: str) -> dict:
-    """Full two-phase transcription for a single TikTok video."""
-    video_id = extract_video_id(url)
-    result = {
-        "url": url,
-        "video_id": video_id,
+def is_local(source: str) -> bool:
+    return source.startswith("file://") or os.path.exists(source)
+
+
+def new_result(source: str) -> dict:
+    local = is_local(source)
+    path = source[len("file://"):] if source.startswith("file://") else source
+    return {
+        "url": source,
+        "video_id": os.path.splitext(os.path.basename(path))[0] if local else extract_video_id(source),
         "transcript": None,
         "method": None,
         "transcribed_at": datetime.now(timezone.utc).isoformat(),
     }
 
-    with tempfile.TemporaryDirectory() as work_dir:
-        print(f"  Phase 1: Checking auto-captions for {video_id}...")
-        text = extract_captions_ytdlp(url, work_dir)
-        if text:
-            result["transcript"] = text
-            result["method"] = "auto_captions"
-            print(f"  ✓ Got captions ({len(text)} chars)")
-            return result
 
-        print(f"  Phase 2: Downloading audio + whisper for {video_id}...")
-        text = transcribe_with_whisper(url, work_dir)
-        if text:
-            result["transcript"] = text
-            result["method"] = "whisper"
-            print(f"  ✓ Whisper transcribed ({len(text)} chars)")
-            return result
+def fetch(source: str, work_dir: str, stats: StageStats) -> tuple:
+    """Caption check + audio download for one item (download pool).
+
+    Returns ("auto_captions", text), ("audio", path) or ("none", None).
+    """
+    if is_local(source):
+        path = source[len("file://"):] if source.startswith("file://") else source
+        sidecar = os.path.splitext(path)[0] + ".vtt"
+        if os.path.exists(sidecar):
+            text = read_vtt(sidecar)
+            if text:
+                return "auto_captions", text
+        return "audio", path
+
+    t0 = time.perf_counter()
+    text = extract_captions_ytdlp(source, work_dir)
+    stats.add("captions", time.perf_counter() - t0)
+    if text:
+        return "auto_captions", text
+
+    t0 = time.perf_counter()
+    audio = download_audio(source, work_dir)
+    stats.add("download", time.perf_counter() - t0, bytes=os.path.getsize(audio) if audio else 0)
+    return ("audio", audio) if audio else ("none", None)
+
+
+def transcribe_videos(sources: list[str], workers: int | None = None, download_workers: int = DOWNLOAD_WORKERS,
+                      model: str = WHISPER_MODEL, stats: StageStats | None = None) -> list[dict]:
+    """Two-phase transcription for many videos, pipelined. Results come back in input order."""
+    stats = stats or StageStats()
+    results = [new_result(s) for s in sources]
+    with tempfile.TemporaryDirectory() as work_root, WhisperPool(workers, model) as whisper, \
+            ThreadPoolExecutor(max_workers=download_workers) as downloads:
+        # Downloads run ahead of whisper, but only so far: at most two files per worker on disk.
+        # A downloaded file is deleted, and its slot freed, as soon as its whisper job ends.
+        ahead = threading.BoundedSemaphore(2 * whisper.workers)
+
+        def finished(audio):
+            if audio.startswith(work_root):
+                try:
+                    os.remove(audio)
+                except OSError:
+                    pass
+            ahead.release()
+
+        def fetch_one(i):
+            ahead.acquire()
+            try:
+                got = fetch(sources[i], os.path.join(work_root, str(i)), stats)
+            except Exception as e:
+                got = ("none", None)
+                print(f"  Fetch failed for {sources[i]}: {e}")
+            if got[0] != "audio":
+                ahead.release()
+            return got
+
+        for i in range(len(sources)):
+            os.makedirs(os.path.join(work_root, str(i)))
+        fetches = {downloads.submit(fetch_one, i): i for i in range(len(sources))}
+        jobs = {}
+        for fut in as_completed(fetches):
+            i = fetches[fut]
+            kind, value = fut.result()
+            r = results[i]
+            if kind == "auto_captions":
+                r["transcript"], r["method"] = value, "auto_captions"
+                print(f"  ✓ {r['video_id']}: captions ({len(value)} chars)")
+            elif kind == "audio":
+                try:
+                    job = whisper.submit(value)
+                except Exception as e:
+                    finished(value)
+                    print(f"  Whisper transcription failed for {r['video_id']}: {e}")
+                    continue
+                job.add_done_callback(lambda _f, audio=value: finished(audio))
+                jobs[job] = (i, value)
+            else:
+                print(f"  ✗ {r['video_id']}: no captions or audio")
+
+        for job in as_completed(jobs):
+            i, _ = jobs[job]
+            r = results[i]
+            try:
+                text, audio_sec, secs = job.result()
+            except Exception as e:
+                print(f"  Whisper transcription failed for {r['video_id']}: {e}")
+                continue
+            stats.add("whisper", secs, audio_sec=audio_sec)
+            if text:
+                r["transcript"], r["method"] = text, "whisper"
+                print(f"  ✓ {r['video_id']}: whisper ({len(text)} chars)")
+            else:
+                print(f"  ✗ {r['video_id']}: whisper found no speech")
+    return results
 
-    print(f"  ✗ No transcript available for {video_id}")
-    return result
+
+def transcribe_video(url: str) -> dict:
+    """Full two-phase transcription for a single TikTok video."""
+    return transcribe_videos([url], workers=1, download_workers=1)[0]
 
 
 def load_latest_tiktok_scan() -> dict | None:
@@ -145,15 +310,14 @@ def extract_urls_from_scan(scan_data: dict, top_n: int = 50) -> list[dict]:
     return videos
 
 
-def run_batch(urls: list[str]) -> list[dict]:
-    """Transcribe a batch of URLs."""
+def run_batch(urls: list[str], workers: int | None = None, download_workers: int = DOWNLOAD_WORKERS,
+              model: str = WHISPER_MODEL) -> list[dict]:
+    """Transcribe a batch of URLs (or local media paths)."""
     os.makedirs(TRANSCRIPT_DIR, exist_ok=True)
-    results = []
-
-    for i, url in enumerate(urls):
-        print(f"\n[{i+1}/{len(urls)}] {url}")
-        result = transcribe_video(url)
-        results.append(result)
+    stats = StageStats()
+    print(f"Transcribing {len(urls)} videos ({workers or os.cpu_count()} whisper workers, "
+          f"{download_workers} download workers)")
+    results = transcribe_videos(urls, workers, download_workers, model, stats)
 
     outfile = os.path.join(
         TRANSCRIPT_DIR,
@@ -172,6 +336,8 @@ def run_batch(urls: list[str]) -> list[dict]:
     whisper_count = len([r for r in results if r["method"] == "whisper"])
     failed = len([r for r in results if not r["transcript"]])
     print(f"  Auto-captions: {caption_count} | Whisper: {whisper_count} | Failed: {failed}")
+    print(stats.report({"captions": download_workers, "download": download_workers,
+                        "whisper": workers or os.cpu_count() or 1}))
 
     return results
 
@@ -189,40 +355,53 @@ def enrich_scan_with_transcripts(scan_data: dict, transcripts: list[dict]) -> di
     return scan_data
 
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print(__doc__)
-        sys.exit(1)
-
-    if sys.argv[1] == "--from-scan":
-        top_n = 20
-        if "--top" in sys.argv:
-            idx = sys.argv.index("--top")
-            top_n = int(sys.argv[idx + 1])
+def main():
+    parser = argparse.ArgumentParser(description="TikTok transcript extractor (captions, then whisper)")
+    parser.add_argument("url", nargs="?", help="Single TikTok URL or local media file")
+    parser.add_argument("--batch", metavar="FILE", help="File with one URL or media path per line")
+    parser.add_argument("--from-scan", action="store_true", help="Process the latest TikTok scan")
+    parser.add_argument("--top", type=int, default=20, help="With --from-scan: top N by engagement")
+    parser.add_argument("--local", metavar="DIR", help="Every media file in DIR (offline)")
+    parser.add_argument("--workers", type=int, default=None, help="Whisper processes (default: CPU cores)")
+    parser.add_argument("--download-workers", type=int, default=DOWNLOAD_WORKERS, help="Concurrent yt-dlp fetches")
+    parser.add_argument("--model", default=WHISPER_MODEL, help="faster-whisper model (default: base)")
+    args = parser.parse_args()
 
+    if args.from_scan:
         scan = load_latest_tiktok_scan()
         if not scan:
             print("No TikTok scan data found")
             sys.exit(1)
 
-        videos = extract_urls_from_scan(scan, top_n)
+        videos = extract_urls_from_scan(scan, args.top)
         if not videos:
             print("No video URLs found in scan data")
             sys.exit(1)
 
-        print(f"Found {len(videos)} videos from latest scan (top {top_n} by engagement)")
+        print(f"Found {len(videos)} videos from latest scan (top {args.top} by engagement)")
         urls = [v["url"] for v in videos]
-        run_batch(urls)
-
-    elif sys.argv[1] == "--batch":
-        with open(sys.argv[2]) as f:
+    elif args.batch:
+        with open(args.batch) as f:
             urls = [line.strip() for line in f if line.strip()]
-        run_batch(urls)
-
-    else:
-        result = transcribe_video(sys.argv[1])
+    elif args.local:
+        urls = sorted(str(p) for p in Path(args.local).iterdir() if p.suffix.lower() in MEDIA_EXTS)
+        if not urls:
+            print(f"No media files in {args.local}")
+            sys.exit(1)
+    elif args.url:
+        result = transcribe_video(args.url)
         if result["transcript"]:
             print(f"\n--- TRANSCRIPT ({result['method']}) ---")
             print(result["transcript"])
         else:
             print("\nNo transcript could be extracted.")
+        return
+    else:
+        print(__doc__)
+        sys.exit(1)
+
+    run_batch(urls, args.workers, args.download_workers, args.model)
+
+
+if __name__ == "__main__":
+    main()
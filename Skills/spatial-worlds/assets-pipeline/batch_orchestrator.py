@@ -3,19 +3,25 @@
 Batch orchestrator V2 - Full ComfyUI API integration
 Adds: deterministic seeds, retry logic, timeout handling, traceability
 
+Post-processing (cutout -> normalize -> QC) runs in-process through
+sprite_engine: frames are cut out and normalized on a worker pool while the
+next frame generates, then QC'd in frame order.
+
 Only use this AFTER workflow_freeze_test.py passes 3/3
+
+Usage:
+    python3 batch_orchestrator.py <job_file.json> [--workers N]
 """
 
+import argparse
 import json
-import sys
-import subprocess
 import time
 import urllib.request
 from pathlib import Path
 from datetime import datetime
-import shutil
 import requests
 from seed_strategy import get_seed
+from sprite_engine import DEFAULT_WORKERS, FramePool, sort_qc
 
 def load_config():
     config_path = Path(__file__).parent / "pipeline_config.json"
@@ -262,68 +268,61 @@ def run_comfy_generation_with_retry(
     
     return (False, None, reason)
 
-def process_frame(raw_path, character_id, state, frame_num, prev_normalized_path, config, job):
-    """Process a single frame through the pipeline"""
-    job_id = job["character_id"]
-
-    # Paths
-    cut_dir = Path(__file__).parent / "output_cut" / character_id
-    norm_dir = Path(__file__).parent / "output_norm" / character_id
-    qc_pass_dir = Path(__file__).parent / "output_qc_pass" / character_id
-    qc_fail_dir = Path(__file__).parent / "output_qc_fail" / character_id
+def frame_paths(character_id, state, frame_num):
+    """Cutout / normalized paths for a frame, plus the QC pass and fail directories"""
+    base = Path(__file__).parent
+    cut_dir = base / "output_cut" / character_id
+    norm_dir = base / "output_norm" / character_id
+    qc_pass_dir = base / "output_qc_pass" / character_id
+    qc_fail_dir = base / "output_qc_fail" / character_id
 
     for d in [cut_dir, norm_dir, qc_pass_dir, qc_fail_dir]:
         d.mkdir(parents=True, exist_ok=True)
 
     cut_path = cut_dir / f"{character_id}_{state}_f{frame_num:02d}_cut.png"
     norm_path = norm_dir / f"{character_id}_{state}_f{frame_num:02d}.png"
+    return cut_path, norm_path, qc_pass_dir, qc_fail_dir
 
-    # Step 1: Cutout (background removal)
-    log(f"Cutting out frame {frame_num}", job_id)
-    if raw_path and raw_path.exists():
-        subprocess.run([sys.executable, str(pipeline_dir / "cutout_sprite.py"), str(raw_path), str(cut_path)], check=True)
-    else:
+def submit_frame(pool, raw_path, character_id, state, frame_num, job):
+    """Queue cutout + normalize for a raw frame; returns a Future or None"""
+    job_id = job["character_id"]
+
+    if not (raw_path and raw_path.exists()):
         log(f"WARNING: Raw frame not found: {raw_path}", job_id)
         return None
 
-    # Step 2: Normalize
-    log(f"Normalizing frame {frame_num}", job_id)
-    pipeline_dir = Path(__file__).parent
-    subprocess.run([
-        sys.executable,
-        str(pipeline_dir / "normalize_sprite.py"),
-        str(cut_path),
-        str(norm_path)
-    ], check=True)
-
-    # Step 3: QC
+    log(f"Cutting out + normalizing frame {frame_num}", job_id)
+    cut_path, norm_path, _, _ = frame_paths(character_id, state, frame_num)
+    return pool.submit(raw_path, cut_path, norm_path)
+
+def finish_frame(pool, future, character_id, state, frame_num, prev_normalized_path, job):
+    """Wait for a frame's cutout + normalize, then QC it against the previous passed frame"""
+    job_id = job["character_id"]
+    _, _, qc_pass_dir, qc_fail_dir = frame_paths(character_id, state, frame_num)
+
+    try:
+        norm_path = future.result()
+    except Exception as e:
+        log(f"Frame {frame_num} post-processing failed: {e}", job_id)
+        return None
+
     log(f"QC checking frame {frame_num}", job_id)
-    qc_result = subprocess.run([
-        sys.executable,
-        str(pipeline_dir / "qc_checker.py"),
-        str(norm_path),
-        str(prev_normalized_path) if prev_normalized_path else ""
-    ], capture_output=True, text=True)
-
-    qc_data = json.loads(qc_result.stdout)
-
-    if qc_data["passed"]:
-        # Move to pass directory
-        pass_path = qc_pass_dir / norm_path.name
-        shutil.copy(norm_path, pass_path)
+    qc_data = pool.qc(norm_path, prev_normalized_path)
+    pass_path = sort_qc(norm_path, qc_data, qc_pass_dir, qc_fail_dir)
+
+    if pass_path:
         log(f"Frame {frame_num} PASSED QC", job_id)
-        return pass_path
     else:
-        # Move to fail directory with reason
-        fail_path = qc_fail_dir / norm_path.name
-        reason_path = qc_fail_dir / f"{norm_path.stem}_reason.json"
-
-        shutil.copy(norm_path, fail_path)
-        with open(reason_path, "w") as f:
-            json.dump(qc_data, f, indent=2)
-
         log(f"Frame {frame_num} FAILED QC: {qc_data['failures']}", job_id)
-        return None
+    return pass_path
+
+def process_frame(raw_path, character_id, state, frame_num, prev_normalized_path, config, job):
+    """Process a single frame through the pipeline (in this process, with `config` driving normalize + QC)"""
+    with FramePool(0, config) as pool:
+        future = submit_frame(pool, raw_path, character_id, state, frame_num, job)
+        if future is None:
+            return None
+        return finish_frame(pool, future, character_id, state, frame_num, prev_normalized_path, job)
 
 def generate_metadata(character_id, state, frame_paths, config, job):
     """Generate engine-ready metadata JSON"""
@@ -371,7 +370,7 @@ def generate_metadata(character_id, state, frame_paths, config, job):
 
     return metadata_path
 
-def run_job(job_path):
+def run_job(job_path, workers=DEFAULT_WORKERS):
     """Execute full pipeline for a character job"""
     config = load_config()
     job = load_job(job_path)
@@ -386,6 +385,23 @@ def run_job(job_path):
         "states": {}
     }
 
+    with FramePool(workers, config) as pool:
+        run_states(pool, job, config, base_seed, results)
+
+    # Write final job results
+    results_dir = Path(__file__).parent / "logs"
+    results_path = results_dir / f"{job_id}_results.json"
+
+    with open(results_path, "w") as f:
+        json.dump(results, f, indent=2)
+
+    log(f"Job complete. Results: {results_path}", job_id)
+    return results
+
+def run_states(pool, job, config, base_seed, results):
+    """Generate and post-process every animation state of a job"""
+    job_id = job["character_id"]
+
     # Process each animation state
     for state in job["states"]:
         log(f"Processing state: {state}", job_id)
@@ -398,8 +414,9 @@ def run_job(job_path):
         frame_count = anim_spec["frames"]
         passed_frames = []
         prev_normalized_path = None
+        pending = []
 
-        # Generate and process each frame
+        # Generate each frame; cutout + normalize run on the pool meanwhile
         for frame_num in range(1, frame_count + 1):
             # Deterministic seed
             seed = get_seed(job_id, state, frame_num, base_seed)
@@ -418,14 +435,19 @@ def run_job(job_path):
                 log(f"Skipping frame {frame_num} - generation failed: {reason}", job_id)
                 continue
 
-            # Process through pipeline
-            result_path = process_frame(
-                raw_path,
+            future = submit_frame(pool, raw_path, job_id, state, frame_num, job)
+            if future:
+                pending.append((frame_num, future))
+
+        # QC in frame order: each frame is compared with the previous passed frame
+        for frame_num, future in pending:
+            result_path = finish_frame(
+                pool,
+                future,
                 job_id,
                 state,
                 frame_num,
                 prev_normalized_path,
-                config,
                 job
             )
 
@@ -459,23 +481,14 @@ def run_job(job_path):
                 "metadata": None
             }
 
-    # Write final job results
-    results_dir = Path(__file__).parent / "logs"
-    results_path = results_dir / f"{job_id}_results.json"
-
-    with open(results_path, "w") as f:
-        json.dump(results, f, indent=2)
-
-    log(f"Job complete. Results: {results_path}", job_id)
-    return results
-
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: batch_orchestrator_v2.py <job_file.json>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Batch sprite generation + post-processing")
+    parser.add_argument("job_path", help="Character job file (JSON)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Post-processing worker processes (0 = inline, default {DEFAULT_WORKERS})")
+    args = parser.parse_args()
 
-    job_path = sys.argv[1]
-    results = run_job(job_path)
+    results = run_job(args.job_path, args.workers)
 
     print(json.dumps(results, indent=2))
 
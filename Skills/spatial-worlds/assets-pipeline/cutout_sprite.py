@@ -4,12 +4,46 @@ Background removal using rembg
 Converts RGB images to RGBA with transparent background
 """
 
+import inspect
 import sys
 from pathlib import Path
+import onnxruntime as ort
 from PIL import Image
-from rembg import remove
+from rembg import new_session, remove
+from rembg.sessions import sessions_class
 
-def remove_background(input_path, output_path):
+# rembg's default model (what remove() loads without a session): u2net in older
+# releases, bria-rmbg in current ones
+MODEL_NAME = inspect.signature(new_session).parameters["model_name"].default
+
+_sessions = {}
+
+def get_session(model_name=MODEL_NAME, threads=None):
+    """rembg ONNX session, loaded once per process (`threads` caps its intra-op pool)"""
+    if model_name not in _sessions:
+        if threads:
+            # new_session() builds its own SessionOptions, so construct the session class directly
+            session_class = next((sc for sc in sessions_class if sc.name() == model_name), None)
+            if session_class is None:
+                raise ValueError(f"No rembg session for model '{model_name}'")
+            opts = ort.SessionOptions()
+            opts.intra_op_num_threads = threads
+            _sessions[model_name] = session_class(model_name, opts)
+        else:
+            _sessions[model_name] = new_session(model_name)
+    return _sessions[model_name]
+
+def cutout_image(img, session=None):
+    """Remove background from an Image, returns RGBA Image"""
+    output_img = remove(img, session=session or get_session())
+
+    # Ensure RGBA mode
+    if output_img.mode != 'RGBA':
+        output_img = output_img.convert('RGBA')
+
+    return output_img
+
+def remove_background(input_path, output_path, session=None):
     """Remove background and output RGBA PNG"""
     print(f"Removing background: {input_path.name}")
     
@@ -17,11 +51,7 @@ def remove_background(input_path, output_path):
     input_img = Image.open(input_path)
     
     # Remove background
-    output_img = remove(input_img)
-    
-    # Ensure RGBA mode
-    if output_img.mode != 'RGBA':
-        output_img = output_img.convert('RGBA')
+    output_img = cutout_image(input_img, session)
     
     # Save with transparency
     output_img.save(output_path, 'PNG')
@@ -2,10 +2,11 @@
 # Run with: python3 fal_generate.py <job_file.json>
 """
 fal.ai sprite generation — replaces ComfyUI for cloud GPU generation.
-Uses SD 1.5 via fal.ai API, then feeds output into existing pipeline.
+Uses SD 1.5 via fal.ai API, then feeds output into existing pipeline
+(sprite_engine: cutout + normalize on a worker pool, QC in frame order).
 
 Usage:
-    python fal_generate.py <job_file.json>
+    python fal_generate.py <job_file.json> [--workers N]
     python fal_generate.py jobs/pilot_hero.json
 """
 
@@ -13,9 +14,8 @@ import os
 import sys
 import json
 import time
+import argparse
 import urllib.request
-import subprocess
-import shutil
 from pathlib import Path
 from datetime import datetime
 
@@ -25,6 +25,8 @@ except ImportError:
     print("ERROR: fal-client not installed. Run: pip install fal-client")
     sys.exit(1)
 
+from sprite_engine import DEFAULT_WORKERS, FramePool, sort_qc
+
 # ── Config ────────────────────────────────────────────────────────────────────
 
 PIPELINE_DIR = Path(__file__).parent
@@ -121,8 +123,8 @@ def generate_frame_fal(character_id, state, frame_num, config, job, max_retries=
 
 # ── Post-processing pipeline ──────────────────────────────────────────────────
 
-def process_frame(raw_path, character_id, state, frame_num, prev_norm_path, job_id):
-    """Run raw image through cutout → normalize → QC"""
+def submit_frame(pool, raw_path, character_id, state, frame_num, job_id):
+    """Queue raw image for cutout → normalize; returns (norm_path future, qc dirs)"""
     cut_dir = PIPELINE_DIR / "output_cut" / character_id
     norm_dir = PIPELINE_DIR / "output_norm" / character_id
     qc_pass_dir = PIPELINE_DIR / "output_qc_pass" / character_id
@@ -134,52 +136,26 @@ def process_frame(raw_path, character_id, state, frame_num, prev_norm_path, job_
     cut_path = cut_dir / f"{character_id}_{state}_f{frame_num:02d}_cut.png"
     norm_path = norm_dir / f"{character_id}_{state}_f{frame_num:02d}.png"
 
-    # Step 1: Background removal
-    log(f"  Cutout: {raw_path.name}", job_id)
-    r = subprocess.run(
-        [sys.executable, str(PIPELINE_DIR / "cutout_sprite.py"), str(raw_path), str(cut_path)],
-        capture_output=True, text=True
-    )
-    if r.returncode != 0:
-        log(f"  Cutout failed: {r.stderr[:100]}", job_id)
-        return None
-
-    # Step 2: Normalize
-    log(f"  Normalize", job_id)
-    r = subprocess.run(
-        [sys.executable, str(PIPELINE_DIR / "normalize_sprite.py"), str(cut_path), str(norm_path)],
-        capture_output=True, text=True
-    )
-    if r.returncode != 0:
-        log(f"  Normalize failed: {r.stderr[:100]}", job_id)
-        return None
-
-    # Step 3: QC
-    log(f"  QC check", job_id)
-    args = [sys.executable, str(PIPELINE_DIR / "qc_checker.py"), str(norm_path)]
-    if prev_norm_path:
-        args.append(str(prev_norm_path))
-    r = subprocess.run(args, capture_output=True, text=True)
+    log(f"  Cutout + normalize: {raw_path.name}", job_id)
+    return pool.submit(raw_path, cut_path, norm_path), (qc_pass_dir, qc_fail_dir)
 
+def finish_frame(pool, pending, prev_norm_path, job_id):
+    """Wait for cutout → normalize, then QC against the previous passed frame"""
+    future, (qc_pass_dir, qc_fail_dir) = pending
     try:
-        qc_data = json.loads(r.stdout)
-    except json.JSONDecodeError:
-        log(f"  QC parse error: {r.stdout[:100]}", job_id)
+        norm_path = future.result()
+    except Exception as e:
+        log(f"  Cutout/normalize failed: {str(e)[:100]}", job_id)
         return None
 
-    if qc_data.get("passed"):
-        pass_path = qc_pass_dir / norm_path.name
-        shutil.copy(norm_path, pass_path)
+    log(f"  QC check: {norm_path.name}", job_id)
+    qc_data = pool.qc(norm_path, prev_norm_path)
+    pass_path = sort_qc(norm_path, qc_data, qc_pass_dir, qc_fail_dir)
+    if pass_path:
         log(f"  QC PASSED", job_id)
-        return pass_path
     else:
-        fail_path = qc_fail_dir / norm_path.name
-        shutil.copy(norm_path, fail_path)
-        reason_path = qc_fail_dir / f"{norm_path.stem}_reason.json"
-        with open(reason_path, "w") as f:
-            json.dump(qc_data, f, indent=2)
         log(f"  QC FAILED: {qc_data.get('failures', [])}", job_id)
-        return None
+    return pass_path
 
 def generate_metadata(character_id, state, frame_paths, config):
     anim_spec = config["animation_spec"][state]
@@ -216,7 +192,7 @@ def generate_metadata(character_id, state, frame_paths, config):
 
 # ── Main ──────────────────────────────────────────────────────────────────────
 
-def run_job(job_path):
+def run_job(job_path, workers=DEFAULT_WORKERS):
     api_key = os.environ.get("FAL_API_KEY")
     if not api_key:
         print("ERROR: FAL_API_KEY not set. Run: source /root/.zo_secrets")
@@ -233,6 +209,25 @@ def run_job(job_path):
 
     results = {"character_id": character_id, "states": {}}
 
+    with FramePool(workers, config) as pool:
+        run_states(pool, job, config, results)
+
+    # Summary
+    log(f"\n── COMPLETE ──", character_id)
+    for state, r in results["states"].items():
+        log(f"  {state}: {r['rate']} frames passed QC", character_id)
+
+    # Save results
+    results_path = PIPELINE_DIR / "logs" / f"{character_id}_fal_results.json"
+    with open(results_path, "w") as f:
+        json.dump(results, f, indent=2)
+    log(f"Results: {results_path}", character_id)
+
+    return results
+
+def run_states(pool, job, config, results):
+    character_id = job["character_id"]
+
     for state in job["states"]:
         anim_spec = config["animation_spec"].get(state)
         if not anim_spec:
@@ -244,14 +239,20 @@ def run_job(job_path):
 
         passed_frames = []
         prev_norm_path = None
+        pending = []
 
+        # Post-processing runs on the pool while the next frame generates
         for frame_num in range(1, frame_count + 1):
             success, raw_path = generate_frame_fal(character_id, state, frame_num, config, job)
             if not success:
                 log(f"Skipping frame {frame_num} — generation failed", character_id)
                 continue
 
-            result_path = process_frame(raw_path, character_id, state, frame_num, prev_norm_path, character_id)
+            pending.append(submit_frame(pool, raw_path, character_id, state, frame_num, character_id))
+
+        # QC in frame order
+        for frame in pending:
+            result_path = finish_frame(pool, frame, prev_norm_path, character_id)
             if result_path:
                 passed_frames.append(result_path)
                 prev_norm_path = result_path
@@ -269,22 +270,11 @@ def run_job(job_path):
             log(f"WARNING: 0 frames passed for state '{state}'", character_id)
             results["states"][state] = {"passed": 0, "total": frame_count, "rate": "0/0"}
 
-    # Summary
-    log(f"\n── COMPLETE ──", character_id)
-    for state, r in results["states"].items():
-        log(f"  {state}: {r['rate']} frames passed QC", character_id)
-
-    # Save results
-    results_path = PIPELINE_DIR / "logs" / f"{character_id}_fal_results.json"
-    with open(results_path, "w") as f:
-        json.dump(results, f, indent=2)
-    log(f"Results: {results_path}", character_id)
-
-    return results
-
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python fal_generate.py <job_file.json>")
-        print("Example: python fal_generate.py jobs/pilot_hero.json")
-        sys.exit(1)
-    run_job(sys.argv[1])
+    parser = argparse.ArgumentParser(description="fal.ai sprite generation",
+                                     epilog="Example: python fal_generate.py jobs/pilot_hero.json")
+    parser.add_argument("job_path", help="Character job file (JSON)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Post-processing worker processes (0 = inline, default {DEFAULT_WORKERS})")
+    args = parser.parse_args()
+    run_job(args.job_path, args.workers)
@@ -13,17 +13,20 @@ Sheet layout (matches IsoGame-NFT-TEST.ts):
 
 Each frame is 64×64 px.
 
+Cutout + 64×64 fit run on a sprite_engine worker pool while later
+frames generate.
+
 Usage:
-    python3 fal_walk_generator.py jobs/hero_orange_walk.json
+    python3 fal_walk_generator.py jobs/hero_orange_walk.json [--workers N]
 """
 
 import os
 import sys
 import json
 import time
+import argparse
 import hashlib
 import urllib.request
-import subprocess
 import shutil
 from pathlib import Path
 from datetime import datetime
@@ -40,6 +43,8 @@ except ImportError:
     print("ERROR: Pillow not installed. Run: pip install Pillow --break-system-packages")
     sys.exit(1)
 
+from sprite_engine import DEFAULT_WORKERS, FramePool
+
 # ── Config ──────────────────────────────────────────────────────────────────
 
 PIPELINE_DIR = Path(__file__).parent
@@ -225,71 +230,30 @@ def generate_frame(character_id, direction, frame_idx, config, job, ref_frame_pa
     return False, None
 
 
-def process_frame(raw_path, character_id, direction, frame_idx, job_id):
-    """Run cutout → normalize (64×64 for sheet)"""
+def process_frame(pool, raw_path, character_id, direction, frame_idx, job_id):
+    """Queue cutout → normalize (64×64 for sheet); returns a future for the norm path"""
     cut_dir = PIPELINE_DIR / "output_cut" / character_id / f"walk_{direction}"
     norm_dir = PIPELINE_DIR / "output_norm_walk" / character_id / f"walk_{direction}"
 
-    for d in [cut_dir, norm_dir]:
-        d.mkdir(parents=True, exist_ok=True)
-
     cut_path = cut_dir / f"{character_id}_walk_{direction}_f{frame_idx:02d}_cut.png"
     norm_path = norm_dir / f"{character_id}_walk_{direction}_f{frame_idx:02d}.png"
 
-    # Step 1: Background removal
-    r = subprocess.run(
-        [sys.executable, str(PIPELINE_DIR / "cutout_sprite.py"), str(raw_path), str(cut_path)],
-        capture_output=True, text=True
-    )
-    if r.returncode != 0:
-        log(f"  Cutout failed: {r.stderr[:200]}", job_id)
-        return None
+    return pool.submit(raw_path, cut_path, norm_path, cell=FRAME_SIZE)
+
 
-    # Step 2: Normalize to 64×64
-    normalize_to_64(cut_path, norm_path)
+def collect_frame(future, job_id):
+    """Wait for a queued frame; returns norm path or None on failure"""
+    if future is None:
+        return None
+    try:
+        norm_path = future.result()
+    except Exception as e:
+        log(f"  Cutout failed: {str(e)[:200]}", job_id)
+        return None
     log(f"  Normalized: {norm_path.name}", job_id)
     return norm_path
 
 
-def normalize_to_64(input_path, output_path):
-    """Normalize cutout to 64×64 transparent canvas, character centered with feet at bottom."""
-    import numpy as np
-    img = Image.open(input_path).convert("RGBA")
-    arr = __import__("numpy").array(img)
-    alpha = arr[:, :, 3]
-
-    rows = __import__("numpy").any(alpha > 10, axis=1)
-    cols = __import__("numpy").any(alpha > 10, axis=0)
-
-    if not __import__("numpy").any(rows):
-        canvas = Image.new("RGBA", (64, 64), (0, 0, 0, 0))
-        canvas.save(output_path, "PNG")
-        return
-
-    y_indices = __import__("numpy").where(rows)[0]
-    x_indices = __import__("numpy").where(cols)[0]
-    y_min, y_max = int(y_indices[0]), int(y_indices[-1])
-    x_min, x_max = int(x_indices[0]), int(x_indices[-1])
-
-    char = img.crop((x_min, y_min, x_max + 1, y_max + 1))
-    char_h = y_max - y_min + 1
-    char_w = x_max - x_min + 1
-
-    # Scale to fit in 60×60 (leave 2px margin)
-    target = 56
-    scale = target / max(char_h, char_w)
-    new_w = max(1, int(char_w * scale))
-    new_h = max(1, int(char_h * scale))
-    char = char.resize((new_w, new_h), Image.LANCZOS)
-
-    canvas = Image.new("RGBA", (64, 64), (0, 0, 0, 0))
-    # Center horizontally, bottom-align (feet at y=62)
-    paste_x = (64 - new_w) // 2
-    paste_y = 62 - new_h
-    canvas.paste(char, (paste_x, paste_y), char)
-    canvas.save(output_path, "PNG")
-
-
 # ── Sprite sheet assembly ────────────────────────────────────────────────────
 
 DIRECTION_ORDER = ["south", "north", "west", "east"]  # matches engine frame layout
@@ -342,7 +306,7 @@ def copy_to_game(character_id, sheet_path, frame_paths_by_dir):
 
 # ── Main ─────────────────────────────────────────────────────────────────────
 
-def run_job(job_path):
+def run_job(job_path, workers=DEFAULT_WORKERS):
     api_key = os.environ.get("FAL_API_KEY")
     if not api_key:
         print("ERROR: FAL_API_KEY not set. Run: source /root/.zo_secrets")
@@ -358,7 +322,35 @@ def run_job(job_path):
     log(f"Starting walk job: {character_id}", character_id)
     log(f"Directions: {directions}, Frames: {frames_per_dir}", character_id)
 
-    frame_paths_by_dir = {}
+    with FramePool(workers, config) as pool:
+        pending = generate_directions(pool, character_id, directions, frames_per_dir, config, job)
+
+        frame_paths_by_dir = {}
+        for direction, futures in pending.items():
+            frames = [collect_frame(f, character_id) for f in futures]
+            frame_paths_by_dir[direction] = frames
+            passed = sum(1 for f in frames if f is not None)
+            log(f"  {direction}: {passed}/{frames_per_dir} frames ready", character_id)
+
+    # Assemble sprite sheet
+    log(f"\n── Assembling sprite sheet ──", character_id)
+    sheet_dir = PIPELINE_DIR / "output_sheets" / character_id
+    sheet_path = assemble_sheet(character_id, frame_paths_by_dir, sheet_dir)
+
+    # Copy to game
+    log(f"\n── Copying to game assets ──", character_id)
+    game_path = copy_to_game(character_id, sheet_path, frame_paths_by_dir)
+
+    log(f"\n── COMPLETE ──", character_id)
+    log(f"  Sheet: {sheet_path}", character_id)
+    log(f"  Game:  {game_path}", character_id)
+
+    return {"character_id": character_id, "sheet_path": str(sheet_path), "game_path": str(game_path)}
+
+
+def generate_directions(pool, character_id, directions, frames_per_dir, config, job):
+    """Generate every frame, queueing post-processing as each one lands; returns futures by direction"""
+    pending = {}
 
     for direction in directions:
         log(f"\n── Direction: {direction} ──", character_id)
@@ -380,32 +372,18 @@ def run_job(job_path):
             if frame_idx == 0:
                 ref_frame_path = raw_path
 
-            norm_path = process_frame(raw_path, character_id, direction, frame_idx, character_id)
-            frames.append(norm_path)
-
-        frame_paths_by_dir[direction] = frames
-        passed = sum(1 for f in frames if f is not None)
-        log(f"  {direction}: {passed}/{frames_per_dir} frames ready", character_id)
-
-    # Assemble sprite sheet
-    log(f"\n── Assembling sprite sheet ──", character_id)
-    sheet_dir = PIPELINE_DIR / "output_sheets" / character_id
-    sheet_path = assemble_sheet(character_id, frame_paths_by_dir, sheet_dir)
-
-    # Copy to game
-    log(f"\n── Copying to game assets ──", character_id)
-    game_path = copy_to_game(character_id, sheet_path, frame_paths_by_dir)
+            frames.append(process_frame(pool, raw_path, character_id, direction, frame_idx, character_id))
 
-    log(f"\n── COMPLETE ──", character_id)
-    log(f"  Sheet: {sheet_path}", character_id)
-    log(f"  Game:  {game_path}", character_id)
+        pending[direction] = frames
 
-    return {"character_id": character_id, "sheet_path": str(sheet_path), "game_path": str(game_path)}
+    return pending
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python3 fal_walk_generator.py <job_file.json>")
-        print("Example: python3 fal_walk_generator.py jobs/hero_orange_walk.json")
-        sys.exit(1)
-    run_job(sys.argv[1])
+    parser = argparse.ArgumentParser(description="Walk animation sprite sheet generator",
+                                     epilog="Example: python3 fal_walk_generator.py jobs/hero_orange_walk.json")
+    parser.add_argument("job_path", help="Walk job file (JSON)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Post-processing worker processes (0 = inline, default {DEFAULT_WORKERS})")
+    args = parser.parse_args()
+    run_job(args.job_path, args.workers)
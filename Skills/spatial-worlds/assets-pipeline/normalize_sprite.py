@@ -115,14 +115,43 @@ def recenter_to_baseline(img, canvas_w, canvas_h, baseline_y, target_height):
 
     return canvas
 
-def normalize_sprite(input_path, output_path, config=None):
-    """Full normalization pipeline"""
-    if config is None:
-        config = load_config()
+def fit_to_cell(img, size=64, target=56, bottom=62):
+    """
+    Fit sprite into a square sheet cell: scale longest side to target,
+    center horizontally, feet at y=bottom
+    """
+    img = img.convert("RGBA")
+    alpha = np.array(img)[:, :, 3]
 
-    norm = config["normalization"]
+    rows = np.any(alpha > 10, axis=1)
+    cols = np.any(alpha > 10, axis=0)
 
-    img = Image.open(input_path)
+    if not np.any(rows):
+        return Image.new("RGBA", (size, size), (0, 0, 0, 0))
+
+    y_indices = np.where(rows)[0]
+    x_indices = np.where(cols)[0]
+    y_min, y_max = int(y_indices[0]), int(y_indices[-1])
+    x_min, x_max = int(x_indices[0]), int(x_indices[-1])
+
+    char = img.crop((x_min, y_min, x_max + 1, y_max + 1))
+    char_h = y_max - y_min + 1
+    char_w = x_max - x_min + 1
+
+    scale = target / max(char_h, char_w)
+    new_w = max(1, int(char_w * scale))
+    new_h = max(1, int(char_h * scale))
+    char = char.resize((new_w, new_h), Image.LANCZOS)
+
+    canvas = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    paste_x = (size - new_w) // 2
+    paste_y = bottom - new_h
+    canvas.paste(char, (paste_x, paste_y), char)
+    return canvas
+
+def normalize_image(img, config):
+    """Full normalization pipeline on an Image, returns the normalized RGBA canvas"""
+    norm = config["normalization"]
 
     # 1. Background removal and cleanup
     img = remove_background(img)
@@ -143,6 +172,15 @@ def normalize_sprite(input_path, output_path, config=None):
         norm["target_char_height_px"]
     )
 
+    return img
+
+def normalize_sprite(input_path, output_path, config=None):
+    """Full normalization pipeline"""
+    if config is None:
+        config = load_config()
+
+    img = normalize_image(Image.open(input_path), config)
+
     # Save with full alpha
     img.save(output_path, "PNG", optimize=True)
 
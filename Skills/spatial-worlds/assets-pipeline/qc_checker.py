@@ -205,9 +205,6 @@ def run_qc(image_path, prev_image_path=None, config=None):
     if config is None:
         config = load_config()
 
-    qc_gates = config["qc_gates"]
-    norm = config["normalization"]
-
     img = Image.open(image_path).convert("RGBA")
     img_array = np.array(img)
 
@@ -216,8 +213,15 @@ def run_qc(image_path, prev_image_path=None, config=None):
         prev_img = Image.open(prev_image_path).convert("RGBA")
         prev_array = np.array(prev_img)
 
+    return run_qc_arrays(img_array, prev_array, config, image_path)
+
+def run_qc_arrays(img_array, prev_array, config, image=""):
+    """Run all QC checks on an RGBA array (prev_array: previous passed frame or None)"""
+    qc_gates = config["qc_gates"]
+    norm = config["normalization"]
+
     results = {
-        "image": str(image_path),
+        "image": str(image),
         "passed": True,
         "failures": []
     }
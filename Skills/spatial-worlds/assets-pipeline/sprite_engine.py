@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+In-process sprite post-processing engine: cutout -> normalize -> QC
+
+Replaces the per-frame subprocess chain (cutout_sprite.py, normalize_sprite.py,
+qc_checker.py), which started three interpreters per frame, re-imported
+PIL/NumPy/SciPy and reloaded the rembg ONNX model every time.
+
+- SpriteEngine: config + one rembg session (loaded lazily, once per process),
+  stages as function calls on Image/ndarray objects
+- FramePool: cutout + normalize across a process pool; each worker builds its
+  engine once. Submit frames as they are generated, collect them in order.
+- QC runs in the caller, in frame order: the jitter / silhouette / angle gates
+  compare each frame with the previous *passed* frame.
+
+Usage:
+    python3 sprite_engine.py <raw.png> [<raw.png> ...] [--workers N] [--out DIR]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from cutout_sprite import MODEL_NAME, cutout_image, get_session
+from normalize_sprite import fit_to_cell, load_config, normalize_image
+from qc_checker import run_qc_arrays
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def _rgba_array(img):
+    """RGBA ndarray from an Image, ndarray or image path"""
+    if img is None or isinstance(img, np.ndarray):
+        return img
+    if not isinstance(img, Image.Image):
+        img = Image.open(img)
+    return np.array(img.convert("RGBA"))
+
+
+class SpriteEngine:
+    """Long-lived cutout -> normalize -> QC stages for one process"""
+
+    def __init__(self, config=None, model_name=MODEL_NAME, threads=None):
+        self.config = config or load_config()
+        self.model_name = model_name
+        self.threads = threads
+
+    @property
+    def session(self):
+        return get_session(self.model_name, self.threads)
+
+    def cutout(self, img):
+        """Background removal, returns RGBA Image"""
+        return cutout_image(img, self.session)
+
+    def normalize(self, img):
+        """Full normalization (canvas, baseline, palette) of a cutout"""
+        return normalize_image(img, self.config)
+
+    def fit(self, img, size):
+        """Fit a cutout into a size x size sheet cell (walk sheets)"""
+        return fit_to_cell(img, size, size - 8, size - 2)
+
+    def qc(self, img, prev=None, label=""):
+        """QC results dict for a normalized frame against the previous passed frame"""
+        return run_qc_arrays(_rgba_array(img), _rgba_array(prev), self.config, label)
+
+    def cut_and_normalize(self, raw_path, cut_path, norm_path, cell=None):
+        """Raw frame -> cutout PNG -> normalized PNG (or a cell x cell fit); returns norm_path"""
+        cut = self.cutout(Image.open(raw_path))
+        cut.save(cut_path, "PNG")
+        if cell:
+            self.fit(cut, cell).save(norm_path, "PNG")
+        else:
+            self.normalize(cut).save(norm_path, "PNG", optimize=True)
+        return Path(norm_path)
+
+
+# -- Process pool -------------------------------------------------------------
+
+_worker_engine = None
+
+
+def _init_worker(config, model_name, threads):
+    global _worker_engine
+    # Split cores between workers through the session options
+    _worker_engine = SpriteEngine(config, model_name, threads)
+    _worker_engine.session
+
+
+def _cut_and_normalize(raw_path, cut_path, norm_path, cell):
+    return _worker_engine.cut_and_normalize(raw_path, cut_path, norm_path, cell)
+
+
+class FramePool:
+    """
+    Cutout + normalize across worker processes, each holding one engine
+
+    workers=0 runs frames inline in this process (still one model load).
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, config=None, model_name=MODEL_NAME):
+        self.engine = SpriteEngine(config, model_name)
+        self.workers = workers
+        self.executor = None
+        if workers > 0:
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            # spawn, not fork: forking after rembg's imports (pymatting/numba) hangs the parent at exit
+            self.executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.engine.config, model_name, threads),
+            )
+
+    def submit(self, raw_path, cut_path, norm_path, cell=None):
+        """Future resolving to norm_path once the frame is cut out and normalized"""
+        Path(cut_path).parent.mkdir(parents=True, exist_ok=True)
+        Path(norm_path).parent.mkdir(parents=True, exist_ok=True)
+        args = (str(raw_path), str(cut_path), str(norm_path), cell)
+        if self.executor:
+            return self.executor.submit(_cut_and_normalize, *args)
+        future = Future()
+        try:
+            future.set_result(self.engine.cut_and_normalize(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def qc(self, norm_path, prev_path=None):
+        return self.engine.qc(norm_path, prev_path, norm_path)
+
+    def close(self):
+        if self.executor:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def sort_qc(norm_path, qc_data, qc_pass_dir, qc_fail_dir):
+    """Copy a QC'd frame to the pass or fail directory (with reason JSON); returns pass path or None"""
+    norm_path = Path(norm_path)
+    if qc_data["passed"]:
+        pass_path = Path(qc_pass_dir) / norm_path.name
+        shutil.copy(norm_path, pass_path)
+        return pass_path
+
+    fail_path = Path(qc_fail_dir) / norm_path.name
+    reason_path = Path(qc_fail_dir) / f"{norm_path.stem}_reason.json"
+    shutil.copy(norm_path, fail_path)
+    with open(reason_path, "w") as f:
+        json.dump(qc_data, f, indent=2)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cutout, normalize and QC raw frames in-process")
+    parser.add_argument("raw", nargs="+", help="Raw frames, in animation order")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Worker processes (0 = inline, default {DEFAULT_WORKERS})")
+    parser.add_argument("--out", default="engine_out", help="Output directory")
+    args = parser.parse_args()
+
+    out = Path(args.out)
+    for d in ("cut", "norm", "pass", "fail"):
+        (out / d).mkdir(parents=True, exist_ok=True)
+
+    t0 = time.time()
+    with FramePool(args.workers) as pool:
+        futures = []
+        for raw in map(Path, args.raw):
+            if not raw.exists():
+                print(f"Error: Input file not found: {raw}")
+                sys.exit(1)
+            futures.append(pool.submit(raw, out / "cut" / f"{raw.stem}_cut.png", out / "norm" / f"{raw.stem}.png"))
+
+        prev = None
+        passed = 0
+        for future in futures:
+            norm_path = future.result()
+            qc_data = pool.qc(norm_path, prev)
+            result = sort_qc(norm_path, qc_data, out / "pass", out / "fail")
+            if result:
+                passed += 1
+                prev = result
+            status = "PASS" if result else f"FAIL {[f['check'] for f in qc_data['failures']]}"
+            print(f"  {norm_path.name}: {status}")
+
+    elapsed = time.time() - t0
+    print(f"{passed}/{len(futures)} frames passed QC in {elapsed:.2f}s "
+          f"({elapsed / len(futures) * 1000:.0f} ms/frame incl. model load)")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,12 +14,15 @@ Usage:
   python3 correlate.py --log-file /path/to/monitor.log    # Parse log, add EDT column
   python3 correlate.py --window "2026-03-22 03:40:00" 10  # Show 10min window around time
   python3 correlate.py --now                              # Show current time in both zones
+
+Log files are read through log_index.py: window queries seek via a sparse
+timestamp -> offset index kept beside the log (<log>.tsidx, extended as the
+log grows) and annotation runs over chunks in parallel.
 """
 
 import argparse
 import json
 import os
-import re
 import sys
 import time
 import urllib.request
@@ -27,6 +30,9 @@ import urllib.error
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 
+from log_index import annotate_log, line_timestamp, open_index
+from rpc_cache import open_cache
+
 # -- Constants ----------------------------------------------------------------
 
 EDT_OFFSET = timedelta(hours=-4)
@@ -42,20 +48,7 @@ RPC_URL = "https://api.mainnet-beta.solana.com"
 
 VALIDATOR_IDENTITY = "SaGAgdkowooXBrHihpmE8gsjf1dUG7n5SqnyJxYFnXJ"
 
-# Common timestamp formats in validator logs
-TIMESTAMP_PATTERNS = [
-    # ISO 8601 with timezone
-    (r'(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?Z)', "%Y-%m-%dT%H:%M:%SZ"),
-    (r'(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:[+-]\d{2}:?\d{2}))', None),
-    # Standard date+time
-    (r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) UTC', "%Y-%m-%d %H:%M:%S"),
-    (r'\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) UTC\]', "%Y-%m-%d %H:%M:%S"),
-    # Time only (HH:MM:SS) -- assume UTC
-    (r'\b(\d{2}:\d{2}:\d{2})\b', "%H:%M:%S"),
-    # Unix timestamp
-    (r'timestamp[=: ]+(\d{10,13})', None),
-]
-
+CACHE = open_cache(RPC_URL)
 
 # -- Conversion Functions -----------------------------------------------------
 
@@ -133,6 +126,13 @@ def parse_timestamp(ts_str):
 # -- Slot / Time Estimation ---------------------------------------------------
 
 def rpc_request(method, params=None):
+    """Make an RPC call to Solana mainnet, reading through the shared RPC cache."""
+    if CACHE is None:
+        return fetch_rpc(method, params)
+    return CACHE.call(method, params, lambda: fetch_rpc(method, params))
+
+
+def fetch_rpc(method, params=None):
     """Make an RPC call to Solana mainnet."""
     payload = {
         "jsonrpc": "2.0",
@@ -159,8 +159,13 @@ def rpc_request(method, params=None):
 def estimate_time_from_slot(slot):
     """
     Estimate the UTC time for a given slot number.
-    Uses current slot + time as anchor, then extrapolates backwards.
+    Uses the slot's finalized block time when there is one, otherwise the
+    current slot + time as anchor, extrapolating backwards.
     """
+    block_time = rpc_request("getBlockTime", [slot])
+    if block_time is not None:
+        return datetime.fromtimestamp(block_time, tz=UTC_TZ)
+
     # Get current slot from RPC for accurate anchoring
     current_slot = rpc_request("getSlot", [{"commitment": "confirmed"}])
     if current_slot is None:
@@ -194,14 +199,10 @@ def estimate_slot_from_time(dt_utc):
 
 def parse_log_line(line):
     """Extract timestamp from a log line and return (utc_dt, original_match)."""
-    for pattern, fmt in TIMESTAMP_PATTERNS:
-        match = re.search(pattern, line)
-        if match:
-            ts_str = match.group(1)
-            dt = parse_timestamp(ts_str)
-            if dt:
-                return dt, ts_str
-    return None, None
+    ts, ts_str = line_timestamp(line)
+    if ts is None:
+        return None, None
+    return datetime.fromtimestamp(ts, tz=UTC_TZ), ts_str
 
 
 def annotate_log_file(log_path, output_path=None):
@@ -215,23 +216,9 @@ def annotate_log_file(log_path, output_path=None):
         sys.exit(1)
 
     out = open(output_path, 'w') if output_path else sys.stdout
-    line_count = 0
-    annotated = 0
 
     try:
-        with open(log_path) as f:
-            for line in f:
-                line = line.rstrip('\n')
-                line_count += 1
-
-                dt_utc, original = parse_log_line(line)
-                if dt_utc:
-                    dt_edt = utc_to_edt(dt_utc)
-                    edt_str = dt_edt.strftime("%H:%M:%S EDT")
-                    out.write(f"[{edt_str}] {line}\n")
-                    annotated += 1
-                else:
-                    out.write(f"{'':>14s} {line}\n")
+        line_count, annotated = annotate_log(log_path, out)
     finally:
         if output_path:
             out.close()
@@ -281,12 +268,10 @@ def show_time_window(center_time_str, window_minutes, log_path=None):
         log_path = Path(log_path)
         if log_path.exists():
             print(f"\n  Log lines in window ({log_path}):")
-            with open(log_path) as f:
-                for line in f:
-                    dt_utc, _ = parse_log_line(line.rstrip('\n'))
-                    if dt_utc and start <= dt_utc <= end:
-                        dt_edt = utc_to_edt(dt_utc)
-                        print(f"  [{dt_edt.strftime('%H:%M:%S EDT')}] {line.rstrip()}")
+            index = open_index(log_path)
+            for ts, line in index.window(start.timestamp(), end.timestamp()):
+                dt_edt = utc_to_edt(datetime.fromtimestamp(ts, tz=UTC_TZ))
+                print(f"  [{dt_edt.strftime('%H:%M:%S EDT')}] {line.rstrip()}")
 
 
 # -- Main ---------------------------------------------------------------------
@@ -340,11 +325,6 @@ Examples:
         metavar=("TIMESTAMP", "MINUTES"),
         help="Show a time window around a center timestamp (UTC)",
     )
-    group.add_argument(
-        "--log-file",
-        metavar="PATH",
-        help="Parse a log file and annotate with EDT timestamps",
-    )
     group.add_argument(
         "--grafana-range",
         nargs=2,
@@ -352,6 +332,11 @@ Examples:
         help="Generate a Grafana URL for a specific UTC time range",
     )
 
+    parser.add_argument(
+        "--log-file",
+        metavar="PATH",
+        help="Parse a log file and annotate with EDT timestamps (with --window: show its lines in the window)",
+    )
     parser.add_argument(
         "--output",
         metavar="PATH",
@@ -432,7 +417,7 @@ Examples:
         except ValueError:
             print(f"Error: invalid minutes: {minutes_str}", file=sys.stderr)
             sys.exit(1)
-        show_time_window(ts_str, minutes)
+        show_time_window(ts_str, minutes, args.log_file)
 
     elif args.log_file:
         annotate_log_file(args.log_file, args.output)
@@ -2,23 +2,48 @@
 """
 Solana Validator Epoch Performance Report
 Queries mainnet RPC for vote account data and produces a per-epoch performance analysis.
+
+Cluster statistics (ranks, percentiles, deltas vs median, rolling trends) come
+from epoch_matrix.EpochMatrix, computed for every validator and epoch at once.
+getVoteAccounts carries the last 5 epochs; asking for more with --epochs reads
+the full credit history (up to 64 epochs) from the vote accounts themselves.
+
+Usage:
+    python3 epoch-performance.py [VALIDATOR_IDENTITY_PUBKEY] [--epochs N]
 """
 
+import argparse
 import json
 import sys
 import urllib.request
 import urllib.error
 import time
-from collections import defaultdict
+
+from epoch_matrix import EpochMatrix, ROLLING_WINDOW
+from rpc_cache import open_cache
+from solana_rpc import RpcClient
+from vote_decode import decode_vote_states
 
 RPC_URL = "https://api.mainnet-beta.solana.com"
 DEFAULT_VALIDATOR = "SaGAgdkowooXBrHihpmE8gsjf1dUG7n5SqnyJxYFnXJ"
 REQUEST_TIMEOUT = 30
 MAX_RETRIES = 3
 RETRY_DELAY = 2
+HISTORY_EPOCHS = 5
+VOTE_ACCOUNTS_EPOCHS = 5  # epochCredits entries getVoteAccounts returns
+ACCOUNTS_PER_CALL = 100  # getMultipleAccounts limit
+
+CACHE = open_cache(RPC_URL)
 
 
 def rpc_request(method, params=None, retries=MAX_RETRIES):
+    """RPC call read through the shared RPC cache (getVoteAccounts/getEpochInfo have short TTLs)."""
+    if CACHE is None:
+        return fetch_rpc(method, params, retries)
+    return CACHE.call(method, params, lambda: fetch_rpc(method, params, retries))
+
+
+def fetch_rpc(method, params=None, retries=MAX_RETRIES):
     payload = {
         "jsonrpc": "2.0",
         "id": 1,
@@ -70,6 +95,27 @@ def get_vote_accounts():
     return rpc_request("getVoteAccounts")
 
 
+def get_vote_states(vote_accounts):
+    """(identity, decoded vote state or None) for every vote account, via batched getMultipleAccounts."""
+    accounts = vote_accounts.get("current", []) + vote_accounts.get("delinquent", [])
+    calls = [
+        ("getMultipleAccounts", [[v["votePubkey"] for v in accounts[i:i + ACCOUNTS_PER_CALL]],
+                                 {"encoding": "base64"}])
+        for i in range(0, len(accounts), ACCOUNTS_PER_CALL)
+    ]
+    rpc = RpcClient(RPC_URL, batch_size=4, max_inflight=2, log=lambda msg: print(msg, file=sys.stderr))
+    states = []
+    for (_, params), result in zip(calls, rpc.batch(calls)):
+        if isinstance(result, Exception):
+            print(f"getMultipleAccounts failed: {result}", file=sys.stderr)
+            sys.exit(1)
+        datas = [value and value["data"] for value in result["value"]]
+        decoded = iter(decode_vote_states([data for data in datas if data]))
+        states.extend(next(decoded) if data else None for data in datas)
+    identities = [v["nodePubkey"] for v in accounts]
+    return list(zip(identities, states))
+
+
 def find_validator(vote_accounts, identity):
     for v in vote_accounts.get("current", []):
         if v["nodePubkey"] == identity:
@@ -91,38 +137,11 @@ def extract_epoch_credits(epoch_credits, target_epoch):
     return None
 
 
-def build_epoch_map(vote_accounts, epoch):
-    """Build a map of identity -> credits for the given epoch."""
-    result = {}
-    for v in vote_accounts.get("current", []) + vote_accounts.get("delinquent", []):
-        credits = extract_epoch_credits(v["epochCredits"], epoch)
-        if credits is not None and credits > 0:
-            result[v["nodePubkey"]] = credits
-    return result
-
-
-def percentile(sorted_vals, p):
-    if not sorted_vals:
-        return 0
-    k = (len(sorted_vals) - 1) * (p / 100.0)
-    f = int(k)
-    c = f + 1 if f + 1 < len(sorted_vals) else f
-    d = k - f
-    return sorted_vals[f] + d * (sorted_vals[c] - sorted_vals[f])
-
-
-def rank_of(val, sorted_vals_desc):
-    for i, v in enumerate(sorted_vals_desc):
-        if val >= v:
-            return i + 1
-    return len(sorted_vals_desc)
-
-
 def format_number(n):
     return f"{n:,.0f}"
 
 
-def generate_report(identity):
+def generate_report(identity, history_epochs=HISTORY_EPOCHS):
     print(f"Fetching epoch info...", file=sys.stderr)
     epoch_info = get_epoch_info()
     current_epoch = epoch_info["epoch"]
@@ -149,19 +168,24 @@ def generate_report(identity):
     if my_credits is None:
         my_credits = 0
 
-    # All validators' credits this epoch
-    epoch_map = build_epoch_map(vote_accounts, current_epoch)
-    all_credits = sorted(epoch_map.values())
-    all_credits_desc = sorted(epoch_map.values(), reverse=True)
-    total_validators = len(all_credits)
-
-    my_rank = rank_of(my_credits, all_credits_desc) if my_credits > 0 else total_validators
-
-    top5_avg = sum(all_credits_desc[:5]) / min(5, len(all_credits_desc)) if all_credits_desc else 0
-    top50_avg = sum(all_credits_desc[:50]) / min(50, len(all_credits_desc)) if all_credits_desc else 0
-    median_credits = percentile(all_credits, 50)
-    bottom_q = percentile(all_credits, 25)
-    cluster_avg = sum(all_credits) / len(all_credits) if all_credits else 0
+    # All validators' credits, every epoch
+    matrix = EpochMatrix.from_vote_accounts(vote_accounts)
+    if history_epochs > VOTE_ACCOUNTS_EPOCHS:
+        print(f"Fetching vote account credit history ({len(matrix)} validators)...", file=sys.stderr)
+        matrix = EpochMatrix.from_vote_states(get_vote_states(vote_accounts))
+    stats = matrix.stats()
+
+    if current_epoch in stats.epochs:
+        col = stats.column(current_epoch)
+        my_rank, total_validators = stats.rank(identity, current_epoch)
+        top5_avg = stats.top[5][col]
+        top50_avg = stats.top[50][col]
+        median_credits = stats.percentiles[50][col]
+        bottom_q = stats.percentiles[25][col]
+        cluster_avg = stats.mean[col]
+    else:
+        my_rank = total_validators = 0
+        top5_avg = top50_avg = median_credits = bottom_q = cluster_avg = 0
 
     # Credits per slot rate
     my_rate = my_credits / slot_index if slot_index > 0 else 0
@@ -173,33 +197,14 @@ def generate_report(identity):
     projected_top5 = top5_avg / epoch_progress if epoch_progress > 0 else 0
     projected_median = median_credits / epoch_progress if epoch_progress > 0 else 0
 
-    # Projected rank (rough)
-    projected_all = sorted(
-        [(creds / epoch_progress if epoch_progress > 0 else 0) for creds in all_credits],
-        reverse=True,
-    )
-    projected_rank = rank_of(projected_my, projected_all)
-
-    # Historical epochs (from epochCredits array)
-    historical = []
-    for entry in validator["epochCredits"]:
-        ep = entry[0]
-        creds = entry[1] - entry[2]
-        if ep != current_epoch and creds > 0:
-            historical.append((ep, creds))
-    historical.sort()
-
-    # Historical cluster data for comparison
-    hist_cluster = {}
-    for ep, _ in historical[-3:]:
-        ep_map = build_epoch_map(vote_accounts, ep)
-        if ep_map:
-            vals = sorted(ep_map.values())
-            hist_cluster[ep] = {
-                "median": percentile(vals, 50),
-                "count": len(vals),
-                "top50_avg": sum(sorted(vals, reverse=True)[:50]) / min(50, len(vals)),
-            }
+    # Projected rank (rough): scaling every validator by the same progress keeps the order
+    projected_rank = my_rank
+
+    # Historical epochs
+    historical = [
+        row for row in stats.history(identity)
+        if row["epoch"] != current_epoch and row["credits"] > 0
+    ][-history_epochs:]
 
     # Output report
     status_label = "CURRENT" if is_current else "DELINQUENT"
@@ -268,15 +273,25 @@ def generate_report(identity):
     # Historical
     if historical:
         print(f"\n### Historical Trend (Recent Epochs)")
-        print(f"| Epoch | Your Credits | Cluster Median | vs Median |")
-        print(f"|-------|-------------|----------------|-----------|")
-        for ep, creds in historical[-5:]:
-            if ep in hist_cluster:
-                med = hist_cluster[ep]["median"]
-                delta = creds - med
-                print(f"| {ep} | {format_number(creds)} | {format_number(med)} | {format_number(delta)} ({delta/med*100 if med else 0:+.1f}%) |")
-            else:
-                print(f"| {ep} | {format_number(creds)} | -- | -- |")
+        print(f"| Epoch | Your Credits | Rank | Cluster Median | vs Median | Rolling Rank ({ROLLING_WINDOW}) |")
+        print(f"|-------|-------------|------|----------------|-----------|-------------------|")
+        for row in historical:
+            med = row["median"]
+            delta = row["vs_median"]
+            print(f"| {row['epoch']} | {format_number(row['credits'])} | {row['rank']} / {row['count']} "
+                  f"| {format_number(med)} | {format_number(delta)} ({delta/med*100 if med else 0:+.1f}%) "
+                  f"| {row['rolling_rank']:.1f} |")
+
+        ranks = [row["rank"] for row in historical]
+        percentiles = [row["percentile"] for row in historical]
+        print(f"\nOver {len(historical)} epochs ({historical[0]['epoch']}-{historical[-1]['epoch']}): "
+              f"average rank **{sum(ranks)/len(ranks):.1f}**, best {min(ranks)}, worst {max(ranks)}, "
+              f"average percentile {sum(percentiles)/len(percentiles):.1f}th")
+        if len(historical) > 1:
+            trend = historical[-1]["rolling_rank"] - historical[0]["rolling_rank"]
+            direction = "improving" if trend < 0 else "slipping" if trend > 0 else "flat"
+            print(f"Rolling rank trend: {historical[0]['rolling_rank']:.1f} -> "
+                  f"{historical[-1]['rolling_rank']:.1f} ({direction})")
 
     if not is_current:
         print(f"\n---")
@@ -289,14 +304,15 @@ def generate_report(identity):
 
 
 def main():
-    identity = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_VALIDATOR
-
-    if identity in ("-h", "--help"):
-        print("Usage: epoch-performance.py [VALIDATOR_IDENTITY_PUBKEY]")
-        print(f"Default: {DEFAULT_VALIDATOR}")
-        sys.exit(0)
-
-    generate_report(identity)
+    parser = argparse.ArgumentParser(description="Solana validator epoch performance report")
+    parser.add_argument("identity", nargs="?", default=DEFAULT_VALIDATOR,
+                        help=f"Validator identity pubkey (default: {DEFAULT_VALIDATOR})")
+    parser.add_argument("--epochs", type=int, default=HISTORY_EPOCHS,
+                        help=f"Past epochs to rank (default: {HISTORY_EPOCHS}; "
+                             f"more than {VOTE_ACCOUNTS_EPOCHS} reads vote account history, up to 64)")
+    args = parser.parse_args()
+
+    generate_report(args.identity, args.epochs)
 
 
 if __name__ == "__main__":
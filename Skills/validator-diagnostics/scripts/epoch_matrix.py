@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Validators x epochs vote-credit matrix for cluster-wide epoch comparisons.
+
+epochCredits for every vote account are loaded once into a matrix (one row
+per validator identity, one column per epoch, 0 where the validator earned
+nothing). stats() then computes, for all epochs in one pass:
+- per-epoch cluster figures: active count, mean, percentiles, top-5/top-50
+  averages
+- every validator's per-epoch rank (1 + validators with strictly more
+  credits, as the old rank_of scan), credits vs the epoch median, and the
+  change from the previous epoch
+- rolling means of credits and rank over the last `window` epochs
+
+With NumPy the ranks come from one column-wise sort and a single
+searchsorted over all epochs; without it the same numbers are computed per
+epoch with sort + bisect.
+
+getVoteAccounts reports the last 5 epochs; vote account data holds up to 64
+(from_vote_states).
+
+Uses only stdlib; NumPy is optional.
+
+Usage:
+    python3 epoch_matrix.py bench [--validators N] [--epochs N]
+"""
+
+import argparse
+import random
+import time
+from bisect import bisect_right
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PERCENTILES = (25, 50, 75, 90)
+TOP_K = (5, 50)
+ROLLING_WINDOW = 5
+
+
+def _credits_by_epoch(epoch_credits):
+    """{epoch: credits earned} from [epoch, credits, prev_credits] entries (positive only)."""
+    out = {}
+    for epoch, credits, prev in epoch_credits:
+        if credits - prev > 0:
+            out[int(epoch)] = int(credits - prev)
+    return out
+
+
+def percentile(sorted_vals, p):
+    """Linear-interpolated percentile of an ascending list."""
+    if not sorted_vals:
+        return 0
+    k = (len(sorted_vals) - 1) * (p / 100.0)
+    f = int(k)
+    c = f + 1 if f + 1 < len(sorted_vals) else f
+    d = k - f
+    return sorted_vals[f] + d * (sorted_vals[c] - sorted_vals[f])
+
+
+class EpochStats:
+    """
+    stats() output. Per-epoch figures are lists aligned with `epochs`:
+    count, mean, percentiles {p: [...]}, top {k: [...]}. Per-validator
+    figures are rows x epochs matrices (NumPy arrays or lists of lists):
+    ranks (0 where inactive), vs_median, change, rolling_credits,
+    rolling_rank (None/NaN where undefined).
+    """
+
+    def __init__(self, matrix, window, **fields):
+        self.matrix = matrix
+        self.epochs = matrix.epochs
+        self.window = window
+        self.__dict__.update(fields)
+
+    def column(self, epoch):
+        return self.epochs.index(epoch)
+
+    def rank(self, identity, epoch):
+        """(rank, active validators) in an epoch; an inactive validator ranks last."""
+        j = self.column(epoch)
+        i = self.matrix.index.get(identity)
+        count = self.count[j]
+        rank = int(self.ranks[i][j]) if i is not None else 0
+        return (rank or count), count
+
+    def history(self, identity, last=None):
+        """Per-epoch rows for one validator, oldest first (the last `last` epochs)."""
+        i = self.matrix.index.get(identity)
+        if i is None:
+            return []
+        start = max(0, len(self.epochs) - last) if last else 0
+        rows = []
+        for j in range(start, len(self.epochs)):
+            credits = int(self.matrix.credits[i][j])
+            rank = int(self.ranks[i][j])
+            rows.append({
+                "epoch": self.epochs[j],
+                "credits": credits,
+                "rank": rank or None,
+                "count": self.count[j],
+                "percentile": (1 - rank / self.count[j]) * 100 if rank else None,
+                "median": self.percentiles[50][j],
+                "vs_median": _value(self.vs_median[i][j]),
+                "change": _value(self.change[i][j]),
+                "rolling_credits": _value(self.rolling_credits[i][j]),
+                "rolling_rank": _value(self.rolling_rank[i][j]),
+            })
+        return rows
+
+
+def _value(v):
+    """A matrix cell as a Python float, None for missing (NaN)."""
+    if v is None or v != v:
+        return None
+    return float(v)
+
+
+class EpochMatrix:
+    """Vote credits earned, one row per validator identity and one column per epoch."""
+
+    def __init__(self, identities, epochs, credits):
+        self.identities = identities
+        self.index = {identity: i for i, identity in enumerate(identities)}
+        self.epochs = epochs
+        self.credits = credits
+        self._stats = {}
+
+    @classmethod
+    def from_epoch_credits(cls, items):
+        """Build from [(identity, epochCredits)]; a repeated identity keeps its last entry."""
+        per_validator = {}
+        for identity, epoch_credits in items:
+            per_validator[identity] = _credits_by_epoch(epoch_credits)
+        identities = list(per_validator)
+        epochs = sorted({e for by_epoch in per_validator.values() for e in by_epoch})
+        col = {e: j for j, e in enumerate(epochs)}
+
+        if np is not None:
+            credits = np.zeros((len(identities), len(epochs)), dtype=np.int64)
+            for i, by_epoch in enumerate(per_validator.values()):
+                if by_epoch:
+                    credits[i, [col[e] for e in by_epoch]] = list(by_epoch.values())
+        else:
+            credits = []
+            for by_epoch in per_validator.values():
+                row = [0] * len(epochs)
+                for e, c in by_epoch.items():
+                    row[col[e]] = c
+                credits.append(row)
+        return cls(identities, epochs, credits)
+
+    @classmethod
+    def from_vote_accounts(cls, vote_accounts):
+        """Build from a getVoteAccounts result (current and delinquent)."""
+        accounts = vote_accounts.get("current", []) + vote_accounts.get("delinquent", [])
+        return cls.from_epoch_credits((v["nodePubkey"], v["epochCredits"]) for v in accounts)
+
+    @classmethod
+    def from_vote_states(cls, states):
+        """Build from [(identity, decode_vote_state() dict or None)] (up to 64 epochs each)."""
+        return cls.from_epoch_credits((identity, state["epoch_credits"])
+                                      for identity, state in states if state is not None)
+
+    def __len__(self):
+        return len(self.identities)
+
+    def stats(self, window=ROLLING_WINDOW):
+        """EpochStats for every validator and epoch (computed once per window)."""
+        if window not in self._stats:
+            compute = _numpy_stats if np is not None and isinstance(self.credits, np.ndarray) else _python_stats
+            self._stats[window] = EpochStats(self, window, **compute(self.credits, len(self.epochs), window))
+        return self._stats[window]
+
+
+# ── NumPy engine ──
+
+def _numpy_stats(credits, n_epochs, window):
+    rows, cols = credits.shape
+    active = credits > 0
+    count = active.sum(axis=0)
+    filled = np.where(active, credits, -1)
+    asc = np.sort(filled, axis=0)  # inactive (-1) first in every column
+
+    # Ranks for all epochs at once: shift column j by j*step so the sorted
+    # columns form one increasing array, then one searchsorted gives each
+    # cell's count of values <= it within its own column.
+    step = int(credits.max(initial=0)) + 2
+    offsets = np.arange(cols, dtype=np.int64) * step
+    flat = (asc + offsets).T.ravel()
+    at_most = np.searchsorted(flat, (filled + offsets).T.ravel(), side="right").reshape(cols, rows).T
+    at_most -= np.arange(cols) * rows
+    ranks = np.where(active, 1 + rows - at_most, 0)
+
+    idx = np.arange(cols)
+    first = rows - count
+    percentiles = {}
+    for p in PERCENTILES:
+        k = (count - 1) * (p / 100.0)
+        f = k.astype(np.int64)
+        c = np.minimum(f + 1, count - 1)
+        lo = asc[first + f, idx].astype(float)
+        hi = asc[first + c, idx].astype(float)
+        percentiles[p] = lo + (k - f) * (hi - lo)
+
+    desc = asc[::-1].clip(0)
+    top = {k: desc[:k].sum(axis=0) / np.minimum(k, count) for k in TOP_K}
+    mean = credits.clip(0).sum(axis=0) / count
+
+    values = np.where(active, credits, np.nan)
+    vs_median = values - percentiles[50]
+    change = np.full_like(values, np.nan)
+    change[:, 1:] = values[:, 1:] - values[:, :-1]
+
+    def rolling(matrix):
+        sums = np.zeros((rows, cols + 1))
+        counts = np.zeros((rows, cols + 1))
+        np.cumsum(np.where(active, matrix, 0), axis=1, out=sums[:, 1:])
+        np.cumsum(active, axis=1, out=counts[:, 1:])
+        lag = np.maximum(np.arange(1, cols + 1) - window, 0)
+        n = counts[:, 1:] - counts[:, lag]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(n > 0, (sums[:, 1:] - sums[:, lag]) / n, np.nan)
+
+    return {
+        "count": count.tolist(),
+        "mean": mean.tolist(),
+        "percentiles": {p: v.tolist() for p, v in percentiles.items()},
+        "top": {k: v.tolist() for k, v in top.items()},
+        "ranks": ranks,
+        "vs_median": vs_median,
+        "change": change,
+        "rolling_credits": rolling(credits),
+        "rolling_rank": rolling(ranks),
+    }
+
+
+# ── stdlib engine ──
+
+def _python_stats(credits, n_epochs, window):
+    rows = len(credits)
+    count, mean, percentiles, top = [], [], {p: [] for p in PERCENTILES}, {k: [] for k in TOP_K}
+    ranks = [[0] * n_epochs for _ in range(rows)]
+    vs_median = [[None] * n_epochs for _ in range(rows)]
+    change = [[None] * n_epochs for _ in range(rows)]
+
+    for j in range(n_epochs):
+        column = [row[j] for row in credits]
+        asc = sorted(c for c in column if c > 0)
+        n = len(asc)
+        count.append(n)
+        mean.append(sum(asc) / n)
+        for p in PERCENTILES:
+            percentiles[p].append(float(percentile(asc, p)))
+        for k in TOP_K:
+            top[k].append(sum(asc[-k:]) / min(k, n))
+        median = percentiles[50][j]
+        for i, c in enumerate(column):
+            if c > 0:
+                ranks[i][j] = 1 + n - bisect_right(asc, c)
+                vs_median[i][j] = c - median
+                if j and credits[i][j - 1] > 0:
+                    change[i][j] = c - credits[i][j - 1]
+
+    def rolling(matrix):
+        out = []
+        for i in range(rows):
+            row = []
+            for j in range(n_epochs):
+                span = [matrix[i][e] for e in range(max(0, j + 1 - window), j + 1) if credits[i][e] > 0]
+                row.append(sum(span) / len(span) if span else None)
+            out.append(row)
+        return out
+
+    return {
+        "count": count,
+        "mean": mean,
+        "percentiles": percentiles,
+        "top": top,
+        "ranks": ranks,
+        "vs_median": vs_median,
+        "change": change,
+        "rolling_credits": rolling(credits),
+        "rolling_rank": rolling(ranks),
+    }
+
+
+# ── benchmark ──
+
+def synthetic_vote_accounts(rng, validators=1500, epochs=64, current=800):
+    """A getVoteAccounts-shaped result with `epochs` of credits per validator."""
+    accounts = []
+    for n in range(validators):
+        quality = rng.uniform(0.6, 1.0)
+        total = rng.randrange(10 ** 9)
+        history = []
+        for epoch in range(current - epochs + 1, current + 1):
+            if rng.random() < 0.03:
+                continue
+            earned = int(432_000 * 16 * quality * rng.uniform(0.97, 1.0))
+            history.append([epoch, total + earned, total])
+            total += earned
+        accounts.append({"nodePubkey": f"node{n}", "votePubkey": f"vote{n}", "epochCredits": history})
+    return {"current": accounts, "delinquent": []}
+
+
+def _legacy_ranks(vote_accounts, epochs):
+    """The previous per-epoch approach: build_epoch_map, sort, linear rank_of per validator."""
+    accounts = vote_accounts["current"] + vote_accounts["delinquent"]
+    out = {}
+    for epoch in epochs:
+        epoch_map = {}
+        for v in accounts:
+            for entry in v["epochCredits"]:
+                if entry[0] == epoch and entry[1] - entry[2] > 0:
+                    epoch_map[v["nodePubkey"]] = entry[1] - entry[2]
+        desc = sorted(epoch_map.values(), reverse=True)
+        asc = sorted(epoch_map.values())
+        medians = percentile(asc, 50)
+        for identity, val in epoch_map.items():
+            rank = next((i + 1 for i, v in enumerate(desc) if val >= v), len(desc))
+            out[identity, epoch] = (rank, val - medians)
+    return out
+
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t0
+
+
+def benchmark(validators=1500, epochs=64):
+    global np
+    rng = random.Random(7)
+    vote_accounts = synthetic_vote_accounts(rng, validators, epochs)
+    print(f"{validators} validators x {epochs} epochs")
+
+    legacy, t_legacy = _timed(_legacy_ranks, vote_accounts, range(800 - epochs + 1, 801))
+    print(f"  per-epoch maps + rank_of scan:  {t_legacy * 1000:9.1f} ms")
+
+    numpy = np
+    results = {}
+    for label, backend in (("numpy", numpy), ("stdlib", None)):
+        if label == "numpy" and numpy is None:
+            print("  numpy engine:                   (numpy not installed)")
+            continue
+        np = backend
+        matrix, t_load = _timed(EpochMatrix.from_vote_accounts, vote_accounts)
+        stats, t_stats = _timed(matrix.stats)
+        print(f"  {label + ' engine:':<31} {(t_load + t_stats) * 1000:9.1f} ms "
+              f"(load {t_load * 1000:.1f} ms, all stats {t_stats * 1000:.1f} ms)")
+        results[label] = stats
+    np = numpy
+
+    for label, stats in results.items():
+        for (identity, epoch), (rank, vs_median) in legacy.items():
+            i, j = stats.matrix.index[identity], stats.column(epoch)
+            assert int(stats.ranks[i][j]) == rank, (label, identity, epoch)
+            assert abs(_value(stats.vs_median[i][j]) - vs_median) < 1e-6, (label, identity, epoch)
+    print(f"  ranks and medians match the per-epoch scan ({len(legacy)} cells)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validators x epochs vote-credit statistics")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bench = sub.add_parser("bench", help="Compare against the per-epoch rank_of scan")
+    bench.add_argument("--validators", type=int, default=1500)
+    bench.add_argument("--epochs", type=int, default=64)
+    args = parser.parse_args()
+    benchmark(args.validators, args.epochs)
+
+
+if __name__ == "__main__":
+    main()
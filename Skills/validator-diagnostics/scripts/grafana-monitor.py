@@ -2,18 +2,27 @@
 """
 Grafana Dashboard Monitor for Saga DAO Validator
 
-Captures screenshots of the Solana monitoring Grafana dashboard using Playwright.
-Supports configurable time ranges, saves to dated directories, and extracts
-visible metric values from panel titles/legends where possible.
+By default pulls the raw series behind the dashboard's key panels: the
+dashboard JSON gives each panel's queries, which are sent to Grafana's
+datasource API (/api/ds/query) with the dashboard variables filled in. The
+samples go into a compact SQLite time-series file (timeseries.db under the
+output base), deduplicated by timestamp, so repeated pulls build up history
+for the trend report. The step depends on --range, so each resolution is
+kept as its own series rather than mixing 5s and 2m points.
+
+Screenshots are an optional render: --screenshot (and --panels/--snapshot)
+capture the dashboard with Playwright and scrape visible values from the DOM.
 
 Requirements:
-  - playwright (pip-installed)
-  - chromium at /usr/bin/chromium
+  - data mode: stdlib only (GRAFANA_TOKEN for dashboards that need auth)
+  - screenshots: playwright (pip-installed), chromium at /usr/bin/chromium
 
 Usage:
   python3 grafana-monitor.py --help
-  python3 grafana-monitor.py --range 1h
+  python3 grafana-monitor.py --range 1h          # pull panel data
   python3 grafana-monitor.py --range 6h --output /path/to/dir
+  python3 grafana-monitor.py --trend             # trends over stored history
+  python3 grafana-monitor.py --screenshot        # render the dashboard
   python3 grafana-monitor.py --snapshot          # capture + extract metrics
   python3 grafana-monitor.py --panels            # capture individual panels
 """
@@ -22,10 +31,15 @@ import argparse
 import json
 import os
 import re
+import sqlite3
 import sys
 import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
+from urllib.parse import parse_qs, quote, urlsplit
 
 # -- Constants ----------------------------------------------------------------
 
@@ -73,6 +87,38 @@ DEFAULT_OUTPUT_BASE = "/home/workspace/Skills/validator-diagnostics/snapshots"
 
 CHROMIUM_PATH = "/usr/bin/chromium"
 
+# Data mode
+TIMESERIES_DB = "timeseries.db"
+GRAFANA_TOKEN_ENV = "GRAFANA_TOKEN"
+API_TIMEOUT = 30
+MAX_DATA_POINTS = 720
+MIN_INTERVAL_MS = 1000
+QUERY_WORKERS = 4
+MIXED_DATASOURCE = "-- Mixed --"
+BUILTIN_DATASOURCES = {"grafana", "-- Grafana --", "-- Dashboard --", "datasource"}
+
+SERIES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY,
+    panel TEXT NOT NULL,
+    name TEXT NOT NULL,
+    step_ms INTEGER NOT NULL,
+    UNIQUE (panel, name, step_ms)
+);
+CREATE TABLE IF NOT EXISTS samples (
+    series INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (series, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS pulls (
+    at INTEGER NOT NULL,
+    time_range TEXT NOT NULL,
+    series INTEGER NOT NULL,
+    samples INTEGER NOT NULL
+);
+"""
+
 
 # -- Helpers ------------------------------------------------------------------
 
@@ -91,6 +137,24 @@ def ensure_output_dir(base_path=None):
     return dated_dir
 
 
+def range_ms(time_range):
+    """Length of a time range like 30m / 6h / 2d in milliseconds."""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+    m = re.fullmatch(r"(\d+)([smhdw])", time_range)
+    if not m:
+        raise ValueError(f"Unrecognized time range: {time_range}")
+    return int(m.group(1)) * units[m.group(2)] * 1000
+
+
+def key_panel(title):
+    """The KEY_PANELS entry a panel title matches, or None."""
+    lowered = title.lower()
+    for key in KEY_PANELS:
+        if key.lower() in lowered:
+            return key
+    return None
+
+
 def utc_now_str():
     return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
 
@@ -100,6 +164,337 @@ def edt_now_str():
     return datetime.now(edt).strftime("%Y-%m-%d %H:%M:%S EDT")
 
 
+# -- Data API -----------------------------------------------------------------
+
+class GrafanaApi:
+    """Read-only client for the dashboard JSON and datasource query APIs."""
+
+    def __init__(self, dashboard_url=DASHBOARD_URL, base_url=None):
+        parts = urlsplit(dashboard_url)
+        query = parse_qs(parts.query)
+        self.base = (base_url or f"{parts.scheme}://{parts.netloc}").rstrip("/")
+        self.uid = parts.path.split("/d/", 1)[1].split("/")[0]
+        self.org_id = query.get("orgId", [None])[0]
+        self.url_vars = {k[4:]: v[0] for k, v in query.items() if k.startswith("var-")}
+        self.token = os.environ.get(GRAFANA_TOKEN_ENV)
+        self._settings = None
+
+    def request(self, path, payload=None):
+        headers = {"Accept": "application/json"}
+        data = None
+        if payload is not None:
+            headers["Content-Type"] = "application/json"
+            data = json.dumps(payload).encode()
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        if self.org_id:
+            headers["X-Grafana-Org-Id"] = str(self.org_id)
+        req = urllib.request.Request(self.base + path, data=data, headers=headers)
+        with urllib.request.urlopen(req, timeout=API_TIMEOUT) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+
+    def dashboard(self):
+        return self.request(f"/api/dashboards/uid/{quote(self.uid)}")["dashboard"]
+
+    def datasources(self):
+        """{name: datasource} and the default's name, from the frontend settings (readable by viewers)."""
+        if self._settings is None:
+            settings = self.request("/api/frontend/settings")
+            self._settings = (settings.get("datasources", {}), settings.get("defaultDatasource"))
+        return self._settings
+
+    def query(self, queries, time_range, interval_ms):
+        body = {
+            "queries": [dict(q, intervalMs=interval_ms, maxDataPoints=MAX_DATA_POINTS) for q in queries],
+            "from": TIME_RANGES.get(time_range, f"now-{time_range}"),
+            "to": "now",
+        }
+        return self.request("/api/ds/query", body)
+
+
+def dashboard_variables(dashboard, url_vars):
+    """Template variable values: the URL's var-* parameters over the dashboard's current selections."""
+    values = {}
+    for var in dashboard.get("templating", {}).get("list", []):
+        current = var.get("current") or {}
+        value = current.get("value", current.get("text"))
+        if value is not None:
+            values[var["name"]] = value
+    values.update(url_vars)
+    for name, value in values.items():
+        if isinstance(value, list):
+            values[name] = value[0] if len(value) == 1 else "(" + "|".join(value) + ")"
+    return values
+
+
+_VARIABLE = re.compile(r"\$\{(\w+)(?::\w+)?\}|\[\[(\w+)\]\]|\$(\w+)")
+
+
+def substitute(value, variables):
+    """Fill $var, ${var} and [[var]] references in every string of a query; Grafana macros are left alone."""
+    if isinstance(value, str):
+        def fill(m):
+            name = m.group(1) or m.group(2) or m.group(3)
+            return str(variables[name]) if name in variables else m.group(0)
+        return _VARIABLE.sub(fill, value)
+    if isinstance(value, dict):
+        return {k: substitute(v, variables) for k, v in value.items()}
+    if isinstance(value, list):
+        return [substitute(v, variables) for v in value]
+    return value
+
+
+def dashboard_panels(dashboard):
+    """All panels with queries, including those inside (collapsed) rows and old-schema rows."""
+    stack = list(dashboard.get("panels", []))
+    for row in dashboard.get("rows", []):
+        stack.extend(row.get("panels", []))
+    panels = []
+    while stack:
+        panel = stack.pop(0)
+        stack.extend(panel.get("panels", []))
+        if panel.get("targets"):
+            panels.append(panel)
+    return panels
+
+
+def resolve_datasource(api, ref, variables):
+    """A {uid, type} reference for a panel/target datasource (name, uid dict, variable or default)."""
+    by_name, default = api.datasources()
+    ref = substitute(ref, variables)
+    if isinstance(ref, dict):
+        if ref.get("uid") and ref.get("type"):
+            return {"uid": ref["uid"], "type": ref["type"]}
+        uid = ref.get("uid")
+        for ds in by_name.values():
+            if uid and ds.get("uid") == uid:
+                return {"uid": ds["uid"], "type": ds.get("type")}
+        ref = uid
+    ds = by_name.get(ref) if ref else None
+    if ds is None and ref:
+        ds = next((d for d in by_name.values() if d.get("uid") == ref), None)
+    if ds is None:
+        ds = by_name.get(default)
+    return {"uid": ds["uid"], "type": ds.get("type")} if ds else None
+
+
+def panel_queries(api, panel, variables):
+    """The /api/ds/query queries for one panel's visible targets."""
+    queries = []
+    for i, target in enumerate(panel.get("targets", [])):
+        if target.get("hide"):
+            continue
+        ref = target.get("datasource") or panel.get("datasource")
+        ids = set(ref.values()) if isinstance(ref, dict) else {ref}
+        if ids & BUILTIN_DATASOURCES:
+            continue
+        if MIXED_DATASOURCE in ids:
+            ref = None
+        datasource = resolve_datasource(api, ref, variables)
+        if datasource is None or datasource.get("type") in BUILTIN_DATASOURCES:
+            continue
+        query = substitute({k: v for k, v in target.items() if k != "datasource"}, variables)
+        query["refId"] = target.get("refId") or chr(ord("A") + i)
+        query["datasource"] = datasource
+        queries.append(query)
+    return queries
+
+
+def frame_series(frames):
+    """[(series name, [(ts_ms, value)])] from data frames: each numeric field against the time field."""
+    series = []
+    for frame in frames:
+        schema = frame.get("schema", {})
+        fields = schema.get("fields", [])
+        values = frame.get("data", {}).get("values", [])
+        times = next((values[i] for i, f in enumerate(fields) if f.get("type") == "time" and i < len(values)), None)
+        if times is None:
+            continue
+        numeric = [(f, values[i]) for i, f in enumerate(fields) if f.get("type") == "number" and i < len(values)]
+        for field, column in numeric:
+            config = field.get("config") or {}
+            name = config.get("displayNameFromDS") or config.get("displayName")
+            if not name:
+                name = schema.get("name") or field.get("name") or "value"
+                if len(numeric) > 1 and field.get("name") and field["name"] != name:
+                    name = f"{name} {field['name']}"
+                labels = field.get("labels") or {}
+                if labels and "{" not in name:
+                    name += " {" + ", ".join(f"{k}={v}" for k, v in sorted(labels.items())) + "}"
+            points = [(int(t), float(v)) for t, v in zip(times, column)
+                      if t is not None and isinstance(v, (int, float)) and v == v]
+            if points:
+                series.append((name, points))
+    return series
+
+
+def interval_for(time_range):
+    """Query step (intervalMs) for a range: MAX_DATA_POINTS points, at least MIN_INTERVAL_MS apart."""
+    return max(range_ms(time_range) // MAX_DATA_POINTS, MIN_INTERVAL_MS)
+
+
+def fetch_panel_data(api, time_range, all_panels=False):
+    """[(panel title, series name, points)] for the dashboard's key panels (or all panels)."""
+    dashboard = api.dashboard()
+    variables = dashboard_variables(dashboard, api.url_vars)
+    interval_ms = interval_for(time_range)
+
+    jobs = []
+    for panel in dashboard_panels(dashboard):
+        title = substitute(panel.get("title") or f"panel-{panel.get('id')}", variables)
+        if not all_panels and key_panel(title) is None:
+            continue
+        queries = panel_queries(api, panel, variables)
+        if queries:
+            jobs.append((title, queries))
+
+    def run(job):
+        title, queries = job
+        try:
+            results = api.query(queries, time_range, interval_ms).get("results", {})
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            print(f"  {title}: query failed ({e})")
+            return []
+        out = []
+        for ref_id, result in sorted(results.items()):
+            if result.get("error"):
+                print(f"  {title} [{ref_id}]: {result['error']}")
+            for name, points in frame_series(result.get("frames", [])):
+                out.append((title, name, points))
+        return out
+
+    with ThreadPoolExecutor(max_workers=QUERY_WORKERS) as pool:
+        return [row for rows in pool.map(run, jobs) for row in rows]
+
+
+# -- Time-Series Store --------------------------------------------------------
+
+class TimeSeriesStore:
+    """Panel series samples in SQLite: one row per (series, timestamp), re-pulls overwrite in place.
+
+    A series is (panel, name, step): pulls at different --range values query
+    different steps, and their points are kept apart.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._migrate()
+        self.conn.executescript(SERIES_SCHEMA)
+
+    def _migrate(self):
+        """Stores from before step_ms: their series keep their ids with an unknown (0) step."""
+        cols = [row[1] for row in self.conn.execute("PRAGMA table_info(series)")]
+        if not cols or "step_ms" in cols:
+            return
+        with self.conn:
+            self.conn.execute("ALTER TABLE series RENAME TO series_old")
+            self.conn.executescript(SERIES_SCHEMA)
+            self.conn.execute("INSERT INTO series SELECT id, panel, name, 0 FROM series_old")
+            self.conn.execute("DROP TABLE series_old")
+
+    def add(self, time_range, step_ms, rows):
+        """Store [(panel, series name, points)] pulled at step_ms; returns the number of samples written."""
+        written = 0
+        with self.conn:
+            for panel, name, points in rows:
+                self.conn.execute("INSERT OR IGNORE INTO series (panel, name, step_ms) VALUES (?, ?, ?)",
+                                  (panel, name, step_ms))
+                series_id = self.conn.execute(
+                    "SELECT id FROM series WHERE panel = ? AND name = ? AND step_ms = ?",
+                    (panel, name, step_ms)).fetchone()[0]
+                self.conn.executemany("INSERT OR REPLACE INTO samples VALUES (?, ?, ?)",
+                                      [(series_id, ts, value) for ts, value in points])
+                written += len(points)
+            self.conn.execute("INSERT INTO pulls VALUES (?, ?, ?, ?)",
+                              (int(time.time() * 1000), time_range, len(rows), written))
+        return written
+
+    def trends(self):
+        """Per-series summaries for print_trend_report, key panels first."""
+        rows = self.conn.execute(
+            """SELECT s.id, s.panel, s.name, s.step_ms, COUNT(*), MIN(x.value), MAX(x.value), AVG(x.value),
+                      MIN(x.ts), MAX(x.ts)
+               FROM samples x JOIN series s ON s.id = x.series
+               GROUP BY s.id""").fetchall()
+        trends = []
+        for series_id, panel, name, step_ms, count, lo, hi, avg, first_ts, last_ts in rows:
+            first, latest = (
+                self.conn.execute("SELECT value FROM samples WHERE series = ? AND ts = ?", (series_id, ts)).fetchone()[0]
+                for ts in (first_ts, last_ts)
+            )
+            trends.append({
+                "name": f"{panel}: {name}" + (f" [{format_step(step_ms)} step]" if step_ms else ""),
+                "panel": panel,
+                "samples": count,
+                "first_time": ms_to_utc_str(first_ts),
+                "last_time": ms_to_utc_str(last_ts),
+                "first": first,
+                "latest": latest,
+                "min": lo,
+                "max": hi,
+                "avg": avg,
+            })
+        order = {key: i for i, key in enumerate(KEY_PANELS)}
+        trends.sort(key=lambda t: (order.get(key_panel(t["panel"]), len(order)), t["name"]))
+        return trends
+
+    def close(self):
+        self.conn.close()
+
+
+def format_step(ms):
+    """5000 → 5s, 120000 → 2m, 3600000 → 1h."""
+    for unit, size in (("h", 3600000), ("m", 60000), ("s", 1000)):
+        if ms >= size and ms % size == 0:
+            return f"{ms // size}{unit}"
+    return f"{ms}ms"
+
+
+def ms_to_utc_str(ms):
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+
+
+def pull_data(args):
+    """Data mode: pull the key panels' series for the range and append them to the store."""
+    api = GrafanaApi(DASHBOARD_URL, args.grafana)
+    base = Path(args.output) if args.output else Path(DEFAULT_OUTPUT_BASE)
+
+    print("Grafana Data Monitor")
+    print(f"  Time:       {utc_now_str()} / {edt_now_str()}")
+    print(f"  Range:      {args.range} ({format_step(interval_for(args.range))} step)")
+    print(f"  Grafana:    {api.base} (dashboard {api.uid})")
+    print(f"  Store:      {base / TIMESERIES_DB}")
+    print()
+
+    t0 = time.time()
+    try:
+        rows = fetch_panel_data(api, args.range, args.all_panels)
+    except (urllib.error.URLError, OSError, ValueError, KeyError) as e:
+        print(f"Dashboard API unavailable: {e}")
+        print(f"Set {GRAFANA_TOKEN_ENV} if the dashboard needs auth, or use --screenshot to render it.")
+        sys.exit(1)
+
+    if not rows:
+        print("No series returned.")
+        return
+
+    panel_width = max(len(panel) for panel, _, _ in rows)
+    for panel, name, points in rows:
+        values = [v for _, v in points]
+        print(f"  {panel:<{panel_width}}  {name[:48]:<48} latest {values[-1]:>14,.2f}  "
+              f"min {min(values):>14,.2f}  max {max(values):>14,.2f}")
+
+    store = TimeSeriesStore(base / TIMESERIES_DB)
+    try:
+        written = store.add(args.range, interval_for(args.range), rows)
+    finally:
+        store.close()
+    print(f"\nDone. {len(rows)} series, {written} samples stored in {time.time() - t0:.1f}s")
+
+
 # -- Browser Automation -------------------------------------------------------
 
 def launch_browser():
@@ -282,21 +677,9 @@ def load_history(base_path=None):
     return history
 
 
-def print_trend_report(history):
-    """Print a trend analysis from historical snapshots."""
-    if not history:
-        print("No historical snapshots found.")
-        return
-
-    print(f"\n{'=' * 70}")
-    print(f"  TREND ANALYSIS - {len(history)} snapshots")
-    print(f"{'=' * 70}")
-
-    if len(history) >= 2:
-        print(f"  First snapshot: {history[0].get('captured_at_utc', 'unknown')}")
-        print(f"  Last snapshot:  {history[-1].get('captured_at_utc', 'unknown')}")
-
-    # Track metrics across snapshots
+def snapshot_trends(history):
+    """Per-metric summaries (print_trend_report form) of the values scraped into screenshot snapshots."""
+    trends = []
     for key in KEY_PANELS:
         values = []
         for snap in history:
@@ -314,100 +697,52 @@ def print_trend_report(history):
 
         if values:
             vals = [v["value"] for v in values]
-            print(f"\n  {key}:")
-            print(f"    Samples: {len(vals)}")
-            print(f"    Latest:  {vals[-1]:.2f}")
-            print(f"    Min:     {min(vals):.2f}")
-            print(f"    Max:     {max(vals):.2f}")
-            print(f"    Avg:     {sum(vals)/len(vals):.2f}")
-            if len(vals) >= 2:
-                trend = vals[-1] - vals[0]
-                print(f"    Trend:   {trend:+.2f} (first to last)")
+            trends.append({
+                "name": f"{key} (screenshots)",
+                "panel": key,
+                "samples": len(vals),
+                "first_time": values[0]["time"],
+                "last_time": values[-1]["time"],
+                "first": vals[0],
+                "latest": vals[-1],
+                "min": min(vals),
+                "max": max(vals),
+                "avg": sum(vals) / len(vals),
+            })
+    return trends
 
-    print(f"\n{'=' * 70}")
 
+def print_trend_report(trends):
+    """Print a trend analysis from per-series summaries (time-series store and/or snapshots)."""
+    if not trends:
+        print("No historical data found.")
+        return
 
-# -- Main ---------------------------------------------------------------------
+    print(f"\n{'=' * 70}")
+    print(f"  TREND ANALYSIS - {len(trends)} series, {sum(t['samples'] for t in trends)} samples")
+    print(f"{'=' * 70}")
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="Grafana Dashboard Monitor for Saga DAO Validator",
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
-Time ranges: 5m, 15m, 30m, 1h, 3h, 6h, 12h, 24h, 2d, 7d, 30d
+    print(f"  First sample: {min(t['first_time'] for t in trends)}")
+    print(f"  Last sample:  {max(t['last_time'] for t in trends)}")
 
-Examples:
-  %(prog)s --range 1h                 # Capture last 1 hour
-  %(prog)s --range 6h --panels        # Capture + individual panels
-  %(prog)s --snapshot --range 3h      # Full snapshot with metric extraction
-  %(prog)s --trend                    # Show trend from historical snapshots
-  %(prog)s --url-only --range 12h     # Just print the Grafana URL
-        """,
-    )
-    parser.add_argument(
-        "--range", "-r",
-        default="1h",
-        choices=list(TIME_RANGES.keys()),
-        help="Time range to display (default: 1h)",
-    )
-    parser.add_argument(
-        "--output", "-o",
-        default=None,
-        help=f"Output directory (default: {DEFAULT_OUTPUT_BASE}/<date>/)",
-    )
-    parser.add_argument(
-        "--panels", "-p",
-        action="store_true",
-        help="Also capture individual panels as separate screenshots",
-    )
-    parser.add_argument(
-        "--snapshot", "-s",
-        action="store_true",
-        help="Full snapshot: capture screenshots + extract metrics + save JSON",
-    )
-    parser.add_argument(
-        "--trend", "-t",
-        action="store_true",
-        help="Print trend analysis from historical snapshots (no browser needed)",
-    )
-    parser.add_argument(
-        "--url-only",
-        action="store_true",
-        help="Just print the Grafana URL for the given time range",
-    )
-    parser.add_argument(
-        "--wait",
-        type=int,
-        default=8,
-        help="Seconds to wait for dashboard to load (default: 8)",
-    )
-    parser.add_argument(
-        "--viewport-width",
-        type=int,
-        default=1920,
-        help="Browser viewport width (default: 1920)",
-    )
-    parser.add_argument(
-        "--viewport-height",
-        type=int,
-        default=1080,
-        help="Browser viewport height (default: 1080)",
-    )
+    for t in trends:
+        print(f"\n  {t['name']}:")
+        print(f"    Samples: {t['samples']}")
+        print(f"    Latest:  {t['latest']:.2f}")
+        print(f"    Min:     {t['min']:.2f}")
+        print(f"    Max:     {t['max']:.2f}")
+        print(f"    Avg:     {t['avg']:.2f}")
+        if t["samples"] >= 2:
+            trend = t["latest"] - t["first"]
+            print(f"    Trend:   {trend:+.2f} (first to last)")
 
-    args = parser.parse_args()
+    print(f"\n{'=' * 70}")
 
-    # URL-only mode
-    if args.url_only:
-        print(build_url(args.range))
-        return
 
-    # Trend-only mode (no browser)
-    if args.trend:
-        history = load_history(args.output)
-        print_trend_report(history)
-        return
+# -- Main ---------------------------------------------------------------------
 
-    # Browser modes
+def render_dashboard(args):
+    """Screenshot mode: render the dashboard in headless Chromium, optionally per panel and with DOM metrics."""
     url = build_url(args.range)
     output_dir = ensure_output_dir(args.output)
 
@@ -501,5 +836,112 @@ Examples:
         pw.stop()
 
 
+def main():
+    parser = argparse.ArgumentParser(
+        description="Grafana Dashboard Monitor for Saga DAO Validator",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Time ranges: 5m, 15m, 30m, 1h, 3h, 6h, 12h, 24h, 2d, 7d, 30d
+
+Examples:
+  %(prog)s --range 1h                 # Pull last 1 hour of panel data
+  %(prog)s --trend                    # Show trend from stored data + snapshots
+  %(prog)s --screenshot --range 1h    # Render the dashboard
+  %(prog)s --range 6h --panels        # Render + individual panels
+  %(prog)s --snapshot --range 3h      # Full snapshot with metric extraction
+  %(prog)s --url-only --range 12h     # Just print the Grafana URL
+        """,
+    )
+    parser.add_argument(
+        "--range", "-r",
+        default="1h",
+        choices=list(TIME_RANGES.keys()),
+        help="Time range to display (default: 1h)",
+    )
+    parser.add_argument(
+        "--output", "-o",
+        default=None,
+        help=f"Output directory (default: {DEFAULT_OUTPUT_BASE}/<date>/; "
+             f"data mode stores {TIMESERIES_DB} at the base)",
+    )
+    parser.add_argument(
+        "--screenshot",
+        action="store_true",
+        help="Render the dashboard with a headless browser instead of pulling panel data",
+    )
+    parser.add_argument(
+        "--panels", "-p",
+        action="store_true",
+        help="Also capture individual panels as separate screenshots",
+    )
+    parser.add_argument(
+        "--snapshot", "-s",
+        action="store_true",
+        help="Full snapshot: capture screenshots + extract metrics + save JSON",
+    )
+    parser.add_argument(
+        "--trend", "-t",
+        action="store_true",
+        help="Print trend analysis from stored panel data and snapshots (no browser needed)",
+    )
+    parser.add_argument(
+        "--all-panels",
+        action="store_true",
+        help="Data mode: store every panel, not just the key panels",
+    )
+    parser.add_argument(
+        "--grafana",
+        default=None,
+        help="Grafana base URL for API requests (default: the dashboard's host)",
+    )
+    parser.add_argument(
+        "--url-only",
+        action="store_true",
+        help="Just print the Grafana URL for the given time range",
+    )
+    parser.add_argument(
+        "--wait",
+        type=int,
+        default=8,
+        help="Seconds to wait for dashboard to load (default: 8)",
+    )
+    parser.add_argument(
+        "--viewport-width",
+        type=int,
+        default=1920,
+        help="Browser viewport width (default: 1920)",
+    )
+    parser.add_argument(
+        "--viewport-height",
+        type=int,
+        default=1080,
+        help="Browser viewport height (default: 1080)",
+    )
+
+    args = parser.parse_args()
+
+    # URL-only mode
+    if args.url_only:
+        print(build_url(args.range))
+        return
+
+    # Trend-only mode (no browser)
+    if args.trend:
+        base = Path(args.output) if args.output else Path(DEFAULT_OUTPUT_BASE)
+        trends = []
+        if (base / TIMESERIES_DB).exists():
+            store = TimeSeriesStore(base / TIMESERIES_DB)
+            trends = store.trends()
+            store.close()
+        trends += snapshot_trends(load_history(args.output))
+        print_trend_report(trends)
+        return
+
+    if args.screenshot or args.panels or args.snapshot:
+        render_dashboard(args)
+    else:
+        pull_data(args)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Sparse timestamp -> byte-offset index for large validator logs.
+
+- Timestamps come from one combined regex whose alternatives keep the
+  priority order of the old per-pattern loop (ISO 8601 Z, ISO 8601 with
+  offset, "YYYY-MM-DD HH:MM:SS UTC", bare HH:MM:SS, timestamp=<unix>);
+  fractional seconds and UTC offsets are parsed instead of falling through to
+  the bare time-of-day pattern.
+- The index holds one (timestamp, offset) entry per INDEX_STRIDE bytes: it
+  seeks to each stride boundary and reads the first dated line there, so
+  building it never reads the whole log. It is persisted beside the log as
+  <log>.tsidx (or under ~/.cache when that directory isn't writable) and
+  extended incrementally as the log grows; a rewritten or rotated log
+  (different head bytes, or shorter than indexed) is re-indexed.
+- window() binary-searches the entries and scans at most one stride before
+  the window plus the window itself.
+- annotate_log() splits the log into newline-aligned chunks and annotates them
+  in a process pool, writing results in order.
+
+Uses only stdlib.
+
+Usage:
+    python3 log_index.py LOG              # build / extend the index, print stats
+    python3 log_index.py LOG --bench      # time index update and a 5-minute window lookup
+"""
+
+import argparse
+import calendar
+import hashlib
+import os
+import re
+import struct
+import time
+from array import array
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+INDEX_SUFFIX = ".tsidx"
+INDEX_VERSION = 1
+INDEX_MAGIC = b"TSIDX\0\0\0"
+INDEX_STRIDE = 256 * 1024  # bytes of log per index entry
+PROBE_BYTES = 64 * 1024  # how far past a stride boundary to look for a dated line
+HEAD_BYTES = 4096  # log prefix hashed to detect rotation / rewrite
+ORDER_SLACK = 5  # seconds of out-of-order lines tolerated around a window
+ANNOTATE_CHUNK = 32 * 1024 * 1024
+WORKERS = os.cpu_count() or 1
+FALLBACK_DIR = Path.home() / ".cache" / "validator-diagnostics" / "log-index"
+EDT_OFFSET_S = -4 * 3600
+
+HEADER = struct.Struct("<8sIIQQQ16s")  # magic, version, head_len, stride, next_boundary, count, head md5
+
+# Alternatives in priority order; each is one named group around its captures
+TIMESTAMP_PATTERNS = [
+    ("isoz", r"(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(\.\d+)?Z"),
+    ("isooff", r"(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(\.\d+)?([+-])(\d{2}):?(\d{2})"),
+    ("utc", r"(\d{4})-(\d{2})-(\d{2}) (\d{2}):(\d{2}):(\d{2}) UTC"),
+    ("time", r"\b(\d{2}):(\d{2}):(\d{2})\b"),
+    ("unix", r"timestamp[=: ]+(\d{10,13})"),
+]
+TIMESTAMP_RE = re.compile("|".join(f".*?(?P<{name}>{pattern})" for name, pattern in TIMESTAMP_PATTERNS))
+DATED = {"isoz", "isooff", "utc", "unix"}
+
+_day_cache = {}
+
+
+def _epoch(year, month, day, hh, mm, ss):
+    key = (year, month, day)
+    base = _day_cache.get(key)
+    if base is None:
+        base = _day_cache[key] = calendar.timegm((int(year), int(month), int(day), 0, 0, 0))
+    return base + int(hh) * 3600 + int(mm) * 60 + int(ss)
+
+
+def line_timestamp(line, dated_only=False):
+    """(UTC epoch seconds, matched text) for the first timestamp pattern found in a line, or (None, None).
+
+    Bare HH:MM:SS is taken as today (UTC); dated_only skips it.
+    """
+    ts, text, kind = _parse(line)
+    if ts is None or (dated_only and kind not in DATED):
+        return None, None
+    return ts, text
+
+
+def _parse(line):
+    """(epoch, matched text, pattern name), or Nones."""
+    m = TIMESTAMP_RE.match(line)
+    if not m:
+        return None, None, None
+    kind = m.lastgroup
+    k = m.lastindex
+    g = m.groups()
+    text = g[k] if kind == "unix" else g[k - 1]
+    try:
+        if kind == "isoz":
+            ts = _epoch(*g[k:k + 6])
+            if g[k + 6]:
+                ts += float(g[k + 6])
+        elif kind == "isooff":
+            ts = _epoch(*g[k:k + 6])
+            if g[k + 6]:
+                ts += float(g[k + 6])
+            offset = int(g[k + 8]) * 3600 + int(g[k + 9]) * 60
+            ts -= offset if g[k + 7] == "+" else -offset
+        elif kind == "utc":
+            ts = _epoch(*g[k:k + 6])
+        elif kind == "unix":
+            ts = int(g[k])
+            if ts > 1e12:
+                ts /= 1000
+        else:
+            hh, mm, ss = (int(x) for x in g[k:k + 3])
+            if hh > 23 or mm > 59 or ss > 60:
+                return None, None, None
+            today = int(time.time()) // 86400 * 86400
+            ts = today + hh * 3600 + mm * 60 + ss
+    except (ValueError, OverflowError):
+        return None, None, None
+    return ts, text, kind
+
+
+_edt_cache = {}
+
+
+def edt_clock(ts):
+    """HH:MM:SS EDT for a UTC epoch."""
+    second = int(ts)
+    label = _edt_cache.get(second)
+    if label is None:
+        if len(_edt_cache) > 100_000:
+            _edt_cache.clear()
+        label = _edt_cache[second] = time.strftime("%H:%M:%S EDT", time.gmtime(second + EDT_OFFSET_S))
+    return label
+
+
+# -- Index ----------------------------------------------------------------------
+
+class LogIndex:
+    """Sparse (timestamp, byte offset) index of one log file."""
+
+    def __init__(self, log_path, stride=INDEX_STRIDE):
+        self.log_path = Path(log_path)
+        self.stride = stride
+        self.times = array("d")
+        self.offsets = array("Q")
+        self.next_boundary = 0
+        self.head_len = 0
+        self.head_digest = b""
+        self.path = self._index_path()
+        self._load()
+
+    def _index_path(self):
+        beside = self.log_path.with_name(self.log_path.name + INDEX_SUFFIX)
+        if beside.exists() or os.access(self.log_path.parent, os.W_OK):
+            return beside
+        key = hashlib.md5(str(self.log_path.resolve()).encode()).hexdigest()[:16]
+        return FALLBACK_DIR / f"{self.log_path.name}.{key}{INDEX_SUFFIX}"
+
+    def _load(self):
+        try:
+            with open(self.path, "rb") as f:
+                magic, version, head_len, stride, next_boundary, count, digest = HEADER.unpack(f.read(HEADER.size))
+                if magic != INDEX_MAGIC or version != INDEX_VERSION or stride != self.stride:
+                    return
+                times, offsets = array("d"), array("Q")
+                times.fromfile(f, count)
+                offsets.fromfile(f, count)
+        except (OSError, EOFError, struct.error):
+            return
+        self.times, self.offsets = times, offsets
+        self.next_boundary, self.head_len, self.head_digest = next_boundary, head_len, digest
+
+    def save(self):
+        header = HEADER.pack(INDEX_MAGIC, INDEX_VERSION, self.head_len, self.stride,
+                             self.next_boundary, len(self.times), self.head_digest)
+        for path in (self.path, FALLBACK_DIR / self.path.name):
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_name(path.name + ".tmp")
+                with open(tmp, "wb") as f:
+                    f.write(header)
+                    self.times.tofile(f)
+                    self.offsets.tofile(f)
+                os.replace(tmp, path)
+                self.path = path
+                return
+            except OSError:
+                continue
+
+    def _reset(self):
+        self.times, self.offsets = array("d"), array("Q")
+        self.next_boundary = 0
+        self.head_len = 0
+        self.head_digest = b""
+
+    @staticmethod
+    def _probe(f, offset, size):
+        """(timestamp, line offset) of the first dated line at or after a boundary, within PROBE_BYTES."""
+        f.seek(offset)
+        if offset:
+            f.readline()  # finish the partial line
+        limit = min(size, offset + PROBE_BYTES)
+        pos = f.tell()
+        while pos < limit:
+            raw = f.readline()
+            if not raw.endswith(b"\n"):
+                return None  # incomplete last line; wait for more of the log
+            ts, _ = line_timestamp(raw.decode("utf-8", "replace"), dated_only=True)
+            if ts is not None:
+                return ts, pos
+            pos += len(raw)
+        return None
+
+    def update(self):
+        """Index log data appended since the last update; returns the number of new entries."""
+        size = self.log_path.stat().st_size
+        dirty = False
+        with open(self.log_path, "rb") as f:
+            head = f.read(HEAD_BYTES)
+            if self.head_len and (len(head) < self.head_len
+                                  or hashlib.md5(head[:self.head_len]).digest() != self.head_digest
+                                  or size < self.next_boundary - self.stride):
+                self._reset()  # rotated, truncated or rewritten
+            if self.head_len < min(len(head), HEAD_BYTES) or not self.head_len:
+                self.head_len = len(head)
+                self.head_digest = hashlib.md5(head).digest()
+                dirty = True
+
+            before = len(self.times)
+            boundary = self.next_boundary
+            while boundary < size:
+                hit = self._probe(f, boundary, size)
+                if hit is None and boundary + PROBE_BYTES >= size:
+                    break  # the tail may still gain a dated line
+                if hit and (not self.offsets or hit[1] > self.offsets[-1]):
+                    self.times.append(hit[0])
+                    self.offsets.append(hit[1])
+                boundary += self.stride
+            dirty = dirty or boundary != self.next_boundary
+            self.next_boundary = boundary
+        if dirty:
+            self.save()
+        return len(self.times) - before
+
+    def seek_offset(self, start_ts):
+        """A byte offset at or before the first line stamped start_ts (minus ORDER_SLACK)."""
+        pos = bisect_left(self.times, start_ts - ORDER_SLACK)
+        return self.offsets[pos - 1] if pos > 0 else 0
+
+    def window(self, start_ts, end_ts):
+        """Yield (timestamp, line) for lines stamped within [start_ts, end_ts]."""
+        offset = self.seek_offset(start_ts)
+        # With no dated entries at all there is nothing to stop on early: scan everything
+        stop = end_ts + ORDER_SLACK if self.times else float("inf")
+        with open(self.log_path, "rb") as f:
+            f.seek(offset)
+            for raw in f:
+                line = raw.decode("utf-8", "replace").rstrip("\n")
+                ts, _, kind = _parse(line)
+                if ts is None:
+                    continue
+                if start_ts <= ts <= end_ts:
+                    yield ts, line
+                elif ts > stop and kind in DATED:
+                    return
+
+    def stats(self):
+        span = (self.times[0], self.times[-1]) if self.times else None
+        return {"entries": len(self.times), "indexed_bytes": min(self.next_boundary, self.log_path.stat().st_size),
+                "span": span, "path": str(self.path)}
+
+
+def open_index(log_path):
+    """The log's index, extended to the current end of the log."""
+    index = LogIndex(log_path)
+    index.update()
+    return index
+
+
+# -- Annotation -----------------------------------------------------------------
+
+def annotate_lines(text):
+    """Prefix each line with its EDT clock time (or padding). Returns (text, lines, annotated)."""
+    out = []
+    annotated = 0
+    lines = text.split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()
+    for line in lines:
+        ts, _ = line_timestamp(line)
+        if ts is not None:
+            out.append(f"[{edt_clock(ts)}] {line}\n")
+            annotated += 1
+        else:
+            out.append(f"{'':>14s} {line}\n")
+    return "".join(out), len(lines), annotated
+
+
+def _annotate_range(path, start, end):
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return annotate_lines(data.decode("utf-8", "replace"))
+
+
+def _chunk_bounds(path, size, chunk):
+    """Newline-aligned (start, end) byte ranges of about `chunk` bytes."""
+    bounds = []
+    start = 0
+    with open(path, "rb") as f:
+        while start < size:
+            f.seek(min(start + chunk, size))
+            f.readline()
+            end = min(f.tell(), size) if start + chunk < size else size
+            bounds.append((start, end))
+            start = end
+    return bounds
+
+
+def annotate_log(log_path, out, workers=WORKERS, chunk=ANNOTATE_CHUNK):
+    """Write the annotated log to `out`, chunks annotated in parallel. Returns (lines, annotated)."""
+    size = os.path.getsize(log_path)
+    bounds = _chunk_bounds(log_path, size, chunk)
+    total_lines = total_annotated = 0
+
+    def emit(result):
+        nonlocal total_lines, total_annotated
+        text, lines, annotated = result
+        out.write(text)
+        total_lines += lines
+        total_annotated += annotated
+
+    if workers <= 1 or len(bounds) <= 1:
+        for start, end in bounds:
+            emit(_annotate_range(log_path, start, end))
+        return total_lines, total_annotated
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for start, end in bounds:
+            pending.append(pool.submit(_annotate_range, str(log_path), start, end))
+            if len(pending) >= workers * 2:  # bound memory held in finished chunks
+                emit(pending.popleft().result())
+        while pending:
+            emit(pending.popleft().result())
+    return total_lines, total_annotated
+
+
+# -- CLI ------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Sparse timestamp index for validator logs")
+    parser.add_argument("log")
+    parser.add_argument("--bench", action="store_true", help="Time an index update and a 5-minute window lookup")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = LogIndex(args.log)
+    added = index.update()
+    elapsed = time.perf_counter() - start
+    stats = index.stats()
+    print(f"Index: {stats['path']}")
+    print(f"  {stats['entries']:,} entries over {stats['indexed_bytes'] / 1e9:.2f} GB "
+          f"(+{added:,} in {elapsed:.2f}s)")
+    if stats["span"]:
+        first, last = stats["span"]
+        print(f"  {time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(first))} -> "
+              f"{time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(last))} UTC")
+
+    if args.bench and stats["span"]:
+        first, last = stats["span"]
+        center = first + (last - first) * 0.6
+        start = time.perf_counter()
+        index = open_index(args.log)
+        window = index.window(center - 150, center + 150)
+        next(window, None)
+        first = time.perf_counter() - start
+        lines = 1 + sum(1 for _ in window)
+        total = time.perf_counter() - start
+        print(f"  5-minute window: first line after {first * 1000:.1f} ms (index load + update + seek), "
+              f"{lines:,} lines in {total * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
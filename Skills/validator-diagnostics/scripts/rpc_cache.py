@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Persistent Solana RPC result cache shared by the validator-diagnostics scripts.
+
+One SQLite database (WAL, so the monitor and an analysis can share it) holds
+RPC results keyed by method and params:
+- Finalized, immutable results are kept for good: getTransaction (by
+  signature), getBlock / getBlockTime (by slot), getInflationReward (by
+  epoch), and getSignaturesForAddress pages below a `before` signature. They
+  are shared across endpoints, so re-analyses and cross-validator comparisons
+  reuse earlier downloads.
+- Live values get short TTLs (getSlot ~1 slot, getEpochInfo, getVoteAccounts)
+  and are scoped to the endpoint they came from.
+- Methods without a policy, `processed`/`confirmed` reads of immutable
+  methods, and null results are never cached.
+
+Set SOLANA_RPC_CACHE to a path to move the database, or to "off" to disable it.
+
+Uses only stdlib.
+
+Usage:
+    python3 rpc_cache.py stats
+    python3 rpc_cache.py prune
+    python3 rpc_cache.py clear
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+CACHE_ENV = "SOLANA_RPC_CACHE"
+CACHE_DB = Path.home() / ".cache" / "validator-diagnostics" / "rpc-cache.db"
+
+# Immutable once finalized: method -> (params index, config key) naming the signature/slot/epoch
+FINALIZED = {
+    "getTransaction": (0, None),
+    "getBlock": (0, None),
+    "getBlockTime": (0, None),
+    "getInflationReward": (1, "epoch"),
+    "getSignaturesForAddress": (1, "before"),
+}
+
+# Live values: seconds a result stays fresh
+LIVE_TTL = {
+    "getSlot": 0.4,
+    "getBlockHeight": 0.4,
+    "getAccountInfo": 0.4,
+    "getEpochInfo": 2,
+    "getSignaturesForAddress": 2,  # head page (no `before`)
+    "getVoteAccounts": 10,
+    "getClusterNodes": 60,
+    "getEpochSchedule": 86400,
+}
+MAX_TTL = max(LIVE_TTL.values())
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    method TEXT NOT NULL,
+    ref TEXT,
+    data TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    immutable INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_live ON results(immutable, fetched_at);
+"""
+
+
+def _config(params):
+    if params and isinstance(params[-1], dict):
+        return params[-1]
+    return {}
+
+
+def policy(method, params, url=""):
+    """(key, ref, ttl) for a call; ttl is None for immutable results and 0 for uncacheable ones."""
+    params = params or []
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"))
+    commitment = _config(params).get("commitment", "finalized")
+    if method in FINALIZED and commitment == "finalized":
+        pos, field = FINALIZED[method]
+        arg = params[pos] if len(params) > pos else None
+        if field is None:
+            ref = arg
+        else:
+            ref = arg.get(field) if isinstance(arg, dict) else None
+        if ref is not None:
+            return f"{method}:{canonical}", str(ref), None
+    ttl = LIVE_TTL.get(method, 0)
+    return f"{url}|{method}:{canonical}", None, ttl
+
+
+class RpcCache:
+    """SQLite-backed read-through cache for JSON-RPC results."""
+
+    def __init__(self, path=CACHE_DB, url=""):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.url = url
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.prune()
+
+    def _fresh(self, row, ttl):
+        data, fetched_at, immutable = row
+        return bool(immutable or (ttl and time.time() - fetched_at < ttl))
+
+    def get_many(self, calls, ttl=None):
+        """{index: result} for the cached entries of [(method, params)]."""
+        plans = [policy(m, p, self.url) for m, p in calls]
+        keys = {plan[0] for plan in plans if plan[2] != 0 or ttl}
+        rows = {}
+        with self._lock:
+            keys = list(keys)
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                for key, *row in self.conn.execute(
+                        f"SELECT key, data, fetched_at, immutable FROM results WHERE key IN ({marks})", chunk):
+                    rows[key] = row
+        found = {}
+        for i, (key, ref, plan_ttl) in enumerate(plans):
+            row = rows.get(key)
+            if row and self._fresh(row, ttl if ttl is not None else plan_ttl):
+                found[i] = json.loads(row[0])
+        self.hits += len(found)
+        self.misses += len(calls) - len(found)
+        return found
+
+    def get(self, method, params=None, ttl=None):
+        """(hit, result) for one call."""
+        found = self.get_many([(method, params)], ttl)
+        return (True, found[0]) if found else (False, None)
+
+    def put_many(self, items):
+        """Store [(method, params, result)]; null and uncacheable results are skipped."""
+        now = time.time()
+        rows = []
+        for method, params, result in items:
+            if result is None:
+                continue
+            key, ref, ttl = policy(method, params, self.url)
+            if ttl == 0:
+                continue
+            rows.append((key, method, ref, json.dumps(result, separators=(",", ":")), now, int(ttl is None)))
+        if not rows:
+            return
+        with self._lock:
+            self.conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self.conn.commit()
+
+    def put(self, method, params, result):
+        self.put_many([(method, params, result)])
+
+    def call(self, method, params, fetch, ttl=None):
+        """Cached result of a call, or fetch() it and store it. ttl overrides the method's freshness."""
+        hit, result = self.get(method, params, ttl)
+        if hit:
+            return result
+        result = fetch()
+        self.put(method, params, result)
+        return result
+
+    def prune(self):
+        """Drop live entries older than the longest TTL."""
+        with self._lock:
+            self.conn.execute("DELETE FROM results WHERE immutable = 0 AND fetched_at < ?",
+                              (time.time() - MAX_TTL,))
+            self.conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM results")
+            self.conn.commit()
+            self.conn.execute("VACUUM")
+
+    def stats(self):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT method, immutable, COUNT(*), SUM(LENGTH(data)) FROM results GROUP BY method, immutable ORDER BY 3 DESC"
+            ).fetchall()
+        return [{"method": m, "immutable": bool(imm), "entries": n, "bytes": b or 0} for m, imm, n, b in rows]
+
+    def close(self):
+        self.conn.close()
+
+
+def open_cache(url=""):
+    """The shared cache for an endpoint, or None when disabled or unwritable."""
+    setting = os.environ.get(CACHE_ENV, "")
+    if setting.lower() in ("off", "0", "none"):
+        return None
+    try:
+        return RpcCache(setting or CACHE_DB, url)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Warning: RPC cache unavailable ({e}), fetching everything", file=sys.stderr)
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared Solana RPC result cache")
+    parser.add_argument("command", choices=["stats", "prune", "clear"])
+    args = parser.parse_args()
+
+    cache = open_cache()
+    if cache is None:
+        print(f"RPC cache disabled ({CACHE_ENV})")
+        return
+    if args.command == "stats":
+        rows = cache.stats()
+        print(f"Cache: {cache.path} ({cache.path.stat().st_size / 1024:.0f} KB)")
+        for r in rows:
+            kind = "finalized" if r["immutable"] else "live"
+            print(f"  {r['method']:<26} {kind:<10} {r['entries']:>8} entries  {r['bytes'] / 1024:>10.1f} KB")
+        if not rows:
+            print("  (empty)")
+    elif args.command == "prune":
+        cache.prune()
+        print("Pruned expired live entries")
+    else:
+        cache.clear()
+        print("Cache cleared")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
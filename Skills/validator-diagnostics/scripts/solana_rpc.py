@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Solana JSON-RPC client for the validator-diagnostics scripts.
+
+- Keep-alive: each worker thread reuses one HTTP(S) connection. A reused
+  connection the server already closed is reopened and the request resent
+  once right away, without a backoff.
+- Batching: batch() packs many calls (e.g. getTransaction per signature)
+  into JSON-RPC array requests of up to `batch_size` calls and keeps up to
+  `max_inflight` of them in flight.
+- Adaptive throughput: a 429 (HTTP status or a per-call error) halves the
+  in-flight window and pauses every sender for Retry-After or an exponential
+  backoff; each clean batch grows the window back (AIMD). Endpoints that
+  reject array requests get smaller batches, down to single calls. Other
+  4xx answers (bad auth, wrong path, ...) fail every pending call at once
+  instead of being retried.
+- Caching: with a cache (rpc_cache.RpcCache), call() and batch() read
+  through it and only send the misses.
+
+Uses only stdlib.
+
+Usage:
+    from solana_rpc import RpcClient
+    from rpc_cache import open_cache
+    url = "https://api.mainnet-beta.solana.com"
+    rpc = RpcClient(url, cache=open_cache(url))
+    slot = rpc.call("getSlot")
+    txs = rpc.batch([("getTransaction", [sig, {"encoding": "json"}]) for sig in sigs])
+"""
+
+import http.client
+import json
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+RPC_URL = "https://api.mainnet-beta.solana.com"
+BATCH_SIZE = 50
+MAX_INFLIGHT = 4
+TIMEOUT = 60
+MAX_RETRIES = 6
+MAX_BACKOFF = 30
+
+RATE_LIMITED = 429
+RETRYABLE_CODES = {429, -32005, -32009}  # rate limited, node behind / server busy
+
+
+class RpcError(RuntimeError):
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+class _RateLimited(Exception):
+    def __init__(self, retry_after=None):
+        self.retry_after = retry_after
+
+
+class _BatchRejected(Exception):
+    pass
+
+
+# A keep-alive connection the server closed between requests fails like this on reuse.
+_STALE_CONN = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+def _backoff(attempt):
+    return min(2 ** attempt + 1, MAX_BACKOFF) * random.uniform(0.8, 1.2)
+
+
+def _retryable(err):
+    return err.get("code") in RETRYABLE_CODES or "too many requests" in str(err).lower()
+
+
+class RpcClient:
+    """JSON-RPC over pooled keep-alive connections, with batching and 429-adaptive concurrency."""
+
+    def __init__(self, url=RPC_URL, batch_size=BATCH_SIZE, max_inflight=MAX_INFLIGHT,
+                 timeout=TIMEOUT, max_retries=MAX_RETRIES, cache=None, log=print):
+        parts = urlsplit(url)
+        self.url = url
+        self.https = parts.scheme == "https"
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path or "/"
+        if parts.query:
+            self.path += "?" + parts.query
+        self.batch_size = batch_size
+        self.max_inflight = max_inflight
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.cache = cache
+        self.log = log
+        self.requests = 0
+        self.calls = 0
+        self.throttled = 0
+        self._local = threading.local()
+        self._cond = threading.Condition()
+        self._window = float(max_inflight)
+        self._active = 0
+        self._resume_at = 0.0
+
+    # ── transport ──
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            conn = cls(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _drop_conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+        self._local.conn = None
+
+    def _post(self, payload):
+        """POST a JSON body, returns (status, headers, decoded body or None)."""
+        body = json.dumps(payload).encode()
+        for retry in (False, True):
+            reused = getattr(self._local, "conn", None) is not None
+            conn = self._conn()
+            try:
+                conn.request("POST", self.path, body, {"Content-Type": "application/json"})
+                resp = conn.getresponse()
+                data = resp.read()
+                break
+            except (http.client.HTTPException, OSError) as e:
+                self._drop_conn()
+                if reused and not retry and isinstance(e, _STALE_CONN):
+                    continue
+                raise ConnectionError(str(e)) from e
+        with self._cond:
+            self.requests += 1
+        if resp.getheader("Connection", "").lower() == "close":
+            self._drop_conn()
+        try:
+            decoded = json.loads(data) if data else None
+        except ValueError:
+            decoded = None
+        return resp.status, resp, decoded
+
+    def _send(self, items):
+        """Send [(id, method, params)] in one request; returns {id: response object}."""
+        payload = [{"jsonrpc": "2.0", "id": i, "method": m, "params": p or []} for i, m, p in items]
+        status, resp, decoded = self._post(payload if len(payload) > 1 else payload[0])
+        if status == 429:
+            retry_after = resp.getheader("Retry-After")
+            raise _RateLimited(float(retry_after) if retry_after and retry_after.isdigit() else None)
+        if status == 413 and len(payload) > 1:
+            raise _BatchRejected()
+        if status >= 500:
+            raise ConnectionError(f"HTTP {status}")
+        if status >= 400 and not isinstance(decoded, list):
+            err = decoded.get("error") if isinstance(decoded, dict) else None
+            if isinstance(err, dict) and err.get("code") == RATE_LIMITED:
+                raise _RateLimited()
+            if status == 400 and len(payload) > 1:
+                raise _BatchRejected()  # may just mean "no batches"; single calls will tell
+            raise RpcError(f"HTTP {status}{f': {err}' if err else ''}", status)
+        if isinstance(decoded, dict) and len(payload) > 1:
+            # An error object instead of an array: this endpoint doesn't take batches
+            err = decoded.get("error") or {}
+            if err.get("code") == RATE_LIMITED:
+                raise _RateLimited()
+            raise _BatchRejected()
+        if isinstance(decoded, dict):
+            decoded = [decoded]
+        if not isinstance(decoded, list):
+            raise ConnectionError(f"HTTP {status}: unreadable response")
+        return {r.get("id"): r for r in decoded if isinstance(r, dict)}
+
+    # ── adaptive window ──
+
+    def _acquire(self):
+        with self._cond:
+            while True:
+                wait = self._resume_at - time.time()
+                if wait <= 0 and self._active < int(self._window):
+                    self._active += 1
+                    return
+                self._cond.wait(timeout=wait if wait > 0 else None)
+
+    def _release(self, clean):
+        with self._cond:
+            self._active -= 1
+            if clean:
+                self._window = min(float(self.max_inflight), self._window + 1 / self._window)
+            self._cond.notify_all()
+
+    def _throttle(self, wait):
+        with self._cond:
+            self.throttled += 1
+            self._window = max(1.0, self._window / 2)
+            self._resume_at = max(self._resume_at, time.time() + wait)
+            self._cond.notify_all()
+        self.log(f"  Rate limited, backing off {wait:.1f}s (window {int(self._window)} batch(es) in flight)")
+
+    # ── public API ──
+
+    def call(self, method, params=None, ttl=None):
+        """One RPC call; raises RpcError when it fails for good."""
+        result = self.batch([(method, params)], ttl=ttl)[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def batch(self, calls, progress=None, ttl=None):
+        """Results for [(method, params)], in order. A call that fails for good is an RpcError in its slot.
+
+        progress(done, total) is called after each request that completes calls.
+        ttl overrides the cache freshness of live methods.
+        """
+        if self.cache is None:
+            return self._fetch(calls, progress)
+        results = [None] * len(calls)
+        cached = self.cache.get_many(calls, ttl)
+        for i, result in cached.items():
+            results[i] = result
+        missing = [i for i in range(len(calls)) if i not in cached]
+        if cached and len(calls) > 1:
+            self.log(f"  {len(cached)}/{len(calls)} calls served from cache")
+        if missing:
+            offset = len(cached)
+            fetched = self._fetch([calls[i] for i in missing],
+                                  progress and (lambda done, total: progress(offset + done, len(calls))))
+            stored = []
+            for i, result in zip(missing, fetched):
+                results[i] = result
+                if not isinstance(result, Exception):
+                    stored.append((*calls[i], result))
+            self.cache.put_many(stored)
+        return results
+
+    def _fetch(self, calls, progress=None):
+        results = [None] * len(calls)
+        queue = deque(range(len(calls)))
+        lock = threading.Lock()
+        done = [0]
+        fatal = []  # an HTTP 4xx that every call would get
+
+        def settle(indices, value=None):
+            for i in indices:
+                results[i] = value
+            with lock:
+                done[0] += len(indices)
+                count = done[0]
+            if progress:
+                progress(count, len(calls))
+
+        def run(todo):
+            """Send one batch until every call in it settles. Returns calls to requeue."""
+            attempt = 0
+            while todo:
+                if attempt >= self.max_retries:
+                    settle(todo, RpcError(f"Failed after {self.max_retries} retries"))
+                    return []
+                self._acquire()
+                clean = False
+                try:
+                    responses = self._send([(i, *calls[i]) for i in todo])
+                    clean = True
+                except _RateLimited as e:
+                    self._throttle(e.retry_after or _backoff(attempt))
+                    attempt += 1
+                    continue
+                except RpcError as e:
+                    with lock:
+                        fatal.append(e)
+                    settle(todo, e)
+                    return []
+                except _BatchRejected:
+                    with lock:
+                        size = max(1, min(self.batch_size, len(todo) // 2))
+                        if size < self.batch_size:
+                            self.batch_size = size
+                            self.log(f"  Endpoint rejected a batch of {len(todo)}, using batches of {size}")
+                    return todo
+                except ConnectionError as e:
+                    wait = _backoff(attempt)
+                    self.log(f"  Connection error: {e}, retrying in {wait:.1f}s...")
+                    time.sleep(wait)
+                    attempt += 1
+                    continue
+                finally:
+                    self._release(clean)
+
+                retry, limited = [], False
+                for i in todo:
+                    r = responses.get(i)
+                    if r is None:
+                        retry.append(i)
+                    elif "error" in r:
+                        err = r["error"]
+                        if _retryable(err):
+                            retry.append(i)
+                            limited = limited or err.get("code") == RATE_LIMITED
+                        else:
+                            settle([i], RpcError(f"RPC error: {err}", err.get("code")))
+                    else:
+                        settle([i], r.get("result"))
+                with self._cond:
+                    self.calls += len(todo) - len(retry)
+                if retry:
+                    if limited:
+                        self._throttle(_backoff(attempt))
+                    else:
+                        time.sleep(_backoff(attempt))
+                    attempt += 1
+                todo = retry
+            return []
+
+        def worker():
+            while True:
+                with lock:
+                    if not queue:
+                        return
+                    if fatal:
+                        todo = list(queue)
+                        queue.clear()
+                    else:
+                        todo = [queue.popleft() for _ in range(min(self.batch_size, len(queue)))]
+                if fatal:
+                    settle(todo, fatal[0])
+                    return
+                requeue = run(todo)
+                if requeue:
+                    with lock:
+                        queue.extendleft(reversed(requeue))
+
+        workers = max(1, min(self.max_inflight, -(-len(calls) // self.batch_size)))
+        if workers == 1:
+            worker()
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for f in [pool.submit(worker) for _ in range(workers)]:
+                    f.result()
+        return results
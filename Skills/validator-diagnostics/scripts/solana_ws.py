@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Minimal Solana RPC websocket (PubSub) client.
+
+A small RFC 6455 client over socket/ssl: the upgrade handshake, masked text
+frames out, and text, continuation, ping and close frames in. On top of it
+SolanaWebsocket does JSON-RPC subscriptions (slotSubscribe,
+accountSubscribe, ...) and yields their notifications.
+
+Uses only stdlib.
+
+Usage:
+    from solana_ws import SolanaWebsocket, ws_url
+    with SolanaWebsocket(ws_url("http://127.0.0.1:8899")) as ws:
+        ws.subscribe("slotSubscribe")
+        for method, result in ws.notifications():
+            ...
+"""
+
+import base64
+import hashlib
+import json
+import os
+import socket
+import ssl
+import struct
+from urllib.parse import urlsplit, urlunsplit
+
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+CONNECT_TIMEOUT = 10
+RECV_TIMEOUT = 10  # slot notifications arrive every ~400ms; silence this long means a dead stream
+MAX_MESSAGE = 16 * 1024 * 1024
+
+OP_CONTINUATION, OP_TEXT, OP_BINARY = 0x0, 0x1, 0x2
+OP_CLOSE, OP_PING, OP_PONG = 0x8, 0x9, 0xA
+
+
+def ws_url(rpc_url):
+    """The PubSub endpoint for an RPC URL: ws(s) scheme, and port+1 when a port is given (8899 -> 8900)."""
+    parts = urlsplit(rpc_url)
+    scheme = "wss" if parts.scheme in ("https", "wss") else "ws"
+    netloc = parts.netloc
+    if parts.port and parts.scheme in ("http", "https"):
+        netloc = f"{parts.hostname}:{parts.port + 1}"
+    return urlunsplit((scheme, netloc, parts.path, parts.query, ""))
+
+
+def _mask(payload, key):
+    if not payload:
+        return payload
+    n = len(payload)
+    stream = (key * (n // 4 + 1))[:n]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(stream, "big")).to_bytes(n, "big")
+
+
+class WebSocket:
+    """A blocking websocket client connection."""
+
+    def __init__(self, url, timeout=RECV_TIMEOUT):
+        parts = urlsplit(url)
+        secure = parts.scheme == "wss"
+        host = parts.hostname
+        port = parts.port or (443 if secure else 80)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+        sock = socket.create_connection((host, port), timeout=CONNECT_TIMEOUT)
+        if secure:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=host)
+        self.sock = sock
+        self.buffer = b""
+
+        key = base64.b64encode(os.urandom(16)).decode()
+        request = (
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {host}:{port}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n\r\n"
+        )
+        sock.sendall(request.encode())
+        while b"\r\n\r\n" not in self.buffer:
+            self._fill()
+        head, self.buffer = self.buffer.split(b"\r\n\r\n", 1)
+        lines = head.decode("latin-1").split("\r\n")
+        if " 101 " not in f"{lines[0]} ":
+            self.close()
+            raise ConnectionError(f"Websocket upgrade refused: {lines[0]}")
+        headers = {k.strip().lower(): v.strip() for k, _, v in (line.partition(":") for line in lines[1:])}
+        expected = base64.b64encode(hashlib.sha1(key.encode() + WS_GUID).digest()).decode()
+        if headers.get("sec-websocket-accept") != expected:
+            self.close()
+            raise ConnectionError("Websocket upgrade: bad Sec-WebSocket-Accept")
+        sock.settimeout(timeout)
+
+    def _fill(self):
+        try:
+            chunk = self.sock.recv(65536)
+        except socket.timeout as e:
+            raise ConnectionError("websocket receive timed out") from e
+        if not chunk:
+            raise ConnectionError("websocket closed by peer")
+        self.buffer += chunk
+
+    def _take(self, n):
+        while len(self.buffer) < n:
+            self._fill()
+        data, self.buffer = self.buffer[:n], self.buffer[n:]
+        return data
+
+    def _send_frame(self, opcode, payload):
+        n = len(payload)
+        if n < 126:
+            header = struct.pack("!BB", 0x80 | opcode, 0x80 | n)
+        elif n < 65536:
+            header = struct.pack("!BBH", 0x80 | opcode, 0x80 | 126, n)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 0x80 | 127, n)
+        key = os.urandom(4)
+        self.sock.sendall(header + key + _mask(payload, key))
+
+    def send(self, text):
+        self._send_frame(OP_TEXT, text.encode())
+
+    def recv(self):
+        """The next text message; raises ConnectionError when the connection ends."""
+        message = []
+        size = 0
+        while True:
+            b0, b1 = self._take(2)
+            fin, opcode = b0 & 0x80, b0 & 0x0F
+            n = b1 & 0x7F
+            if n == 126:
+                n = struct.unpack("!H", self._take(2))[0]
+            elif n == 127:
+                n = struct.unpack("!Q", self._take(8))[0]
+            key = self._take(4) if b1 & 0x80 else None
+            if n > MAX_MESSAGE:
+                raise ConnectionError(f"websocket frame too large ({n} bytes)")
+            payload = self._take(n)
+            if key:
+                payload = _mask(payload, key)
+
+            if opcode == OP_PING:
+                self._send_frame(OP_PONG, payload)
+                continue
+            if opcode == OP_PONG:
+                continue
+            if opcode == OP_CLOSE:
+                try:
+                    self._send_frame(OP_CLOSE, payload[:2])
+                except OSError:
+                    pass
+                raise ConnectionError("websocket closed by peer")
+            message.append(payload)
+            size += n
+            if size > MAX_MESSAGE:
+                raise ConnectionError("websocket message too large")
+            if fin:
+                return b"".join(message).decode()
+
+    def close(self):
+        try:
+            self._send_frame(OP_CLOSE, struct.pack("!H", 1000))
+        except OSError:
+            pass
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class SolanaWebsocket:
+    """JSON-RPC PubSub over a WebSocket: subscribe, then iterate notifications."""
+
+    def __init__(self, url, timeout=RECV_TIMEOUT):
+        self.url = url
+        self.ws = WebSocket(url, timeout)
+        self.next_id = 1
+        self.pending = []  # notifications that arrived while waiting for a subscribe reply
+        self.subscriptions = {}  # subscription id -> method
+
+    def subscribe(self, method, params=None):
+        """Send a subscribe request and wait for its subscription id."""
+        request_id = self.next_id
+        self.next_id += 1
+        self.ws.send(json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params or []}))
+        while True:
+            msg = json.loads(self.ws.recv())
+            if msg.get("id") == request_id:
+                if "error" in msg:
+                    raise ConnectionError(f"{method} failed: {msg['error']}")
+                self.subscriptions[msg["result"]] = method
+                return msg["result"]
+            if "method" in msg:
+                self.pending.append(msg)
+
+    def notifications(self):
+        """Yield (notification method, result) until the connection drops (ConnectionError)."""
+        while True:
+            msg = self.pending.pop(0) if self.pending else json.loads(self.ws.recv())
+            params = msg.get("params")
+            if "method" in msg and params:
+                yield msg["method"], params.get("result")
+
+    def close(self):
+        self.ws.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
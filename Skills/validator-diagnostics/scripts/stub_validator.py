@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for a validator's RPC and websocket endpoints.
+
+Serves just enough for vote-latency-monitor.py: JSON-RPC over HTTP on
+--port (getSlot, getVoteAccounts, getEpochInfo, getAccountInfo) and PubSub
+over a websocket on --port + 1 (slotSubscribe, accountSubscribe). The
+cluster advances one slot every SLOT_SECONDS and the vote account trails it
+by 1-4 slots. The vote account is a synthetic version-2 vote state, or with
+--bad-account data no decoder accepts, which exercises the monitor's
+fallback from streaming to polling. --drop-after N closes every websocket
+after N seconds to exercise the reconnect path.
+
+Uses only stdlib.
+
+Usage:
+    python3 stub_validator.py [--port 18899] [--bad-account] [--drop-after SECONDS]
+    python3 vote-latency-monitor.py --rpc http://127.0.0.1:18899 --ws --duration 0.01 --output /tmp/vl.log
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import socket
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from solana_ws import OP_CLOSE, OP_PING, OP_TEXT, WS_GUID
+from vote_decode import synthetic_vote_state
+
+SLOT_SECONDS = 0.4
+FIRST_SLOT = 400_000_000
+SLOTS_PER_EPOCH = 432_000
+DEFAULT_VOTE_ACCOUNT = "sagasJDjjAHND4hien3bbo5xXkzCT5Ss6nKjyUJ45aw"
+
+
+class Chain:
+    """Slot clock and the vote account's last vote, derived from wall time."""
+
+    def __init__(self, vote_account, bad_account=False):
+        self.vote_account = vote_account
+        self.bad_account = bad_account
+        self.started = time.time()
+
+    def slot(self):
+        return FIRST_SLOT + int((time.time() - self.started) / SLOT_SECONDS)
+
+    def last_vote(self, slot=None):
+        slot = slot or self.slot()
+        return slot - 1 - (3 if slot % 11 == 0 else slot % 2)
+
+    def account_data(self, slot=None):
+        """[base64 data, "base64"] as getAccountInfo / accountNotification carry it."""
+        if self.bad_account:
+            return [base64.b64encode(struct.pack("<I", 9) + bytes(3727)).decode(), "base64"]
+        last = self.last_vote(slot)
+        return [synthetic_vote_state(random.Random(last), slot=last + 1), "base64"]
+
+    def rpc(self, method, params):
+        slot = self.slot()
+        if method == "getSlot":
+            return slot
+        if method == "getEpochInfo":
+            return {"epoch": slot // SLOTS_PER_EPOCH, "absoluteSlot": slot,
+                    "slotIndex": slot % SLOTS_PER_EPOCH, "slotsInEpoch": SLOTS_PER_EPOCH}
+        if method == "getVoteAccounts":
+            last = self.last_vote(slot)
+            return {"current": [{"votePubkey": self.vote_account, "lastVote": last,
+                                 "rootSlot": last - 32, "activatedStake": 1, "commission": 5}],
+                    "delinquent": []}
+        if method == "getAccountInfo":
+            return {"context": {"slot": slot},
+                    "value": {"data": self.account_data(slot), "owner": "Vote111111111111111111111111111111111111111",
+                              "lamports": 1, "executable": False, "rentEpoch": 0}}
+        raise KeyError(method)
+
+
+def rpc_handler(chain):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+            try:
+                reply = {"jsonrpc": "2.0", "id": request.get("id"),
+                         "result": chain.rpc(request["method"], request.get("params") or [])}
+            except KeyError:
+                reply = {"jsonrpc": "2.0", "id": request.get("id"),
+                         "error": {"code": -32601, "message": "Method not found"}}
+            body = json.dumps(reply).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+# -- Websocket side -------------------------------------------------------------
+
+def _read_exact(sock, n):
+    data = b""
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        if not chunk:
+            raise ConnectionError("client closed")
+        data += chunk
+    return data
+
+
+def _recv_frame(sock):
+    """(opcode, payload) of one client frame (clients always mask)."""
+    b0, b1 = _read_exact(sock, 2)
+    n = b1 & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", _read_exact(sock, 2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", _read_exact(sock, 8))[0]
+    key = _read_exact(sock, 4) if b1 & 0x80 else b"\0\0\0\0"
+    payload = bytes(b ^ key[i % 4] for i, b in enumerate(_read_exact(sock, n)))
+    return b0 & 0x0F, payload
+
+
+def _send_frame(sock, opcode, payload):
+    n = len(payload)
+    if n < 126:
+        header = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    sock.sendall(header + payload)
+
+
+class PubSubSession:
+    """One websocket client: answers subscribes, then pushes slot and account notifications."""
+
+    def __init__(self, sock, chain, drop_after=None):
+        self.sock = sock
+        self.chain = chain
+        self.drop_after = drop_after
+        self.lock = threading.Lock()
+        self.subs = {}  # method -> subscription id
+        self.closed = threading.Event()
+
+    def send(self, msg):
+        with self.lock:
+            _send_frame(self.sock, OP_TEXT, json.dumps(msg).encode())
+
+    def handshake(self):
+        head = b""
+        while b"\r\n\r\n" not in head:
+            chunk = self.sock.recv(4096)
+            if not chunk:
+                raise ConnectionError("client closed during handshake")
+            head += chunk
+        headers = {k.strip().lower(): v.strip() for k, _, v in
+                   (line.partition(":") for line in head.decode("latin-1").split("\r\n")[1:])}
+        accept = base64.b64encode(hashlib.sha1(headers["sec-websocket-key"].encode() + WS_GUID).digest()).decode()
+        self.sock.sendall(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                           f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+
+    def reader(self):
+        try:
+            while True:
+                opcode, payload = _recv_frame(self.sock)
+                if opcode == OP_CLOSE:
+                    return
+                if opcode == OP_PING:
+                    continue
+                request = json.loads(payload)
+                method = request.get("method")
+                if method in ("slotSubscribe", "accountSubscribe"):
+                    sub_id = len(self.subs) + 1
+                    self.subs[method] = sub_id
+                    self.send({"jsonrpc": "2.0", "id": request.get("id"), "result": sub_id})
+                else:
+                    self.send({"jsonrpc": "2.0", "id": request.get("id"),
+                               "error": {"code": -32601, "message": "Method not found"}})
+        except (ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            self.closed.set()
+
+    def run(self):
+        started = time.time()
+        threading.Thread(target=self.reader, daemon=True).start()
+        last_slot = last_vote = None
+        try:
+            while not self.closed.is_set():
+                if self.drop_after and time.time() - started >= self.drop_after:
+                    return
+                slot = self.chain.slot()
+                if slot != last_slot:
+                    last_slot = slot
+                    vote = self.chain.last_vote(slot)
+                    if "accountSubscribe" in self.subs and vote != last_vote:
+                        last_vote = vote
+                        self.send({"jsonrpc": "2.0", "method": "accountNotification", "params": {
+                            "subscription": self.subs["accountSubscribe"],
+                            "result": {"context": {"slot": slot},
+                                       "value": {"data": self.chain.account_data(slot)}}}})
+                    if "slotSubscribe" in self.subs:
+                        self.send({"jsonrpc": "2.0", "method": "slotNotification", "params": {
+                            "subscription": self.subs["slotSubscribe"],
+                            "result": {"slot": slot, "parent": slot - 1, "root": slot - 32}}})
+                time.sleep(0.05)
+        except OSError:
+            pass
+        finally:
+            try:
+                _send_frame(self.sock, OP_CLOSE, struct.pack("!H", 1000))
+            except OSError:
+                pass
+            self.sock.close()
+
+
+def serve_pubsub(port, chain, drop_after=None):
+    server = socket.create_server(("127.0.0.1", port))
+
+    def session(conn):
+        s = PubSubSession(conn, chain, drop_after)
+        try:
+            s.handshake()
+        except (ConnectionError, OSError, KeyError):
+            conn.close()
+            return
+        s.run()
+
+    def accept():
+        while True:
+            conn, _ = server.accept()
+            threading.Thread(target=session, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=accept, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline validator RPC + websocket stub")
+    parser.add_argument("--port", type=int, default=18899, help="RPC port; the websocket is on port + 1")
+    parser.add_argument("--vote-account", default=DEFAULT_VOTE_ACCOUNT)
+    parser.add_argument("--bad-account", action="store_true", help="serve vote account data that can't be decoded")
+    parser.add_argument("--drop-after", type=float, default=None, help="close each websocket after N seconds")
+    args = parser.parse_args()
+
+    chain = Chain(args.vote_account, args.bad_account)
+    serve_pubsub(args.port + 1, chain, args.drop_after)
+    httpd = ThreadingHTTPServer(("127.0.0.1", args.port), rpc_handler(chain))
+    print(f"Stub validator: RPC http://127.0.0.1:{args.port}  websocket ws://127.0.0.1:{args.port + 1}"
+          f"{'  (undecodable vote account)' if args.bad_account else ''}", flush=True)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -8,161 +8,61 @@ Two data sources:
 2. Historical vote transactions via getSignaturesForAddress + getTransaction
    to compute (landing_slot - voted_slot) over hundreds of votes
 
-Uses only stdlib. Handles RPC rate limits with exponential backoff.
+getTransaction calls go out as JSON-RPC batches over keep-alive connections
+with a bounded number in flight; the in-flight window adapts to 429s
+(see solana_rpc.py). Finalized transactions and signature pages are kept in
+the shared RPC cache (rpc_cache.py), so re-runs only download new votes.
+
+Uses only stdlib.
+
+Usage:
+    python3 vote-latency-analysis.py [--samples N] [--rpc URL]
 """
 
-import json
+import argparse
 import struct
 import time
-import base64
-import urllib.request
-import urllib.error
 from collections import Counter, defaultdict
 
+from rpc_cache import open_cache
+from solana_rpc import RpcClient
+from vote_decode import decode_vote_txs, decode_votes, vote_latency
+
 RPC_URL = "https://api.mainnet-beta.solana.com"
 SAGA_VOTE_ACCOUNT = "sagasJDjjAHND4hien3bbo5xXkzCT5Ss6nKjyUJ45aw"
 
 # Number of recent vote txs to sample per validator
-TX_SAMPLE_SIZE = 150
-
-# ── Base58 decode (inline, no deps) ─────────────────────────────────
-
-BASE58_ALPHABET = b'123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
-
-def b58decode(s):
-    """Decode a base58-encoded string to bytes."""
-    if isinstance(s, str):
-        s = s.encode('ascii')
-    origlen = len(s)
-    s = s.lstrip(BASE58_ALPHABET[0:1])
-    newlen = len(s)
-    acc = 0
-    for c in s:
-        acc = acc * 58 + BASE58_ALPHABET.index(c)
-    result = []
-    while acc > 0:
-        acc, mod = divmod(acc, 256)
-        result.append(mod)
-    # Add leading zeros
-    result.extend([0] * (origlen - newlen))
-    return bytes(reversed(result))
+TX_SAMPLE_SIZE = 1500
 
+# getSignaturesForAddress page size (RPC maximum)
+SIGNATURE_PAGE = 1000
+
+# getTransaction calls per JSON-RPC batch, and batches in flight
+TX_BATCH_SIZE = 50
+TX_MAX_INFLIGHT = 4
+
+RPC = RpcClient(RPC_URL, batch_size=TX_BATCH_SIZE, max_inflight=TX_MAX_INFLIGHT,
+                cache=open_cache(RPC_URL))
 
 # ── RPC helpers ──────────────────────────────────────────────────────
 
-def rpc_call(method, params=None, max_retries=6):
+def rpc_call(method, params=None):
     """Make a JSON-RPC call with exponential backoff on rate limits."""
-    payload = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": method,
-        "params": params or [],
-    }
-    data = json.dumps(payload).encode()
-
-    for attempt in range(max_retries):
-        try:
-            req = urllib.request.Request(
-                RPC_URL,
-                data=data,
-                headers={"Content-Type": "application/json"},
-            )
-            with urllib.request.urlopen(req, timeout=60) as resp:
-                result = json.loads(resp.read().decode())
-                if "error" in result:
-                    err = result["error"]
-                    if err.get("code") == 429 or "Too many requests" in str(err).lower():
-                        wait = 2 ** attempt + 1
-                        print(f"  Rate limited, waiting {wait}s...")
-                        time.sleep(wait)
-                        continue
-                    # Server busy / resource exhausted
-                    if err.get("code") in (-32005, -32009):
-                        wait = 2 ** attempt + 1
-                        print(f"  Server busy ({err.get('code')}), waiting {wait}s...")
-                        time.sleep(wait)
-                        continue
-                    raise RuntimeError(f"RPC error: {err}")
-                return result.get("result")
-        except urllib.error.HTTPError as e:
-            if e.code == 429:
-                wait = 2 ** attempt + 1
-                print(f"  HTTP 429, waiting {wait}s... (attempt {attempt+1}/{max_retries})")
-                time.sleep(wait)
-                continue
-            raise
-        except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
-            wait = 2 ** attempt + 1
-            print(f"  Connection error: {e}, retrying in {wait}s...")
-            time.sleep(wait)
-            continue
-    raise RuntimeError(f"Failed after {max_retries} retries for {method}")
+    return RPC.call(method, params)
 
 
 # ── Parse on-chain vote state (tower snapshot) ──────────────────────
 
 def parse_vote_state(account_data_b64):
     """Parse vote account binary data. Returns (votes_list, version)."""
-    raw = base64.b64decode(account_data_b64)
-    offset = 0
-
-    def read_u32():
-        nonlocal offset
-        val = struct.unpack_from('<I', raw, offset)[0]
-        offset += 4
-        return val
-
-    def read_u64():
-        nonlocal offset
-        val = struct.unpack_from('<Q', raw, offset)[0]
-        offset += 8
-        return val
-
-    def read_pubkey():
-        nonlocal offset
-        offset += 32
-
-    def read_u8():
-        nonlocal offset
-        val = raw[offset]
-        offset += 1
-        return val
-
-    version = read_u32()        # 4 bytes
-    read_pubkey()               # node_pubkey: 32 bytes
-    read_pubkey()               # authorized_withdrawer: 32 bytes
-    commission = read_u8()      # commission: 1 byte
-    # Now at offset 69
-
-    votes = []
-    if version >= 1:
-        # Current format: LandedVote = { latency: u8, lockout: { slot: u64, confirmation_count: u32 } }
-        num_votes = read_u64()
-        if num_votes > 150:
-            return [], version
-        for _ in range(num_votes):
-            latency = read_u8()
-            slot = read_u64()
-            confirmation_count = read_u32()
-            votes.append({
-                'slot': slot,
-                'latency': latency,
-                'confirmation_count': confirmation_count,
-            })
-    else:
-        num_votes = read_u64()
-        if num_votes > 150:
-            return [], version
-        for _ in range(num_votes):
-            slot = read_u64()
-            confirmation_count = read_u32()
-            votes.append({
-                'slot': slot,
-                'latency': None,
-                'confirmation_count': confirmation_count,
-            })
-
-    return votes, version
+    try:
+        version, votes = decode_votes(account_data_b64)
+    except (ValueError, IndexError, struct.error):
+        return [], None
+    return [
+        {'slot': slot, 'latency': latency, 'confirmation_count': conf}
+        for slot, conf, latency in votes
+    ], version
 
 
 def fetch_vote_state(vote_account_pubkey):
@@ -185,183 +85,30 @@ def fetch_recent_vote_signatures(vote_account, limit=TX_SAMPLE_SIZE):
     sigs = []
     before = None
     while len(sigs) < limit:
-        params = [vote_account, {"limit": min(50, limit - len(sigs))}]
+        page = min(SIGNATURE_PAGE, limit - len(sigs))
+        params = [vote_account, {"limit": page}]
         if before:
             params[1]["before"] = before
         result = rpc_call("getSignaturesForAddress", params)
         if not result:
             break
         sigs.extend(result)
-        if len(result) < 50:
+        if len(result) < page:
             break
         before = result[-1]["signature"]
-        time.sleep(0.3)
     return sigs[:limit]
 
 
 def parse_vote_instruction(tx_data):
     """
     Extract the voted-for slot from a vote transaction.
-    Vote instructions use program Vote111111111111111111111111111111111111111.
-    The vote instruction contains the slot being voted on.
+    Vote instructions use program Vote111111111111111111111111111111111111111;
+    the newest slot in the Vote / UpdateVoteState / TowerSync payload is the
+    slot being voted on (see vote_decode.py).
 
     Returns (voted_slot, landing_slot) or None.
     """
-    if not tx_data:
-        return None
-
-    meta = tx_data.get("meta")
-    transaction = tx_data.get("transaction")
-    if not meta or not transaction:
-        return None
-
-    landing_slot = tx_data.get("slot")
-    if not landing_slot:
-        return None
-
-    # The transaction message contains instructions
-    message = transaction.get("message", {})
-    account_keys = message.get("accountKeys", [])
-    instructions = message.get("instructions", [])
-
-    # Find the Vote program instruction
-    vote_program = "Vote111111111111111111111111111111111111111"
-    for ix in instructions:
-        program_idx = ix.get("programIdIndex", -1)
-        if program_idx < len(account_keys) and account_keys[program_idx] == vote_program:
-            # Decode the instruction data
-            ix_data_b58 = ix.get("data", "")
-            if not ix_data_b58:
-                continue
-            try:
-                ix_bytes = b58decode(ix_data_b58)
-            except Exception:
-                continue
-
-            # Vote instruction types:
-            # 0 = InitializeAccount, 2 = Vote, 6 = UpdateVoteState,
-            # 9 = CompactUpdateVoteState, 12 = TowerSync, 13 = CompactTowerSync
-            if len(ix_bytes) < 4:
-                continue
-
-            ix_type = struct.unpack_from('<I', ix_bytes, 0)[0]
-
-            # Parse based on instruction type
-            if ix_type == 2:
-                # Vote: { slots: Vec<u64>, hash: Hash, timestamp: Option<i64> }
-                if len(ix_bytes) < 12:
-                    continue
-                num_slots = struct.unpack_from('<I', ix_bytes, 4)[0]
-                if num_slots == 0 or num_slots > 100:
-                    continue
-                # Last slot in the vector is the most recent vote
-                last_offset = 8 + (num_slots - 1) * 8
-                if last_offset + 8 > len(ix_bytes):
-                    continue
-                voted_slot = struct.unpack_from('<Q', ix_bytes, last_offset)[0]
-                return (voted_slot, landing_slot)
-
-            elif ix_type in (6, 9):
-                # UpdateVoteState / CompactUpdateVoteState
-                # { lockouts: Vec<Lockout>, root: Option<u64>, hash: Hash, timestamp: Option<i64> }
-                offset = 4
-                if ix_type == 9:
-                    # CompactUpdateVoteState uses compact-u16 for vec length
-                    # Simple approach: read first byte
-                    if offset >= len(ix_bytes):
-                        continue
-                    num_lockouts = ix_bytes[offset]
-                    offset += 1
-                    if num_lockouts > 127:
-                        # multi-byte compact-u16, skip for now
-                        continue
-                else:
-                    if offset + 4 > len(ix_bytes):
-                        continue
-                    num_lockouts = struct.unpack_from('<I', ix_bytes, offset)[0]
-                    offset += 4
-
-                if num_lockouts == 0 or num_lockouts > 100:
-                    continue
-
-                # Each Lockout = { slot: u64, confirmation_count: u32 } for type 6
-                # For type 9 (compact): { offset: compact-u16, confirmation_count: u8 }
-                if ix_type == 6:
-                    last_off = offset + (num_lockouts - 1) * 12
-                    if last_off + 8 > len(ix_bytes):
-                        continue
-                    voted_slot = struct.unpack_from('<Q', ix_bytes, last_off)[0]
-                    return (voted_slot, landing_slot)
-                else:
-                    # compact: first lockout has absolute slot, rest have offsets
-                    if offset + 8 > len(ix_bytes):
-                        continue
-                    base_slot = struct.unpack_from('<Q', ix_bytes, offset)[0]
-                    offset += 8
-                    conf = ix_bytes[offset] if offset < len(ix_bytes) else 0
-                    offset += 1
-                    current_slot = base_slot
-                    for _ in range(num_lockouts - 1):
-                        if offset >= len(ix_bytes):
-                            break
-                        # Read compact offset
-                        slot_off = ix_bytes[offset]
-                        offset += 1
-                        if slot_off > 127:
-                            break
-                        current_slot += slot_off
-                        conf = ix_bytes[offset] if offset < len(ix_bytes) else 0
-                        offset += 1
-                    return (current_slot, landing_slot)
-
-            elif ix_type in (12, 13):
-                # TowerSync / CompactTowerSync (newer format, similar structure)
-                offset = 4
-                if ix_type == 13:
-                    if offset >= len(ix_bytes):
-                        continue
-                    num_lockouts = ix_bytes[offset]
-                    offset += 1
-                    if num_lockouts > 127:
-                        continue
-                else:
-                    if offset + 4 > len(ix_bytes):
-                        continue
-                    num_lockouts = struct.unpack_from('<I', ix_bytes, offset)[0]
-                    offset += 4
-
-                if num_lockouts == 0 or num_lockouts > 100:
-                    continue
-
-                if ix_type == 12:
-                    # TowerSync: lockouts are { slot: u64, confirmation_count: u32 }
-                    last_off = offset + (num_lockouts - 1) * 12
-                    if last_off + 8 > len(ix_bytes):
-                        continue
-                    voted_slot = struct.unpack_from('<Q', ix_bytes, last_off)[0]
-                    return (voted_slot, landing_slot)
-                else:
-                    # CompactTowerSync: first has absolute slot, rest have offsets
-                    if offset + 8 > len(ix_bytes):
-                        continue
-                    base_slot = struct.unpack_from('<Q', ix_bytes, offset)[0]
-                    offset += 8
-                    conf = ix_bytes[offset] if offset < len(ix_bytes) else 0
-                    offset += 1
-                    current_slot = base_slot
-                    for _ in range(num_lockouts - 1):
-                        if offset >= len(ix_bytes):
-                            break
-                        slot_off = ix_bytes[offset]
-                        offset += 1
-                        if slot_off > 127:
-                            break
-                        current_slot += slot_off
-                        conf = ix_bytes[offset] if offset < len(ix_bytes) else 0
-                        offset += 1
-                    return (current_slot, landing_slot)
-
-    return None
+    return vote_latency(tx_data)
 
 
 def analyze_vote_transactions(vote_account, label):
@@ -377,27 +124,33 @@ def analyze_vote_transactions(vote_account, label):
     parsed = 0
     errors = 0
 
-    for i, sig_info in enumerate(sigs):
-        sig = sig_info["signature"]
-        if sig_info.get("err"):
-            continue  # Skip failed transactions
-
-        try:
-            tx = rpc_call("getTransaction", [
-                sig,
-                {"encoding": "json", "maxSupportedTransactionVersion": 0}
-            ])
-        except RuntimeError as e:
+    # Skip failed transactions
+    calls = [
+        ("getTransaction", [sig_info["signature"],
+                            {"encoding": "json", "maxSupportedTransactionVersion": 0}])
+        for sig_info in sigs if not sig_info.get("err")
+    ]
+    progress_step = max(100, len(calls) // 10)
+    reported = [0]
+
+    def progress(done, total):
+        if done - reported[0] >= progress_step or done == total:
+            reported[0] = done
+            print(f"  Fetched {done}/{total} txs...")
+
+    started = time.time()
+    txs = RPC.batch(calls, progress=progress)
+    elapsed = time.time() - started
+    print(f"  Fetched {len(calls)} txs in {elapsed:.1f}s ({len(calls) / max(elapsed, 1e-9):.0f} tx/s)")
+
+    fetched = []
+    for tx in txs:
+        if isinstance(tx, RuntimeError):
             errors += 1
-            if errors > 10:
-                print(f"  Too many errors, stopping after {parsed} txs")
-                break
-            continue
+        elif tx:
+            fetched.append(tx)
 
-        if not tx:
-            continue
-
-        result = parse_vote_instruction(tx)
+    for result in decode_vote_txs(fetched):
         if result:
             voted_slot, landing_slot = result
             latency = landing_slot - voted_slot
@@ -409,14 +162,6 @@ def analyze_vote_transactions(vote_account, label):
                 })
             parsed += 1
 
-        # Rate limit protection
-        if (i + 1) % 10 == 0:
-            time.sleep(0.5)
-
-        # Progress
-        if (i + 1) % 25 == 0:
-            print(f"  Processed {i+1}/{len(sigs)} txs, {len(latencies)} valid latencies...")
-
     print(f"  Parsed {parsed} vote txs, {len(latencies)} valid latency samples, {errors} errors")
     return latencies
 
@@ -654,6 +399,18 @@ def compare_epoch_credits(saga_info, top_validators):
 # ── Main ────────────────────────────────────────────────────────────
 
 def main():
+    global TX_SAMPLE_SIZE, RPC
+
+    parser = argparse.ArgumentParser(description="Solana vote latency analysis")
+    parser.add_argument("--samples", type=int, default=TX_SAMPLE_SIZE,
+                        help=f"Recent vote txs to sample per validator (default {TX_SAMPLE_SIZE})")
+    parser.add_argument("--rpc", default=RPC_URL, help="RPC endpoint")
+    args = parser.parse_args()
+    TX_SAMPLE_SIZE = args.samples
+    if args.rpc != RPC_URL:
+        RPC = RpcClient(args.rpc, batch_size=TX_BATCH_SIZE, max_inflight=TX_MAX_INFLIGHT,
+                        cache=open_cache(args.rpc))
+
     print("=" * 65)
     print("  SOLANA VOTE LATENCY ANALYSIS")
     print("  Saga DAO vs Top Validators by Stake")
@@ -4,7 +4,17 @@ Vote Latency Monitor for Solana Validators
 Continuously tracks vote timing, distance, and shred reception patterns.
 Designed to run for hours and surface patterns invisible in snapshots.
 
+Polling mode samples getSlot + getVoteAccounts every SAMPLE_INTERVAL. Stream
+mode (--ws) subscribes to slotSubscribe and accountSubscribe on the vote
+account over the RPC websocket, decodes the vote state locally and samples
+vote distance on every slot; when the websocket drops it polls for
+FALLBACK_POLL seconds, then reconnects, and when the vote account can't be
+decoded it polls for the rest of the run. Both modes keep a compact rolling
+histogram of vote distance in a JSON file next to the log. stub_validator.py
+serves a fake RPC + websocket for trying either mode offline.
+
 Usage: python3 vote-latency-monitor.py [--duration HOURS] [--rpc URL] [--output FILE]
+                                       [--ws] [--ws-url URL] [--histogram FILE]
 """
 
 import json
@@ -12,10 +22,15 @@ import time
 import sys
 import os
 import signal
+import struct
 import urllib.request
 import urllib.error
 from datetime import datetime, timezone
-from collections import defaultdict
+from collections import defaultdict, deque
+
+from rpc_cache import open_cache
+from solana_ws import SolanaWebsocket, ws_url
+from vote_decode import decode_vote_state
 
 # Config
 RPC_URL = "http://127.0.0.1:8899"
@@ -23,6 +38,15 @@ SAMPLE_INTERVAL = 0.4  # ~1 slot
 SUMMARY_INTERVAL = 300  # 5 minutes
 OUTPUT_FILE = None
 DURATION_HOURS = 12
+VOTE_ACCOUNT = "sagasJDjjAHND4hien3bbo5xXkzCT5Ss6nKjyUJ45aw"
+STREAM = False
+WS_URL = None  # default: the RPC URL's websocket endpoint (port + 1)
+FALLBACK_POLL = 30  # seconds of polling after a websocket drop before reconnecting
+HISTOGRAM_FILE = None
+HISTOGRAM_BUCKET = 60  # seconds per rolling histogram bucket
+HISTOGRAM_BUCKETS = 60  # buckets kept (1 hour)
+HISTOGRAM_MAX_DISTANCE = 32  # last bin counts every distance >= this
+HISTOGRAM_FLUSH = 5  # seconds between histogram file writes
 
 # Parse args
 args = sys.argv[1:]
@@ -37,6 +61,16 @@ while i < len(args):
     elif args[i] == "--output" and i + 1 < len(args):
         OUTPUT_FILE = args[i + 1]
         i += 2
+    elif args[i] == "--ws":
+        STREAM = True
+        i += 1
+    elif args[i] == "--ws-url" and i + 1 < len(args):
+        STREAM = True
+        WS_URL = args[i + 1]
+        i += 2
+    elif args[i] == "--histogram" and i + 1 < len(args):
+        HISTOGRAM_FILE = args[i + 1]
+        i += 2
     else:
         i += 1
 
@@ -44,6 +78,59 @@ if OUTPUT_FILE is None:
     timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
     OUTPUT_FILE = f"/home/solv/vote-latency-{timestamp}.log"
 
+if HISTOGRAM_FILE is None:
+    HISTOGRAM_FILE = os.path.splitext(OUTPUT_FILE)[0] + ".hist.json"
+
+
+class RollingHistogram:
+    """Vote-distance counts per time bucket over a rolling window, plus run totals, flushed as compact JSON."""
+
+    def __init__(self, path):
+        self.path = path
+        self.total = [0] * (HISTOGRAM_MAX_DISTANCE + 1)
+        self.buckets = deque(maxlen=HISTOGRAM_BUCKETS)  # [bucket start, counts by distance]
+        self.last_flush = 0
+
+    def add(self, distance, timestamp):
+        d = min(max(distance, 0), HISTOGRAM_MAX_DISTANCE)
+        start = int(timestamp // HISTOGRAM_BUCKET * HISTOGRAM_BUCKET)
+        if not self.buckets or self.buckets[-1][0] != start:
+            self.buckets.append([start, [0] * (HISTOGRAM_MAX_DISTANCE + 1)])
+        self.buckets[-1][1][d] += 1
+        self.total[d] += 1
+        if timestamp - self.last_flush >= HISTOGRAM_FLUSH:
+            self.flush(timestamp)
+
+    @staticmethod
+    def _trim(counts):
+        end = len(counts)
+        while end > 1 and not counts[end - 1]:
+            end -= 1
+        return counts[:end]
+
+    def flush(self, now=None):
+        """Atomically rewrite the histogram file. counts[i] is the number of samples at distance i."""
+        self.last_flush = now or time.time()
+        data = {
+            "validator": VOTE_ACCOUNT,
+            "updated": int(self.last_flush),
+            "bucket_seconds": HISTOGRAM_BUCKET,
+            "max_distance": HISTOGRAM_MAX_DISTANCE,
+            "total": self._trim(self.total),
+            "buckets": [[start, self._trim(counts)] for start, counts in self.buckets],
+        }
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Warning: can't write histogram {self.path}: {e}", flush=True)
+
+
+class TowerDecodeError(ValueError):
+    """The vote account data isn't a vote state this monitor can read."""
+
 
 class VoteLatencyMonitor:
     def __init__(self):
@@ -61,6 +148,8 @@ class VoteLatencyMonitor:
         self.max_distance_seen = 0
         self.spikes = []  # (timestamp, distance, cluster_slot, vote_slot)
         self.outfile = None
+        self.cache = open_cache(RPC_URL)
+        self.histogram = RollingHistogram(HISTOGRAM_FILE)
 
         signal.signal(signal.SIGINT, self._handle_signal)
         signal.signal(signal.SIGTERM, self._handle_signal)
@@ -69,6 +158,12 @@ class VoteLatencyMonitor:
         self.running = False
 
     def rpc_call(self, method, params=None):
+        """RPC call read through the shared RPC cache."""
+        if self.cache is None:
+            return self.fetch_rpc(method, params)
+        return self.cache.call(method, params, lambda: self.fetch_rpc(method, params))
+
+    def fetch_rpc(self, method, params=None):
         payload = {
             "jsonrpc": "2.0",
             "id": 1,
@@ -90,11 +185,14 @@ class VoteLatencyMonitor:
         except Exception:
             return None
 
+    # The sample loop needs a fresh value every SAMPLE_INTERVAL, so these two
+    # skip the cache: a hit would be rare and every miss would store a full
+    # getVoteAccounts response in SQLite.
     def get_slot(self):
-        return self.rpc_call("getSlot", [{"commitment": "processed"}])
+        return self.fetch_rpc("getSlot", [{"commitment": "processed"}])
 
     def get_vote_accounts(self):
-        return self.rpc_call("getVoteAccounts")
+        return self.fetch_rpc("getVoteAccounts")
 
     def get_epoch_info(self):
         return self.rpc_call("getEpochInfo")
@@ -111,7 +209,7 @@ class VoteLatencyMonitor:
 
         # Find our validator
         for va in vote_accounts.get("current", []):
-            if va.get("votePubkey") == "sagasJDjjAHND4hien3bbo5xXkzCT5Ss6nKjyUJ45aw":
+            if va.get("votePubkey") == VOTE_ACCOUNT:
                 last_vote = va.get("lastVote", 0)
                 root_slot = va.get("rootSlot", 0)
                 distance = cluster_slot - last_vote
@@ -180,6 +278,131 @@ class VoteLatencyMonitor:
                 ts = datetime.fromtimestamp(s["timestamp"], timezone.utc).strftime("%H:%M:%S")
                 self.log(f"    {ts}: distance={s['distance']} (cluster={s['cluster_slot']}, vote={s['last_vote']})")
 
+    def record(self, sample):
+        """Track one vote-distance sample: counters, spikes, histogram and periodic summaries."""
+        self.samples.append(sample)
+        self.window_samples.append(sample)
+
+        # Track distances
+        d = sample["distance"]
+        self.vote_distances[d] += 1
+        self.window_distances[d] += 1
+        self.histogram.add(d, sample["timestamp"])
+
+        if d > self.max_distance_seen:
+            self.max_distance_seen = d
+
+        # Log spikes immediately
+        if d >= 3:
+            self.spikes.append(sample)
+            ts = datetime.fromtimestamp(sample["timestamp"], timezone.utc).strftime("%H:%M:%S")
+            self.log(f"⚠ SPIKE: distance={d} at {ts} (cluster={sample['cluster_slot']}, vote={sample['last_vote']})")
+
+        # Periodic summary
+        if time.time() - self.window_start >= SUMMARY_INTERVAL:
+            self.summary_count += 1
+            elapsed = time.time() - self.start_time
+            elapsed_min = elapsed / 60
+
+            self.log("")
+            self.log(f"{'=' * 70}")
+            self.log(f"SUMMARY #{self.summary_count} (elapsed: {elapsed_min:.1f} min)")
+            self.log(f"{'=' * 70}")
+            self.log(f"--- Last {SUMMARY_INTERVAL}s window ---")
+            self.print_summary(self.window_distances, self.window_samples, "window")
+            self.log(f"--- Cumulative ---")
+            self.print_summary(self.vote_distances, self.samples, "cumulative")
+            self.log(f"{'=' * 70}")
+            self.log("")
+
+            # Reset window
+            self.window_samples = []
+            self.window_distances = defaultdict(int)
+            self.window_start = time.time()
+
+        self.last_vote_slot = sample["last_vote"]
+        self.last_sample_time = sample["timestamp"]
+
+    def poll(self, end_time):
+        """Polling mode: getSlot + getVoteAccounts every SAMPLE_INTERVAL until end_time."""
+        consecutive_errors = 0
+
+        while self.running and time.time() < end_time:
+            sample = self.get_vote_distance()
+
+            if sample is None:
+                consecutive_errors += 1
+                if consecutive_errors >= 10:
+                    self.log("ERROR: 10 consecutive RPC failures, waiting 10s...")
+                    time.sleep(10)
+                    consecutive_errors = 0
+                else:
+                    time.sleep(SAMPLE_INTERVAL)
+                continue
+
+            consecutive_errors = 0
+            self.record(sample)
+            time.sleep(SAMPLE_INTERVAL)
+
+    def stream(self, end_time):
+        """Websocket mode until end_time, polling for FALLBACK_POLL seconds whenever the stream drops."""
+        url = WS_URL or ws_url(RPC_URL)
+        while self.running and time.time() < end_time:
+            try:
+                self.stream_once(url, end_time)
+            except TowerDecodeError as e:
+                # Reconnecting would hit the same account data; getVoteAccounts doesn't need decoding.
+                self.log(f"Can't decode the vote account ({e}); polling for the rest of the run")
+                self.poll(end_time)
+                return
+            except (ConnectionError, OSError, ValueError) as e:
+                if not self.running:
+                    break
+                self.log(f"Websocket unavailable ({e}); polling for {FALLBACK_POLL}s before reconnecting")
+                self.poll(min(end_time, time.time() + FALLBACK_POLL))
+
+    def stream_once(self, url, end_time):
+        """One websocket session: a sample on every slotNotification, last vote from accountNotification."""
+        with SolanaWebsocket(url) as ws:
+            ws.subscribe("accountSubscribe", [VOTE_ACCOUNT, {"encoding": "base64", "commitment": "processed"}])
+            ws.subscribe("slotSubscribe")
+            self.log(f"Streaming from {url}")
+
+            tower = None
+            account = self.rpc_call("getAccountInfo", [VOTE_ACCOUNT, {"encoding": "base64", "commitment": "processed"}])
+            if account and account.get("value"):
+                tower = self.decode_tower(account["value"]["data"])
+
+            for method, result in ws.notifications():
+                if not self.running or time.time() >= end_time:
+                    return
+                if method == "accountNotification":
+                    tower = self.decode_tower(result["value"]["data"]) or tower
+                elif method == "slotNotification" and tower:
+                    last_vote, root_slot = tower
+                    cluster_slot = result["slot"]
+                    self.record({
+                        "cluster_slot": cluster_slot,
+                        "last_vote": last_vote,
+                        "root_slot": root_slot,
+                        "distance": cluster_slot - last_vote,
+                        "timestamp": time.time(),
+                    })
+
+    @staticmethod
+    def decode_tower(data):
+        """(last vote slot, root slot) from vote account data, None for an empty tower.
+
+        Raises TowerDecodeError when the data can't be decoded.
+        """
+        try:
+            state = decode_vote_state(data)
+        except (ValueError, IndexError, struct.error) as e:
+            raise TowerDecodeError(str(e) or type(e).__name__) from e
+        if not state["votes"]:
+            return None
+        return state["votes"][-1][0], state["root_slot"] or 0
+
     def run(self):
         end_time = self.start_time + (DURATION_HOURS * 3600)
 
@@ -195,7 +418,9 @@ class VoteLatencyMonitor:
         self.log(f"  Output: {OUTPUT_FILE}")
         self.log(f"  Sample interval: {SAMPLE_INTERVAL}s")
         self.log(f"  Summary every: {SUMMARY_INTERVAL}s")
-        self.log(f"  Validator: sagasJDjjAHND4hien3bbo5xXkzCT5Ss6nKjyUJ45aw")
+        self.log(f"  Validator: {VOTE_ACCOUNT}")
+        self.log(f"  Mode: {'websocket stream' if STREAM else 'polling'}")
+        self.log(f"  Histogram: {HISTOGRAM_FILE}")
         self.log("")
 
         # Initial epoch info
@@ -206,65 +431,11 @@ class VoteLatencyMonitor:
         self.log("=" * 70)
         self.log("")
 
-        consecutive_errors = 0
-
-        while self.running and time.time() < end_time:
-            sample = self.get_vote_distance()
-
-            if sample is None:
-                consecutive_errors += 1
-                if consecutive_errors >= 10:
-                    self.log("ERROR: 10 consecutive RPC failures, waiting 10s...")
-                    time.sleep(10)
-                    consecutive_errors = 0
-                else:
-                    time.sleep(SAMPLE_INTERVAL)
-                continue
-
-            consecutive_errors = 0
-            self.samples.append(sample)
-            self.window_samples.append(sample)
-
-            # Track distances
-            d = sample["distance"]
-            self.vote_distances[d] += 1
-            self.window_distances[d] += 1
-
-            if d > self.max_distance_seen:
-                self.max_distance_seen = d
-
-            # Log spikes immediately
-            if d >= 3:
-                self.spikes.append(sample)
-                ts = datetime.fromtimestamp(sample["timestamp"], timezone.utc).strftime("%H:%M:%S")
-                self.log(f"⚠ SPIKE: distance={d} at {ts} (cluster={sample['cluster_slot']}, vote={sample['last_vote']})")
-
-            # Periodic summary
-            if time.time() - self.window_start >= SUMMARY_INTERVAL:
-                self.summary_count += 1
-                elapsed = time.time() - self.start_time
-                elapsed_min = elapsed / 60
-
-                self.log("")
-                self.log(f"{'=' * 70}")
-                self.log(f"SUMMARY #{self.summary_count} (elapsed: {elapsed_min:.1f} min)")
-                self.log(f"{'=' * 70}")
-                self.log(f"--- Last {SUMMARY_INTERVAL}s window ---")
-                self.print_summary(self.window_distances, self.window_samples, "window")
-                self.log(f"--- Cumulative ---")
-                self.print_summary(self.vote_distances, self.samples, "cumulative")
-                self.log(f"{'=' * 70}")
-                self.log("")
-
-                # Reset window
-                self.window_samples = []
-                self.window_distances = defaultdict(int)
-                self.window_start = time.time()
-
-            self.last_vote_slot = sample["last_vote"]
-            self.last_sample_time = sample["timestamp"]
-
-            time.sleep(SAMPLE_INTERVAL)
+        if STREAM:
+            self.stream(end_time)
+        else:
+            self.poll(end_time)
+        self.histogram.flush()
 
         # Final summary
         self.log("")
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+Fast decoding of Solana vote accounts and vote transactions.
+
+- base58: bytes.translate through a 256-entry digit table, one bigint
+  accumulate, then a single int.to_bytes (no per-character .index, no
+  per-byte divmod loop).
+- Vote accounts: precompiled struct.Struct layouts over a memoryview, with
+  the packed lockout and epoch-credit arrays read by struct.iter_unpack, or
+  as NumPy structured arrays with arrays=True.
+- Vote transactions: VoteInstruction discriminants and layouts as the vote
+  program serializes them (bincode; short_vec/varint lockout offsets for the
+  compact UpdateVoteState and TowerSync forms).
+- decode_votes() reads just the tower; decode_vote_states() and
+  decode_vote_txs() decode many accounts and transactions per call.
+
+Uses only stdlib; NumPy is optional (arrays=True).
+
+Usage:
+    python3 vote_decode.py bench [--accounts N] [--txs N]
+"""
+
+import argparse
+import base64
+import random
+import struct
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+BASE58_ALPHABET = b'123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+_B58_DIGITS = bytearray(b'\xff' * 256)
+for _i, _c in enumerate(BASE58_ALPHABET):
+    _B58_DIGITS[_c] = _i
+B58_DIGITS = bytes(_B58_DIGITS)
+
+VOTE_PROGRAM = "Vote111111111111111111111111111111111111111"
+MAX_VOTES = 150  # lockout history is 31; anything far beyond that is not a vote state
+MAX_EPOCH_CREDITS = 1024
+NO_ROOT = 2 ** 64 - 1
+
+U16 = struct.Struct('<H')
+U32 = struct.Struct('<I')
+U64 = struct.Struct('<Q')
+LANDED_VOTE = struct.Struct('<BQI')      # latency, slot, confirmation_count
+LOCKOUT = struct.Struct('<QI')           # slot, confirmation_count
+EPOCH_CREDITS = struct.Struct('<QQQ')    # epoch, credits, prev_credits
+LAST_TIMESTAMP = struct.Struct('<Qq')    # slot, unix timestamp
+V1_HEADER = struct.Struct('<I32s32sB')   # version, node_pubkey, authorized_withdrawer, commission
+AUTHORIZED_VOTER_SIZE = 8 + 32
+PRIOR_VOTERS_SIZE = 32 * (32 + 8 + 8) + 8 + 1        # CircBuf<(Pubkey, Epoch, Epoch)>
+PRIOR_VOTERS_V0_SIZE = 32 * (32 + 8 + 8 + 8) + 8 + 1  # CircBuf<(Pubkey, Epoch, Epoch, Slot)>
+
+if np is not None:
+    LANDED_VOTE_DTYPE = np.dtype([('latency', 'u1'), ('slot', '<u8'), ('confirmation_count', '<u4')])
+    LOCKOUT_DTYPE = np.dtype([('slot', '<u8'), ('confirmation_count', '<u4')])
+    EPOCH_CREDITS_DTYPE = np.dtype([('epoch', '<u8'), ('credits', '<u8'), ('prev_credits', '<u8')])
+
+# VoteInstruction discriminants carrying votes
+VOTE, VOTE_SWITCH = 2, 6
+UPDATE_VOTE_STATE, UPDATE_VOTE_STATE_SWITCH = 8, 9
+COMPACT_UPDATE_VOTE_STATE, COMPACT_UPDATE_VOTE_STATE_SWITCH = 12, 13
+TOWER_SYNC, TOWER_SYNC_SWITCH = 14, 15
+
+
+# ── base58 ──
+
+def b58decode(s):
+    """Decode a base58-encoded string to bytes."""
+    if isinstance(s, str):
+        s = s.encode('ascii')
+    digits = s.translate(B58_DIGITS)
+    if 255 in digits:
+        raise ValueError("invalid base58 character")
+    zeros = len(digits) - len(digits.lstrip(b'\0'))
+    acc = 0
+    for d in digits:
+        acc = acc * 58 + d
+    return b'\0' * zeros + acc.to_bytes((acc.bit_length() + 7) // 8, 'big')
+
+
+def b58encode(data):
+    """Encode bytes as a base58 string."""
+    acc = int.from_bytes(data, 'big')
+    out = bytearray()
+    while acc:
+        acc, rem = divmod(acc, 58)
+        out.append(BASE58_ALPHABET[rem])
+    zeros = len(data) - len(data.lstrip(b'\0'))
+    return (b'1' * zeros + bytes(reversed(out))).decode('ascii')
+
+
+# ── Vote accounts ──
+
+def _raw(data):
+    """Account bytes from raw bytes, base64 text or an RPC ["<b64>", "base64"] pair."""
+    if isinstance(data, (list, tuple)):
+        data = data[0]
+    if isinstance(data, str):
+        return base64.b64decode(data)
+    return bytes(data)
+
+
+def _records(raw, offset, count, layout, dtype, arrays):
+    """A packed array of `count` records at offset, as tuples or a NumPy structured array."""
+    end = offset + count * layout.size
+    if end > len(raw):
+        raise ValueError("vote state truncated")
+    if arrays:
+        return np.frombuffer(raw, dtype=dtype, count=count, offset=offset), end
+    return list(layout.iter_unpack(memoryview(raw)[offset:end])), end
+
+
+def _header(raw):
+    """(version, node_pubkey, authorized_withdrawer, commission, votes offset)."""
+    version = U32.unpack_from(raw, 0)[0]
+    if version in (1, 2):
+        _, node, withdrawer, commission = V1_HEADER.unpack_from(raw, 0)
+        return version, node, withdrawer, commission, V1_HEADER.size
+    if version == 0:
+        offset = 36 + 32 + 8 + PRIOR_VOTERS_V0_SIZE  # authorized_voter, its epoch, prior voters
+        return version, raw[4:36], raw[offset:offset + 32], raw[offset + 32], offset + 33
+    if version == 3:
+        # V4 (SIMD-0185): reward collectors and basis-point commissions, no prior voters
+        offset = 144  # + inflation/block revenue collectors, two bps, pending rewards
+        offset += 49 if raw[offset] else 1  # Option<BLS pubkey>
+        return version, raw[4:36], raw[36:68], U16.unpack_from(raw, 132)[0] / 100, offset
+    raise ValueError(f"unsupported vote state version {version}")
+
+
+def _votes(raw, version, offset, arrays):
+    """The lockout tower at offset -> (votes, next offset)."""
+    count = U64.unpack_from(raw, offset)[0]
+    if count > MAX_VOTES:
+        raise ValueError(f"implausible vote count {count}")
+    if version >= 2:
+        votes, offset = _records(raw, offset + 8, count, LANDED_VOTE, arrays and LANDED_VOTE_DTYPE, arrays)
+        if not arrays:
+            votes = [(slot, conf, latency) for latency, slot, conf in votes]
+    else:
+        votes, offset = _records(raw, offset + 8, count, LOCKOUT, arrays and LOCKOUT_DTYPE, arrays)
+        if not arrays:
+            votes = [(slot, conf, None) for slot, conf in votes]
+    return votes, offset
+
+
+def decode_votes(data, arrays=False):
+    """Just the tower: (version, votes), votes as in decode_vote_state."""
+    if arrays and np is None:
+        raise ImportError("arrays=True needs numpy")
+    raw = _raw(data)
+    version, _, _, _, offset = _header(raw)
+    return version, _votes(raw, version, offset, arrays)[0]
+
+
+def decode_vote_state(data, arrays=False):
+    """
+    Decode a vote account (VoteStateVersions 0-3).
+
+    Returns a dict: version, node_pubkey, authorized_withdrawer (bytes),
+    commission (percent), votes, root_slot, epoch_credits, last_timestamp.
+    votes are (slot, confirmation_count, latency) tuples (latency None before
+    LandedVote) and epoch_credits (epoch, credits, prev_credits) tuples; with
+    arrays=True both are NumPy structured arrays with those field names.
+    Raises ValueError for unknown versions and truncated data.
+    """
+    if arrays and np is None:
+        raise ImportError("arrays=True needs numpy")
+    raw = _raw(data)
+    version, node, withdrawer, commission, offset = _header(raw)
+    votes, offset = _votes(raw, version, offset, arrays)
+
+    root_slot = None
+    if raw[offset]:
+        root_slot = U64.unpack_from(raw, offset + 1)[0]
+        offset += 9
+    else:
+        offset += 1
+    if version:
+        # authorized_voters: BTreeMap<Epoch, Pubkey>
+        offset += 8 + U64.unpack_from(raw, offset)[0] * AUTHORIZED_VOTER_SIZE
+    if version in (1, 2):
+        offset += PRIOR_VOTERS_SIZE
+
+    count = U64.unpack_from(raw, offset)[0]
+    if count > MAX_EPOCH_CREDITS:
+        raise ValueError(f"implausible epoch credits count {count}")
+    epoch_credits, offset = _records(raw, offset + 8, count, EPOCH_CREDITS,
+                                     arrays and EPOCH_CREDITS_DTYPE, arrays)
+    last_timestamp = LAST_TIMESTAMP.unpack_from(raw, offset)
+
+    return {
+        'version': version,
+        'node_pubkey': node,
+        'authorized_withdrawer': withdrawer,
+        'commission': commission,
+        'votes': votes,
+        'root_slot': root_slot,
+        'epoch_credits': epoch_credits,
+        'last_timestamp': last_timestamp,
+    }
+
+
+def decode_vote_states(datas, arrays=False):
+    """Decode many vote accounts; an account that fails to decode is None."""
+    out = []
+    for data in datas:
+        try:
+            out.append(decode_vote_state(data, arrays))
+        except (ValueError, IndexError, struct.error):
+            out.append(None)
+    return out
+
+
+# ── Vote transactions ──
+
+def _short_vec_len(buf, offset):
+    """compact-u16 length prefix -> (value, next offset)."""
+    value = shift = 0
+    for i in range(3):
+        byte = buf[offset + i]
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return value, offset + i + 1
+        shift += 7
+    raise ValueError("bad short_vec length")
+
+
+def _varint(buf, offset):
+    """LEB128 u64 -> (value, next offset)."""
+    value = shift = 0
+    while True:
+        byte = buf[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+        if shift > 63:
+            raise ValueError("bad varint")
+
+
+def decode_vote_instruction(ix):
+    """Newest slot voted for by one vote-program instruction's data, or None."""
+    if len(ix) < 12:
+        return None
+    kind = U32.unpack_from(ix, 0)[0]
+    if kind in (VOTE, VOTE_SWITCH):
+        # Vote { slots: Vec<Slot>, hash, timestamp }
+        count = U64.unpack_from(ix, 4)[0]
+        last = 12 + (count - 1) * 8
+        if not count or last + 8 > len(ix):
+            return None
+        return U64.unpack_from(ix, last)[0]
+    if kind in (UPDATE_VOTE_STATE, UPDATE_VOTE_STATE_SWITCH):
+        # VoteStateUpdate { lockouts: VecDeque<Lockout>, root, hash, timestamp }
+        count = U64.unpack_from(ix, 4)[0]
+        last = 12 + (count - 1) * LOCKOUT.size
+        if not count or last + 8 > len(ix):
+            return None
+        return U64.unpack_from(ix, last)[0]
+    if kind in (COMPACT_UPDATE_VOTE_STATE, COMPACT_UPDATE_VOTE_STATE_SWITCH, TOWER_SYNC, TOWER_SYNC_SWITCH):
+        # { root: Slot (u64::MAX = none), lockout_offsets: short_vec<(varint, u8)>, hash, timestamp, ... }
+        root = U64.unpack_from(ix, 4)[0]
+        count, offset = _short_vec_len(ix, 12)
+        if not count:
+            return None
+        slot = 0 if root == NO_ROOT else root
+        for _ in range(count):
+            delta, offset = _varint(ix, offset)
+            slot += delta
+            offset += 1  # confirmation_count
+        return slot
+    return None
+
+
+def vote_latency(tx):
+    """(voted_slot, landing_slot) of a getTransaction (json encoding) result, or None."""
+    if not tx or not tx.get("meta"):
+        return None
+    landing_slot = tx.get("slot")
+    transaction = tx.get("transaction")
+    if not landing_slot or not transaction:
+        return None
+    message = transaction.get("message", {})
+    keys = message.get("accountKeys", [])
+    for ix in message.get("instructions", ()):
+        idx = ix.get("programIdIndex", -1)
+        if 0 <= idx < len(keys) and keys[idx] == VOTE_PROGRAM and ix.get("data"):
+            try:
+                voted_slot = decode_vote_instruction(b58decode(ix["data"]))
+            except (ValueError, IndexError, struct.error):
+                continue
+            if voted_slot is not None:
+                return (voted_slot, landing_slot)
+    return None
+
+
+def decode_vote_txs(txs):
+    """(voted_slot, landing_slot) or None for each transaction."""
+    return [vote_latency(tx) for tx in txs]
+
+
+# ── Benchmark ──
+
+def _legacy_b58decode(s):
+    """The previous vote-latency-analysis decoder, for comparison."""
+    if isinstance(s, str):
+        s = s.encode('ascii')
+    origlen = len(s)
+    s = s.lstrip(BASE58_ALPHABET[0:1])
+    newlen = len(s)
+    acc = 0
+    for c in s:
+        acc = acc * 58 + BASE58_ALPHABET.index(c)
+    result = []
+    while acc > 0:
+        acc, mod = divmod(acc, 256)
+        result.append(mod)
+    result.extend([0] * (origlen - newlen))
+    return bytes(reversed(result))
+
+
+def _legacy_parse_vote_state(account_data_b64):
+    """The previous vote-latency-analysis vote parser (votes only), for comparison."""
+    raw = base64.b64decode(account_data_b64)
+    offset = 0
+
+    def read_u32():
+        nonlocal offset
+        val = struct.unpack_from('<I', raw, offset)[0]
+        offset += 4
+        return val
+
+    def read_u64():
+        nonlocal offset
+        val = struct.unpack_from('<Q', raw, offset)[0]
+        offset += 8
+        return val
+
+    def read_u8():
+        nonlocal offset
+        val = raw[offset]
+        offset += 1
+        return val
+
+    version = read_u32()
+    offset += 64
+    read_u8()
+    votes = []
+    for _ in range(read_u64()):
+        latency = read_u8()
+        slot = read_u64()
+        confirmation_count = read_u32()
+        votes.append({'slot': slot, 'latency': latency, 'confirmation_count': confirmation_count})
+    return votes, version
+
+
+def synthetic_vote_state(rng, slot=400_000_000, epochs=64):
+    """A version-2 vote account with a full tower and `epochs` of credits."""
+    out = bytearray(V1_HEADER.pack(2, rng.randbytes(32), rng.randbytes(32), 5))
+    out += U64.pack(31)
+    for i in range(31):
+        out += LANDED_VOTE.pack(rng.choice((1, 1, 1, 2, 3)), slot - 31 + i, 31 - i)
+    out += b'\x01' + U64.pack(slot - 32)
+    out += U64.pack(1) + U64.pack(900) + rng.randbytes(32)
+    out += bytes(PRIOR_VOTERS_SIZE)
+    out += U64.pack(epochs)
+    credits = 0
+    for e in range(epochs):
+        out += EPOCH_CREDITS.pack(900 - epochs + e, credits + 6_000_000, credits)
+        credits += 6_000_000
+    out += LAST_TIMESTAMP.pack(slot, 1_770_000_000)
+    return base64.b64encode(bytes(out)).decode()
+
+
+def synthetic_tower_sync_tx(rng, slot=400_000_000):
+    """A getTransaction-shaped TowerSync vote landing 1-3 slots after its newest vote."""
+    root = slot - 40
+    ix = bytearray(U32.pack(TOWER_SYNC) + U64.pack(root) + bytes([31]))
+    for i in range(31):
+        ix += bytes([1 if i else 9, 31 - i])
+    ix += rng.randbytes(32) + b'\x01' + U64.pack(1_770_000_000) + rng.randbytes(32)
+    voted = root + 9 + 30
+    return {
+        "slot": voted + rng.choice((1, 1, 2, 3)),
+        "meta": {"err": None},
+        "transaction": {"message": {
+            "accountKeys": [b58encode(rng.randbytes(32)), b58encode(rng.randbytes(32)), VOTE_PROGRAM],
+            "instructions": [{"programIdIndex": 2, "accounts": [1, 0], "data": b58encode(bytes(ix))}],
+        }},
+    }
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def benchmark(accounts=2000, txs=5000):
+    rng = random.Random(7)
+    states = [synthetic_vote_state(rng) for _ in range(accounts)]
+    transactions = [synthetic_tower_sync_tx(rng) for _ in range(txs)]
+    keys = [b58encode(b'\0' + rng.randbytes(31)) for _ in range(txs)]
+    ix_data = [tx["transaction"]["message"]["instructions"][0]["data"] for tx in transactions]
+
+    print(f"Decoding benchmark ({accounts} vote accounts, {txs} vote txs)")
+    print(f"{'case':<36} {'legacy':>10} {'new':>10} {'speedup':>8}")
+
+    def row(name, legacy, new):
+        print(f"{name:<36} {legacy:>9.3f}s {new:>9.3f}s {legacy / new:>7.1f}x")
+
+    old, t_old = _timed(lambda: [_legacy_b58decode(k) for k in keys])
+    new, t_new = _timed(lambda: [b58decode(k) for k in keys])
+    assert old == new
+    row("b58decode pubkeys", t_old, t_new)
+    old, t_old = _timed(lambda: [_legacy_b58decode(d) for d in ix_data])
+    new, t_new = _timed(lambda: [b58decode(d) for d in ix_data])
+    assert old == new
+    row("b58decode vote instructions", t_old, t_new)
+
+    raws = [base64.b64decode(s) for s in states]
+    old, t_old = _timed(lambda: [_legacy_parse_vote_state(s) for s in states])
+    new, t_new = _timed(lambda: [decode_votes(s) for s in states])
+    assert [[(v['slot'], v['confirmation_count'], v['latency']) for v in votes] for votes, _ in old] == \
+        [votes for _, votes in new]
+    row("vote towers (base64 in)", t_old, t_new)
+    _, t_raw = _timed(lambda: [decode_votes(r) for r in raws])
+    _, t_full = _timed(decode_vote_states, raws)
+    print(f"{'vote towers (bytes in)':<36} {'':>10} {t_raw:>9.3f}s")
+    print(f"{'full vote states + epoch credits':<36} {'':>10} {t_full:>9.3f}s")
+    if np is not None:
+        _, t_np = _timed(decode_vote_states, raws, True)
+        print(f"{'full vote states, NumPy structured':<36} {'':>10} {t_np:>9.3f}s")
+    else:
+        print("  (NumPy not installed; structured-array path skipped)")
+
+    results, t_tx = _timed(decode_vote_txs, transactions)
+    assert all(r and 1 <= r[1] - r[0] <= 3 for r in results)
+    print(f"{'decode_vote_txs (TowerSync)':<36} {'':>10} {t_tx:>9.3f}s  {txs / t_tx:,.0f} tx/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vote account / transaction decoding")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bench_p = sub.add_parser("bench", help="Micro-benchmark against the previous decoders")
+    bench_p.add_argument("--accounts", type=int, default=2000)
+    bench_p.add_argument("--txs", type=int, default=5000)
+    args = parser.parse_args()
+    if args.command == "bench":
+        benchmark(args.accounts, args.txs)
+
+
+if __name__ == "__main__":
+    main()
@@ -160,6 +160,9 @@ def scrape_instagram():
     try:
         import urllib.request
         from datetime import timedelta
+        sys.path.insert(0, "/home/workspace/Skills/vurt-post-log/scripts")
+        import meta_client
+        cache = meta_client.InsightsCache()
 
         def _graph_get(path, params=None):
             params = params or {}
@@ -217,8 +220,23 @@ def scrape_instagram():
                 "fields": "id,media_type,media_url,permalink,timestamp",
                 "limit": "50",
             })
+            stories = stories_resp.get("data", [])
+            # Three insight sub-requests per story, all sent through the batch endpoint.
+            subs = []
+            for s in stories:
+                subs.append((f"{s['id']}/insights", {"metric": "reach,replies,profile_visits"}))
+                # Navigation needs its own call w/ breakdown param
+                subs.append((f"{s['id']}/insights", {
+                    "metric": "navigation",
+                    "breakdown": "story_navigation_action_type",
+                    "metric_type": "total_value",
+                }))
+                # Link clicks — only exists if story had a link sticker; metric fails silently otherwise
+                subs.append((f"{s['id']}/insights", {"metric": "website_clicks"}))
+            bodies = meta_client.batch(subs, token=ig_token)
             stories_list = []
-            for s in stories_resp.get("data", []):
+            for i, s in enumerate(stories):
+                si, nav, lc = bodies[3 * i:3 * i + 3]
                 story_item = {
                     "id": s["id"],
                     "type": s.get("media_type", ""),
@@ -233,25 +251,9 @@ def scrape_instagram():
                     "profile_visits": None,
                     "link_clicks": None,
                 }
-                try:
-                    si = _graph_get(f"{s['id']}/insights", {
-                        "metric": "reach,replies,profile_visits",
-                    })
-                    for entry in si.get("data", []):
-                        name = entry["name"]
-                        val = entry.get("values", [{}])[0].get("value")
-                        if val is None:
-                            val = entry.get("total_value", {}).get("value", 0)
-                        story_item[name] = val
-                except Exception:
-                    pass
-                # Navigation needs its own call w/ breakdown param
-                try:
-                    nav = _graph_get(f"{s['id']}/insights", {
-                        "metric": "navigation",
-                        "breakdown": "story_navigation_action_type",
-                        "metric_type": "total_value",
-                    })
+                if not isinstance(si, meta_client.GraphError):
+                    story_item.update(meta_client.parse_insights(si))
+                if not isinstance(nav, meta_client.GraphError):
                     for entry in nav.get("data", []):
                         for bd in entry.get("total_value", {}).get("breakdowns", []):
                             for r in bd.get("results", []):
@@ -265,17 +267,10 @@ def scrape_instagram():
                                     story_item["exits"] = v
                                 elif dim == "swipe_forward":
                                     story_item["swipes"] = v
-                except Exception:
-                    pass
-                # Link clicks — only exists if story had a link sticker; metric fails silently otherwise
-                try:
-                    lc = _graph_get(f"{s['id']}/insights", {"metric": "website_clicks"})
-                    for entry in lc.get("data", []):
-                        val = entry.get("values", [{}])[0].get("value", 0)
-                        if val:
-                            story_item["link_clicks"] = val
-                except Exception:
-                    pass
+                if not isinstance(lc, meta_client.GraphError):
+                    val = meta_client.parse_insights(lc).get("website_clicks", 0)
+                    if val:
+                        story_item["link_clicks"] = val
                 stories_list.append(story_item)
             data["active_stories"] = stories_list
             data["active_stories_count"] = len(stories_list)
@@ -291,14 +286,23 @@ def scrape_instagram():
         except Exception as e:
             data["active_stories_error"] = str(e)
 
-        # Recent posts (top 15)
+        # Recent posts (top 15) — media + insights in one expanded listing,
+        # comments for every post in one batch call
         try:
-            media = _graph_get(f"{IG_USER_ID}/media", {
-                "fields": "id,caption,timestamp,like_count,comments_count,media_type,permalink",
-                "limit": "15",
-            })
+            media = meta_client.get_media_with_insights(
+                IG_USER_ID, "id,caption,timestamp,like_count,comments_count,media_type,permalink",
+                "reach,saved,shares,views", limit=15, token=ig_token, cache=cache,
+            )
+            with_comments = [p for p in media if p.get("comments_count", 0) > 0]
+            comment_bodies = dict(zip(
+                (p["id"] for p in with_comments),
+                meta_client.batch([(f"{p['id']}/comments", {
+                    "fields": "text,username,timestamp,replies{text,username,timestamp}",
+                    "limit": "50",
+                }) for p in with_comments], token=ig_token),
+            ))
             all_comments = []
-            for post in media.get("data", []):
+            for post in media:
                 post_data = {
                     "caption": (post.get("caption") or "")[:60],
                     "likes": post.get("like_count", 0),
@@ -308,21 +312,15 @@ def scrape_instagram():
                     "reach": None, "views": None, "saves": None, "shares": None,
                     "comments_with_replies": 0,
                 }
-                try:
-                    # Use views (not plays — deprecated in v22+); works for VIDEO and IMAGE
-                    pi = _graph_get(f"{post['id']}/insights", {"metric": "reach,saved,shares,views"})
-                    for entry in pi.get("data", []):
-                        key = entry["name"] if entry["name"] != "saved" else "saves"
-                        post_data[key] = entry.get("values", [{}])[0].get("value", 0)
-                except:
-                    pass
+                # Use views (not plays — deprecated in v22+); works for VIDEO and IMAGE
+                for name, value in post.get("insights", {}).items():
+                    post_data[name if name != "saved" else "saves"] = value
                 # Pull comments + replies for accurate total count
                 if post_data["comments"] > 0:
-                    try:
-                        c_resp = _graph_get(f"{post['id']}/comments", {
-                            "fields": "text,username,timestamp,replies{text,username,timestamp}",
-                            "limit": "50",
-                        })
+                    c_resp = comment_bodies.get(post["id"])
+                    if isinstance(c_resp, meta_client.GraphError) or c_resp is None:
+                        post_data["comment_list"] = []
+                    else:
                         comment_list = []
                         reply_count = 0
                         for c in c_resp.get("data", []):
@@ -344,13 +342,12 @@ def scrape_instagram():
                         post_data["comment_list"] = comment_list[:15]
                         post_data["comments_with_replies"] = len(c_resp.get("data", [])) + reply_count
                         all_comments.extend(comment_list)
-                    except:
-                        post_data["comment_list"] = []
                 data["top_posts"].append(post_data)
             data["all_recent_comments"] = sorted(all_comments, key=lambda x: x.get("date",""), reverse=True)[:25]
             data["total_comments_with_replies"] = sum(p.get("comments_with_replies", 0) for p in data["top_posts"])
         except:
             pass
+        cache.save()
 
     except Exception as e:
         data["error"] = f"Graph API error: {e}"
@@ -396,6 +393,8 @@ def get_facebook_page():
 
     try:
         import urllib.request, urllib.parse
+        sys.path.insert(0, "/home/workspace/Skills/vurt-post-log/scripts")
+        import meta_client
 
         def _graph(path, params=None, token=None):
             params = params or {}
@@ -492,12 +491,35 @@ def get_facebook_page():
             "limit": "20",
         }, token=page_token)
 
+        feed = []
         seen_ids = set()
         for p in posts_resp.get("data", []):
+            if p.get("id", "") not in seen_ids:
+                seen_ids.add(p.get("id", ""))
+                feed.append(p)
+
+        def _reel_target(p):
+            for att in (p.get("attachments", {}).get("data", [])):
+                target = att.get("target", {})
+                if att.get("type", "") == "video_inline" and target.get("id") and "/reel/" in target.get("url", ""):
+                    return target["id"]
+            return None
+
+        # Reel view counts and comment threads for every post in one batch round-trip
+        reel_targets = {p["id"]: _reel_target(p) for p in feed}
+        commented = [p["id"] for p in feed if p.get("comments", {}).get("summary", {}).get("total_count", 0) > 0]
+        subs = [(t, {"fields": "views"}) for t in reel_targets.values() if t]
+        subs += [(f"{pid}/comments", {
+            "fields": "message,from,created_time,comments{message,from,created_time}",
+            "limit": "50",
+            "filter": "stream",
+        }) for pid in commented]
+        bodies = iter(meta_client.batch(subs, token=page_token, version="v19.0"))
+        reel_views = {pid: next(bodies) for pid, t in reel_targets.items() if t}
+        comment_threads = {pid: next(bodies) for pid in commented}
+
+        for p in feed:
             post_id = p.get("id", "")
-            if post_id in seen_ids:
-                continue
-            seen_ids.add(post_id)
 
             # Use likes count as reactions proxy (reactions.summary deprecated on feed)
             reactions = p.get("likes", {}).get("summary", {}).get("total_count", 0)
@@ -511,31 +533,18 @@ def get_facebook_page():
 
             # Extract FB video views from attachment target (cross-posted IG reels)
             video_views = None
-            is_reel = False
-            for att in (p.get("attachments", {}).get("data", [])):
-                att_type = att.get("type", "")
-                target = att.get("target", {})
-                target_id = target.get("id")
-                target_url = target.get("url", "")
-                if att_type == "video_inline" and target_id and "/reel/" in target_url:
-                    is_reel = True
-                    try:
-                        vr = _graph(target_id, {"fields": "views"}, token=page_token)
-                        video_views = vr.get("views")
-                    except Exception:
-                        pass
-                    break
+            is_reel = post_id in reel_views
+            if is_reel and not isinstance(reel_views[post_id], meta_client.GraphError):
+                video_views = reel_views[post_id].get("views")
 
             # Pull comments + replies for accurate counts
             recent_comments = []
             total_with_replies = 0
             if comment_count > 0:
-                try:
-                    comments_resp = _graph(f"{post_id}/comments", {
-                        "fields": "message,from,created_time,comments{message,from,created_time}",
-                        "limit": "50",
-                        "filter": "stream",
-                    }, token=page_token)
+                comments_resp = comment_threads.get(post_id)
+                if isinstance(comments_resp, meta_client.GraphError) or comments_resp is None:
+                    total_with_replies = comment_count
+                else:
                     for c in comments_resp.get("data", []):
                         total_with_replies += 1
                         recent_comments.append({
@@ -551,8 +560,6 @@ def get_facebook_page():
                                 "text": f"↳ {(nc.get('message') or '')[:110]}",
                                 "date": nc.get("created_time", "")[:10],
                             })
-                except Exception:
-                    total_with_replies = comment_count
 
             post_record = {
                 "date": p.get("created_time", "")[:10],
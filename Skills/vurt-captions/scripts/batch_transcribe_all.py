@@ -1,18 +1,16 @@
 #!/usr/bin/env python3
 """Submit every clip in inventory.json to AssemblyAI via signed Frame.io URL.
-Poll until all complete. Write transcripts to footage/<show>/transcripts/<id>.json."""
-import json, os, re, sys, time, urllib.request, subprocess
+Jobs go through the shared aai_jobs table (bounded submission, one backoff
+poller or webhook). Writes transcripts to footage/<show>/transcripts/<id>.json."""
+import json, os, re, sys, subprocess
 
 sys.path.insert(0, "/home/workspace/Skills/vurt-post-log/scripts")
 from frameio_client import get_access_token, ACCT_ID, API_BASE
-
-AAI_KEY = os.environ["ASSEMBLYAI_API_KEY"]
-AAI_BASE = "https://api.assemblyai.com/v2"
-AAI_H = {"authorization": AAI_KEY, "content-type": "application/json"}
+from aai_jobs import JobManager, webhook_from_env
 
 INV = "/home/workspace/Skills/vurt-captions/footage/inventory.json"
 FOOTAGE = "/home/workspace/Skills/vurt-captions/footage"
-JOBS_FILE = "/home/workspace/Skills/vurt-captions/footage/aai_jobs.json"
+AAI_CONFIG = {"speech_models": ["universal-3-pro"], "speaker_labels": True}
 
 
 def show_slug(s):
@@ -30,26 +28,10 @@ def signed_url(file_id):
     return (ml.get("original") or {}).get("download_url")
 
 
-def submit(audio_url):
-    body = json.dumps({"audio_url": audio_url, "speech_models":["universal-3-pro"], "speaker_labels": True}).encode()
-    req = urllib.request.Request(f"{AAI_BASE}/transcript", data=body, headers=AAI_H, method="POST")
-    with urllib.request.urlopen(req, timeout=30) as r:
-        return json.loads(r.read())["id"]
-
-
-def status(tid):
-    req = urllib.request.Request(f"{AAI_BASE}/transcript/{tid}", headers={"authorization": AAI_KEY})
-    with urllib.request.urlopen(req, timeout=30) as r:
-        return json.loads(r.read())
-
-
 def main():
     inv = json.load(open(INV))
-    jobs = {}
-    if os.path.exists(JOBS_FILE):
-        jobs = json.load(open(JOBS_FILE))
+    mgr = JobManager("caption-inventory", webhook=webhook_from_env())
 
-    # Submit
     for show, meta in inv.items():
         slug = show_slug(show)
         tdir = f"{FOOTAGE}/{slug}/transcripts"
@@ -57,63 +39,17 @@ def main():
         for clip in meta["clips"]:
             fid = clip.get("file_id") or clip.get("id")
             if not fid: continue
-            key = f"{slug}/{fid}"
             # Already transcribed?
             target = f"{tdir}/{fid}.json"
             if os.path.exists(target) and os.path.getsize(target) > 100:
                 continue
-            if key in jobs and jobs[key].get("status") in ("queued","processing","completed"):
-                continue
-            url = signed_url(fid)
-            if not url:
-                print(f"NO URL {show}/{clip['name']}"); continue
-            try:
-                tid = submit(url)
-                jobs[key] = {"tid": tid, "status": "queued", "show": show, "name": clip["name"], "fid": fid, "path": target}
-                print(f"SUB  {show}/{clip['name']} → {tid}")
-            except Exception as e:
-                print(f"ERR  {show}/{clip['name']}: {e}")
-        with open(JOBS_FILE, "w") as f:
-            json.dump(jobs, f, indent=2)
-
-    # Poll
-    print(f"\n--- Polling {sum(1 for j in jobs.values() if j['status'] != 'done')} jobs ---")
-    while True:
-        pending = [k for k,j in jobs.items() if j.get("status") != "done"]
-        if not pending: break
-        for k in list(pending):
-            j = jobs[k]
-            try:
-                resp = status(j["tid"])
-            except Exception as e:
-                print(f"POLL ERR {k}: {e}"); continue
-            st = resp.get("status")
-            if st == "completed":
-                out = {
-                    "text": resp.get("text",""),
-                    "audio_duration": resp.get("audio_duration",0),
-                    "utterances": resp.get("utterances",[]) or [],
-                }
-                with open(j["path"],"w") as f:
-                    json.dump(out, f, indent=2)
-                with open(j["path"].replace(".json",".txt"),"w") as f:
-                    f.write(out["text"])
-                j["status"] = "done"
-                print(f"DONE {j['show']}/{j['name']} ({out['audio_duration']}s)")
-            elif st == "error":
-                j["status"] = "error"; j["error"] = resp.get("error","")
-                print(f"AAI ERR {k}: {resp.get('error','')}")
-            else:
-                j["status"] = st
-        with open(JOBS_FILE,"w") as f:
-            json.dump(jobs, f, indent=2)
-        remaining = [k for k,j in jobs.items() if j.get("status") not in ("done","error")]
-        if not remaining: break
-        print(f"  ... {len(remaining)} remaining")
-        time.sleep(15)
+            mgr.add(f"{slug}/{fid}", source=lambda fid=fid: signed_url(fid), config=AAI_CONFIG,
+                    sinks=[{"type": "caption_inventory", "path": target}],
+                    meta={"show": show, "name": clip["name"], "fid": fid}, retry_errors=True)
 
-    done = sum(1 for j in jobs.values() if j["status"]=="done")
-    err = sum(1 for j in jobs.values() if j["status"]=="error")
+    jobs = mgr.run()
+    done = sum(1 for j in jobs.values() if j["status"] == "done")
+    err = sum(1 for j in jobs.values() if j["status"] == "error")
     print(f"\nFinal: {done} done, {err} errors")
 
 
@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+"""Caption production pipeline: download → transcribe → translate → SRT, per clip and language.
+
+Takes a show/episode selector and a language list and captions every matching
+clip in one run:
+
+- download   Frame.io originals to footage/<show>/ (only with --download;
+             otherwise AssemblyAI fetches the signed URL itself). Local
+             footage (--local DIR) skips this stage.
+- transcribe through the shared aai_jobs manager in its own namespace
+             (caption-pipeline): universal-3-pro with universal-2 fallback and
+             language detection, so Swahili and other non-English clips go
+             through the same path. Clips batch_transcribe_all already
+             finished (caption-inventory namespace, transcript on disk) are
+             translated from that transcript instead of being re-billed.
+- translate  AssemblyAI speech-understanding translation, utterance by
+             utterance, one request per clip for all missing languages.
+- render     SRT per language via vurt-subtitles/scripts/srt_pipeline.
+
+Each stage has its own bounded worker pool and hands items on as they finish,
+so transcripts come back while downloads are still running and SRTs land on
+disk clip by clip. Stage state is kept per (clip, stage, language) in
+.caption-pipeline.db; a re-run skips finished stages and retries only the ones
+that failed. Transcript ids from the old footage/aai_jobs.json are picked up so
+earlier transcripts are translated without transcribing again.
+
+Outputs:
+  footage/<show>/transcripts/<id>.json + .txt   (same layout as batch_transcribe_all)
+  footage/<show>/captions/<id>.<lang>.json      translated utterances
+  footage/<show>/captions/<id>.<lang>.srt
+
+Usage:
+  python3 caption_pipeline.py --show "Love Network Jam" --languages en,sw
+  python3 caption_pipeline.py --show come-back-dad --episode 'EP2\\d' --languages en,es,fr --download
+  python3 caption_pipeline.py --local footage/come-back-dad --languages en
+  python3 caption_pipeline.py --all --languages en,es
+  python3 caption_pipeline.py --status
+"""
+import argparse
+import json
+import os
+import queue
+import re
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, "..", "..", "vurt-post-log", "scripts"))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, "..", "..", "vurt-subtitles", "scripts"))
+from aai_jobs import MAX_INFLIGHT, JobManager, register_sink, webhook_from_env  # noqa: E402
+from srt_pipeline import emit, from_utterances, reformat  # noqa: E402
+from batch_transcribe_all import FOOTAGE, INV, show_slug, signed_url  # noqa: E402
+
+STATE_DB = os.path.join(SCRIPT_DIR, ".caption-pipeline.db")
+LEGACY_JOBS = os.path.join(FOOTAGE, "aai_jobs.json")
+NAMESPACE = "caption-pipeline"
+INVENTORY_NAMESPACE = "caption-inventory"  # batch_transcribe_all's jobs, read only
+AAI_CONFIG = {"speech_models": ["universal-3-pro", "universal-2"], "speaker_labels": True,
+              "language_detection": True}
+MEDIA_EXTS = (".mp4", ".mov", ".m4a", ".mp3", ".wav")
+
+DOWNLOAD_WORKERS = 4
+TRANSLATE_WORKERS = 4
+RENDER_WORKERS = 2
+
+# SRT display settings (same as the Frame.io subtitle batch)
+MAX_LINE_CHARS = 32
+MAX_LINES = 2
+MIN_DISPLAY_SEC = 1.0
+
+
+# --- Stage state ---
+class StageState:
+    """Per (item, stage, language) status, shared by the stage pools."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS stages (
+        key        TEXT NOT NULL,
+        stage      TEXT NOT NULL,
+        lang       TEXT NOT NULL DEFAULT '',
+        status     TEXT NOT NULL,
+        data       TEXT,
+        error      TEXT,
+        attempts   INTEGER DEFAULT 0,
+        updated_at REAL,
+        PRIMARY KEY (key, stage, lang)
+    );
+    """
+
+    def __init__(self, db_path=STATE_DB):
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(self.SCHEMA)
+        self.lock = threading.Lock()
+
+    def get(self, key, stage, lang=""):
+        """(status, data) or (None, {}) if the stage never ran."""
+        with self.lock:
+            row = self.db.execute("SELECT status, data FROM stages WHERE key=? AND stage=? AND lang=?",
+                                  (key, stage, lang)).fetchone()
+        return (row[0], json.loads(row[1] or "{}")) if row else (None, {})
+
+    def done(self, key, stage, lang=""):
+        return self.get(key, stage, lang)[0] == "done"
+
+    def set(self, key, stage, status, lang="", data=None, error=None):
+        with self.lock, self.db:
+            self.db.execute(
+                "INSERT INTO stages (key, stage, lang, status, data, error, attempts, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (key, stage, lang) DO UPDATE SET status=excluded.status,"
+                " data=COALESCE(excluded.data, data), error=excluded.error,"
+                " attempts=attempts + excluded.attempts, updated_at=excluded.updated_at",
+                (key, stage, lang, status, json.dumps(data) if data is not None else None, error,
+                 int(status == "error"), time.time()))
+
+    def summary(self):
+        with self.lock:
+            return self.db.execute(
+                "SELECT stage, status, COUNT(*) FROM stages GROUP BY stage, status ORDER BY stage, status").fetchall()
+
+    def errors(self):
+        with self.lock:
+            return self.db.execute(
+                "SELECT key, stage, lang, error, attempts FROM stages WHERE status='error' ORDER BY key").fetchall()
+
+
+# --- Selection ---
+def select_inventory(shows=None, episode=None):
+    """Frame.io clips from inventory.json for the given show names/slugs (all if None)."""
+    inv = json.load(open(INV))
+    wanted = {show_slug(s) for s in shows} if shows else None
+    pattern = re.compile(episode, re.I) if episode else None
+    items = []
+    for show, meta in inv.items():
+        slug = show_slug(show)
+        if wanted and not any(w == slug or w in slug for w in wanted):
+            continue
+        for clip in meta["clips"]:
+            fid = clip.get("file_id") or clip.get("id")
+            if not fid or (pattern and not pattern.search(clip["name"])):
+                continue
+            items.append({"key": f"{slug}/{fid}", "id": fid, "show": show, "slug": slug,
+                          "name": clip["name"], "fid": fid})
+    return items
+
+
+def select_local(folder, episode=None):
+    """Media files in a local footage folder (footage/<show>/ by convention)."""
+    folder = os.path.abspath(folder)
+    slug = os.path.basename(folder.rstrip("/"))
+    pattern = re.compile(episode, re.I) if episode else None
+    items = []
+    for name in sorted(os.listdir(folder)):
+        if not name.lower().endswith(MEDIA_EXTS) or (pattern and not pattern.search(name)):
+            continue
+        stem = os.path.splitext(name)[0]
+        items.append({"key": f"{slug}/{stem}", "id": stem, "show": slug, "slug": slug,
+                      "name": name, "path": os.path.join(folder, name)})
+    return items
+
+
+def legacy_tids(path=LEGACY_JOBS):
+    """{key: tid} for transcripts finished by the old one-off scripts."""
+    if not os.path.exists(path):
+        return {}
+    jobs = json.load(open(path))
+    return {k: j["tid"] for k, j in jobs.items()
+            if j.get("status") == "done" and j.get("tid")}
+
+
+def same_language(a, b):
+    return bool(a and b) and a.split("_")[0].lower() == b.split("_")[0].lower()
+
+
+# --- Stage work (pool threads) ---
+def download(item, footage=FOOTAGE):
+    dest = os.path.join(footage, item["slug"], item["name"])
+    if os.path.exists(dest) and os.path.getsize(dest) > 0:
+        return dest
+    url = signed_url(item["fid"])
+    if not url:
+        raise RuntimeError("no signed URL returned")
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = f"{dest}.part"
+    with urllib.request.urlopen(url, timeout=60) as r, open(tmp, "wb") as f:
+        shutil.copyfileobj(r, f, 1 << 20)
+    os.replace(tmp, dest)
+    return dest
+
+
+def transcript_path(item, footage=FOOTAGE):
+    return os.path.join(footage, item["slug"], "transcripts", f"{item['id']}.json")
+
+
+def caption_path(item, lang, ext, footage=FOOTAGE):
+    return os.path.join(footage, item["slug"], "captions", f"{item['id']}.{lang}.{ext}")
+
+
+def write_atomic(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def render_srt(utterances):
+    blocks = reformat(from_utterances(utterances), MAX_LINE_CHARS, MAX_LINES, MIN_DISPLAY_SEC,
+                      same_speaker=True, enders=".!?\"'", drop_empty=True)
+    return "".join(emit(blocks))
+
+
+# --- Orchestration ---
+class CaptionPipeline:
+    def __init__(self, items, languages, mgr, state, fetch=False, footage=FOOTAGE,
+                 download_workers=DOWNLOAD_WORKERS, translate_workers=TRANSLATE_WORKERS,
+                 render_workers=RENDER_WORKERS, log=print):
+        self.items = {it["key"]: it for it in items}
+        self.languages = languages
+        self.mgr = mgr
+        self.state = state
+        self.fetch = fetch
+        self.footage = footage
+        self.log = log
+        self.pools = {
+            "download": ThreadPoolExecutor(download_workers, thread_name_prefix="download"),
+            "translate": ThreadPoolExecutor(translate_workers, thread_name_prefix="translate"),
+            "render": ThreadPoolExecutor(render_workers, thread_name_prefix="render"),
+        }
+        self.feed = queue.Queue()
+        self.feed_closed = False
+        self.lock = threading.Condition()
+        self.outstanding = 0   # download/translate/render tasks not yet finished
+        self.downloading = 0   # the transcribe feed closes when this reaches 0
+        self.seeded = False
+        self.failed = set()    # (key, stage, lang) that failed this run; retried on the next
+        self.counts = {"transcribed": 0, "translated": 0, "rendered": 0, "errors": 0}
+        register_sink("caption_pipeline", self._transcribed)
+
+    # Scheduling
+    def _spawn(self, stage, fn, *args):
+        with self.lock:
+            self.outstanding += 1
+            if stage == "download":
+                self.downloading += 1
+        self.pools[stage].submit(self._guard, stage, fn, *args)
+
+    def _guard(self, stage, fn, *args):
+        try:
+            fn(*args)
+        except Exception as e:  # stage functions record their own errors; this is a backstop
+            self.log(f"  {stage} crashed: {e}")
+        finally:
+            with self.lock:
+                self.outstanding -= 1
+                if stage == "download":
+                    self.downloading -= 1
+                self._maybe_close_feed()
+                self.lock.notify_all()
+
+    def _maybe_close_feed(self):
+        if self.seeded and not self.downloading and not self.feed_closed:
+            self.feed.put(None)
+            self.feed_closed = True
+
+    def _fail(self, key, stage, error, lang=""):
+        self.state.set(key, stage, "error", lang=lang, error=str(error)[:500])
+        self.failed.add((key, stage, lang))
+        with self.lock:
+            self.counts["errors"] += 1
+        self.log(f"ERR  {key} {stage}{' ' + lang if lang else ''}: {error}")
+
+    def advance(self, key):
+        """Start whatever stage comes next for this item."""
+        item = self.items[key]
+        st = self.state
+        if self.fetch and "fid" in item and not st.done(key, "download"):
+            if (key, "download", "") not in self.failed:
+                self._spawn("download", self._download, item)
+            return
+        if not st.done(key, "transcribe"):
+            if (key, "transcribe", "") not in self.failed:
+                self._queue_transcribe(item)
+            return
+        todo = [lang for lang in self.languages
+                if not st.done(key, "translate", lang) and (key, "translate", lang) not in self.failed]
+        if todo:
+            self._spawn("translate", self._translate, item, todo)
+        for lang in self.languages:
+            if (st.done(key, "translate", lang) and not st.done(key, "render", lang)
+                    and (key, "render", lang) not in self.failed):
+                self._spawn("render", self._render, item, lang)
+
+    def _queue_transcribe(self, item):
+        key = item["key"]
+        if self.feed_closed:  # only reachable if a stage hands back an untranscribed item
+            return self._fail(key, "transcribe", "transcribe feed already closed")
+        _, data = self.state.get(key, "download")
+        local = item.get("path") or data.get("path")
+        meta = {"show": item["show"], "name": item["name"], "fid": item.get("fid")}
+        job = {"key": key, "config": AAI_CONFIG, "meta": meta, "retry_errors": True,
+               "sinks": [{"type": "caption_inventory", "path": transcript_path(item, self.footage)},
+                         {"type": "caption_pipeline"}]}
+        if local:
+            job["audio_path"] = local
+        else:
+            job["source"] = lambda fid=item["fid"]: signed_url(fid)
+        self.feed.put(job)
+
+    # Stages
+    def _download(self, item):
+        key = item["key"]
+        try:
+            path = download(item, self.footage)
+        except Exception as e:
+            return self._fail(key, "download", e)
+        self.state.set(key, "download", "done", data={"path": path})
+        self.log(f"GET  {key} → {path}")
+        self.advance(key)
+
+    def _transcribed(self, job, transcript, client):
+        """aai_jobs sink: runs on the job manager's worker as each transcript finishes."""
+        key = job["key"]
+        if key not in self.items:
+            return {}
+        language = transcript.get("language_code")
+        self.state.set(key, "transcribe", "done", data={"tid": job["tid"], "language": language})
+        with self.lock:
+            self.counts["transcribed"] += 1
+        self.advance(key)
+        return {"language_code": language}
+
+    def _translate(self, item, languages):
+        key = item["key"]
+        _, data = self.state.get(key, "transcribe")
+        source = data.get("language")
+        if source is None and data.get("tid"):
+            source = self.mgr.client.get(data["tid"]).get("language_code")
+            self.state.set(key, "transcribe", "done", data={**data, "language": source})
+        needed = [lang for lang in languages if not same_language(lang, source)]
+        for lang in languages:
+            if lang not in needed:
+                self._store_translation(item, lang, self._source_utterances(item), source)
+        if not needed:
+            return self.advance(key)
+        if not data.get("tid"):
+            for lang in needed:
+                self._fail(key, "translate", "no transcript id to translate from", lang)
+            return
+        try:
+            resp = self.mgr.client.translate(data["tid"], needed)
+        except Exception as e:
+            for lang in needed:
+                self._fail(key, "translate", e, lang)
+            return
+        for lang in needed:
+            try:
+                utterances = [{"start": u["start"], "end": u["end"], "speaker": u.get("speaker"),
+                               "text": (u.get("translated_texts") or {})[lang]}
+                              for u in resp.get("utterances") or []]
+            except KeyError:
+                utterances = None
+            if utterances is None or (not utterances and lang not in (resp.get("translated_texts") or {})):
+                self._fail(key, "translate", f"no {lang} translation in response", lang)
+                continue
+            self._store_translation(item, lang, utterances, lang)
+        self.advance(key)
+
+    def _source_utterances(self, item):
+        with open(transcript_path(item, self.footage)) as f:
+            return [{"start": u["start"], "end": u["end"], "speaker": u.get("speaker"), "text": u["text"]}
+                    for u in json.load(f).get("utterances") or []]
+
+    def _store_translation(self, item, lang, utterances, language):
+        path = caption_path(item, lang, "json", self.footage)
+        write_atomic(path, json.dumps({"language": language, "utterances": utterances},
+                                      ensure_ascii=False, indent=2))
+        self.state.set(item["key"], "translate", "done", lang=lang, data={"path": path})
+        with self.lock:
+            self.counts["translated"] += 1
+
+    def _render(self, item, lang):
+        key = item["key"]
+        try:
+            with open(caption_path(item, lang, "json", self.footage)) as f:
+                utterances = json.load(f)["utterances"]
+            path = caption_path(item, lang, "srt", self.footage)
+            write_atomic(path, render_srt(utterances))
+        except Exception as e:
+            return self._fail(key, "render", e, lang)
+        self.state.set(key, "render", "done", lang=lang, data={"path": path})
+        with self.lock:
+            self.counts["rendered"] += 1
+        self.log(f"SRT  {key} [{lang}] → {path}")
+
+    # Driver
+    def seed_transcripts(self, legacy=None, inventory=None):
+        """Mark transcribe done for items the job table or the old jobs file already finished.
+
+        `inventory` is batch_transcribe_all's JobManager; its finished jobs count
+        when their transcript is on disk.
+        """
+        legacy = legacy or {}
+        for key in self.items:
+            if self.state.done(key, "transcribe"):
+                continue
+            job = self.mgr.job(key)
+            other = inventory.job(key) if inventory else None
+            if job and job["status"] == "done" and job["tid"]:
+                self.state.set(key, "transcribe", "done",
+                               data={"tid": job["tid"], "language": job["result"].get("language_code")})
+            elif (other and other["status"] == "done" and other["tid"]
+                  and os.path.exists(transcript_path(self.items[key], self.footage))):
+                self.state.set(key, "transcribe", "done",
+                               data={"tid": other["tid"], "language": other["result"].get("language_code")})
+            elif key in legacy and os.path.exists(transcript_path(self.items[key], self.footage)):
+                self.state.set(key, "transcribe", "done", data={"tid": legacy[key], "language": None})
+
+    def run(self):
+        for key in self.items:
+            self.advance(key)
+        with self.lock:
+            self.seeded = True
+            self._maybe_close_feed()
+        jobs = self.mgr.run(feed=self.feed)
+        for key, job in jobs.items():
+            if key in self.items and job["status"] == "error" and not self.state.done(key, "transcribe"):
+                self._fail(key, "transcribe", job["error"] or "transcription failed")
+        with self.lock:
+            while self.outstanding:
+                self.lock.wait()
+        for pool in self.pools.values():
+            pool.shutdown()
+        return self.counts
+
+
+def report(state, items, languages):
+    keys = set(items)
+    rows = [r for r in state.errors() if r[0] in keys]
+    srts = sum(state.done(k, "render", lang) for k in keys for lang in languages)
+    print(f"\nCaptions: {srts}/{len(keys) * len(languages)} SRTs ({len(keys)} clips × {len(languages)} languages)")
+    if rows:
+        print("Failed stages (retried on the next run):")
+        for key, stage, lang, error, attempts in rows:
+            print(f"  - {key} {stage}{' ' + lang if lang else ''} (attempt {attempts}): {error}")
+
+
+def main():
+    p = argparse.ArgumentParser(description="Caption clips in every target language (resumable)")
+    sel = p.add_mutually_exclusive_group()
+    sel.add_argument("--show", action="append", help="Show name or slug from inventory.json (repeatable)")
+    sel.add_argument("--local", help="Local footage folder instead of the Frame.io inventory")
+    sel.add_argument("--all", action="store_true", help="Every show in inventory.json")
+    p.add_argument("--episode", help="Regex on the clip file name, e.g. 'EP29' or 'Social_0[1-5]'")
+    p.add_argument("--languages", default="en", help="Comma-separated target languages (default: en)")
+    p.add_argument("--download", action="store_true", help="Keep local copies of Frame.io originals")
+    p.add_argument("-c", "--concurrency", type=int, default=MAX_INFLIGHT, help="Max transcripts in flight")
+    p.add_argument("--download-workers", type=int, default=DOWNLOAD_WORKERS)
+    p.add_argument("--translate-workers", type=int, default=TRANSLATE_WORKERS)
+    p.add_argument("--render-workers", type=int, default=RENDER_WORKERS)
+    p.add_argument("--status", action="store_true", help="Show stage state and exit")
+    p.add_argument("--dry-run", action="store_true", help="List the selected clips and exit")
+    args = p.parse_args()
+
+    state = StageState()
+    if args.status:
+        for stage, status, n in state.summary():
+            print(f"  {stage:<12} {status:<8} {n}")
+        return
+    if not (args.show or args.local or args.all):
+        p.error("choose --show, --local or --all")
+
+    items = select_local(args.local, args.episode) if args.local else select_inventory(args.show, args.episode)
+    languages = [lang.strip() for lang in args.languages.split(",") if lang.strip()]
+    print(f"{len(items)} clips × {len(languages)} languages ({', '.join(languages)})")
+    if args.dry_run:
+        for it in items:
+            print(f"  {it['key']}  {it['name']}")
+        return
+    if not items:
+        return
+
+    mgr = JobManager(NAMESPACE, max_inflight=args.concurrency, webhook=webhook_from_env())
+    pipeline = CaptionPipeline(items, languages, mgr, state, fetch=args.download,
+                               download_workers=args.download_workers,
+                               translate_workers=args.translate_workers,
+                               render_workers=args.render_workers)
+    pipeline.seed_transcripts(legacy_tids(), JobManager(INVENTORY_NAMESPACE, client=mgr.client))
+    start = time.time()
+    counts = pipeline.run()
+    print(f"\n{counts['transcribed']} transcribed, {counts['translated']} translated, "
+          f"{counts['rendered']} SRTs, {counts['errors']} errors in {(time.time() - start) / 60:.1f} min")
+    report(state, {it["key"] for it in items}, languages)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,18 @@
 """
 Generate draft captions for VURT Content Calendar entries in Notion.
 
-Reads show profiles and hashtag config from YAML, queries the Content Calendar
-for entries with empty Caption fields, generates platform-appropriate template-based
-captions, and writes them back prefixed with [DRAFT].
+Reads show profiles and hashtag config from YAML once into per-show lookup
+tables, queries the Content Calendar for entries with empty Caption fields,
+generates platform-appropriate template-based captions in memory, and writes
+them back prefixed with [DRAFT]. Writes are diffed against what is already in
+Notion and flushed concurrently under Notion's rate limit.
 
 Usage:
     python3 generate-captions.py --all              # Generate for all empty entries
     python3 generate-captions.py --show karma        # Only for a specific show
     python3 generate-captions.py --dry-run           # Preview without writing
     python3 generate-captions.py --all --dry-run     # Preview all
+    python3 generate-captions.py --all --regenerate  # Also refresh existing [DRAFT] captions
 """
 
 import argparse
@@ -18,9 +21,14 @@ import hashlib
 import json
 import os
 import random
+import re
 import sys
+import threading
+import time
+import urllib.error
 import urllib.request
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 try:
@@ -36,10 +44,18 @@ SCRIPT_DIR = Path(__file__).resolve().parent
 DATA_DIR = SCRIPT_DIR.parent / "data"
 SHOWS_YAML = DATA_DIR / "shows.yaml"
 HASHTAGS_YAML = DATA_DIR / "hashtags.yaml"
+DRAFTS_FILE = SCRIPT_DIR / ".caption-drafts.json"  # page id -> hash of the draft last written
+
+sys.path.insert(0, str(SCRIPT_DIR.parent.parent / "vurt-post-log" / "scripts"))
+import show_catalog  # noqa: E402
 
 # --- Notion ---
 CAL_DB_ID = "a7587d5d-8f14-490d-a494-664bd80d6256"
 NOTION_BASE = "https://api.notion.com/v1"
+NOTION_RATE = 3.0     # requests/sec, Notion's average per-integration limit
+NOTION_WORKERS = 3    # concurrent PATCHes
+NOTION_RETRIES = 5
+DRAFT_PREFIX = "[DRAFT] "
 
 # --- Clip Arc Labels ---
 CLIP_ARC = {
@@ -58,6 +74,17 @@ CLIP_ARC_LABELS = {
     5: "Edge of Resolution",
 }
 
+CLIP_CONTEXTS = {
+    1: "This is where it all starts.",
+    2: "Things are about to escalate.",
+    3: "You didn't see this coming.",
+    4: "The confrontation you've been waiting for.",
+    5: "Right on the edge. No resolution yet.",
+}
+
+_CLIP_RE = re.compile(r"[Cc]lip\s*#?\s*(\d+)")
+_EPISODE_RE = re.compile(r"[Ee]p(?:isode)?\s*#?\s*(\d+)")
+
 
 def get_env(key):
     val = os.environ.get(key)
@@ -77,7 +104,7 @@ def notion_request(method, path, body=None):
         "Notion-Version": "2022-06-28",
         "Content-Type": "application/json",
     })
-    resp = urllib.request.urlopen(req)
+    resp = urllib.request.urlopen(req, timeout=30)
     return json.loads(resp.read())
 
 
@@ -98,6 +125,75 @@ def update_page(page_id, properties):
     return notion_request("PATCH", f"pages/{page_id}", {"properties": properties})
 
 
+class RateLimiter:
+    """Spaces calls `1/rate` seconds apart across threads.
+
+    pause() pushes everyone back and halves the rate (once per pause), and
+    each success() eases it back toward the configured rate, so a lower real
+    limit is settled on instead of retried into.
+    """
+
+    def __init__(self, rate):
+        self.min_interval = self.interval = 1.0 / rate
+        self.lock = threading.Lock()
+        self.next_at = 0.0
+        self.paused_until = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            at = max(now, self.next_at)
+            self.next_at = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+    def pause(self, seconds):
+        with self.lock:
+            now = time.monotonic()
+            if now >= self.paused_until:
+                self.interval = min(self.interval * 2, 5.0)
+                self.paused_until = now + seconds
+            self.next_at = max(self.next_at, self.paused_until)
+
+    def success(self):
+        with self.lock:
+            self.interval = max(self.min_interval, self.interval * 0.9)
+
+
+class NotionWriter:
+    """Flush page property patches concurrently under Notion's rate limit.
+
+    429s and 5xx are retried after Retry-After (or exponential backoff), and
+    the pause applies to every worker, not just the one that was throttled.
+    """
+
+    def __init__(self, workers=NOTION_WORKERS, rate=NOTION_RATE, retries=NOTION_RETRIES):
+        self.workers = workers
+        self.limiter = RateLimiter(rate)
+        self.retries = retries
+
+    def _patch(self, page_id, properties):
+        for attempt in range(self.retries + 1):
+            self.limiter.wait()
+            try:
+                result = update_page(page_id, properties)
+                self.limiter.success()
+                return result
+            except urllib.error.HTTPError as e:
+                if attempt == self.retries or not (e.code == 429 or e.code >= 500):
+                    raise
+                delay = float(e.headers.get("Retry-After") or 2 ** attempt)
+                self.limiter.pause(delay)
+
+    def flush(self, patches):
+        """patches: [(page_id, properties)]. Yields (page_id, error or None) as writes finish."""
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self._patch, pid, props): pid for pid, props in patches}
+            for fut in as_completed(futures):
+                exc = fut.exception()
+                yield futures[fut], exc
+
+
 # --- YAML loaders ---
 def load_shows():
     with open(SHOWS_YAML, "r") as f:
@@ -111,45 +207,70 @@ def load_hashtags():
     return data
 
 
+class CaptionConfig:
+    """Show profiles + hashtag config, loaded once and flattened into lookup tables.
+
+    Everything that depends only on the show (or show + platform) is built on
+    first use and reused for every calendar entry of that show.
+    """
+
+    def __init__(self, shows=None, hashtag_config=None):
+        self.shows = load_shows() if shows is None else shows
+        self.hashtag_config = load_hashtags() if hashtag_config is None else hashtag_config
+        self._profiles = {}
+        self._tag_pools = {}
+        self._matches = {}
+
+    def match_show(self, title):
+        if title not in self._matches:
+            self._matches[title] = match_show(title, self.shows)
+        return self._matches[title]
+
+    def profile(self, show_key):
+        prof = self._profiles.get(show_key)
+        if prof is None:
+            show_data = self.shows[show_key]
+            cast = show_data.get("cast", show_data.get("characters", []))
+            cast_names = [c.get("actor", c.get("name", "")) for c in cast[:3] if isinstance(c, dict)]
+            mentions = get_collaborator_mentions(show_data)
+            prof = self._profiles[show_key] = {
+                "data": show_data,
+                "hooks": show_data.get("caption_hooks", []),
+                "mention_str": " ".join(mentions) if mentions else "",
+                "genre": show_data.get("genre", "drama"),
+                "cast_line": f"Featuring {', '.join(cast_names)}." if cast_names else "",
+            }
+        return prof
+
+    def tag_pools(self, show_key, platform):
+        """(always, rotating, testing, platform tags) for a show on a platform."""
+        key = (show_key, platform)
+        pools = self._tag_pools.get(key)
+        if pools is None:
+            shows = self.hashtag_config.get("shows", {})
+            show_tags = shows.get(show_key, shows.get("default", {}))
+            plat_key = platform.lower().replace(" ", "")
+            if plat_key == "ytshorts":
+                plat_key = "youtube"
+            plat_tags = self.hashtag_config.get("global", {}).get("platform_specific", {}).get(plat_key, [])
+            pools = self._tag_pools[key] = (list(show_tags.get("always", [])), show_tags.get("rotating", []),
+                                            show_tags.get("testing", []), plat_tags)
+        return pools
+
+
 # --- Show matching ---
 def match_show(title, shows):
-    """Match a calendar entry title to a show profile key."""
-    tl = title.lower()
-    # Direct keyword matching
-    mappings = [
-        ("karma", "karma-in-heels"),
-        ("parking lot", "parking-lot-series"),
-        ("parking", "parking-lot-series"),
-        ("mardi gras", "mardi-gras"),
-        ("marry me", "marry-me-for-christmas"),
-        ("my first love", "my-first-love"),
-        ("come back dad", "come-back-dad"),
-        ("comeback", "come-back-dad"),
-        ("35 and ticking", "35-and-ticking"),
-        ("35 & ticking", "35-and-ticking"),
-        ("something like", "something-like-a-business"),
-        ("killer stepdad", "killer-stepdad"),
-        ("director spotlight", "director-spotlight"),
-        ("filmmaker", "director-spotlight"),
-        ("vurt brand", "vurt-brand"),
-        ("this is vurt", "vurt-brand"),
-        ("vurt 100", "vurt-brand"),
-    ]
-    for keyword, key in mappings:
-        if keyword in tl:
-            if key in shows:
-                return key
-    return None
+    """Match a calendar entry title to a show profile key (profile vocabulary in the show catalog)."""
+    return show_catalog.match_profile(title, shows)
 
 
 def extract_clip_number(title):
     """Extract clip number from title like 'Karma in Heels Clip 3'."""
-    import re
-    m = re.search(r"[Cc]lip\s*#?\s*(\d+)", title)
+    m = _CLIP_RE.search(title)
     if m:
         return int(m.group(1))
     # Also check for Ep/Episode pattern
-    m = re.search(r"[Ee]p(?:isode)?\s*#?\s*(\d+)", title)
+    m = _EPISODE_RE.search(title)
     if m:
         num = int(m.group(1))
         # Map episode ranges to clip numbers (5 clips per cycle)
@@ -183,26 +304,15 @@ def pick_from_list(items, seed_str, count=1):
 
 
 # --- Caption generation ---
-def build_hashtag_string(show_key, platform, hashtag_config, seed_str):
+def build_hashtag_string(show_key, platform, config, seed_str):
     """Build a hashtag string from config: always + rotating subset + platform tags."""
-    show_tags = hashtag_config.get("shows", {}).get(show_key, hashtag_config.get("shows", {}).get("default", {}))
-    global_tags = hashtag_config.get("global", {})
-
-    always = list(show_tags.get("always", []))
-    rotating = show_tags.get("rotating", [])
-    testing = show_tags.get("testing", [])
+    always, rotating, testing, plat_tags = config.tag_pools(show_key, platform)
 
     # Pick 2-3 rotating tags
     picked_rotating = pick_from_list(rotating, seed_str + "_rotating", min(3, len(rotating)))
     # Pick 0-1 testing tags
     picked_testing = pick_from_list(testing, seed_str + "_testing", min(1, len(testing)))
 
-    # Platform-specific tags
-    plat_key = platform.lower().replace(" ", "")
-    if plat_key == "ytshorts":
-        plat_key = "youtube"
-    plat_tags = global_tags.get("platform_specific", {}).get(plat_key, [])
-
     all_tags = always + picked_rotating + picked_testing + plat_tags
 
     # Deduplicate preserving order
@@ -246,12 +356,11 @@ def get_collaborator_mentions(show_data):
     return [m for m in mentions if m and m != "unknown"]
 
 
-def generate_caption(show_key, show_data, platform, clip_num, title, hashtag_config):
+def generate_caption(show_key, platform, clip_num, title, config):
     """Generate a platform-appropriate template-based caption."""
-    display_name = show_data.get("display_name", title)
-    hooks = show_data.get("caption_hooks", [])
-    tone = show_data.get("tone", "")
-    synopsis = show_data.get("synopsis", "")
+    profile = config.profile(show_key)
+    display_name = profile["data"].get("display_name", title)
+    hooks = profile["hooks"]
 
     # Seed for deterministic variety per entry
     seed = f"{show_key}_{platform}_{clip_num}_{title}"
@@ -264,23 +373,13 @@ def generate_caption(show_key, show_data, platform, clip_num, title, hashtag_con
 
     # Clip context line
     clip_label = CLIP_ARC_LABELS.get(clip_num, "")
-    clip_context = ""
-    if clip_num and clip_label:
-        clip_contexts = {
-            1: "This is where it all starts.",
-            2: "Things are about to escalate.",
-            3: "You didn't see this coming.",
-            4: "The confrontation you've been waiting for.",
-            5: "Right on the edge. No resolution yet.",
-        }
-        clip_context = clip_contexts.get(clip_num, "")
+    clip_context = CLIP_CONTEXTS.get(clip_num, "") if clip_num and clip_label else ""
 
     # Build hashtags
-    hashtags = build_hashtag_string(show_key, platform, hashtag_config, seed)
+    hashtags = build_hashtag_string(show_key, platform, config, seed)
 
-    # Get mentions for IG
-    mentions = get_collaborator_mentions(show_data)
-    mention_str = " ".join(mentions) if mentions else ""
+    # Mentions for IG
+    mention_str = profile["mention_str"]
 
     # --- Platform-specific templates ---
 
@@ -321,10 +420,8 @@ def generate_caption(show_key, show_data, platform, clip_num, title, hashtag_con
 
     elif platform == "LinkedIn":
         # Professional/industry angle
-        genre = show_data.get("genre", "drama")
-        cast = show_data.get("cast", show_data.get("characters", []))
-        cast_names = [c.get("actor", c.get("name", "")) for c in cast[:3] if isinstance(c, dict)]
-        cast_line = f"Featuring {', '.join(cast_names)}." if cast_names else ""
+        genre = profile["genre"]
+        cast_line = profile["cast_line"]
 
         templates = [
             f"{hook}\n\n{display_name} is a vertical-first {genre.lower()} series streaming free on VURT -- the platform built for mobile cinema. {cast_line}\n\nWatch at myvurt.com\n\n{hashtags}",
@@ -379,6 +476,54 @@ def extract_calendar_entry(page):
     }
 
 
+def caption_hash(text):
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def load_drafts():
+    try:
+        with open(DRAFTS_FILE) as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def save_drafts(drafts):
+    tmp = f"{DRAFTS_FILE}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(drafts, f)
+    os.replace(tmp, DRAFTS_FILE)
+
+
+def is_unedited_draft(entry, drafts):
+    """True if the caption is still exactly the draft this script last wrote."""
+    return (entry["caption"].startswith(DRAFT_PREFIX)
+            and drafts.get(entry["id"]) == caption_hash(entry["caption"]))
+
+
+def plan_caption(entry, config):
+    """Caption + Notion patch for one entry, diffed against its current values. None if no show matches."""
+    show_key = config.match_show(entry["title"])
+    if not show_key:
+        return None
+    platforms = entry["platforms"] or ["Instagram"]  # Default
+    clip_num = entry["clip_num"] or 1  # Default to hook
+
+    # Generate a caption for the first/primary platform
+    # (Calendar entries typically target one platform combo)
+    caption, hashtags_str = generate_caption(show_key, platforms[0], clip_num, entry["title"], config)
+    draft_caption = f"{DRAFT_PREFIX}{caption}"
+
+    patch = {}
+    if entry["caption"] != draft_caption[:2000]:
+        patch["Caption"] = {"rich_text": [{"text": {"content": draft_caption[:2000]}}]}
+    # Also fill Hashtags if empty
+    if not entry["hashtags"]:
+        patch["Hashtags"] = {"rich_text": [{"text": {"content": hashtags_str[:2000]}}]}
+    return {"entry": entry, "platforms": platforms, "clip_num": clip_num,
+            "caption": draft_caption, "hashtags": hashtags_str, "patch": patch}
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Generate draft captions for VURT Content Calendar entries in Notion.",
@@ -390,10 +535,12 @@ Examples:
   %(prog)s --show parking-lot    Only generate for Parking Lot Series
   %(prog)s --all --dry-run       Preview what would be generated
   %(prog)s --show karma --dry-run Preview Karma captions only
+  %(prog)s --all --regenerate    Refresh existing [DRAFT] captions too
 
 The script reads show profiles from data/shows.yaml and hashtag
 config from data/hashtags.yaml. Captions are template-based using
 hooks, clip arc context, and platform-specific formatting rules.
+Only fields whose value actually changes are written back.
 
 Requires VURT_NOTION_API_KEY environment variable.
         """,
@@ -401,6 +548,10 @@ Requires VURT_NOTION_API_KEY environment variable.
     parser.add_argument("--all", action="store_true", help="Generate captions for all entries with empty Caption fields")
     parser.add_argument("--show", type=str, help="Only generate for a specific show (keyword match, e.g. 'karma', 'parking-lot')")
     parser.add_argument("--dry-run", action="store_true", help="Preview generated captions without writing to Notion")
+    parser.add_argument("--regenerate", action="store_true",
+                        help="Also regenerate entries whose caption is still the unedited [DRAFT] this script wrote")
+    parser.add_argument("--workers", type=int, default=NOTION_WORKERS, help="Concurrent Notion writes (default: 3)")
+    parser.add_argument("--rate", type=float, default=NOTION_RATE, help="Max Notion requests/sec (default: 3)")
     args = parser.parse_args()
 
     if not args.all and not args.show:
@@ -408,13 +559,9 @@ Requires VURT_NOTION_API_KEY environment variable.
         sys.exit(1)
 
     # Load data
-    print("Loading show profiles...")
-    shows = load_shows()
-    print(f"  Loaded {len(shows)} shows")
-
-    print("Loading hashtag config...")
-    hashtag_config = load_hashtags()
-    print(f"  Loaded hashtags for {len(hashtag_config.get('shows', {}))} shows")
+    print("Loading show profiles and hashtag config...")
+    config = CaptionConfig()
+    print(f"  Loaded {len(config.shows)} shows, hashtags for {len(config.hashtag_config.get('shows', {}))} shows")
 
     # Fetch calendar entries
     print("\nFetching Content Calendar from Notion...")
@@ -423,92 +570,83 @@ Requires VURT_NOTION_API_KEY environment variable.
     print(f"  Found {len(entries)} total entries")
 
     # Filter to entries needing captions
-    needs_caption = [e for e in entries if not e["caption"]]
-    print(f"  {len(needs_caption)} entries have empty Caption fields")
+    drafts = load_drafts()
+    needs_caption = [e for e in entries if not e["caption"]
+                     or (args.regenerate and is_unedited_draft(e, drafts))]
+    print(f"  {len(needs_caption)} entries have empty{' or unedited draft' if args.regenerate else ''} Caption fields")
+    if args.regenerate:
+        edited = sum(1 for e in entries if e["caption"].startswith(DRAFT_PREFIX) and not is_unedited_draft(e, drafts))
+        if edited:
+            print(f"  {edited} [DRAFT] captions edited (or not written by this script) are left alone")
 
     # Filter by show if specified
     if args.show:
         show_filter = args.show.lower()
-        filtered = []
-        for e in needs_caption:
-            matched_key = match_show(e["title"], shows)
-            if matched_key and show_filter in matched_key:
-                filtered.append(e)
-            elif show_filter in e["title"].lower():
-                filtered.append(e)
-        needs_caption = filtered
+        needs_caption = [e for e in needs_caption
+                         if show_filter in (config.match_show(e["title"]) or "") or show_filter in e["title"].lower()]
         print(f"  {len(needs_caption)} entries match show filter '{args.show}'")
 
     if not needs_caption:
         print("\nNo entries need captions. Done.")
         return
 
-    # Generate captions
+    # Generate captions (all in memory, before any write)
     prefix = "[DRY RUN] " if args.dry_run else ""
     print(f"\n{prefix}Generating captions for {len(needs_caption)} entries...\n")
 
-    generated = 0
+    plans = []
     skipped = 0
-
     for entry in needs_caption:
-        show_key = match_show(entry["title"], shows)
-        if not show_key:
+        plan = plan_caption(entry, config)
+        if plan is None:
             print(f"  SKIP: No show profile match for '{entry['title']}'")
             skipped += 1
             continue
-
-        show_data = shows[show_key]
-        platforms = entry["platforms"]
-        if not platforms:
-            platforms = ["Instagram"]  # Default
-
-        clip_num = entry["clip_num"]
-        if not clip_num:
-            clip_num = 1  # Default to hook
-
-        # Generate a caption for the first/primary platform
-        # (Calendar entries typically target one platform combo)
-        primary_platform = platforms[0]
-        caption, hashtags_str = generate_caption(
-            show_key, show_data, primary_platform, clip_num,
-            entry["title"], hashtag_config,
-        )
-
-        # Prefix with [DRAFT]
-        draft_caption = f"[DRAFT] {caption}"
+        plans.append(plan)
+        draft_caption, hashtags_str = plan["caption"], plan["hashtags"]
 
         # Display
         print(f"  {entry['title']}")
-        print(f"    Platform: {', '.join(platforms)} | Clip: {clip_num} ({CLIP_ARC_LABELS.get(clip_num, 'N/A')})")
+        print(f"    Platform: {', '.join(plan['platforms'])} | Clip: {plan['clip_num']} ({CLIP_ARC_LABELS.get(plan['clip_num'], 'N/A')})")
         print(f"    Caption: {draft_caption[:120]}{'...' if len(draft_caption) > 120 else ''}")
         if not entry["hashtags"]:
             print(f"    Hashtags: {hashtags_str[:80]}{'...' if len(hashtags_str) > 80 else ''}")
+        if not plan["patch"]:
+            print("    (unchanged)")
         print()
 
-        # Write to Notion
-        if not args.dry_run:
-            patch = {
-                "Caption": {
-                    "rich_text": [{"text": {"content": draft_caption[:2000]}}]
-                },
-            }
-            # Also fill Hashtags if empty
-            if not entry["hashtags"]:
-                patch["Hashtags"] = {
-                    "rich_text": [{"text": {"content": hashtags_str[:2000]}}]
-                }
+    changed = [p for p in plans if p["patch"]]
+    unchanged = len(plans) - len(changed)
+    written = [p for p in plans if "Caption" not in p["patch"]]
 
-            try:
-                update_page(entry["id"], patch)
+    # Write to Notion
+    generated = 0
+    if args.dry_run:
+        generated = len(changed)
+    elif changed:
+        by_id = {p["entry"]["id"]: p for p in changed}
+        print(f"Writing {len(changed)} entries to Notion ({args.workers} workers, {args.rate:g} req/s)...")
+        start = time.time()
+        writer = NotionWriter(workers=args.workers, rate=args.rate)
+        for page_id, error in writer.flush([(p["entry"]["id"], p["patch"]) for p in changed]):
+            if error:
+                print(f"    ERROR writing '{by_id[page_id]['entry']['title']}' to Notion: {error}")
+            else:
                 generated += 1
-            except Exception as ex:
-                print(f"    ERROR writing to Notion: {ex}")
-        else:
-            generated += 1
+                if "Caption" in by_id[page_id]["patch"]:
+                    written.append(by_id[page_id])
+        print(f"  Done in {time.time() - start:.1f}s")
+
+    # Remember what was written so --regenerate can tell human edits apart
+    if not args.dry_run and written:
+        drafts.update({p["entry"]["id"]: caption_hash(p["caption"][:2000]) for p in written})
+        save_drafts(drafts)
 
     # Summary
     print(f"\n{'[DRY RUN] ' if args.dry_run else ''}Summary:")
     print(f"  {generated} captions {'would be ' if args.dry_run else ''}generated")
+    if unchanged:
+        print(f"  {unchanged} entries already up to date (not written)")
     if skipped:
         print(f"  {skipped} entries skipped (no matching show profile)")
     print("Done.")
@@ -6,12 +6,18 @@ Ground truth = Frame.io Status tag ("Posted" / "Approved" / "Needs Review" /
 only to link Posted clips to their TikTok post metrics. Tag wins over match.
 
 Writes per-show CLIP_MAP.md + cross-show CROSS_SHOW_SUMMARY.json.
+
+Captions are looked up through a shingle index (CaptionIndex) persisted next
+to the TikTok scrape and refreshed incrementally for new/edited captions.
 """
-import json, os, re
+import hashlib, json, os, re
+from collections import Counter, defaultdict
 
 INV = "/home/workspace/Skills/vurt-captions/footage/inventory.json"
 TT = "/home/workspace/Skills/vurt-post-log/data/tiktok_user_url_scrape.json"
+TT_INDEX = "/home/workspace/Skills/vurt-post-log/data/tiktok_caption_index.json"
 FOOTAGE = "/home/workspace/Skills/vurt-captions/footage"
+SHINGLE = 3
 
 
 def slug(s):
@@ -46,10 +52,78 @@ def load_posts():
     return out
 
 
-def find_match(transcript_text, posts):
+class CaptionIndex:
+    """Token and token-trigram postings over normalized captions.
+
+    A fragment "w1 w2 w3 w4 w5" can only be a substring of a caption whose
+    tokens contain "w2 w3 w4" consecutively (the inner words are bounded by
+    spaces on both sides), so the trigram postings give an exact candidate
+    set and the substring test only runs on those captions. Shorter fragments
+    fall back to intersecting token postings, or to every caption.
+
+    Per-caption tokens/shingles are stored in TT_INDEX keyed by a digest of the
+    normalized caption, so only new or edited captions are re-shingled.
+    """
+
+    def __init__(self, posts, path=TT_INDEX):
+        self.posts = posts
+        self.by_shingle = defaultdict(list)
+        self.by_token = defaultdict(list)
+        self.captioned = []
+        try:
+            stored = json.load(open(path))
+        except (OSError, ValueError):
+            stored = {}
+        entries = {}
+        for i, p in enumerate(posts):
+            if not p["cap_n"]:
+                continue
+            self.captioned.append(i)
+            d = hashlib.sha1(p["cap_n"].encode()).hexdigest()[:16]
+            e = entries.get(d) or stored.get(d)
+            if e is None:
+                w = p["cap_n"].split()
+                e = {"t": sorted(set(w)),
+                     "s": sorted({" ".join(w[j:j+SHINGLE]) for j in range(len(w) - SHINGLE + 1)})}
+            entries[d] = e
+            for sh in e["s"]:
+                self.by_shingle[sh].append(i)
+            for t in e["t"]:
+                self.by_token[t].append(i)
+        self.added = len(entries.keys() - stored.keys())
+        if entries.keys() != stored.keys():
+            tmp = f"{path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp, path)
+
+    def candidates(self, frag):
+        inner = frag.split()[1:-1]
+        if len(inner) >= SHINGLE:
+            return self.by_shingle.get(" ".join(inner[:SHINGLE]), ())
+        if inner:
+            found = set(self.by_token.get(inner[0], ()))
+            for t in inner[1:]:
+                found &= set(self.by_token.get(t, ()))
+            return sorted(found)
+        return self.captioned
+
+
+def find_match(transcript_text, posts, index=None):
     if not transcript_text.strip():
         return None, 0
     frags = fragments(transcript_text)
+    if index is not None:
+        hits = Counter()
+        for f in frags:
+            for i in index.candidates(f):
+                if f in posts[i]["cap_n"]:
+                    hits[i] += 1
+        if not hits:
+            return None, 0
+        # Most hits, earliest post on ties — same as the linear scan below.
+        i = min(hits, key=lambda i: (-hits[i], i))
+        return posts[i], hits[i]
     best = None
     best_hits = 0
     for p in posts:
@@ -92,6 +166,7 @@ BUCKET_ORDER = [
 def main():
     inv = json.load(open(INV))
     posts = load_posts()
+    index = CaptionIndex(posts)
     summary = {}
 
     for show, meta in inv.items():
@@ -106,7 +181,7 @@ def main():
             dur = json.load(open(jpath)).get("audio_duration", 0) if os.path.exists(jpath) else 0
             rs = clip.get("review_status") or ""
 
-            match, hits = find_match(transcript, posts)
+            match, hits = find_match(transcript, posts, index)
 
             if rs in BUCKET:
                 bucket = BUCKET[rs]
@@ -7,6 +7,9 @@ from datetime import datetime, timedelta
 
 import requests
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "vurt-post-log", "scripts"))
+import meta_client  # noqa: E402
+
 BASE_URL = "https://graph.facebook.com/v25.0"
 IG_ACCOUNT_ID = "17841479978232203"
 FB_PAGE_ID = "943789668811148"
@@ -111,23 +114,27 @@ def cmd_daily(args):
             day += timedelta(days=1)
         dates = sorted(set(dates))
 
+    # One sub-request per (metric, day), all sent through the Graph batch endpoint
+    subs = []
     for metric in total_value_metrics:
         for date_str in dates:
             day_start = datetime.strptime(date_str, "%Y-%m-%d")
             day_end = day_start + timedelta(days=1)
-            try:
-                day_data = api_get(f"{IG_ACCOUNT_ID}/insights", {
-                    "metric": metric,
-                    "metric_type": "total_value",
-                    "period": "day",
-                    "since": int(day_start.timestamp()),
-                    "until": int(day_end.timestamp()),
-                })
-                for entry in day_data.get("data", []):
-                    val = entry.get("total_value", {}).get("value", 0)
-                    results.setdefault(date_str, {})[entry["name"]] = val
-            except SystemExit:
-                results.setdefault(date_str, {})[metric] = "N/A"
+            subs.append((metric, date_str, (f"{IG_ACCOUNT_ID}/insights", {
+                "metric": metric,
+                "metric_type": "total_value",
+                "period": "day",
+                "since": int(day_start.timestamp()),
+                "until": int(day_end.timestamp()),
+            })))
+    bodies = meta_client.batch([sub for _, _, sub in subs], token=get_token())
+    for (metric, date_str, _), body in zip(subs, bodies):
+        if isinstance(body, meta_client.GraphError):
+            results.setdefault(date_str, {})[metric] = "N/A"
+            continue
+        for entry in body.get("data", []):
+            val = entry.get("total_value", {}).get("value", 0)
+            results.setdefault(date_str, {})[entry["name"]] = val
 
     if args.json:
         print(json.dumps(results, indent=2))
@@ -173,19 +180,19 @@ def cmd_weekly(args):
         values = [v["value"] for v in metric_entry.get("values", []) if isinstance(v.get("value"), (int, float))]
         summary[name] = sum(values) if name != "follower_count" else (values[-1] if values else 0)
 
-    for metric in total_value_metrics:
-        try:
-            data = api_get(f"{IG_ACCOUNT_ID}/insights", {
-                "metric": metric,
-                "metric_type": "total_value",
-                "period": "day",
-                "since": since_ts,
-                "until": until_ts,
-            })
-            for entry in data.get("data", []):
-                summary[entry["name"]] = entry.get("total_value", {}).get("value", 0)
-        except SystemExit:
+    bodies = meta_client.batch([(f"{IG_ACCOUNT_ID}/insights", {
+        "metric": metric,
+        "metric_type": "total_value",
+        "period": "day",
+        "since": since_ts,
+        "until": until_ts,
+    }) for metric in total_value_metrics], token=get_token())
+    for metric, body in zip(total_value_metrics, bodies):
+        if isinstance(body, meta_client.GraphError):
             summary[metric] = "N/A"
+            continue
+        for entry in body.get("data", []):
+            summary[entry["name"]] = entry.get("total_value", {}).get("value", 0)
 
     if args.json:
         print(json.dumps(summary, indent=2))
@@ -213,17 +220,17 @@ def cmd_posts(args):
         print("No posts found.")
         return
 
+    # Shared cache with the post-log sync and the daily social report
+    cache = meta_client.InsightsCache()
+    found = meta_client.fetch_insights(
+        ((p["id"], p.get("timestamp")) for p in posts), "reach,saved,shares,views",
+        token=get_token(), cache=cache,
+    )
+    cache.save()
     enriched = []
     for post in posts:
         post_insights = {"reach": "N/A", "saved": "N/A", "shares": "N/A", "views": "N/A"}
-        try:
-            insights_data = api_get(f"{post['id']}/insights", {
-                "metric": "reach,saved,shares,views",
-            })
-            for entry in insights_data.get("data", []):
-                post_insights[entry["name"]] = entry.get("values", [{}])[0].get("value", 0)
-        except SystemExit:
-            pass
+        post_insights.update(found.get(post["id"], {}))
         enriched.append({**post, **post_insights})
 
     if args.json:
@@ -0,0 +1,790 @@
+#!/usr/bin/env python3
+"""AssemblyAI transcription job manager: one job table, bounded submission, pluggable sinks.
+
+- Jobs live in a SQLite table (.aai-jobs.db) keyed by (namespace, key), so a
+  re-run resumes in-flight transcripts instead of re-submitting them, and
+  finished ones are skipped.
+- Submission is concurrent but capped at `max_inflight` open transcripts
+  (the provider's concurrency limit); the rest wait in the table as pending.
+- Completion comes from a local webhook receiver when VURT_AAI_WEBHOOK_URL is
+  set, otherwise from one scheduler loop that re-checks each transcript with
+  exponential backoff. No thread ever sleeps on a single transcript.
+- Finished transcripts are handed to sinks (transcript JSON, caption inventory,
+  SRT, or anything registered with register_sink()), whose return values are
+  stored as the job's result.
+- Before submitting, the media is fingerprinted (size + first/middle/last MiB,
+  read with HTTP Range requests or file seeks) and looked up in a transcript
+  store in the same database. Re-exported or duplicated clips reuse the
+  earlier transcript instead of being transcribed again.
+
+- run(feed=queue) keeps accepting jobs while it runs, so an upstream stage
+  (downloads, say) can hand items over as they become ready.
+
+ASSEMBLYAI_BASE_URL / ASSEMBLYAI_LLM_BASE_URL override the API bases, e.g. to
+point at a local mock server.
+
+Used by vurt-captions/scripts/batch_transcribe_all.py, vurt-captions/scripts/caption_pipeline.py,
+vurt-subtitles/scripts/frameio-batch.py and vurt-subtitles/scripts/mux-batch-srt.py.
+
+Usage:
+    python3 aai_jobs.py status [--namespace frameio-srt]
+    python3 aai_jobs.py fingerprint FILE_OR_URL
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import queue
+import secrets
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+AAI_BASE = os.environ.get("ASSEMBLYAI_BASE_URL", "https://api.assemblyai.com/v2")
+LLM_BASE = os.environ.get("ASSEMBLYAI_LLM_BASE_URL", "https://llm-gateway.assemblyai.com/v1")
+DB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".aai-jobs.db")
+TIMEOUT = 30
+
+MAX_INFLIGHT = 32     # open transcripts at the provider at once
+IO_WORKERS = 8        # threads for submits, status checks and sinks
+POLL_MIN = 5          # first status check after submit (seconds)
+POLL_MAX = 60         # backoff ceiling per transcript
+WEBHOOK_POLL = 300    # safety-net poll interval when webhooks are on
+WEBHOOK_HEADER = "X-Vurt-Webhook-Secret"
+FINGERPRINT_CHUNK = 1 << 20  # bytes hashed at the start, middle and end of the media
+
+ACTIVE = ("queued", "processing")
+
+
+class TransientError(Exception):
+    """Rate limit or server error; the caller should back off and retry."""
+
+
+# --- HTTP client ---
+class AssemblyAI:
+    def __init__(self, api_key=None, base=None, user_agent=None, llm_base=None):
+        self.api_key = api_key or os.environ.get("ASSEMBLYAI_API_KEY", "")
+        if not self.api_key:
+            raise RuntimeError("ASSEMBLYAI_API_KEY not set")
+        self.base = (base or AAI_BASE).rstrip("/")
+        self.llm_base = (llm_base or LLM_BASE).rstrip("/")
+        self.headers = {"authorization": self.api_key}
+        if user_agent:
+            self.headers["User-Agent"] = user_agent
+
+    def _request(self, path, body=None, raw=False, timeout=TIMEOUT):
+        headers = dict(self.headers)
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers["content-type"] = "application/json"
+        url = path if path.startswith(("http://", "https://")) else f"{self.base}{path}"
+        req = urllib.request.Request(url, data=data, headers=headers,
+                                     method="POST" if data is not None else "GET")
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as r:
+                payload = r.read()
+        except urllib.error.HTTPError as e:
+            detail = e.read().decode(errors="replace")[:300]
+            if e.code == 429 or e.code >= 500:
+                raise TransientError(f"HTTP {e.code}: {detail}") from None
+            raise RuntimeError(f"HTTP {e.code}: {detail}") from None
+        except (urllib.error.URLError, TimeoutError) as e:
+            raise TransientError(str(e)) from None
+        return payload.decode() if raw else json.loads(payload)
+
+    def submit(self, audio_url, config=None):
+        return self._request("/transcript", {"audio_url": audio_url, **(config or {})})["id"]
+
+    def get(self, transcript_id):
+        return self._request(f"/transcript/{transcript_id}")
+
+    def srt(self, transcript_id, chars_per_caption=None):
+        qs = f"?chars_per_caption={chars_per_caption}" if chars_per_caption else ""
+        return self._request(f"/transcript/{transcript_id}/srt{qs}", raw=True)
+
+    def translate(self, transcript_id, languages, formal=True):
+        """Speech-understanding translation of a finished transcript.
+
+        The response carries translated_texts {lang: text} and, per utterance,
+        translated_texts with the original timings and speaker kept.
+        """
+        body = {"transcript_id": transcript_id, "speech_understanding": {"request": {"translation": {
+            "target_languages": list(languages), "formal": formal, "match_original_utterance": True}}}}
+        return self._request(f"{self.llm_base}/understanding", body, timeout=300)
+
+    def upload(self, path):
+        """Stream a local file to /upload. Returns the upload_url to transcribe."""
+        headers = {**self.headers, "content-type": "application/octet-stream",
+                   "Content-Length": str(os.path.getsize(path))}
+        with open(path, "rb") as f:
+            req = urllib.request.Request(f"{self.base}/upload", data=f, headers=headers, method="POST")
+            try:
+                with urllib.request.urlopen(req, timeout=600) as r:
+                    return json.loads(r.read())["upload_url"]
+            except urllib.error.HTTPError as e:
+                if e.code == 429 or e.code >= 500:
+                    raise TransientError(f"HTTP {e.code}") from None
+                raise RuntimeError(f"HTTP {e.code}: {e.read().decode(errors='replace')[:300]}") from None
+
+
+# --- Media fingerprints ---
+def _read_range(url, start, length):
+    """(bytes, total size, honoured) for one HTTP Range request."""
+    req = urllib.request.Request(url, headers={"Range": f"bytes={start}-{start + length - 1}"})
+    with urllib.request.urlopen(req, timeout=TIMEOUT) as r:
+        data = r.read(length)
+        if r.status == 206:
+            total = (r.headers.get("Content-Range") or "").rpartition("/")[2]
+            return data, int(total) if total.isdigit() else None, True
+        return data, int(r.headers.get("Content-Length") or 0) or None, False
+
+
+def _ranges(total, chunk):
+    """Offsets of the middle and last chunk for a file of `total` bytes."""
+    if not total or total <= chunk:
+        return []
+    return [max(0, total // 2 - chunk // 2), max(0, total - chunk)]
+
+
+def fingerprint_url(url, chunk=FINGERPRINT_CHUNK):
+    """Content fingerprint of remote media from three ranged reads (no full download).
+
+    Raises ValueError when the server ignores Range on media larger than one
+    chunk: hashing only the head would not match fingerprint_file().
+    """
+    head, total, ranged = _read_range(url, 0, chunk)
+    if total is None or not (ranged or len(head) == total):
+        raise ValueError("server ignored the Range request")
+    h = hashlib.sha256(f"{total}:".encode())
+    h.update(head)
+    for start in _ranges(total, chunk):
+        data, _, ranged = _read_range(url, start, chunk)
+        if not ranged:
+            raise ValueError("server ignored the Range request")
+        h.update(data)
+    return f"r{chunk}:{h.hexdigest()}"
+
+
+def fingerprint_file(path, chunk=FINGERPRINT_CHUNK):
+    """Same fingerprint as fingerprint_url() for a local copy of the media."""
+    total = os.path.getsize(path)
+    h = hashlib.sha256(f"{total}:".encode())
+    with open(path, "rb") as f:
+        h.update(f.read(chunk))
+        for start in _ranges(total, chunk):
+            f.seek(start)
+            h.update(f.read(chunk))
+    return f"r{chunk}:{h.hexdigest()}"
+
+
+# --- Transcript store ---
+class TranscriptStore:
+    """Finished transcripts keyed by (media fingerprint, request config), shared by all namespaces."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS transcripts (
+        fingerprint TEXT NOT NULL,
+        config      TEXT NOT NULL,
+        tid         TEXT,
+        transcript  BLOB,
+        created_at  REAL,
+        hits        INTEGER DEFAULT 0,
+        last_hit    REAL,
+        PRIMARY KEY (fingerprint, config)
+    );
+    """
+
+    def __init__(self, db_path=DB_FILE):
+        # Looked up from worker threads, so one connection behind a lock.
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(self.SCHEMA)
+        self.lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+
+    @staticmethod
+    def config_key(config):
+        return hashlib.sha1(json.dumps(config or {}, sort_keys=True).encode()).hexdigest()[:16]
+
+    def get(self, fingerprint, config):
+        """(tid, transcript) for a previously transcribed fingerprint, else None."""
+        key = self.config_key(config)
+        with self.lock:
+            self.lookups += 1
+            row = self.db.execute("SELECT tid, transcript FROM transcripts WHERE fingerprint=? AND config=?",
+                                  (fingerprint, key)).fetchone()
+            if row is None:
+                return None
+            self.hits += 1
+            with self.db:
+                self.db.execute("UPDATE transcripts SET hits=hits+1, last_hit=? WHERE fingerprint=? AND config=?",
+                                (time.time(), fingerprint, key))
+        return row[0], json.loads(zlib.decompress(row[1]))
+
+    def put(self, fingerprint, config, tid, transcript):
+        blob = zlib.compress(json.dumps(transcript).encode())
+        with self.lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO transcripts (fingerprint, config, tid, transcript, created_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (fingerprint, self.config_key(config), tid, blob, time.time()))
+
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
+
+
+# --- Sinks ---
+SINKS = {}
+
+
+def register_sink(name, fn, always=False):
+    """Register fn(job, transcript, client, **params) -> dict | None under `name`.
+
+    Sinks run on a worker thread once a transcript completes; the returned
+    dicts are merged into the job's result. `always` sinks also run when a
+    job ends in error (with transcript=None), e.g. to release temporary URLs.
+    """
+    SINKS[name] = (fn, always)
+
+
+def _write_atomic(path, text):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def transcript_json_sink(job, transcript, client, path):
+    """Full provider response as JSON."""
+    _write_atomic(path, json.dumps(transcript, indent=2))
+    return {"transcript_path": path, "audio_duration": transcript.get("audio_duration", 0)}
+
+
+def caption_inventory_sink(job, transcript, client, path):
+    """footage/<show>/transcripts/<file_id>.json + .txt, the layout match_and_analyze reads."""
+    out = {
+        "text": transcript.get("text", "") or "",
+        "audio_duration": transcript.get("audio_duration", 0),
+        "utterances": transcript.get("utterances", []) or [],
+    }
+    _write_atomic(path, json.dumps(out, indent=2))
+    _write_atomic(path.replace(".json", ".txt"), out["text"])
+    return {"transcript_path": path, "audio_duration": out["audio_duration"]}
+
+
+def srt_sink(job, transcript, client, path, chars_per_caption=None):
+    """Provider-rendered SRT."""
+    _write_atomic(path, client.srt(job["tid"], chars_per_caption))
+    return {"srt_path": path, "audio_duration": transcript.get("audio_duration", 0)}
+
+
+register_sink("transcript_json", transcript_json_sink)
+register_sink("caption_inventory", caption_inventory_sink)
+register_sink("srt", srt_sink)
+
+
+# --- Webhook receiver ---
+class WebhookReceiver:
+    """Local HTTP endpoint for AssemblyAI completion callbacks.
+
+    `public_url` is what AssemblyAI calls (a tunnel or proxy forwarding to
+    `port` on this machine). Callbacks are checked against a per-process
+    secret header and queued as (transcript_id, status).
+    """
+
+    def __init__(self, public_url, port=8765):
+        self.public_url = public_url
+        self.port = port
+        self.secret = secrets.token_hex(16)
+        self.events = queue.Queue()
+        self._server = None
+
+    def start(self):
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if self.headers.get(WEBHOOK_HEADER) != receiver.secret:
+                    self.send_response(403)
+                    self.end_headers()
+                    return
+                try:
+                    event = json.loads(body)
+                    receiver.events.put((event["transcript_id"], event.get("status")))
+                    self.send_response(200)
+                except (ValueError, KeyError):
+                    self.send_response(400)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("", self.port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def submit_config(self):
+        return {
+            "webhook_url": self.public_url,
+            "webhook_auth_header_name": WEBHOOK_HEADER,
+            "webhook_auth_header_value": self.secret,
+        }
+
+
+def webhook_from_env():
+    """WebhookReceiver when VURT_AAI_WEBHOOK_URL is set, else None (polling)."""
+    url = os.environ.get("VURT_AAI_WEBHOOK_URL", "")
+    if not url:
+        return None
+    return WebhookReceiver(url, int(os.environ.get("VURT_AAI_WEBHOOK_PORT", "8765")))
+
+
+# --- Job table ---
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    namespace    TEXT NOT NULL,
+    key          TEXT NOT NULL,
+    tid          TEXT,
+    status       TEXT NOT NULL,
+    audio_url    TEXT,
+    config       TEXT,
+    sinks        TEXT,
+    meta         TEXT,
+    result       TEXT,
+    error        TEXT,
+    polls        INTEGER DEFAULT 0,
+    created_at   REAL,
+    submitted_at REAL,
+    finished_at  REAL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS jobs_tid ON jobs(tid);
+"""
+JSON_COLUMNS = ("config", "sinks", "meta", "result")
+
+
+def _outputs_missing(sinks):
+    """True if a sink's output file (its `path` param) is gone."""
+    return any(spec.get("path") and not os.path.exists(spec["path"]) for spec in sinks)
+
+
+def _row_to_job(row):
+    job = dict(row)
+    for col in JSON_COLUMNS:
+        job[col] = json.loads(job[col]) if job[col] else ({} if col != "sinks" else [])
+    return job
+
+
+class JobManager:
+    """Submit, track and finish AssemblyAI transcripts for one namespace of the job table."""
+
+    def __init__(self, namespace, db_path=DB_FILE, client=None, max_inflight=MAX_INFLIGHT,
+                 io_workers=IO_WORKERS, webhook=None, log=print, use_cache=True):
+        self.namespace = namespace
+        self.store = TranscriptStore(db_path) if use_cache else None
+        self.client = client or AssemblyAI()
+        self.max_inflight = max_inflight
+        self.io_workers = io_workers
+        self.webhook = webhook
+        self.log = log
+        self.db = sqlite3.connect(db_path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self._sources = {}
+        self._session = []
+        self._claims = {}  # fingerprint -> key being transcribed this run
+        self._claims_lock = threading.Lock()
+
+    # Table access (main thread only)
+    def job(self, key):
+        row = self.db.execute("SELECT * FROM jobs WHERE namespace=? AND key=?",
+                              (self.namespace, key)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def jobs(self, statuses=None):
+        sql, args = "SELECT * FROM jobs WHERE namespace=?", [self.namespace]
+        if statuses:
+            sql += f" AND status IN ({','.join('?' * len(statuses))})"
+            args += list(statuses)
+        return [_row_to_job(r) for r in self.db.execute(sql, args)]
+
+    def _update(self, key, **fields):
+        for col in JSON_COLUMNS:
+            if col in fields:
+                fields[col] = json.dumps(fields[col])
+        cols = ", ".join(f"{c}=?" for c in fields)
+        with self.db:
+            self.db.execute(f"UPDATE jobs SET {cols} WHERE namespace=? AND key=?",
+                            [*fields.values(), self.namespace, key])
+
+    def add(self, key, audio_url=None, source=None, config=None, sinks=(), meta=None,
+            retry_errors=False, audio_path=None, force=False):
+        """Queue a transcript (idempotent). Returns the job's status after adding.
+
+        `source` is an optional callable run on a worker at submit time, for
+        URLs that expire or need setting up; it returns the audio URL or
+        (audio_url, extra_meta). A "fingerprint" in extra_meta (e.g. a provider
+        checksum) replaces the ranged hash. `audio_path` is a local file,
+        uploaded only if the transcript store misses.
+        `sinks` is a list of {"type": name, **params}.
+        An existing finished job is kept; if its sinks changed, an output file
+        they wrote is missing, or `force` is set, they are re-run against the
+        stored transcript without re-transcribing.
+        """
+        sinks = list(sinks)
+        if audio_path:
+            meta = {**(meta or {}), "audio_path": audio_path}
+        self._session.append(key)
+        existing = self.job(key)
+        if existing is None:
+            with self.db:
+                self.db.execute(
+                    "INSERT INTO jobs (namespace, key, status, audio_url, config, sinks, meta, created_at)"
+                    " VALUES (?, ?, 'pending', ?, ?, ?, ?, ?)",
+                    (self.namespace, key, audio_url, json.dumps(config or {}), json.dumps(sinks),
+                     json.dumps(meta or {}), time.time()))
+            status = "pending"
+        else:
+            status = existing["status"]
+            if status == "done" and (force or existing["sinks"] != sinks or _outputs_missing(sinks)):
+                status = "queued"
+                self._update(key, status=status, sinks=sinks, polls=0)
+            elif status == "error" and retry_errors:
+                # Sink failures keep their transcript; provider failures start over.
+                status = "queued" if existing["tid"] and (existing["error"] or "").startswith("sink") else "pending"
+                self._update(key, status=status, sinks=sinks, error=None, polls=0,
+                             tid=existing["tid"] if status == "queued" else None)
+            elif status in ("pending",) + ACTIVE:
+                self._update(key, audio_url=audio_url or existing["audio_url"],
+                             config=config or existing["config"], sinks=sinks,
+                             meta={**existing["meta"], **(meta or {})})
+        if source is not None:
+            self._sources[key] = source
+        return status
+
+    # Worker-side tasks (no table access)
+    def _fingerprint(self, audio_url, audio_path):
+        try:
+            return fingerprint_url(audio_url) if audio_url else fingerprint_file(audio_path)
+        except (OSError, ValueError) as e:
+            self.log(f"  fingerprint failed ({e}); transcribing without cache")
+            return None
+
+    def _submit(self, job, source):
+        """One of
+        ("submitted", tid, extra_meta)
+        ("cached", tid, extra_meta, status, result, error)   stored transcript, sinks already run
+        ("deferred", fingerprint)                            same media already in flight this run
+        ("error", result, message, fingerprint)              after `always` sinks have cleaned up
+        """
+        extra = {}
+        try:
+            audio_url = job["audio_url"]
+            audio_path = job["meta"].get("audio_path")
+            if source is not None:
+                got = source()
+                audio_url, extra = got if isinstance(got, tuple) else (got, {})
+            if not audio_url and not audio_path:
+                raise RuntimeError("no audio URL")
+            if self.store is not None:
+                fp = extra.get("fingerprint") or self._fingerprint(audio_url, audio_path)
+                hit = self.store.get(fp, job["config"]) if fp else None
+                if fp:
+                    extra["fingerprint"] = fp
+                if hit:
+                    tid, transcript = hit
+                    result, failed = self._run_sinks({**job, "tid": tid, "meta": {**job["meta"], **extra}},
+                                                     transcript)
+                    result["from_cache"] = True
+                    return ("cached", tid, extra, "error" if failed else "done", result, failed)
+                if fp:
+                    with self._claims_lock:
+                        owner = self._claims.setdefault(fp, job["key"])
+                    if owner != job["key"]:
+                        # Wait for the copy in flight, then hit the store.
+                        self._run_sinks({**job, "meta": {**job["meta"], **extra}}, None)
+                        return ("deferred", fp)
+            if not audio_url:
+                audio_url = self.client.upload(audio_path)
+            config = dict(job["config"])
+            if self.webhook:
+                config.update(self.webhook.submit_config())
+            return "submitted", self.client.submit(audio_url, config), extra
+        except Exception as e:
+            # Release whatever the source set up; a transient failure is retried from scratch.
+            result, _ = self._run_sinks({**job, "meta": {**job["meta"], **extra}}, None)
+            if isinstance(e, TransientError):
+                raise
+            return "error", result, f"submit: {e}", extra.get("fingerprint")
+
+    def _run_sinks(self, job, transcript):
+        result, failed = {}, None
+        for spec in job["sinks"]:
+            params = dict(spec)
+            name = params.pop("type")
+            try:
+                if name not in SINKS:
+                    raise ValueError("not registered")
+                fn, always = SINKS[name]
+                if transcript is None and not always:
+                    continue
+                result.update(fn(job, transcript, self.client, **params) or {})
+            except Exception as e:
+                failed = failed or f"sink {name}: {e}"
+        return result, failed
+
+    def _check(self, job):
+        try:
+            return self._check_status(job)
+        except TransientError:
+            raise
+        except Exception as e:
+            # Release whatever the source set up (e.g. a public playback URL).
+            result, _ = self._run_sinks(job, None)
+            return "error", result, f"status: {e}"
+
+    def _check_status(self, job):
+        transcript = self.client.get(job["tid"])
+        status = transcript.get("status")
+        if status == "completed":
+            fp = job["meta"].get("fingerprint")
+            if self.store is not None and fp:
+                self.store.put(fp, job["config"], job["tid"], transcript)
+            result, failed = self._run_sinks(job, transcript)
+            return ("error", result, failed) if failed else ("done", result, None)
+        if status == "error":
+            result, _ = self._run_sinks(job, None)
+            return "error", result, transcript.get("error") or "transcription failed"
+        return status, None, None
+
+    # Scheduler
+    def _runnable(self, job):
+        return job["status"] == "pending" and (
+            job["key"] in self._sources or job["audio_url"] or job["meta"].get("audio_path"))
+
+    def run(self, feed=None):
+        """Drive every job added this session to done/error. Returns {key: job}.
+
+        `feed` is an optional queue of add() keyword dicts that keeps being
+        drained while jobs run; put None on it once nothing more will come.
+        """
+        keys = list(dict.fromkeys(self._session))
+        jobs = {k: self.job(k) for k in keys}
+        pending = deque(k for k in keys if self._runnable(jobs[k]))
+        # key -> next status check time; inf while a check is running.
+        inflight = {k: 0 for k in keys if jobs[k]["status"] in ACTIVE}
+        by_tid = {jobs[k]["tid"]: k for k in inflight}
+        # Callbacks that arrived before their tid was registered or while its
+        # check was running; applied as soon as the job can be checked again.
+        early = set()
+        feed_open = feed is not None
+        interval = WEBHOOK_POLL if self.webhook else POLL_MIN
+        counts = {"submitted": 0, "cached": 0, "done": 0, "error": 0}
+        busy = {}  # future -> (kind, key)
+        deferred = {}  # fingerprint -> keys waiting on the job transcribing it
+        submitting = 0
+        pause_until = 0
+
+        if self.webhook:
+            self.webhook.start()
+        try:
+            with ThreadPoolExecutor(max_workers=self.io_workers) as pool:
+                while pending or inflight or busy or deferred or feed_open:
+                    while feed_open:
+                        try:
+                            item = feed.get_nowait()
+                        except queue.Empty:
+                            break
+                        if item is None:
+                            feed_open = False
+                            break
+                        key = item["key"]
+                        self.add(**item)
+                        if key not in jobs:
+                            keys.append(key)
+                        job = jobs[key] = self.job(key)
+                        if self._runnable(job) and key not in pending:
+                            pending.append(key)
+                        elif job["status"] in ACTIVE and key not in inflight:
+                            inflight[key] = 0
+                            by_tid[job["tid"]] = key
+                            early.discard(job["tid"])
+                    if deferred and not (pending or inflight or busy):
+                        # Owner finished without releasing (shouldn't happen); don't strand the waiters.
+                        pending.extend(k for keys in deferred.values() for k in keys)
+                        deferred.clear()
+                    now = time.time()
+                    if now >= pause_until:
+                        # Top up submissions to the in-flight cap.
+                        while pending and len(inflight) + submitting < self.max_inflight:
+                            key = pending.popleft()
+                            busy[pool.submit(self._submit, jobs[key], self._sources.get(key))] = ("submit", key)
+                            submitting += 1
+                        for key, due in inflight.items():
+                            if due <= now:
+                                inflight[key] = float("inf")
+                                busy[pool.submit(self._check, jobs[key])] = ("check", key)
+
+                    wake = min(inflight.values(), default=now + interval)
+                    timeout = min(POLL_MAX, max(0.05, max(wake, pause_until) - now))
+                    if self.webhook or feed_open:
+                        timeout = min(timeout, 0.25)  # drain callbacks and fed jobs promptly
+                    done = wait(list(busy), timeout=timeout, return_when=FIRST_COMPLETED)[0] if busy else ()
+                    if not busy:
+                        time.sleep(timeout)
+
+                    # Webhook callbacks make their transcript due immediately.
+                    if self.webhook:
+                        while True:
+                            try:
+                                tid, _ = self.webhook.events.get_nowait()
+                            except queue.Empty:
+                                break
+                            key = by_tid.get(tid)
+                            if key in inflight and inflight[key] != float("inf"):
+                                inflight[key] = 0
+                            else:
+                                early.add(tid)
+
+                    for fut in done:
+                        kind, key = busy.pop(fut)
+                        job = jobs[key]
+                        if kind == "submit":
+                            submitting -= 1
+                            try:
+                                outcome = fut.result()
+                            except TransientError as e:
+                                pause_until = time.time() + POLL_MIN * 2
+                                pending.appendleft(key)
+                                self.log(f"  rate limited on submit ({e}); backing off")
+                                continue
+                            if outcome[0] == "error":
+                                if outcome[3]:
+                                    job["meta"]["fingerprint"] = outcome[3]
+                                self._finish(jobs, key, "error", outcome[1], outcome[2], counts, pending, deferred)
+                                continue
+                            if outcome[0] == "deferred":
+                                deferred.setdefault(outcome[1], []).append(key)
+                                continue
+                            tid, extra = outcome[1], outcome[2]
+                            if outcome[0] == "cached":
+                                job.update(tid=tid, meta={**job["meta"], **extra})
+                                self._update(key, tid=tid, meta=job["meta"])
+                                counts["cached"] += 1
+                                self.log(f"HIT  {key} → {tid}")
+                                self._finish(jobs, key, outcome[3], outcome[4], outcome[5], counts, pending, deferred)
+                                continue
+                            job.update(tid=tid, status="queued", meta={**job["meta"], **extra}, polls=0)
+                            self._update(key, tid=tid, status="queued", meta=job["meta"], polls=0,
+                                         submitted_at=time.time(), error=None)
+                            inflight[key] = 0 if tid in early else time.time() + interval
+                            early.discard(tid)
+                            by_tid[tid] = key
+                            counts["submitted"] += 1
+                            self.log(f"SUB  {key} → {tid}")
+                        else:
+                            try:
+                                status, result, error = fut.result()
+                            except TransientError:
+                                pause_until = time.time() + POLL_MIN * 2
+                                inflight[key] = pause_until
+                                continue
+                            except Exception as e:
+                                status, result, error = "error", {}, f"status: {e}"
+                            if status in ("done", "error"):
+                                inflight.pop(key, None)
+                                self._finish(jobs, key, status, result, error, counts, pending, deferred)
+                                continue
+                            job["polls"] = (job["polls"] or 0) + 1
+                            backoff = min(POLL_MAX, POLL_MIN * 1.5 ** job["polls"])
+                            inflight[key] = time.time() + (WEBHOOK_POLL if self.webhook else backoff)
+                            if job["tid"] in early:
+                                early.discard(job["tid"])
+                                inflight[key] = 0
+                            if status != job["status"]:
+                                job["status"] = status
+                                self._update(key, status=status, polls=job["polls"])
+        finally:
+            if self.webhook:
+                self.webhook.stop()
+
+        if any(counts.values()):
+            self.log(f"Jobs: {counts['submitted']} submitted, {counts['cached']} from transcript cache, "
+                     f"{counts['done']} done, {counts['error']} errors")
+        if self.store is not None and self.store.lookups:
+            self.log(f"Transcript cache: {self.store.hits}/{self.store.lookups} hits "
+                     f"({self.store.hit_rate():.0%})")
+        return {k: self.job(k) for k in keys}
+
+    def _finish(self, jobs, key, status, result, error, counts, pending=None, deferred=None):
+        job = jobs[key]
+        fp = job["meta"].get("fingerprint")
+        if fp and deferred is not None:
+            with self._claims_lock:
+                if self._claims.get(fp) == key:
+                    del self._claims[fp]
+            pending.extendleft(reversed(deferred.pop(fp, [])))
+        job.update(status=status, result=result or {}, error=error)
+        self._update(key, status=status, result=job["result"], error=error, finished_at=time.time())
+        counts[status] += 1
+        if status == "done":
+            self.log(f"DONE {key}")
+        else:
+            self.log(f"ERR  {key}: {error}")
+
+
+# --- CLI ---
+def main():
+    p = argparse.ArgumentParser(description="AssemblyAI job table")
+    p.add_argument("command", choices=["status", "fingerprint"])
+    p.add_argument("target", nargs="?", help="File or URL to fingerprint")
+    p.add_argument("--namespace", help="Only this namespace")
+    p.add_argument("--db", default=DB_FILE)
+    args = p.parse_args()
+
+    if args.command == "fingerprint":
+        if not args.target:
+            p.error("fingerprint needs a file or URL")
+        is_url = args.target.startswith(("http://", "https://"))
+        print(fingerprint_url(args.target) if is_url else fingerprint_file(args.target))
+        return
+
+    if not os.path.exists(args.db):
+        print(f"No job table at {args.db}")
+        return
+    db = sqlite3.connect(args.db)
+    sql = "SELECT namespace, status, COUNT(*) FROM jobs"
+    params = ()
+    if args.namespace:
+        sql += " WHERE namespace=?"
+        params = (args.namespace,)
+    rows = db.execute(sql + " GROUP BY namespace, status ORDER BY namespace, status", params).fetchall()
+    for namespace, status, n in rows:
+        print(f"  {namespace:<20} {status:<12} {n}")
+    try:
+        entries, hits = db.execute("SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM transcripts").fetchone()
+    except sqlite3.OperationalError:
+        entries = hits = 0
+    print(f"  transcript cache: {entries} transcripts, {hits} reuses")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""Meta Graph API client: batch requests, field expansion and a shared insights cache.
+
+- batch() packs up to 50 GET sub-requests into one POST to the Graph batch
+  endpoint and sends several batches concurrently.
+- list_objects() walks cursor pagination and hands each page to a worker pool
+  as soon as it arrives, so insight fetches overlap the next page request.
+- fetch_insights() reads through .meta-insights-cache.json, shared by the
+  post-log sync, vurt-analytics' social report and vurt-ig-insights. Entries
+  expire faster for fresh posts (whose numbers still move) than for old ones.
+
+Used by sync.py (get_ig_posts/get_fb_posts), vurt-analytics/scripts/social_client.py
+and vurt-ig-insights/scripts/insights.py.
+"""
+
+import json
+import os
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+GRAPH_BASE = "https://graph.facebook.com"
+DEFAULT_VERSION = "v25.0"
+BATCH_LIMIT = 50   # Graph API max sub-requests per batch call
+MAX_WORKERS = 4
+TIMEOUT = 30
+
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".meta-insights-cache.json")
+# (max post age in hours, cache TTL in seconds); older posts fall through to the last TTL.
+CACHE_TTLS = [(48, 15 * 60), (24 * 7, 2 * 3600), (None, 24 * 3600)]
+
+
+class GraphError(Exception):
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+def get_token():
+    token = os.environ.get("VURT_META_ACCESS_TOKEN")
+    if not token:
+        raise RuntimeError("VURT_META_ACCESS_TOKEN not set")
+    return token
+
+
+def _check(body):
+    if isinstance(body, dict) and "error" in body:
+        err = body["error"]
+        raise GraphError(err.get("message", "Unknown error"), err.get("code"))
+    return body
+
+
+def _open_json(req):
+    try:
+        return _check(json.loads(urllib.request.urlopen(req, timeout=TIMEOUT).read()))
+    except urllib.error.HTTPError as e:
+        try:
+            return _check(json.loads(e.read()))
+        except (ValueError, GraphError) as inner:
+            raise GraphError(str(inner) or f"HTTP {e.code}", getattr(inner, "code", e.code)) from None
+
+
+def graph_get(path, params=None, token=None, version=DEFAULT_VERSION):
+    params = dict(params or {})
+    params["access_token"] = token or get_token()
+    url = f"{GRAPH_BASE}/{version}/{path}?{urllib.parse.urlencode(params)}"
+    return _open_json(url)
+
+
+def _relative_url(path, params):
+    return f"{path}?{urllib.parse.urlencode(params)}" if params else path
+
+
+def _send_batch(chunk, token, version):
+    payload = urllib.parse.urlencode({
+        "access_token": token,
+        "include_headers": "false",
+        "batch": json.dumps([{"method": "GET", "relative_url": _relative_url(p, q)} for p, q in chunk]),
+    }).encode()
+    req = urllib.request.Request(f"{GRAPH_BASE}/{version}/", data=payload, method="POST",
+                                 headers={"Content-Type": "application/x-www-form-urlencoded"})
+    results = []
+    for item in _open_json(req):
+        if item is None:
+            # Sub-request timed out inside Meta's batch runner.
+            results.append(GraphError("batch sub-request timed out"))
+            continue
+        try:
+            results.append(_check(json.loads(item.get("body") or "{}")))
+        except (ValueError, GraphError) as e:
+            results.append(e if isinstance(e, GraphError) else GraphError(str(e), item.get("code")))
+    return results
+
+
+def batch(subrequests, token=None, version=DEFAULT_VERSION, max_workers=MAX_WORKERS):
+    """Run [(path, params), ...] through the batch endpoint.
+
+    Returns one entry per sub-request, in order: the parsed body, or a
+    GraphError instance if that sub-request (or its whole batch) failed.
+    """
+    token = token or get_token()
+    subrequests = list(subrequests)
+    chunks = [subrequests[i:i + BATCH_LIMIT] for i in range(0, len(subrequests), BATCH_LIMIT)]
+
+    def run(chunk):
+        try:
+            return _send_batch(chunk, token, version)
+        except (GraphError, OSError, ValueError) as e:
+            err = e if isinstance(e, GraphError) else GraphError(str(e))
+            return [err] * len(chunk)
+
+    if len(chunks) <= 1:
+        return run(chunks[0]) if chunks else []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+        return [r for part in pool.map(run, chunks) for r in part]
+
+
+def parse_insights(body):
+    """{metric_name: value} from an /insights response (period values or total_value)."""
+    out = {}
+    for entry in (body or {}).get("data", []):
+        values = entry.get("values")
+        if values:
+            out[entry["name"]] = values[0].get("value", 0)
+        else:
+            out[entry["name"]] = entry.get("total_value", {}).get("value", 0)
+    return out
+
+
+# --- Insights cache ---
+def _ttl_for(created_time):
+    try:
+        created = datetime.fromisoformat(created_time.replace("Z", "+00:00").replace("+0000", "+00:00"))
+        age_hours = (datetime.now(timezone.utc) - created).total_seconds() / 3600
+    except (AttributeError, ValueError):
+        age_hours = 0
+    for max_age, ttl in CACHE_TTLS:
+        if max_age is None or age_hours < max_age:
+            return ttl
+    return CACHE_TTLS[-1][1]
+
+
+class InsightsCache:
+    """JSON-backed {object_id|metrics: values} store shared across scripts."""
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self.entries = self._read()
+        self.dirty = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def key(object_id, metrics, params=None):
+        extra = "&".join(f"{k}={v}" for k, v in sorted((params or {}).items()))
+        return f"{object_id}|{metrics}|{extra}"
+
+    def get(self, key, created_time=None):
+        entry = self.entries.get(key)
+        if entry and time.time() - entry["t"] < _ttl_for(created_time):
+            self.hits += 1
+            return entry["v"]
+        self.misses += 1
+        return None
+
+    def put(self, key, values):
+        entry = {"t": time.time(), "v": values}
+        self.entries[key] = entry
+        self.dirty[key] = entry
+
+    def save(self):
+        if not self.dirty:
+            return
+        # Merge with whatever another script wrote since we loaded.
+        merged = self._read()
+        for k, v in self.dirty.items():
+            if k not in merged or merged[k]["t"] <= v["t"]:
+                merged[k] = v
+        # Drop entries nobody has refreshed for a month.
+        cutoff = time.time() - 30 * 86400
+        merged = {k: v for k, v in merged.items() if v["t"] > cutoff}
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(merged, f)
+        os.replace(tmp, self.path)
+        self.entries = merged
+        self.dirty = {}
+
+
+def fetch_insights(objects, metrics, params=None, token=None, cache=None, version=DEFAULT_VERSION):
+    """Insights for many objects via the batch endpoint, reading through `cache`.
+
+    `objects` is an iterable of (object_id, created_time) pairs; `metrics` a
+    comma-separated metric list sent as one sub-request per object. Returns
+    {object_id: {metric: value}}; objects whose sub-request failed are absent.
+    """
+    params = dict(params or {})
+    out, todo = {}, []
+    for object_id, created in objects:
+        key = InsightsCache.key(object_id, metrics, params)
+        cached = cache.get(key, created) if cache else None
+        if cached is not None:
+            out[object_id] = cached
+        else:
+            todo.append((object_id, key))
+    if todo:
+        subs = [(f"{oid}/insights", {"metric": metrics, **params}) for oid, _ in todo]
+        for (object_id, key), body in zip(todo, batch(subs, token=token, version=version)):
+            if isinstance(body, GraphError):
+                continue
+            values = parse_insights(body)
+            out[object_id] = values
+            if cache:
+                cache.put(key, values)
+    return out
+
+
+def list_objects(path, fields, limit, token=None, version=DEFAULT_VERSION, on_page=None,
+                 max_workers=MAX_WORKERS, page_size=100):
+    """Follow cursor pagination on an edge (e.g. {ig_id}/media) up to `limit` items.
+
+    Cursors are inherently sequential, so each page is handed to `on_page`
+    on a worker thread while the next page is being requested. Returns
+    (items, [on_page results in page order]).
+    """
+    token = token or get_token()
+    params = {"fields": fields, "limit": min(limit, page_size), "access_token": token}
+    url = f"{GRAPH_BASE}/{version}/{path}?{urllib.parse.urlencode(params)}"
+    items, futures = [], []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while url and len(items) < limit:
+            resp = _open_json(url)
+            page = resp.get("data", [])[:limit - len(items)]
+            items.extend(page)
+            if on_page and page:
+                futures.append(pool.submit(on_page, page))
+            url = resp.get("paging", {}).get("next")
+        results = [f.result() for f in futures]
+    return items, results
+
+
+def get_media_with_insights(ig_user_id, fields, metrics, limit=100, token=None, cache=None,
+                            video_metrics=None, version=DEFAULT_VERSION):
+    """IG media plus per-post insights in as few calls as possible.
+
+    The listing asks for `insights.metric(...)` via field expansion, so one
+    page call returns media and metrics together. If Meta rejects the expansion
+    (an unsupported metric for some media type fails the whole page), the page
+    is re-listed plainly and insights go through the batch endpoint instead.
+    `video_metrics` are fetched separately, only for VIDEO media. Each returned
+    post carries an "insights" dict of {metric: value}.
+    """
+    token = token or get_token()
+
+    def enrich(page):
+        missing = []
+        for post in page:
+            expanded = post.pop("insights", None)
+            if expanded is not None:
+                post["insights"] = parse_insights(expanded)
+                if cache:
+                    cache.put(InsightsCache.key(post["id"], metrics), post["insights"])
+            else:
+                missing.append(post)
+        found = fetch_insights(((p["id"], p.get("timestamp")) for p in missing), metrics,
+                               token=token, cache=cache, version=version)
+        for post in missing:
+            post["insights"] = dict(found.get(post["id"], {}))
+        if video_metrics:
+            videos = [p for p in page if p.get("media_type") == "VIDEO"]
+            extra = fetch_insights(((p["id"], p.get("timestamp")) for p in videos), video_metrics,
+                                   token=token, cache=cache, version=version)
+            for post in videos:
+                post["insights"].update(extra.get(post["id"], {}))
+
+    try:
+        posts, _ = list_objects(f"{ig_user_id}/media", f"{fields},insights.metric({metrics})", limit,
+                                token=token, version=version, on_page=enrich)
+    except GraphError:
+        posts, _ = list_objects(f"{ig_user_id}/media", fields, limit,
+                                token=token, version=version, on_page=enrich)
+    return posts
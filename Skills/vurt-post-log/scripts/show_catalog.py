@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""Shared show catalog: one precompiled matcher per vocabulary.
+
+Vocabularies live in ../data/show_catalog.json:
+  title    — Post Log / calendar titles → show name (sync.detect_show)
+  caption  — post captions → show name, regex rules (sync.detect_show_from_caption)
+  profile  — calendar titles → shows.yaml key (generate-captions match_show)
+
+Each vocabulary's rules are compiled once: a prefix-factored (trie) regex finds
+candidate regions in a single C-level scan, and a lookahead regex of named
+alternatives resolves which rules start inside those regions (overlaps
+included). Priority = rule order, exactly like the old "first keyword in the
+list wins" loops. Literal vocabularies up to LINEAR_MAX_RULES keywords skip
+the compile and keep that loop: `in` checks beat the region walk until the
+vocabulary grows past ~150 keywords (--bench compares both).
+
+Frame.io / Trello show names are appended (lowest priority) to
+../data/show_catalog.extensions.json via extend_catalog().
+
+Usage:
+    python3 show_catalog.py --bench 50000       # captions/sec vs the linear scan
+    python3 show_catalog.py --extend-trello     # add Trello title cards to the title vocab
+    python3 show_catalog.py --detect "Karma in Heels Clip 3"
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime, timezone
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+CATALOG_FILE = os.path.join(DATA_DIR, "show_catalog.json")
+EXTENSIONS_FILE = os.path.join(DATA_DIR, "show_catalog.extensions.json")
+
+# Literal vocabularies at or below this size are matched by a plain `in` scan.
+LINEAR_MAX_RULES = 150
+
+_MATCHERS = {}
+_CATALOG = None
+
+
+def _build_trie(words):
+    """Nested dicts keyed by character; "" marks the end of a word and holds its first index."""
+    trie = {}
+    for i, w in enumerate(words):
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node.setdefault("", i)
+    return trie
+
+
+def _trie_pattern(node):
+    """Prefix-factored alternation, e.g. come back|comeback → come(?:\\ back|back)."""
+    alts = [re.escape(ch) + _trie_pattern(sub) for ch, sub in sorted(node.items()) if ch]
+    if not alts:
+        return ""
+    if len(alts) == 1 and "" not in node:
+        return alts[0]
+    return "(?:" + "|".join(alts) + ")" + ("?" if "" in node else "")
+
+
+class ShowMatcher:
+    """Priority-resolving multi-pattern matcher over lowercased text."""
+
+    def __init__(self, rules, literal=True, default=None, linear_max=LINEAR_MAX_RULES):
+        self.rules = [(k, v) for k, v in rules]
+        self.values = [v for _, v in self.rules]
+        self.default = default
+        self.literal = literal
+        self.linear = literal and len(self.rules) <= linear_max
+        self._any = self._all = self._trie = None
+        if not self.rules or self.linear:
+            return
+        if literal:
+            self._trie = _build_trie(k for k, _ in self.rules)
+            self._any = re.compile(_trie_pattern(self._trie))
+        else:
+            self._any = re.compile("|".join(f"(?:{k})" for k, _ in self.rules))
+            alts = [f"(?P<r{i}>{k})" for i, (k, _) in enumerate(self.rules)]
+            self._all = re.compile("(?=" + "|".join(alts) + ")")
+
+    def _literal_at(self, tl, pos):
+        node = self._trie
+        for ch in tl[pos:]:
+            node = node.get(ch)
+            if node is None:
+                return
+            if "" in node:
+                yield node[""]
+
+    def _priorities(self, tl):
+        # The factored regex finds match regions in one C-level scan. Every
+        # position where some rule can start lies inside one of those regions
+        # (the scanner tried and rejected all others), so only region positions
+        # need resolving: a trie walk for literals, a lookahead of named
+        # alternatives (highest priority first) for regex rules.
+        if self.linear:
+            yield from (i for i, (k, _) in enumerate(self.rules) if k in tl)
+            return
+        if self._any is None:
+            return
+        for region in self._any.finditer(tl):
+            for pos in range(region.start(), region.end()):
+                if self._trie is not None:
+                    yield from self._literal_at(tl, pos)
+                else:
+                    m = self._all.match(tl, pos)
+                    if m:
+                        yield int(m.lastgroup[1:])
+
+    def match(self, text):
+        """Value of the highest-priority rule found in `text`, else the default."""
+        if not text:
+            return self.default
+        if self.linear:
+            tl = text.lower()
+            return next((v for k, v in self.rules if k in tl), self.default)
+        best = None
+        for p in self._priorities(text.lower()):
+            if best is None or p < best:
+                best = p
+                if best == 0:
+                    break
+        return self.values[best] if best is not None else self.default
+
+    def match_all(self, text):
+        """Every matched value, highest priority first, without duplicates."""
+        if not text:
+            return []
+        hits = sorted(set(self._priorities(text.lower())))
+        return list(dict.fromkeys(self.values[p] for p in hits))
+
+
+# --- Catalog loading ---
+def _load_json(path, default):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def load_catalog(reload=False):
+    """Base vocabularies with extension rules appended after the built-in ones."""
+    global _CATALOG
+    if _CATALOG is not None and not reload:
+        return _CATALOG
+    catalog = _load_json(CATALOG_FILE, {})
+    catalog = {k: dict(v, rules=list(v.get("rules", []))) for k, v in catalog.items() if isinstance(v, dict)}
+    for vocab, extra in _load_json(EXTENSIONS_FILE, {}).items():
+        if vocab in catalog:
+            catalog[vocab]["rules"].extend([e["keyword"], e["show"]] for e in extra)
+    _CATALOG = catalog
+    _MATCHERS.clear()
+    return catalog
+
+
+def get_matcher(vocab):
+    if vocab not in _MATCHERS:
+        spec = load_catalog().get(vocab)
+        if spec is None:
+            raise KeyError(f"Unknown show vocabulary: {vocab}")
+        _MATCHERS[vocab] = ShowMatcher(spec["rules"], spec.get("literal", True), spec.get("default"))
+    return _MATCHERS[vocab]
+
+
+def detect_show(title):
+    return get_matcher("title").match(title)
+
+
+def detect_show_from_caption(caption):
+    return get_matcher("caption").match(caption)
+
+
+def match_profile(title, profile_keys):
+    """First profile key (by rule priority) found in `title` that exists in `profile_keys`."""
+    for key in get_matcher("profile").match_all(title):
+        if key in profile_keys:
+            return key
+    return None
+
+
+def extend_catalog(vocab, show_names, source):
+    """Append show names that the vocabulary doesn't already recognize.
+
+    Each name becomes a lowercase literal keyword (plus a variant without a
+    leading "the "), mapping to itself. Returns the number of names added.
+    """
+    spec = load_catalog().get(vocab)
+    if spec is None or not spec.get("literal", True):
+        raise ValueError(f"Vocabulary {vocab!r} does not take literal extensions")
+    matcher = get_matcher(vocab)
+    ext = _load_json(EXTENSIONS_FILE, {})
+    entries = ext.setdefault(vocab, [])
+    known = {e["keyword"] for e in entries} | {k for k, _ in spec["rules"]}
+    now = datetime.now(timezone.utc).isoformat()
+    added = 0
+    for name in show_names:
+        name = (name or "").strip()
+        if not name or matcher.match(name) is not None:
+            continue
+        kw = re.sub(r"\s+", " ", name.lower())
+        variants = [kw] + ([kw[4:]] if kw.startswith("the ") and len(kw) > 8 else [])
+        new = [v for v in variants if v not in known]
+        for v in new:
+            entries.append({"keyword": v, "show": name, "source": source, "added_at": now})
+            known.add(v)
+        added += bool(new)
+    if added:
+        tmp = EXTENSIONS_FILE + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(ext, f, indent=2)
+        os.replace(tmp, EXTENSIONS_FILE)
+        load_catalog(reload=True)
+    return added
+
+
+# --- Show-name normalization (Frame.io ↔ Notion) ---
+_NON_ALNUM = re.compile(r"[^a-z0-9]")
+_WORDS = re.compile(r"[a-z0-9]+")
+_NAME_STOP = {"the", "a", "an", "of", "in", "and", "or", "to", "is", "my", "x"}
+
+
+def normalize_show_name(name):
+    """Case, 'The ' prefix, '&' vs 'and', punctuation and whitespace folded away."""
+    n = _NON_ALNUM.sub("", name.lower().strip().replace("&", "and"))
+    return n[3:] if n.startswith("the") else n
+
+
+def show_name_keywords(name):
+    words = _WORDS.findall(name.lower().strip().replace("&", "and"))
+    return {w for w in words if w not in _NAME_STOP and len(w) > 1}
+
+
+class ShowNameIndex:
+    """norm → original show names, with a keyword inverted index for Jaccard lookups."""
+
+    def __init__(self, show_norms, min_score=0.6):
+        self.show_norms = show_norms
+        self.min_score = min_score
+        self._order = {}
+        self._keywords = {}
+        self._by_word = {}
+        for i, (norm, original) in enumerate(show_norms.items()):
+            kw = show_name_keywords(original)
+            self._order[norm] = i
+            self._keywords[norm] = kw
+            for w in kw:
+                self._by_word.setdefault(w, []).append(norm)
+
+    def match(self, name):
+        """Exact normalized match → best keyword overlap (>= min_score Jaccard), else None."""
+        norm = normalize_show_name(name)
+        if norm in self.show_norms:
+            return norm
+        kw = show_name_keywords(name)
+        if not kw:
+            return None
+        candidates = {n for w in kw for n in self._by_word.get(w, ())}
+        best_score, best_norm = 0, None
+        # Dict order breaks ties, same as a full scan over show_norms would.
+        for cand in sorted(candidates, key=self._order.__getitem__):
+            other = self._keywords[cand]
+            score = len(kw & other) / len(kw | other)
+            if score > best_score:
+                best_score, best_norm = score, cand
+        return best_norm if best_score >= self.min_score else None
+
+
+# --- CLI ---
+def _linear(rules, literal, default, text):
+    tl = text.lower()
+    for k, v in rules:
+        if (k in tl) if literal else re.search(k, tl):
+            return v
+    return default
+
+
+def bench(n=50000, seed=7):
+    rng = random.Random(seed)
+    filler = ("watch full episode now streaming link in bio she said he never came home "
+              "tonight family drama miami love money loyalty betrayal new clip").split()
+    catalog = load_catalog()
+    kws = [k for k, _ in catalog["title"]["rules"]] + ["karma in heels", "my brother's wife", "parking lot"]
+    captions = []
+    for _ in range(n):
+        words = rng.choices(filler, k=rng.randint(12, 40))
+        if rng.random() < 0.6:
+            words.insert(rng.randrange(len(words)), rng.choice(kws))
+        captions.append(" ".join(words).capitalize())
+
+    print(f"Classifying {n} synthetic captions")
+    # "title+300" adds synthetic show names, i.e. the title vocab after Frame.io/Trello growth.
+    extra = [[f"show title {i} {rng.choice(filler)}", f"Show {i}"] for i in range(300)]
+    runs = [(v, catalog[v]) for v in ("title", "caption")]
+    runs.append(("title+300", dict(catalog["title"], rules=catalog["title"]["rules"] + extra)))
+    for label, spec in runs:
+        # linear_max=0 always compiles, so the columns show where LINEAR_MAX_RULES should sit.
+        matcher = ShowMatcher(spec["rules"], spec.get("literal", True), spec.get("default"), linear_max=0)
+        chosen = ShowMatcher(spec["rules"], spec.get("literal", True)).linear
+        t0 = time.perf_counter()
+        old = [_linear(spec["rules"], spec.get("literal", True), spec.get("default"), c) for c in captions]
+        t_old = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        new = [matcher.match(c) for c in captions]
+        t_new = time.perf_counter() - t0
+        diff = sum(a != b for a, b in zip(old, new))
+        print(f"  {label:<10} {len(spec['rules']):>4} rules   linear {n / t_old:>10,.0f}/s   "
+              f"compiled {n / t_new:>10,.0f}/s   ({t_old / t_new:.1f}x, {diff} mismatches)   "
+              f"uses {'linear' if chosen else 'compiled'}")
+
+
+def main():
+    p = argparse.ArgumentParser(description="VURT show catalog")
+    p.add_argument("--bench", type=int, nargs="?", const=50000, help="Benchmark N captions")
+    p.add_argument("--extend-trello", action="store_true", help="Add Trello title cards to the title vocabulary")
+    p.add_argument("--detect", type=str, help="Print title/caption/profile matches for a string")
+    args = p.parse_args()
+
+    if args.bench:
+        bench(args.bench)
+    elif args.extend_trello:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        from trello_client import get_all_titles
+        n = extend_catalog("title", [t["title"] for t in get_all_titles()], source="trello")
+        print(f"Added {n} Trello titles to {EXTENSIONS_FILE}")
+    elif args.detect:
+        print(f"  title:   {detect_show(args.detect)}")
+        print(f"  caption: {detect_show_from_caption(args.detect)}")
+        print(f"  profile: {get_matcher('profile').match_all(args.detect)}")
+    else:
+        p.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -13,7 +13,7 @@ import socket
 import sys
 import urllib.request
 import urllib.parse
-from datetime import datetime, timedelta
+from datetime import datetime
 
 socket.setdefaulttimeout(12)
 
@@ -75,42 +75,16 @@ def _pick_best_match(entry, candidates, text_getter, min_overlap=MIN_KEYWORD_OVE
         return None
     return top_matches[0]
 
-SHOW_KEYWORDS = [
-    ("karma", "Karma in Heels"),
-    ("parking", "Parking Lot Series"),
-    ("come back", "Come Back Dad"),
-    ("comeback", "Come Back Dad"),
-    ("killer stepdad", "Killer Stepdad"),
-    ("baby mama", "Baby Mama"),
-    ("fatal lust", "Fatal Lust"),
-    ("miami kingpin", "Miami Kingpins"),
-    ("schemers", "SCHEMERS"),
-    ("something like a business", "Something Like A Business"),
-    ("kevin hart", "Something Like A Business"),
-    ("nita k", "Nita K Spotlight"),
-    ("ted lucas", "Ted Lucas Spotlight"),
-    ("99 jamz", "99 Jamz x VURT"),
-    ("vurt 100", "THIS IS VURT"),
-    ("vurt100", "THIS IS VURT"),
-    ("this is vurt", "THIS IS VURT"),
-    ("miami confidential", "Miami Confidential"),
-    ("35 and ticking", "35 and Ticking"),
-    ("my brother", "My Brother's Wife"),
-    ("director", "Director Spotlight"),
-    ("spotlight", "Director Spotlight"),
-    ("filmmaker", "Director Spotlight"),
-    ("milestone", "VURT Brand"),
-    ("brand post", "VURT Brand"),
-    ("industry", "VURT Brand"),
-]
+try:
+    import show_catalog
+except ImportError:
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import show_catalog
 
 
 def detect_show(title):
-    tl = title.lower()
-    for keyword, show_name in SHOW_KEYWORDS:
-        if keyword in tl:
-            return show_name
-    return None
+    """Show name from a Post Log / calendar title (title vocabulary in data/show_catalog.json)."""
+    return show_catalog.detect_show(title)
 
 
 # --- Constants ---
@@ -161,49 +135,36 @@ def update_page(page_id, properties):
     return notion_request("PATCH", f"pages/{page_id}", {"properties": properties})
 
 
-# --- Instagram ---
+# --- Meta (Instagram + Facebook) ---
+def _meta_client():
+    try:
+        import meta_client
+    except ImportError:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        import meta_client
+    return meta_client
+
+
+IG_MEDIA_FIELDS = "id,caption,timestamp,like_count,comments_count,media_type,permalink,media_product_type"
+IG_BASE_METRICS = "views,reach,saved,shares,total_interactions,likes,comments"
+IG_REEL_METRICS = "ig_reels_avg_watch_time"
+
+
 def get_ig_posts(limit=100):
+    """IG media + insights: one expanded listing call, reel metrics batched 50 per call."""
     token = get_env("VURT_META_ACCESS_TOKEN")
-    posts = []
-    params = urllib.parse.urlencode({
-        "fields": "id,caption,timestamp,like_count,comments_count,media_type,permalink,media_product_type",
-        "limit": min(limit, 100),
-        "access_token": token,
-    })
-    url = f"{META_BASE}/{IG_ACCOUNT_ID}/media?{params}"
-    while url and len(posts) < limit:
-        resp = json.loads(urllib.request.urlopen(url, timeout=15).read())
-        posts.extend(resp.get("data", []))
-        url = resp.get("paging", {}).get("next")
+    meta_client = _meta_client()
+    cache = meta_client.InsightsCache()
+    posts = meta_client.get_media_with_insights(
+        IG_ACCOUNT_ID, IG_MEDIA_FIELDS, IG_BASE_METRICS, limit=limit,
+        token=token, cache=cache, video_metrics=IG_REEL_METRICS,
+    )
+    cache.save()
 
     now = datetime.utcnow()
     enriched = []
     for post in posts:
-        mtype = post.get("media_type", "")
-        base_metrics = "views,reach,saved,shares,total_interactions,likes,comments"
-        reel_metrics = "ig_reels_avg_watch_time"
-
-        insights = {}
-        # Fetch base metrics (work for all post types)
-        try:
-            params2 = urllib.parse.urlencode({"metric": base_metrics, "access_token": token})
-            url2 = f"{META_BASE}/{post['id']}/insights?{params2}"
-            resp2 = urllib.request.urlopen(url2, timeout=15)
-            for entry in json.loads(resp2.read()).get("data", []):
-                insights[entry["name"]] = entry.get("values", [{}])[0].get("value", 0)
-        except Exception:
-            pass
-        # Fetch reel-specific metrics separately (only for VIDEO)
-        if mtype == "VIDEO":
-            try:
-                params3 = urllib.parse.urlencode({"metric": reel_metrics, "access_token": token})
-                url3 = f"{META_BASE}/{post['id']}/insights?{params3}"
-                resp3 = urllib.request.urlopen(url3, timeout=15)
-                for entry in json.loads(resp3.read()).get("data", []):
-                    insights[entry["name"]] = entry.get("values", [{}])[0].get("value", 0)
-            except Exception:
-                pass
-
+        insights = post.pop("insights", {})
         post_time = datetime.strptime(post["timestamp"][:19], "%Y-%m-%dT%H:%M:%S")
         age_hours = (now - post_time).total_seconds() / 3600
         post["_views_preliminary"] = age_hours < 48
@@ -214,83 +175,64 @@ def get_ig_posts(limit=100):
 
 # --- Facebook Page ---
 def get_fb_posts(limit=50):
+    """FB page posts; likes/comments summaries and both view insights go through the batch endpoint."""
     token = get_env("VURT_META_ACCESS_TOKEN")
-    posts = []
-    params = urllib.parse.urlencode({
-        "fields": "id,message,created_time,permalink_url,shares",
-        "limit": min(limit, 100),
-        "access_token": token,
-    })
-    url = f"{META_BASE}/{FB_PAGE_ID}/posts?{params}"
-    while url and len(posts) < limit:
-        resp = json.loads(urllib.request.urlopen(url, timeout=15).read())
-        posts.extend(resp.get("data", []))
-        url = resp.get("paging", {}).get("next")
+    meta_client = _meta_client()
+    cache = meta_client.InsightsCache()
+    posts, _ = meta_client.list_objects(
+        f"{FB_PAGE_ID}/posts", "id,message,created_time,permalink_url,shares", limit, token=token,
+    )
+    print(f"  FB enriching {len(posts)} posts via batch requests...", flush=True)
+
+    summaries = meta_client.batch(
+        [(p["id"], {"fields": "likes.summary(true),comments.summary(true)"}) for p in posts], token=token,
+    )
+    objects = [(p["id"], p.get("created_time")) for p in posts]
+    views = meta_client.fetch_insights(objects, "post_media_view", {"period": "lifetime"},
+                                       token=token, cache=cache)
+    reach = meta_client.fetch_insights(objects, "post_total_media_view_unique", {"period": "lifetime"},
+                                       token=token, cache=cache)
+    cache.save()
 
     enriched = []
-    for i, post in enumerate(posts):
-        print(f"  FB enriching {i+1}/{len(posts)}...", flush=True)
-        likes_url = f"{META_BASE}/{post['id']}?fields=likes.summary(true),comments.summary(true)&access_token={token}"
-        try:
-            lr = json.loads(urllib.request.urlopen(likes_url, timeout=15).read())
-            post["like_count"] = lr.get("likes", {}).get("summary", {}).get("total_count", 0)
-            post["comments_count"] = lr.get("comments", {}).get("summary", {}).get("total_count", 0)
-        except Exception:
+    for post, lr in zip(posts, summaries):
+        if isinstance(lr, meta_client.GraphError):
             post["like_count"] = 0
             post["comments_count"] = 0
-
+        else:
+            post["like_count"] = lr.get("likes", {}).get("summary", {}).get("total_count", 0)
+            post["comments_count"] = lr.get("comments", {}).get("summary", {}).get("total_count", 0)
         post["share_count"] = post.get("shares", {}).get("count", 0)
-        post["video_views"] = 0
-        try:
-            vv_url = f"{META_BASE}/{post['id']}/insights/post_media_view/lifetime?access_token={token}"
-            vv_resp = json.loads(urllib.request.urlopen(vv_url, timeout=15).read())
-            for m in vv_resp.get("data", []):
-                post["video_views"] = m.get("values", [{}])[0].get("value", 0)
-        except Exception:
-            pass
-
-        post["reach"] = 0
-        try:
-            r_url = f"{META_BASE}/{post['id']}/insights/post_total_media_view_unique/lifetime?access_token={token}"
-            r_resp = json.loads(urllib.request.urlopen(r_url, timeout=15).read())
-            for m in r_resp.get("data", []):
-                post["reach"] = m.get("values", [{}])[0].get("value", 0)
-        except Exception:
-            pass
-
+        post["video_views"] = views.get(post["id"], {}).get("post_media_view", 0)
+        post["reach"] = reach.get(post["id"], {}).get("post_total_media_view_unique", 0)
         enriched.append(post)
     return enriched
 
 
 # --- YouTube ---
+def _yt_client():
+    try:
+        import yt_client
+    except ImportError:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        import yt_client
+    return yt_client
+
+
 def get_yt_videos(days=60):
-    api_key = os.environ.get("VURT_YOUTUBE_API_KEY")
-    if not api_key:
+    if not os.environ.get("VURT_YOUTUBE_API_KEY"):
         print("  VURT_YOUTUBE_API_KEY not set, skipping YT", file=sys.stderr)
         return []
-    after = (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%dT00:00:00Z")
-    params = urllib.parse.urlencode({
-        "part": "snippet", "channelId": YT_CHANNEL_ID, "type": "video",
-        "order": "date", "publishedAfter": after, "maxResults": 50,
-        "key": api_key,
-    })
+    yt_client = _yt_client()
     try:
-        resp = urllib.request.urlopen(f"{YT_BASE}/search?{params}", timeout=15)
-        items = json.loads(resp.read()).get("items", [])
+        video_ids = yt_client.list_recent_video_ids(days)
     except Exception as e:
-        print(f"  YT search failed: {e}", file=sys.stderr)
+        print(f"  YT uploads listing failed: {e}", file=sys.stderr)
         return []
-    if not items:
-        return []
-    video_ids = ",".join(i["id"]["videoId"] for i in items if i.get("id", {}).get("videoId"))
     if not video_ids:
         return []
-    params2 = urllib.parse.urlencode({
-        "part": "snippet,statistics", "id": video_ids, "key": api_key,
-    })
-    resp2 = urllib.request.urlopen(f"{YT_BASE}/videos?{params2}", timeout=15)
     videos = []
-    for v in json.loads(resp2.read()).get("items", []):
+    for v in yt_client.get_videos(video_ids):
         s = v["statistics"]
         videos.append({
             "videoId": v["id"],
@@ -307,64 +249,39 @@ def get_yt_videos(days=60):
 
 
 def enrich_yt_analytics(videos, days=60):
-    """Add watch time, avg duration, avg view %, subs gained from YT Analytics API."""
-    refresh = os.environ.get("VURT_YOUTUBE_REFRESH_TOKEN", "")
-    oauth_raw = os.environ.get("VURT_GOOGLE_OAUTH_CLIENT", "")
-    if not refresh or not oauth_raw:
+    """Add watch time, avg duration, avg view %, subs gained from YT Analytics API.
+
+    All videos go into one `dimensions=video` report per range segment; finalized
+    weeks come from yt_client's local store, so a re-run only queries recent days.
+    """
+    if not os.environ.get("VURT_YOUTUBE_REFRESH_TOKEN") or not os.environ.get("VURT_GOOGLE_OAUTH_CLIENT"):
         return
+    yt_client = _yt_client()
     try:
-        creds = json.loads(oauth_raw)
-        installed = creds.get("installed", creds)
-        client_id, client_secret = installed["client_id"], installed["client_secret"]
-        token_data = urllib.parse.urlencode({
-            "client_id": client_id, "client_secret": client_secret,
-            "refresh_token": refresh, "grant_type": "refresh_token",
-        }).encode()
-        req = urllib.request.Request("https://oauth2.googleapis.com/token", data=token_data, method="POST")
-        req.add_header("Content-Type", "application/x-www-form-urlencoded")
-        resp = urllib.request.urlopen(req, timeout=10)
-        access_token = json.loads(resp.read())["access_token"]
+        access_token = yt_client.get_access_token()
     except Exception as e:
         print(f"  YT Analytics OAuth failed: {e}", file=sys.stderr)
         return
 
-    start = (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d")
-    end = datetime.utcnow().strftime("%Y-%m-%d")
-    params = urllib.parse.urlencode({
-        "ids": "channel==MINE",
-        "startDate": start, "endDate": end,
-        "metrics": "views,estimatedMinutesWatched,averageViewDuration,averageViewPercentage,subscribersGained",
-        "dimensions": "video",
-        "sort": "-views",
-        "maxResults": "50",
-    })
+    stats = {}
     try:
-        url = f"https://youtubeanalytics.googleapis.com/v2/reports?{params}"
-        req2 = urllib.request.Request(url)
-        req2.add_header("Authorization", f"Bearer {access_token}")
-        resp2 = urllib.request.urlopen(req2, timeout=15)
-        result = json.loads(resp2.read())
+        analytics_by_id = yt_client.get_video_analytics(
+            [v["videoId"] for v in videos if v.get("videoId")], days,
+            access_token=access_token, stats=stats,
+        )
     except Exception as e:
         print(f"  YT Analytics query failed (may need channel owner OAuth): {e}", file=sys.stderr)
         return
 
-    analytics_by_id = {}
-    for row in result.get("rows", []):
-        analytics_by_id[row[0]] = {
-            "watchMinutes": round(row[2], 1),
-            "avgDuration": int(row[3]),
-            "avgViewPct": round(row[4], 1),
-            "subsGained": int(row[5]),
-        }
-
     enriched = 0
     for vid in videos:
-        vid_id = vid.get("videoId", "")
-        if vid_id in analytics_by_id:
-            vid.update(analytics_by_id[vid_id])
+        row = analytics_by_id.get(vid.get("videoId", ""))
+        if row:
+            vid.update({k: v for k, v in row.items() if k != "views"})
             enriched += 1
     if enriched:
-        print(f"  YT Analytics: enriched {enriched}/{len(videos)} videos with watch time + retention")
+        print(f"  YT Analytics: enriched {enriched}/{len(videos)} videos with watch time + retention "
+              f"({stats.get('api_calls', 0)} API calls, {stats.get('cached_days', 0)} cached days)")
 
 
 # --- TikTok ---
@@ -967,33 +884,8 @@ def enrich_calendar(ig_posts, dry_run=False):
     return updated
 
 
-SHOW_PATTERNS = [
-    (r"karma\s*in\s*heels", "Karma in Heels"),
-    (r"parking\s*lot", "Parking Lot Series"),
-    (r"schemers", "Schemers"),
-    (r"come\s*back\s*dad", "Come Back Dad"),
-    (r"baby\s*mama", "Baby Mama"),
-    (r"my\s*brother.?s\s*wife", "My Brother's Wife"),
-    (r"miami\s*confidential", "Miami Confidential"),
-    (r"miami\s*kingpins", "Miami Kingpins"),
-    (r"liberty\s*city", "Miami Kingpins"),
-    (r"35\s*and\s*ticking", "35 and Ticking"),
-    (r"charles\s*s\.?\s*dutton", "Charles S. Dutton Family"),
-    (r"ted\s*lucas", "Ted Lucas"),
-    (r"nita\s*k", "Nita K"),
-    (r"steven\s*alan\s*davis", "Steven Alan Davis"),
-    (r"99\s*jamz", "99 Jamz x VURT"),
-]
-
-
 def detect_show_from_caption(caption):
-    if not caption:
-        return "VURT"
-    cl = caption.lower()
-    for pattern, show in SHOW_PATTERNS:
-        if re.search(pattern, cl):
-            return show
-    return "VURT"
+    return show_catalog.detect_show_from_caption(caption)
 
 
 def generate_post_title(caption, platform, show):
@@ -1155,60 +1047,7 @@ def _normalize_show_name(name):
 
     Handles: case, 'The ' prefix, '&' vs 'and', punctuation, whitespace.
     """
-    n = name.lower().strip()
-    # Normalize '&' to 'and' before stripping punctuation
-    n = n.replace('&', 'and')
-    # Strip all non-alphanumeric
-    n = re.sub(r'[^a-z0-9]', '', n)
-    # Strip leading 'the'
-    if n.startswith("the"):
-        n = n[3:]
-    return n
-
-
-def _show_name_keywords(name):
-    """Extract meaningful keywords from a show name for overlap matching."""
-    n = name.lower().strip()
-    n = n.replace('&', 'and')
-    # Remove common filler words
-    stop = {'the', 'a', 'an', 'of', 'in', 'and', 'or', 'to', 'is', 'my', 'x'}
-    words = re.findall(r'[a-z0-9]+', n)
-    return {w for w in words if w not in stop and len(w) > 1}
-
-
-def _match_show_name(cal_show, frameio_show_norms):
-    """Try to match a calendar show name against Frame.io show names.
-
-    Attempts: exact normalized match → keyword overlap (>= 60% Jaccard).
-    Returns the matching normalized key or None.
-    """
-    norm = _normalize_show_name(cal_show)
-    if norm in frameio_show_norms:
-        return norm
-
-    # Keyword overlap: find best match among Frame.io shows
-    cal_kw = _show_name_keywords(cal_show)
-    if not cal_kw:
-        return None
-
-    best_score = 0
-    best_norm = None
-    for fio_norm, fio_original in frameio_show_norms.items():
-        fio_kw = _show_name_keywords(fio_original)
-        if not fio_kw:
-            continue
-        overlap = len(cal_kw & fio_kw)
-        union = len(cal_kw | fio_kw)
-        score = overlap / union if union else 0
-        if score > best_score:
-            best_score = score
-            best_norm = fio_norm
-
-    # Require at least 60% keyword overlap (e.g. 2/3 words matching)
-    if best_score >= 0.6:
-        return best_norm
-
-    return None
+    return show_catalog.normalize_show_name(name)
 
 
 def sync_frameio_assets(dry_run=False):
@@ -1266,6 +1105,12 @@ def sync_frameio_assets(dry_run=False):
 
     print(f"  Frame.io: {len(show_clips)} unique show/clip combinations indexed")
     print(f"  Frame.io: {len(frameio_show_norms)} unique show names")
+    # Exact normalized match → keyword overlap (>= 60% Jaccard) via an inverted index
+    show_index = show_catalog.ShowNameIndex(frameio_show_norms)
+    if not dry_run:
+        added = show_catalog.extend_catalog("title", frameio_show_norms.values(), source="frameio")
+        if added:
+            print(f"  Show catalog: added {added} new Frame.io show names")
 
     # Get calendar entries
     cal_results = []
@@ -1294,21 +1139,21 @@ def sync_frameio_assets(dry_run=False):
         # Try to match by show name from Notion (exact → normalized → keyword overlap)
         matched = None
         if show_sel:
-            norm = _match_show_name(show_sel, frameio_show_norms)
+            norm = show_index.match(show_sel)
             if norm:
                 matched = show_clips.get((norm, clip_num))
 
-        # Fallback: detect show from calendar title via SHOW_KEYWORDS
+        # Fallback: detect show from calendar title via the show catalog
         if not matched:
             detected = detect_show(cal_title)
             if detected:
-                norm = _match_show_name(detected, frameio_show_norms)
+                norm = show_index.match(detected)
                 if norm:
                     matched = show_clips.get((norm, clip_num))
 
         # Last resort: try matching the raw calendar title against Frame.io shows
         if not matched and cal_title:
-            norm = _match_show_name(cal_title, frameio_show_norms)
+            norm = show_index.match(cal_title)
             if norm:
                 matched = show_clips.get((norm, clip_num))
 
@@ -2,83 +2,34 @@
 """YouTube Analytics API — retention, traffic sources, demographics, real-time views."""
 
 import argparse
-import json
 import os
 import sys
-import urllib.parse
-import urllib.request
 from datetime import datetime, timedelta, timezone
 
-YT_ANALYTICS_BASE = "https://youtubeanalytics.googleapis.com/v2/reports"
-YT_DATA_BASE = "https://www.googleapis.com/youtube/v3"
-CHANNEL_ID = "UCB7B5ifo5Pgfc-j_uJGQG1g"
-
-
-def get_creds():
-    raw = os.environ.get("VURT_GOOGLE_OAUTH_CLIENT", "")
-    if not raw:
-        print("VURT_GOOGLE_OAUTH_CLIENT not set", file=sys.stderr)
-        sys.exit(1)
-    data = json.loads(raw)
-    installed = data.get("installed", data)
-    return installed["client_id"], installed["client_secret"]
-
-
-def get_access_token():
-    refresh = os.environ.get("VURT_YOUTUBE_REFRESH_TOKEN", "")
-    if not refresh:
-        print("VURT_YOUTUBE_REFRESH_TOKEN not set. Run yt-oauth-setup.py first.", file=sys.stderr)
-        sys.exit(1)
-    client_id, client_secret = get_creds()
-    data = urllib.parse.urlencode({
-        "client_id": client_id,
-        "client_secret": client_secret,
-        "refresh_token": refresh,
-        "grant_type": "refresh_token",
-    }).encode()
-    req = urllib.request.Request("https://oauth2.googleapis.com/token", data=data, method="POST")
-    req.add_header("Content-Type", "application/x-www-form-urlencoded")
-    resp = urllib.request.urlopen(req)
-    return json.loads(resp.read())["access_token"]
-
-
-def analytics_query(access_token, params):
-    params["ids"] = "channel==MINE"
-    qs = urllib.parse.urlencode(params)
-    url = f"{YT_ANALYTICS_BASE}?{qs}"
-    req = urllib.request.Request(url)
-    req.add_header("Authorization", f"Bearer {access_token}")
-    try:
-        resp = urllib.request.urlopen(req)
-        return json.loads(resp.read())
-    except urllib.error.HTTPError as e:
-        print(f"API error {e.code}: {e.read().decode()[:500]}", file=sys.stderr)
-        return None
-
-
-def cmd_retention(access_token, video_id):
-    if not video_id:
-        print("Provide --video-id VIDEO_ID"); return
-    params = {
-        "startDate": "2020-01-01",
-        "endDate": datetime.now(timezone.utc).strftime("%Y-%m-%d"),
-        "metrics": "audienceWatchRatio,relativeRetentionPerformance",
-        "dimensions": "elapsedVideoTimeRatio",
-        "filters": f"video=={video_id}",
-    }
-    data = analytics_query(access_token, params)
-    if not data:
-        return
-    rows = data.get("rows", [])
-    print(f"\nAudience Retention — {video_id}")
-    print(f"{'Time %':>8} {'Watch Ratio':>12} {'Relative':>10}")
-    print("=" * 35)
-    for row in rows:
-        pct = round(row[0] * 100)
-        watch = round(row[1] * 100, 1)
-        rel = round(row[2], 2) if len(row) > 2 else 0
-        bar = "█" * int(watch / 2)
-        print(f"  {pct:>5}%  {watch:>10}%  {rel:>8}  {bar}")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from yt_client import analytics_query, get_access_token, get_retention, get_top_videos, get_video_titles  # noqa: E402
+
+
+def cmd_retention(access_token, video_ids):
+    video_ids = [v.strip() for v in (video_ids or "").split(",") if v.strip()]
+    if not video_ids:
+        print("Provide --video-id VIDEO_ID[,VIDEO_ID...]"); return
+    titles = get_video_titles(video_ids) if len(video_ids) > 1 else {}
+    for video_id in video_ids:
+        data = get_retention(video_id, access_token)
+        if not data:
+            continue
+        rows = data.get("rows", [])
+        label = f"{titles[video_id][:50]} ({video_id})" if video_id in titles else video_id
+        print(f"\nAudience Retention — {label}")
+        print(f"{'Time %':>8} {'Watch Ratio':>12} {'Relative':>10}")
+        print("=" * 35)
+        for row in rows:
+            pct = round(row[0] * 100)
+            watch = round(row[1] * 100, 1)
+            rel = round(row[2], 2) if len(row) > 2 else 0
+            bar = "█" * int(watch / 2)
+            print(f"  {pct:>5}%  {watch:>10}%  {rel:>8}  {bar}")
 
 
 def cmd_traffic(access_token, days=30):
@@ -120,35 +71,15 @@ def cmd_demographics(access_token, days=90):
 
 
 def cmd_top_videos(access_token, days=30):
-    start = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
-    end = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    params = {
-        "startDate": start, "endDate": end,
-        "metrics": "views,estimatedMinutesWatched,averageViewDuration,averageViewPercentage,subscribersGained",
-        "dimensions": "video",
-        "sort": "-views",
-        "maxResults": "25",
-    }
-    data = analytics_query(access_token, params)
-    if not data:
+    rows = get_top_videos(days, limit=25, access_token=access_token)
+    if not rows:
         return
-
-    api_key = os.environ.get("VURT_YOUTUBE_API_KEY", "")
-    video_ids = [row[0] for row in data.get("rows", [])]
-    titles = {}
-    if api_key and video_ids:
-        qs = urllib.parse.urlencode({"part": "snippet", "id": ",".join(video_ids), "key": api_key})
-        try:
-            resp = urllib.request.urlopen(f"{YT_DATA_BASE}/videos?{qs}")
-            for v in json.loads(resp.read()).get("items", []):
-                titles[v["id"]] = v["snippet"]["title"]
-        except Exception:
-            pass
+    titles = get_video_titles([row[0] for row in rows]) if os.environ.get("VURT_YOUTUBE_API_KEY") else {}
 
     print(f"\nTop Videos — Last {days} Days")
     print(f"  {'Title':<40} {'Views':>7} {'Watch Min':>10} {'Avg Dur':>8} {'Avg %':>6} {'Subs':>5}")
     print("  " + "=" * 80)
-    for row in data.get("rows", []):
+    for row in rows:
         vid = row[0]
         title = titles.get(vid, vid)[:39]
         print(f"  {title:<40} {row[1]:>7} {row[2]:>10} {row[3]:>7}s {row[4]:>5.1f}% {row[5]:>5}")
@@ -182,14 +113,18 @@ def main():
     p.add_argument("--top-videos", action="store_true", help="Top videos by views")
     p.add_argument("--geography", action="store_true", help="Views by country")
     p.add_argument("--all", action="store_true", help="Run all reports (except retention)")
-    p.add_argument("--video-id", type=str, default="", help="Video ID for retention")
+    p.add_argument("--video-id", type=str, default="", help="Video ID(s) for retention, comma-separated")
     p.add_argument("--days", type=int, default=30)
     args = p.parse_args()
 
     if not any([args.retention, args.traffic, args.demographics, args.top_videos, args.geography, args.all]):
         p.print_help(); sys.exit(1)
 
-    token = get_access_token()
+    try:
+        token = get_access_token()
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
     if args.retention or (args.all and args.video_id):
         cmd_retention(token, args.video_id)
     if args.traffic or args.all:
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""YouTube Data + Analytics client with cached OAuth tokens and batched reads.
+
+- Access tokens are cached at /home/workspace/.secrets/youtube-oauth-token.json
+  and only refreshed 5 min before expiry (shared by sync.py and yt-analytics.py).
+- `videos.list` is called in 50-id batches (the API max per request).
+- Analytics reports use `video` as the dimension with a `video==id1,id2,...`
+  filter, so one request covers up to 200 videos.
+- Per-video numbers are pulled by day (dimensions=day,video) and summed
+  locally. Days older than FINALIZED_AFTER_DAYS are immutable and are stored in
+  .yt-analytics-store.json, so a re-run asks one report for the days that are
+  missing or still moving. If the daily report fails, it falls back to one
+  dimensions=video report for the whole range (nothing stored).
+"""
+
+import json
+import os
+import sys
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import date, datetime, timedelta, timezone
+
+TOKEN_FILE = "/home/workspace/.secrets/youtube-oauth-token.json"
+TOKEN_URL = "https://oauth2.googleapis.com/token"
+YT_DATA_BASE = "https://www.googleapis.com/youtube/v3"
+YT_ANALYTICS_BASE = "https://youtubeanalytics.googleapis.com/v2/reports"
+CHANNEL_ID = "UCB7B5ifo5Pgfc-j_uJGQG1g"
+
+STORE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".yt-analytics-store.json")
+# YT Analytics keeps revising a day's numbers for ~2-3 days after it closes.
+FINALIZED_AFTER_DAYS = 3
+STORE_KEEP_DAYS = 400  # finalized days older than this are pruned from the store
+VIDEOS_BATCH = 50      # videos.list max ids per request
+ANALYTICS_BATCH = 200  # reports max rows for dimensions=video
+DAILY_PAGE = 5000      # rows per page of a dimensions=day,video report
+
+VIDEO_METRICS = "views,estimatedMinutesWatched,averageViewDuration,averageViewPercentage,subscribersGained"
+
+
+# --- OAuth ---
+def get_creds():
+    raw = os.environ.get("VURT_GOOGLE_OAUTH_CLIENT", "")
+    if not raw:
+        raise RuntimeError("VURT_GOOGLE_OAUTH_CLIENT not set")
+    data = json.loads(raw)
+    installed = data.get("installed", data)
+    return installed["client_id"], installed["client_secret"]
+
+
+def _load_tokens():
+    try:
+        with open(TOKEN_FILE) as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _save_tokens(data):
+    os.makedirs(os.path.dirname(TOKEN_FILE), exist_ok=True)
+    with open(TOKEN_FILE, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def _token_expired(tokens):
+    obtained = tokens.get("obtained_at", "")
+    expires_in = tokens.get("expires_in", 0)
+    if not obtained or not expires_in or not tokens.get("access_token"):
+        return True
+    # A different refresh token means the cached access token belongs to another grant.
+    if tokens.get("refresh_token") != os.environ.get("VURT_YOUTUBE_REFRESH_TOKEN", ""):
+        return True
+    try:
+        elapsed = (datetime.now(timezone.utc) - datetime.fromisoformat(obtained)).total_seconds()
+        return elapsed > (expires_in - 300)  # refresh 5 min before expiry
+    except Exception:
+        return True
+
+
+def _refresh_token():
+    refresh = os.environ.get("VURT_YOUTUBE_REFRESH_TOKEN", "")
+    if not refresh:
+        raise RuntimeError("VURT_YOUTUBE_REFRESH_TOKEN not set. Run yt-oauth-setup.py first.")
+    client_id, client_secret = get_creds()
+    data = urllib.parse.urlencode({
+        "client_id": client_id,
+        "client_secret": client_secret,
+        "refresh_token": refresh,
+        "grant_type": "refresh_token",
+    }).encode()
+    req = urllib.request.Request(TOKEN_URL, data=data, method="POST",
+                                 headers={"Content-Type": "application/x-www-form-urlencoded"})
+    new_data = json.loads(urllib.request.urlopen(req, timeout=10).read())
+    if "access_token" not in new_data:
+        raise RuntimeError(f"YouTube token refresh failed: {new_data}")
+    tokens = {
+        "access_token": new_data["access_token"],
+        "refresh_token": refresh,
+        "expires_in": new_data.get("expires_in", 3600),
+        "obtained_at": datetime.now(timezone.utc).isoformat(),
+    }
+    _save_tokens(tokens)
+    return tokens
+
+
+def get_access_token():
+    tokens = _load_tokens()
+    if _token_expired(tokens):
+        tokens = _refresh_token()
+    return tokens["access_token"]
+
+
+# --- Data API ---
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def data_get(path, params):
+    api_key = os.environ.get("VURT_YOUTUBE_API_KEY", "")
+    if not api_key:
+        raise RuntimeError("VURT_YOUTUBE_API_KEY not set")
+    qs = urllib.parse.urlencode({**params, "key": api_key})
+    return json.loads(urllib.request.urlopen(f"{YT_DATA_BASE}/{path}?{qs}", timeout=15).read())
+
+
+def list_recent_video_ids(days=60, channel_id=CHANNEL_ID):
+    """Video ids published in the last `days`, newest first.
+
+    Walks the channel's uploads playlist (1 quota unit per page) instead of
+    search.list (100 units, capped at 50 results).
+    """
+    after = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
+    uploads = "UU" + channel_id[2:]
+    ids = []
+    params = {"part": "contentDetails", "playlistId": uploads, "maxResults": 50}
+    while True:
+        data = data_get("playlistItems", params)
+        items = data.get("items", [])
+        for item in items:
+            cd = item.get("contentDetails", {})
+            if (cd.get("videoPublishedAt") or "")[:10] < after:
+                return ids
+            ids.append(cd["videoId"])
+        token = data.get("nextPageToken")
+        if not token or not items:
+            return ids
+        params["pageToken"] = token
+
+
+def get_videos(video_ids, part="snippet,statistics"):
+    """videos.list for any number of ids, 50 per request. Returns raw items in input order."""
+    by_id = {}
+    ids = list(dict.fromkeys(video_ids))
+    for batch in _chunks(ids, VIDEOS_BATCH):
+        data = data_get("videos", {"part": part, "id": ",".join(batch), "maxResults": VIDEOS_BATCH})
+        for v in data.get("items", []):
+            by_id[v["id"]] = v
+    return [by_id[i] for i in ids if i in by_id]
+
+
+def get_video_titles(video_ids):
+    try:
+        return {v["id"]: v["snippet"]["title"] for v in get_videos(video_ids, part="snippet")}
+    except Exception:
+        return {}
+
+
+# --- Analytics API ---
+def analytics_query(access_token, params):
+    params = {**params, "ids": "channel==MINE"}
+    url = f"{YT_ANALYTICS_BASE}?{urllib.parse.urlencode(params)}"
+    req = urllib.request.Request(url, headers={"Authorization": f"Bearer {access_token}"})
+    try:
+        return json.loads(urllib.request.urlopen(req, timeout=15).read())
+    except urllib.error.HTTPError as e:
+        print(f"API error {e.code}: {e.read().decode()[:500]}", file=sys.stderr)
+        return None
+
+
+def _load_store():
+    try:
+        with open(STORE_FILE) as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _save_store(store):
+    tmp = STORE_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(store, f)
+    os.replace(tmp, STORE_FILE)
+
+
+def _query_video_rows(access_token, start, end, video_ids, metrics):
+    """One report per 200 ids with dimensions=video. Returns {video_id: [metric values]}."""
+    rows = {}
+    for batch in _chunks(video_ids, ANALYTICS_BATCH):
+        data = analytics_query(access_token, {
+            "startDate": start.isoformat(), "endDate": end.isoformat(),
+            "metrics": metrics, "dimensions": "video",
+            "filters": "video==" + ",".join(batch),
+            "sort": "-views", "maxResults": str(ANALYTICS_BATCH),
+        })
+        if data is None:
+            raise RuntimeError(f"YT Analytics query failed for {start}..{end}")
+        for row in data.get("rows", []):
+            rows[row[0]] = row[1:]
+    return rows
+
+
+def _query_daily_rows(access_token, start, end, video_ids, metrics, stats):
+    """dimensions=day,video over [start, end], 200 ids per report, paged.
+
+    Returns {day iso: {video_id: [metric values]}}; days without views have no row.
+    """
+    days = {}
+    for batch in _chunks(video_ids, ANALYTICS_BATCH):
+        index = 1
+        while True:
+            data = analytics_query(access_token, {
+                "startDate": start.isoformat(), "endDate": end.isoformat(),
+                "metrics": metrics, "dimensions": "day,video",
+                "filters": "video==" + ",".join(batch),
+                "sort": "day", "maxResults": str(DAILY_PAGE), "startIndex": str(index),
+            })
+            stats["api_calls"] += 1
+            if data is None:
+                raise RuntimeError(f"YT Analytics daily query failed for {start}..{end}")
+            rows = data.get("rows", [])
+            for day, vid, *values in rows:
+                days.setdefault(day, {})[vid] = values
+            if len(rows) < DAILY_PAGE:
+                break
+            index += len(rows)
+    return days
+
+
+def _prune_store(store, today):
+    """Drop keys that aren't single days (e.g. the old weekly keys) or are older than STORE_KEEP_DAYS."""
+    oldest = (today - timedelta(days=STORE_KEEP_DAYS)).isoformat()
+    for key in list(store):
+        try:
+            date.fromisoformat(key)
+        except ValueError:
+            del store[key]
+            continue
+        if key < oldest:
+            del store[key]
+
+
+def _combine(parts):
+    """Merge per-day rows of VIDEO_METRICS: sums for counts, view-weighted averages."""
+    views = sum(p[0] for p in parts)
+    minutes = sum(p[1] for p in parts)
+    subs = sum(p[4] for p in parts)
+    if views:
+        avg_dur = sum(p[2] * p[0] for p in parts) / views
+        avg_pct = sum(p[3] * p[0] for p in parts) / views
+    else:
+        avg_dur = avg_pct = 0
+    return [views, minutes, avg_dur, avg_pct, subs]
+
+
+def get_video_analytics(video_ids, days=60, access_token=None, stats=None):
+    """Per-video VIDEO_METRICS over the last `days`, reusing finalized days from the store.
+
+    Returns {video_id: {"views", "watchMinutes", "avgDuration", "avgViewPct", "subsGained"}}.
+    `stats` (optional dict) receives call/cache counters.
+    """
+    video_ids = list(dict.fromkeys(video_ids))
+    if not video_ids:
+        return {}
+    access_token = access_token or get_access_token()
+    stats = stats if stats is not None else {}
+    stats.setdefault("api_calls", 0)
+    stats.setdefault("cached_days", 0)
+
+    today = datetime.now(timezone.utc).date()
+    start = today - timedelta(days=days)
+    finalized_until = today - timedelta(days=FINALIZED_AFTER_DAYS)
+    window = [start + timedelta(days=i) for i in range((today - start).days + 1)]
+    store = _load_store()
+
+    # Days not fully in the store (new videos, newly finalized days, the live
+    # tail) are fetched in one ranged report spanning all of them.
+    stale = [d for d in window
+             if d > finalized_until or any(v not in store.get(d.isoformat(), {}) for v in video_ids)]
+    stats["cached_days"] += len(window) - len(stale)
+    fresh = {}
+    if stale:
+        try:
+            fresh = _query_daily_rows(access_token, stale[0], stale[-1], video_ids, VIDEO_METRICS, stats)
+        except RuntimeError as e:
+            print(f"{e}; falling back to one report for the whole range", file=sys.stderr)
+            rows = _query_video_rows(access_token, start, today, video_ids, VIDEO_METRICS)
+            stats["api_calls"] += -(-len(video_ids) // ANALYTICS_BATCH)
+            return _to_result({vid: [row] for vid, row in rows.items()})
+        for d in stale:
+            if d > finalized_until:
+                continue
+            day = store.setdefault(d.isoformat(), {})
+            # Record zero rows too ([]), so videos without views that day aren't re-asked.
+            for vid in video_ids:
+                day[vid] = fresh.get(d.isoformat(), {}).get(vid, [])
+        _prune_store(store, today)
+        _save_store(store)
+
+    per_video = {vid: [] for vid in video_ids}
+    for d in window:
+        key = d.isoformat()
+        rows = fresh.get(key, {}) if d > finalized_until else store.get(key, {})
+        for vid in video_ids:
+            row = rows.get(vid)
+            if row:
+                per_video[vid].append(row)
+    return _to_result(per_video)
+
+
+def _to_result(per_video):
+    result = {}
+    for vid, parts in per_video.items():
+        views, minutes, avg_dur, avg_pct, subs = _combine(parts) if parts else [0, 0, 0, 0, 0]
+        if not views and not minutes:
+            continue
+        result[vid] = {
+            "views": int(views),
+            "watchMinutes": round(minutes, 1),
+            "avgDuration": int(avg_dur),
+            "avgViewPct": round(avg_pct, 1),
+            "subsGained": int(subs),
+        }
+    return result
+
+
+def get_top_videos(days=30, limit=25, access_token=None):
+    """Channel top videos by views over the last `days` (single report call)."""
+    access_token = access_token or get_access_token()
+    end = datetime.now(timezone.utc).date()
+    start = end - timedelta(days=days)
+    data = analytics_query(access_token, {
+        "startDate": start.isoformat(), "endDate": end.isoformat(),
+        "metrics": VIDEO_METRICS, "dimensions": "video",
+        "sort": "-views", "maxResults": str(limit),
+    })
+    return (data or {}).get("rows", [])
+
+
+def get_retention(video_id, access_token=None, start_date="2020-01-01"):
+    """Audience retention curve rows for one video.
+
+    The elapsedVideoTimeRatio dimension only accepts a single-video filter,
+    so this is inherently one call per video; callers reuse one access token.
+    """
+    access_token = access_token or get_access_token()
+    return analytics_query(access_token, {
+        "startDate": start_date,
+        "endDate": date.today().isoformat(),
+        "metrics": "audienceWatchRatio,relativeRetentionPerformance",
+        "dimensions": "elapsedVideoTimeRatio",
+        "filters": f"video=={video_id}",
+    })
@@ -7,17 +7,21 @@ Features:
 - Merge pass for mid-sentence splits
 - Manifest CSV (SRT → Frame.io view URL)
 - Review flags CSV (flagged segments for editor attention)
-- Resume support (skips already-processed files)
-- Concurrent processing with rate limiting
+- Resume support (skips already-processed files; in-flight transcripts resume from the aai_jobs table)
+- Concurrent processing, capped at the AssemblyAI in-flight limit (shared aai_jobs manager)
 
 Usage:
   source /root/.zo_secrets
   python3 Skills/vurt-subtitles/scripts/frameio-batch.py [--dry-run] [--limit N] [--folder FOLDER_ID]
 """
-import json, urllib.request, urllib.parse, os, sys, csv, time, argparse, re
+import json, urllib.request, urllib.parse, os, sys, csv, argparse, re, threading
 from datetime import datetime, timezone
 from collections import defaultdict
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "vurt-post-log", "scripts"))
+from aai_jobs import MAX_INFLIGHT, AssemblyAI, JobManager, register_sink, webhook_from_env
+from srt_pipeline import emit, from_utterances, low_confidence_clusters, ms_to_ts, reformat, short_utterance_flags
+
 # === Config ===
 SECRETS_PATH = "/home/workspace/.secrets/adobe-tokens.json"
 CLIENT_ID = os.environ.get("VURT_ADOBE_CLIENT_ID", "")
@@ -25,10 +29,8 @@ CLIENT_SECRET = os.environ.get("VURT_ADOBE_CLIENT_SECRET", "")
 ACCT = "6c77dc3c-f088-486d-a8e3-678fc0fcbd70"
 PROJECT = "6a0a9a57-379a-4d48-a7ba-f63982fa3acc"
 FIO_BASE = f"https://api.frame.io/v4/accounts/{ACCT}"
-AAI_KEY = os.environ.get("ASSEMBLYAI_API_KEY", "")
-AAI_BASE = "https://api.assemblyai.com/v2"
 UA = "VURT-Subtitle-Pipeline/2.0"
-AAI_H = {"authorization": AAI_KEY, "content-type": "application/json", "User-Agent": UA}
+AAI_CONFIG = {"speech_models": ["universal-3-pro"], "speaker_labels": True}
 
 OUT_DIR = "/home/workspace/Documents/srts-full"
 INVENTORY_PATH = "/home/workspace/Documents/frameio-srt-test/frameio-inventory.json"
@@ -45,13 +47,17 @@ MIN_DISPLAY_SEC = 1.0  # Minimum display duration (Netflix standard)
 
 
 # === Adobe Token Management ===
+_TOKEN_LOCK = threading.Lock()  # download URLs are resolved on several submit threads
+
+
 def get_token():
-    tokens = json.load(open(SECRETS_PATH))
-    obtained_str = tokens.get("obtained_at", "2000-01-01T00:00:00+00:00").replace("Z", "+00:00")
-    obtained = datetime.fromisoformat(obtained_str)
-    if (datetime.now(timezone.utc) - obtained).total_seconds() > 3000:
-        return _refresh_token(tokens)
-    return tokens["access_token"]
+    with _TOKEN_LOCK:
+        tokens = json.load(open(SECRETS_PATH))
+        obtained_str = tokens.get("obtained_at", "2000-01-01T00:00:00+00:00").replace("Z", "+00:00")
+        obtained = datetime.fromisoformat(obtained_str)
+        if (datetime.now(timezone.utc) - obtained).total_seconds() > 3000:
+            return _refresh_token(tokens)
+        return tokens["access_token"]
 
 
 def _refresh_token(tokens=None):
@@ -88,7 +94,8 @@ def fio(path):
             return json.loads(r.read())
     except urllib.error.HTTPError as e:
         if e.code in (401, 403):
-            token = _refresh_token()
+            with _TOKEN_LOCK:
+                token = _refresh_token()
             req = urllib.request.Request(
                 f"{FIO_BASE}{path}",
                 headers={"Authorization": f"Bearer {token}", "x-api-key": CLIENT_ID, "User-Agent": UA},
@@ -99,185 +106,34 @@ def fio(path):
 
 
 # === SRT Generation ===
-def ms_to_srt_ts(ms):
-    """Convert milliseconds to SRT timestamp format."""
-    h = ms // 3600000
-    m = (ms % 3600000) // 60000
-    s = (ms % 60000) // 1000
-    f = ms % 1000
-    return f"{h:02d}:{m:02d}:{s:02d},{f:03d}"
-
-
-def merge_utterances(utterances):
-    """Merge consecutive same-speaker utterances that are close together
-    and where the first doesn't end with sentence-ending punctuation."""
-    if not utterances:
-        return utterances
-
-    merged = [dict(utterances[0])]  # copy first
-    for utt in utterances[1:]:
-        prev = merged[-1]
-        same_speaker = prev.get("speaker") == utt.get("speaker")
-        gap = utt["start"] - prev["end"]
-        prev_text = prev["text"].strip()
-        # Don't merge if previous ends a sentence
-        ends_sentence = prev_text and prev_text[-1] in ".!?\"'"
-
-        if same_speaker and gap < MERGE_GAP_MS and not ends_sentence:
-            # Merge: extend end time, concatenate text
-            prev["end"] = utt["end"]
-            prev["text"] = prev["text"].strip() + " " + utt["text"].strip()
-        else:
-            merged.append(dict(utt))
-
-    return merged
-
-
-def wrap_into_chunks(text, max_chars=MAX_LINE_CHARS, max_lines=MAX_LINES):
-    """Split text into chunks that each fit within max_chars x max_lines.
-    Returns a list of strings. No text is dropped.
-    """
-    flat = ' '.join(text.strip().split())
-    if len(flat) <= max_chars:
-        return [flat]
-
-    words = flat.split()
-    chunks = []
-    current_chunk_lines = []
-    current_line = ""
-
-    for word in words:
-        test = f"{current_line} {word}".strip() if current_line else word
-        if len(test) <= max_chars:
-            current_line = test
-        else:
-            if current_line:
-                current_chunk_lines.append(current_line)
-            current_line = word
-            if len(current_chunk_lines) >= max_lines:
-                chunks.append("\n".join(current_chunk_lines))
-                current_chunk_lines = []
-
-    if current_line:
-        current_chunk_lines.append(current_line)
-    if current_chunk_lines:
-        chunks.append("\n".join(current_chunk_lines))
-
-    return chunks if chunks else [flat]
+def utterances_to_srt(utterances, flags=None):
+    """Build SRT from utterances with optional merge, line wrapping, and min duration.
 
-
-def enforce_min_duration(utterances, min_sec=MIN_DISPLAY_SEC):
-    """Ensure every utterance has at least min_sec display time.
-    Extends end time if needed, but won't overlap with next utterance.
+    Single streaming pass (srt_pipeline); short-utterance QC flags are
+    appended to `flags` on the way through, if given.
     """
-    result = []
-    for i, utt in enumerate(utterances):
-        u = dict(utt)
-        dur_ms = u["end"] - u["start"]
-        min_ms = int(min_sec * 1000)
-
-        if dur_ms < min_ms:
-            new_end = u["start"] + min_ms
-            # Don't overlap with next utterance
-            if i < len(utterances) - 1:
-                next_start = utterances[i + 1]["start"]
-                new_end = min(new_end, next_start - 1)
-            u["end"] = max(u["end"], new_end)
-
-        result.append(u)
-    return result
-
-
-def utterances_to_srt(utterances):
-    """Build SRT from utterances with optional merge, line wrapping, and min duration."""
-    processed = utterances
-    if MERGE_ENABLED:
-        processed = merge_utterances(processed)
-    processed = enforce_min_duration(processed)
-
-    srt_blocks = []
-    idx = 1
-    for utt in processed:
-        text = utt["text"].strip()
-        if not text:
-            continue
-        chunks = wrap_into_chunks(text)
-        if len(chunks) == 1:
-            start_ts = ms_to_srt_ts(utt["start"])
-            end_ts = ms_to_srt_ts(utt["end"])
-            srt_blocks.append(f"{idx}\n{start_ts} --> {end_ts}\n{chunks[0]}\n")
-            idx += 1
-        else:
-            # Split timing proportionally
-            total_dur = utt["end"] - utt["start"]
-            chunk_dur = total_dur // len(chunks)
-            for j, chunk in enumerate(chunks):
-                start = utt["start"] + j * chunk_dur
-                end = utt["start"] + (j + 1) * chunk_dur if j < len(chunks) - 1 else utt["end"]
-                srt_blocks.append(f"{idx}\n{ms_to_srt_ts(start)} --> {ms_to_srt_ts(end)}\n{chunk}\n")
-                idx += 1
-    return "\n".join(srt_blocks) + "\n"
+    blocks = from_utterances(utterances)
+    if flags is not None:
+        blocks = short_utterance_flags(blocks, flags, SHORT_UTTERANCE_SEC)
+    blocks = reformat(blocks, MAX_LINE_CHARS, MAX_LINES, MIN_DISPLAY_SEC,
+                      merge_gap=MERGE_GAP_MS if MERGE_ENABLED else None,
+                      same_speaker=True, enders=".!?\"'", drop_empty=True)
+    return "".join(emit(blocks))
 
 
 # === QC Flagging ===
 def flag_low_confidence(words):
     """Find clusters of low-confidence words."""
-    flags = []
-    cluster = []
-    for w in words:
-        if w.get("confidence", 1.0) < LOW_CONFIDENCE_THRESHOLD:
-            cluster.append(w)
-        else:
-            if len(cluster) >= LOW_CONFIDENCE_CLUSTER_MIN:
-                flags.append({
-                    "type": "low_confidence",
-                    "start_ms": cluster[0]["start"],
-                    "end_ms": cluster[-1]["end"],
-                    "start_ts": ms_to_srt_ts(cluster[0]["start"]),
-                    "end_ts": ms_to_srt_ts(cluster[-1]["end"]),
-                    "avg_confidence": sum(w["confidence"] for w in cluster) / len(cluster),
-                    "word_count": len(cluster),
-                    "text": " ".join(w["text"] for w in cluster),
-                })
-            cluster = []
-    # Final cluster
-    if len(cluster) >= LOW_CONFIDENCE_CLUSTER_MIN:
-        flags.append({
-            "type": "low_confidence",
-            "start_ms": cluster[0]["start"],
-            "end_ms": cluster[-1]["end"],
-            "start_ts": ms_to_srt_ts(cluster[0]["start"]),
-            "end_ts": ms_to_srt_ts(cluster[-1]["end"]),
-            "avg_confidence": sum(w["confidence"] for w in cluster) / len(cluster),
-            "word_count": len(cluster),
-            "text": " ".join(w["text"] for w in cluster),
-        })
-    return flags
-
-
-def flag_short_utterances(utterances):
-    """Flag very short utterances with speaker changes — often misattributed."""
-    flags = []
-    for i, utt in enumerate(utterances):
-        dur_ms = utt["end"] - utt["start"]
-        if dur_ms < SHORT_UTTERANCE_SEC * 1000:
-            # Check if speaker changes around this utterance
-            prev_speaker = utterances[i - 1].get("speaker") if i > 0 else None
-            next_speaker = utterances[i + 1].get("speaker") if i < len(utterances) - 1 else None
-            curr_speaker = utt.get("speaker")
-
-            if prev_speaker != curr_speaker or next_speaker != curr_speaker:
-                flags.append({
-                    "type": "short_utterance",
-                    "start_ms": utt["start"],
-                    "end_ms": utt["end"],
-                    "start_ts": ms_to_srt_ts(utt["start"]),
-                    "end_ts": ms_to_srt_ts(utt["end"]),
-                    "duration_ms": dur_ms,
-                    "speaker": curr_speaker,
-                    "text": utt["text"].strip(),
-                })
-    return flags
+    return [{
+        "type": "low_confidence",
+        "start_ms": cluster[0]["start"],
+        "end_ms": cluster[-1]["end"],
+        "start_ts": ms_to_ts(cluster[0]["start"]),
+        "end_ts": ms_to_ts(cluster[-1]["end"]),
+        "avg_confidence": sum(w["confidence"] for w in cluster) / len(cluster),
+        "word_count": len(cluster),
+        "text": " ".join(w["text"] for w in cluster),
+    } for cluster in low_confidence_clusters(words, LOW_CONFIDENCE_THRESHOLD, LOW_CONFIDENCE_CLUSTER_MIN)]
 
 
 # === Get Download URL ===
@@ -288,84 +144,70 @@ def get_download_url(file_id):
 
 
 # === Process Single File ===
-def process_file(file_info, out_dir):
-    """Transcribe a single file and return results + flags."""
+def srt_name_for(name):
+    return re.sub(r'\.(mp4|mov|mkv|avi|webm|wav|mp3)$', '', name, flags=re.IGNORECASE)
+
+
+def process_file(file_info, out_dir, mgr):
+    """Queue a single file on the job manager. Returns a skip result, or None if queued."""
     name = file_info["name"]
     file_id = file_info["id"]
-    srt_name = re.sub(r'\.(mp4|mov|mkv|avi|webm|wav|mp3)$', '', name, flags=re.IGNORECASE)
+    srt_name = srt_name_for(name)
     srt_path = os.path.join(out_dir, f"{srt_name}.srt")
 
     # Skip if already done
     if os.path.exists(srt_path) and os.path.getsize(srt_path) > 10:
         return {"name": srt_name, "status": "skipped", "reason": "already exists"}
 
-    # Get download URL
-    try:
-        dl_url = get_download_url(file_id)
-    except Exception as e:
-        return {"name": srt_name, "status": "error", "error": f"download_url: {e}"}
-
-    # Submit to AssemblyAI
-    body = json.dumps({
-        "audio_url": dl_url,
-        "speech_models": ["universal-3-pro"],
-        "speaker_labels": True,
-    }).encode()
-    req = urllib.request.Request(f"{AAI_BASE}/transcript", data=body, headers=AAI_H, method="POST")
-    try:
-        with urllib.request.urlopen(req) as r:
-            resp = json.loads(r.read())
-        tid = resp["id"]
-    except Exception as e:
-        return {"name": srt_name, "status": "error", "error": f"submit: {e}"}
-
-    # Poll for completion
-    while True:
-        time.sleep(5)
-        req = urllib.request.Request(f"{AAI_BASE}/transcript/{tid}", headers=AAI_H)
-        with urllib.request.urlopen(req) as r:
-            resp = json.loads(r.read())
+    # The download URL is signed and short-lived, so it's resolved at submit time.
+    mgr.add(file_id, source=lambda: get_download_url(file_id), config=AAI_CONFIG,
+            sinks=[{"type": "frameio_srt", "path": srt_path}],
+            meta={"name": srt_name, "view_url": file_info.get("view_url", ""), "path": file_info.get("path", "")},
+            retry_errors=True)
+    return None
 
-        if resp["status"] == "completed":
-            break
-        elif resp["status"] == "error":
-            return {"name": srt_name, "status": "error", "error": resp.get("error", "unknown")}
 
-    # Extract data
-    utterances = resp.get("utterances", [])
-    words = resp.get("words", [])
-    dur = resp.get("audio_duration", 0)
+def srt_sink(job, transcript, client, path):
+    """Job sink: diarized SRT + QC flags for one completed transcript."""
+    utterances = transcript.get("utterances") or []
+    words = transcript.get("words") or []
     speakers = len(set(u.get("speaker") for u in utterances)) if utterances else 0
 
+    # QC flags: low confidence first, then short utterances (collected while building the SRT)
+    flags = flag_low_confidence(words) if words else []
+
     # Build SRT
     if utterances:
-        srt = utterances_to_srt(utterances)
+        srt = utterances_to_srt(utterances, flags)
     else:
         # Fallback
-        req2 = urllib.request.Request(f"{AAI_BASE}/transcript/{tid}/srt", headers=AAI_H)
-        with urllib.request.urlopen(req2) as r2:
-            srt = r2.read().decode()
+        srt = client.srt(job["tid"])
 
     # Write SRT
-    with open(srt_path, "w") as f:
+    with open(path, "w") as f:
         f.write(srt)
 
-    # QC flags
-    flags = []
-    if words:
-        flags.extend(flag_low_confidence(words))
-    if utterances:
-        flags.extend(flag_short_utterances(utterances))
-
     return {
-        "name": srt_name,
-        "status": "success",
-        "duration_sec": dur,
+        "duration_sec": transcript.get("audio_duration", 0) or 0,
         "word_count": len(words),
         "speakers": speakers,
         "flags": flags,
-        "view_url": file_info.get("view_url", ""),
-        "path": file_info.get("path", ""),
+    }
+
+
+register_sink("frameio_srt", srt_sink)
+
+
+def file_result(job):
+    meta = job["meta"]
+    if job["status"] != "done":
+        return {"name": meta["name"], "status": "error", "error": job.get("error") or job["status"]}
+    return {
+        "name": meta["name"],
+        "status": "success",
+        **job["result"],
+        "view_url": meta.get("view_url", ""),
+        "path": meta.get("path", ""),
     }
 
 
@@ -377,6 +219,7 @@ def main():
     parser.add_argument("--folder", type=str, default="", help="Only process files from this folder path prefix")
     parser.add_argument("--output", type=str, default=OUT_DIR, help="Output directory")
     parser.add_argument("--merge", action="store_true", help="Enable merge pass for mid-sentence splits")
+    parser.add_argument("--concurrency", type=int, default=MAX_INFLIGHT, help="Max transcripts in flight")
     args = parser.parse_args()
 
     global MERGE_ENABLED
@@ -409,13 +252,11 @@ def main():
     if args.dry_run:
         print(f"\n[DRY RUN] Would process {len(files)} files:")
         for f in files:
-            srt_name = re.sub(r'\.(mp4|mov|mkv|avi|webm|wav|mp3)$', '', f["name"], flags=re.IGNORECASE)
+            srt_name = srt_name_for(f["name"])
             exists = os.path.exists(os.path.join(out_dir, f"{srt_name}.srt"))
             status = "SKIP (exists)" if exists else "PROCESS"
             print(f"  [{status}] {f['name']} ({f['file_size']/1e6:.0f}MB)")
-        to_process = [f for f in files if not os.path.exists(
-            os.path.join(out_dir, re.sub(r'\.(mp4|mov|mkv|avi|webm|wav|mp3)$', '', f["name"], flags=re.IGNORECASE) + ".srt")
-        )]
+        to_process = [f for f in files if not os.path.exists(os.path.join(out_dir, srt_name_for(f["name"]) + ".srt"))]
         print(f"\n{len(to_process)} files to process, {len(files) - len(to_process)} already done")
         return
 
@@ -425,12 +266,17 @@ def main():
     print(f"Output: {out_dir}")
     print(f"{'=' * 60}\n")
 
+    mgr = JobManager("frameio-srt", client=AssemblyAI(user_agent=UA), max_inflight=args.concurrency,
+                     webhook=webhook_from_env())
+    queued = [process_file(f, out_dir, mgr) for f in files]
+    jobs = mgr.run()
+
     results = []
     all_flags = {}
-    for i, f in enumerate(files, 1):
-        print(f"[{i}/{len(files)}] {f['name']}...", end=" ", flush=True)
-        result = process_file(f, out_dir)
+    for i, (f, skipped) in enumerate(zip(files, queued), 1):
+        result = skipped or file_result(jobs[f["id"]])
         results.append(result)
+        print(f"[{i}/{len(files)}] {f['name']}...", end=" ", flush=True)
 
         if result["status"] == "success":
             dur_min = result["duration_sec"] / 60
@@ -496,6 +342,9 @@ def main():
     total_dur = sum(r.get("duration_sec", 0) for r in ok)
     total_words = sum(r.get("word_count", 0) for r in ok)
     total_flags = sum(len(r.get("flags", [])) for r in ok)
+    cached = [r for r in ok if r.get("from_cache")]
+    billed_dur = total_dur - sum(r.get("duration_sec", 0) for r in cached)
+    cache = mgr.store
 
     print(f"\n{'=' * 60}")
     print(f"BATCH COMPLETE")
@@ -506,7 +355,9 @@ def main():
     print(f"  Duration:  {total_dur/60:.0f} min ({total_dur/3600:.1f} hours)")
     print(f"  Words:     {total_words:,}")
     print(f"  Flags:     {total_flags}")
-    print(f"  Est cost:  ${total_dur/60 * 0.00617:.2f} (pro)")
+    print(f"  Reused:    {len(cached)} from transcript cache"
+          + (f" ({cache.hits}/{cache.lookups} lookups hit)" if cache and cache.lookups else ""))
+    print(f"  Est cost:  ${billed_dur/60 * 0.00617:.2f} (pro)")
 
     if errors:
         print(f"\nErrors:")
@@ -525,7 +376,9 @@ def main():
             "total_duration_min": round(total_dur / 60, 1),
             "total_words": total_words,
             "total_flags": total_flags,
-            "estimated_cost": round(total_dur / 60 * 0.00617, 2),
+            "estimated_cost": round(billed_dur / 60 * 0.00617, 2),
+            "transcript_cache": {"reused": len(cached), "hits": cache.hits if cache else 0,
+                                 "lookups": cache.lookups if cache else 0},
             "results": results,
         }, f, indent=2)
     print(f"\nReport: {report_path}")
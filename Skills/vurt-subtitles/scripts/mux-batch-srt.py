@@ -2,15 +2,18 @@
 """VURT Mux → AssemblyAI Batch Subtitle Generator
 
 For each Mux asset:
-1. Create temporary public playback ID
+1. Create temporary public playback ID (at submit time)
 2. Send audio URL to AssemblyAI for transcription
-3. Poll until done, download SRT
+3. Wait for completion via the shared aai_jobs manager, download SRT
 4. Remove public playback ID (cleanup)
 """
 import os, sys, json, time, argparse, requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "vurt-post-log" / "scripts"))
+from aai_jobs import MAX_INFLIGHT, JobManager, register_sink, webhook_from_env
+from srt_pipeline import low_confidence_clusters
+
 MUX_TOKEN_ID = os.environ.get("VURT_MUX_TOKEN_ID", "")
 MUX_TOKEN_SECRET = os.environ.get("VURT_MUX_TOKEN_SECRET", "")
 ASSEMBLYAI_KEY = os.environ.get("ASSEMBLYAI_API_KEY", "")
@@ -51,65 +54,20 @@ def list_all_assets():
             break
     return assets
 
-def transcribe(audio_url):
-    h = {"authorization": ASSEMBLYAI_KEY, "content-type": "application/json"}
-    r = requests.post(f"{AAI_BASE}/transcript", json={"audio_url": audio_url, "speech_models": ["universal-2"]}, headers=h)
-    if not r.ok:
-        raise Exception(f"Transcript request failed ({r.status_code}): {r.text}")
-
-    tid = r.json()["id"]
-    while True:
-        r = requests.get(f"{AAI_BASE}/transcript/{tid}", headers=h)
-        d = r.json()
-        if d["status"] == "completed":
-            return tid, d
-        if d["status"] == "error":
-            raise Exception(f"Transcription error: {d.get('error')}")
-        time.sleep(3)
-
-def get_srt(transcript_id):
-    h = {"authorization": ASSEMBLYAI_KEY}
-    r = requests.get(f"{AAI_BASE}/transcript/{transcript_id}/srt", headers=h)
-    r.raise_for_status()
-    return r.text
-
 CONFIDENCE_THRESHOLD = 0.6
 MIN_CLUSTER_WORDS = 3
 
 def flag_low_confidence(transcript, name):
-    words = transcript.get("words", [])
-    if not words:
-        return []
-    flags = []
-    cluster = []
-    for w in words:
-        if w.get("confidence", 1.0) < CONFIDENCE_THRESHOLD:
-            cluster.append(w)
-        else:
-            if len(cluster) >= MIN_CLUSTER_WORDS:
-                flags.append({
-                    "name": name,
-                    "start": format_ts(cluster[0]["start"]),
-                    "end": format_ts(cluster[-1]["end"]),
-                    "start_ms": cluster[0]["start"],
-                    "end_ms": cluster[-1]["end"],
-                    "avg_confidence": round(sum(c["confidence"] for c in cluster) / len(cluster), 3),
-                    "word_count": len(cluster),
-                    "text": " ".join(c["text"] for c in cluster),
-                })
-            cluster = []
-    if len(cluster) >= MIN_CLUSTER_WORDS:
-        flags.append({
-            "name": name,
-            "start": format_ts(cluster[0]["start"]),
-            "end": format_ts(cluster[-1]["end"]),
-            "start_ms": cluster[0]["start"],
-            "end_ms": cluster[-1]["end"],
-            "avg_confidence": round(sum(c["confidence"] for c in cluster) / len(cluster), 3),
-            "word_count": len(cluster),
-            "text": " ".join(c["text"] for c in cluster),
-        })
-    return flags
+    return [{
+        "name": name,
+        "start": format_ts(cluster[0]["start"]),
+        "end": format_ts(cluster[-1]["end"]),
+        "start_ms": cluster[0]["start"],
+        "end_ms": cluster[-1]["end"],
+        "avg_confidence": round(sum(c["confidence"] for c in cluster) / len(cluster), 3),
+        "word_count": len(cluster),
+        "text": " ".join(c["text"] for c in cluster),
+    } for cluster in low_confidence_clusters(transcript.get("words") or [], CONFIDENCE_THRESHOLD, MIN_CLUSTER_WORDS)]
 
 def format_ts(ms):
     s = ms // 1000
@@ -117,61 +75,50 @@ def format_ts(ms):
     h, m = divmod(m, 60)
     return f"{h:02d}:{m:02d}:{s:02d}"
 
-def process_asset(asset, index, total, output_dir):
-    aid = asset["id"]
-    passthrough = asset.get("passthrough", "")
-    dur_min = round(asset.get("duration", 0) / 60, 1)
-    tag = f"[{index+1}/{total}]"
-    name = passthrough or aid[:16]
-    public_pid = None
-
-    try:
-        has_audio = any(t.get("type") == "audio" for t in asset.get("tracks", []))
-        if not has_audio:
-            print(f"{tag} SKIP (no audio): {name}")
-            return {"name": name, "status": "skipped", "reason": "no audio"}
-
-        print(f"{tag} {name} ({dur_min}min) — creating public URL...")
+def playback_source(aid):
+    """Job source: a temporary public playback ID, recorded in the job meta for cleanup."""
+    def source():
         resp = mux_post(f"assets/{aid}/playback-ids", {"policy": "public"})
         public_pid = resp["data"]["id"]
-        audio_url = f"https://stream.mux.com/{public_pid}/highest.mp4"
-
-        print(f"{tag} {name} — transcribing...")
-        tid, transcript = transcribe(audio_url)
-
-        print(f"{tag} {name} — fetching SRT...")
-        srt = get_srt(tid)
-
-        srt_path = output_dir / f"{name}.srt"
-        srt_path.write_text(srt, encoding="utf-8")
-
-        flags = flag_low_confidence(transcript, name)
-        if flags:
-            print(f"{tag} {name} — {len(flags)} segment(s) flagged for review")
-
-        audio_dur = transcript.get("audio_duration", 0)
-        print(f"{tag} {name} — done ({round(audio_dur/60,1)}min audio) → {srt_path}")
+        return f"https://stream.mux.com/{public_pid}/highest.mp4", {"public_pid": public_pid}
+    return source
+
+def review_flags_sink(job, transcript, client):
+    name = job["meta"]["name"]
+    flags = flag_low_confidence(transcript, name)
+    if flags:
+        print(f"{name} — {len(flags)} segment(s) flagged for review")
+    return {"flags": flags}
+
+def playback_cleanup_sink(job, transcript, client):
+    public_pid = job["meta"].get("public_pid")
+    if not public_pid:
+        return
+    try:
+        mux_delete(f"assets/{job['key']}/playback-ids/{public_pid}")
+    except Exception:
+        print(f"{job['meta']['name']} — WARNING: failed to remove public playback ID {public_pid}")
 
-        return {"name": name, "status": "success", "srt_path": str(srt_path),
-                "audio_duration": audio_dur, "asset_id": aid, "flags": flags}
+register_sink("mux_review_flags", review_flags_sink)
+register_sink("mux_playback_cleanup", playback_cleanup_sink, always=True)
 
-    except Exception as e:
-        print(f"{tag} {name} — FAILED: {e}")
-        return {"name": name, "status": "error", "error": str(e), "asset_id": aid}
+def asset_name(asset):
+    return asset.get("passthrough", "") or asset["id"][:16]
 
-    finally:
-        if public_pid:
-            try:
-                mux_delete(f"assets/{aid}/playback-ids/{public_pid}")
-                print(f"{tag} {name} — cleaned up public playback ID")
-            except:
-                print(f"{tag} {name} — WARNING: failed to remove public playback ID {public_pid}")
+def job_result(job):
+    name = job["meta"]["name"]
+    if job["status"] == "done":
+        r = job["result"]
+        return {"name": name, "status": "success", "srt_path": r.get("srt_path"),
+                "audio_duration": r.get("audio_duration", 0), "asset_id": job["key"], "flags": r.get("flags", []),
+                "from_cache": r.get("from_cache", False)}
+    return {"name": name, "status": "error", "error": job.get("error") or job["status"], "asset_id": job["key"]}
 
 def main():
     parser = argparse.ArgumentParser(description="VURT Mux → AssemblyAI Batch SRT")
     parser.add_argument("-o", "--output", default="./srts", help="Output directory")
     parser.add_argument("-n", "--limit", type=int, default=0, help="Max assets to process (0=all)")
-    parser.add_argument("-c", "--concurrency", type=int, default=3, help="Parallel jobs")
+    parser.add_argument("-c", "--concurrency", type=int, default=MAX_INFLIGHT, help="Max transcripts in flight")
     parser.add_argument("--dry-run", action="store_true", help="List assets without processing")
     args = parser.parse_args()
 
@@ -190,7 +137,7 @@ def main():
 
     if args.dry_run:
         for i, a in enumerate(audio_assets):
-            name = a.get("passthrough", "") or a["id"][:16]
+            name = asset_name(a)
             dur = round(a.get("duration", 0) / 60, 1)
             print(f"  {i+1}. {name} — {dur}min")
         print(f"\n{len(audio_assets)} assets would be processed.")
@@ -200,21 +147,23 @@ def main():
     output_dir.mkdir(parents=True, exist_ok=True)
 
     start = time.time()
-    results = []
-
-    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
-        futures = {
-            pool.submit(process_asset, a, i, len(audio_assets), output_dir): a
-            for i, a in enumerate(audio_assets)
-        }
-        for f in as_completed(futures):
-            results.append(f.result())
+    mgr = JobManager("mux-srt", max_inflight=args.concurrency, webhook=webhook_from_env())
+    for a in audio_assets:
+        name = asset_name(a)
+        mgr.add(a["id"], source=playback_source(a["id"]), config={"speech_models": ["universal-2"]},
+                sinks=[{"type": "srt", "path": str(output_dir / f"{name}.srt")},
+                       {"type": "mux_review_flags"}, {"type": "mux_playback_cleanup"}],
+                meta={"name": name}, retry_errors=True)
+    jobs = mgr.run()
+    results = [job_result(jobs[a["id"]]) for a in audio_assets]
 
     elapsed = round((time.time() - start) / 60, 1)
     succeeded = [r for r in results if r["status"] == "success"]
     failed = [r for r in results if r["status"] == "error"]
     total_audio = sum(r.get("audio_duration", 0) for r in succeeded) / 60
-    cost = total_audio * 0.0025
+    cached = [r for r in succeeded if r.get("from_cache")]
+    cost = (total_audio - sum(r.get("audio_duration", 0) for r in cached) / 60) * 0.0025
+    cache = mgr.store
 
     all_flags = []
     for r in succeeded:
@@ -227,6 +176,8 @@ def main():
     print(f"Succeeded:  {len(succeeded)}")
     print(f"Failed:     {len(failed)}")
     print(f"Audio:      {total_audio:.1f} minutes")
+    print(f"Reused:     {len(cached)} from transcript cache"
+          + (f" ({cache.hits}/{cache.lookups} lookups hit)" if cache and cache.lookups else ""))
     print(f"Est. cost:  ${cost:.2f}")
     print(f"Wall time:  {elapsed} minutes")
     print(f"Flagged:    {len(all_flags)} segment(s) across {len(set(f['name'] for f in all_flags))} file(s)")
@@ -247,7 +198,9 @@ def main():
         "results": results,
         "summary": {"total": len(audio_assets), "succeeded": len(succeeded),
                      "failed": len(failed), "audio_minutes": round(total_audio, 1),
-                     "estimated_cost": round(cost, 2)}
+                     "estimated_cost": round(cost, 2), "transcript_cache_reused": len(cached),
+                     "transcript_cache_hits": cache.hits if cache else 0,
+                     "transcript_cache_lookups": cache.lookups if cache else 0}
     }, indent=2))
     print(f"\nReport: {report}")
 
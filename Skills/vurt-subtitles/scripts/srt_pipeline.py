@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""Streaming subtitle toolkit shared by reformat-srt.py, frameio-batch.py and mux-batch-srt.py.
+
+Every stage is a generator over blocks {"start_ms", "end_ms", "text"[, "speaker"]},
+so a file is processed in one pass holding at most a couple of blocks:
+
+    read_srt(path) | from_utterances(transcript)      parse
+      → merge()                                         optional mid-sentence merge
+      → enforce_min_duration()                          one-block lookahead
+      → wrap()                                          split long blocks, proportional timing
+      → emit() / write_srt()                            renumbered SRT text
+
+QC helpers (short_utterance_flags, low_confidence_clusters) are pass-through or
+streaming too.
+
+Usage:
+    python3 srt_pipeline.py --bench [--files 2000] [--workers 4]
+"""
+
+import argparse
+import os
+import random
+import re
+import shutil
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+MAX_LINE_CHARS = 32   # 9:16 vertical video standard
+MAX_LINES = 2
+MIN_DISPLAY_SEC = 1.0
+MERGE_GAP_MS = 3000
+SENTENCE_ENDERS = '.!?"\')'
+
+_TS = re.compile(r'(\d{2}):(\d{2}):(\d{2}),(\d{3})')
+_TS_LINE = re.compile(r'(\d{2}:\d{2}:\d{2},\d{3})\s*-->\s*(\d{2}:\d{2}:\d{2},\d{3})')
+
+
+# --- Timestamps ---
+def ts_to_ms(ts):
+    """Convert SRT timestamp to milliseconds."""
+    m = _TS.match(ts)
+    if not m:
+        return 0
+    h, mi, s, ms = (int(g) for g in m.groups())
+    return h * 3600000 + mi * 60000 + s * 1000 + ms
+
+
+def ms_to_ts(ms):
+    """Convert milliseconds to SRT timestamp."""
+    h = ms // 3600000
+    m = (ms % 3600000) // 60000
+    s = (ms % 60000) // 1000
+    f = ms % 1000
+    return f"{h:02d}:{m:02d}:{s:02d},{f:03d}"
+
+
+# --- Sources ---
+def _parse_block(raw):
+    lines = raw.strip().split('\n')
+    if len(lines) < 3:
+        return None
+    try:
+        idx = int(lines[0].strip())
+    except ValueError:
+        return None
+    m = _TS_LINE.match(lines[1].strip())
+    if not m:
+        return None
+    return {
+        'index': idx,
+        'start_ms': ts_to_ms(m.group(1)),
+        'end_ms': ts_to_ms(m.group(2)),
+        'text': '\n'.join(lines[2:]).strip(),
+    }
+
+
+def parse_srt(lines):
+    """Blocks from an iterable of SRT lines (a file object works). Blank lines end a block."""
+    buf = []
+    for line in lines:
+        line = line.rstrip('\n')
+        if line:
+            buf.append(line)
+            continue
+        if buf:
+            block = _parse_block('\n'.join(buf))
+            if block:
+                yield block
+            buf = []
+    if buf:
+        block = _parse_block('\n'.join(buf))
+        if block:
+            yield block
+
+
+def read_srt(path):
+    with open(path, encoding='utf-8') as f:
+        yield from parse_srt(f)
+
+
+def from_utterances(utterances):
+    """Blocks from AssemblyAI utterances ({start, end, text, speaker})."""
+    for u in utterances:
+        yield {'start_ms': u['start'], 'end_ms': u['end'], 'text': u['text'], 'speaker': u.get('speaker')}
+
+
+# --- Stages ---
+def merge(blocks, gap_ms=MERGE_GAP_MS, enders=SENTENCE_ENDERS, same_speaker=False):
+    """Join consecutive blocks closer than gap_ms when the first doesn't end a sentence.
+
+    With same_speaker, blocks from different speakers are never joined
+    (without speaker data, any close consecutive blocks are).
+    """
+    prev = None
+    for b in blocks:
+        if prev is None:
+            prev = dict(b)
+            continue
+        prev_text = prev['text'].strip()
+        ends_sentence = prev_text and prev_text[-1] in enders
+        speaker_ok = not same_speaker or prev.get('speaker') == b.get('speaker')
+        if speaker_ok and b['start_ms'] - prev['end_ms'] < gap_ms and not ends_sentence:
+            prev['end_ms'] = b['end_ms']
+            prev['text'] = prev_text + ' ' + b['text'].strip()
+        else:
+            yield prev
+            prev = dict(b)
+    if prev is not None:
+        yield prev
+
+
+def enforce_min_duration(blocks, min_sec=MIN_DISPLAY_SEC):
+    """Stretch blocks to min_sec without overlapping the next block's start."""
+    min_ms = int(min_sec * 1000)
+    blocks = iter(blocks)
+    cur = next(blocks, None)
+    while cur is not None:
+        nxt = next(blocks, None)
+        b = dict(cur)
+        if b['end_ms'] - b['start_ms'] < min_ms:
+            new_end = b['start_ms'] + min_ms
+            if nxt is not None:
+                new_end = min(new_end, nxt['start_ms'] - 1)
+            b['end_ms'] = max(b['end_ms'], new_end)
+        yield b
+        cur = nxt
+
+
+def wrap_into_chunks(text, max_chars=MAX_LINE_CHARS, max_lines=MAX_LINES):
+    """Split text into chunks that each fit within max_chars x max_lines.
+    Returns a list of strings. No text is dropped.
+    """
+    flat = ' '.join(text.split())
+    if len(flat) <= max_chars:
+        return [flat]
+
+    chunks = []
+    current_chunk_lines = []
+    current_line = ""
+    for word in flat.split():
+        test = f"{current_line} {word}" if current_line else word
+        if len(test) <= max_chars:
+            current_line = test
+        else:
+            if current_line:
+                current_chunk_lines.append(current_line)
+            current_line = word
+            if len(current_chunk_lines) >= max_lines:
+                chunks.append("\n".join(current_chunk_lines))
+                current_chunk_lines = []
+    if current_line:
+        current_chunk_lines.append(current_line)
+    if current_chunk_lines:
+        chunks.append("\n".join(current_chunk_lines))
+    return chunks if chunks else [flat]
+
+
+def wrap(blocks, max_chars=MAX_LINE_CHARS, max_lines=MAX_LINES, drop_empty=False):
+    """Split blocks whose text exceeds max_chars x max_lines, dividing time proportionally."""
+    for b in blocks:
+        if drop_empty and not b['text'].strip():
+            continue
+        chunks = wrap_into_chunks(b['text'], max_chars, max_lines)
+        if len(chunks) == 1:
+            yield dict(b, text=chunks[0])
+            continue
+        chunk_dur = (b['end_ms'] - b['start_ms']) // len(chunks)
+        for j, chunk in enumerate(chunks):
+            start = b['start_ms'] + j * chunk_dur
+            end = b['start_ms'] + (j + 1) * chunk_dur if j < len(chunks) - 1 else b['end_ms']
+            yield {'start_ms': start, 'end_ms': end, 'text': chunk, 'speaker': b.get('speaker')}
+
+
+def reformat(blocks, max_chars=MAX_LINE_CHARS, max_lines=MAX_LINES, min_sec=MIN_DISPLAY_SEC,
+             merge_gap=None, same_speaker=False, enders=SENTENCE_ENDERS, drop_empty=False):
+    """merge (if merge_gap is set) → min duration → wrap."""
+    if merge_gap is not None:
+        blocks = merge(blocks, merge_gap, enders, same_speaker)
+    return wrap(enforce_min_duration(blocks, min_sec), max_chars, max_lines, drop_empty)
+
+
+# --- Output ---
+def emit(blocks):
+    """SRT text pieces, renumbered from 1. ''.join(emit(...)) is the whole file."""
+    sep = ""
+    for i, b in enumerate(blocks, 1):
+        yield f"{sep}{i}\n{ms_to_ts(b['start_ms'])} --> {ms_to_ts(b['end_ms'])}\n{b['text']}\n"
+        sep = "\n"
+    yield "\n"
+
+
+def write_srt(blocks, path):
+    """Stream blocks to `path` (atomic replace). Returns the number of blocks written."""
+    counted = _Tally(blocks)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.writelines(emit(counted))
+    os.replace(tmp, path)
+    return counted.n
+
+
+class _Tally:
+    def __init__(self, items):
+        self.items = items
+        self.n = 0
+
+    def __iter__(self):
+        for item in self.items:
+            self.n += 1
+            yield item
+
+
+# --- QC ---
+def short_utterance_flags(blocks, flags, min_sec=1.0):
+    """Pass blocks through, appending to `flags` the short ones next to a speaker change."""
+    blocks = iter(blocks)
+    prev, cur = None, next(blocks, None)
+    while cur is not None:
+        nxt = next(blocks, None)
+        dur_ms = cur['end_ms'] - cur['start_ms']
+        speaker = cur.get('speaker')
+        if dur_ms < min_sec * 1000 and (
+                (prev.get('speaker') if prev else None) != speaker
+                or (nxt.get('speaker') if nxt else None) != speaker):
+            flags.append({
+                "type": "short_utterance",
+                "start_ms": cur['start_ms'],
+                "end_ms": cur['end_ms'],
+                "start_ts": ms_to_ts(cur['start_ms']),
+                "end_ts": ms_to_ts(cur['end_ms']),
+                "duration_ms": dur_ms,
+                "speaker": speaker,
+                "text": cur['text'].strip(),
+            })
+        yield cur
+        prev, cur = cur, nxt
+
+
+def low_confidence_clusters(words, threshold=0.6, min_words=3):
+    """Runs of at least min_words consecutive words below `threshold` confidence."""
+    cluster = []
+    for w in words:
+        if w.get("confidence", 1.0) < threshold:
+            cluster.append(w)
+            continue
+        if len(cluster) >= min_words:
+            yield cluster
+        cluster = []
+    if len(cluster) >= min_words:
+        yield cluster
+
+
+# --- Batch ---
+def reformat_file(in_path, out_path, **opts):
+    """Reformat one SRT file. Returns (blocks in, blocks out)."""
+    counted = _Tally(read_srt(in_path))
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    written = write_srt(reformat(counted, **opts), out_path)
+    return counted.n, written
+
+
+def _reformat_job(args):
+    in_path, out_path, opts = args
+    try:
+        return in_path, reformat_file(in_path, out_path, **opts), None
+    except Exception as e:
+        return in_path, None, str(e)
+
+
+def reformat_tree(in_dir, out_dir, workers=None, recursive=False, **opts):
+    """Reformat every .srt under in_dir into out_dir (same relative paths) across processes.
+
+    Yields (in_path, (blocks_in, blocks_out) or None, error) as files finish.
+    """
+    jobs = []
+    walker = os.walk(in_dir) if recursive else [(in_dir, [], os.listdir(in_dir))]
+    for root, _, names in walker:
+        for name in sorted(names):
+            if name.endswith('.srt'):
+                rel = os.path.relpath(os.path.join(root, name), in_dir)
+                jobs.append((os.path.join(in_dir, rel), os.path.join(out_dir, rel), opts))
+    if workers == 1 or len(jobs) < 2:
+        yield from map(_reformat_job, jobs)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(_reformat_job, jobs, chunksize=8)
+
+
+# --- Benchmark ---
+def _synthetic_srt(rng, n_blocks, vocab):
+    t = 0
+    parts = []
+    for i in range(1, n_blocks + 1):
+        start = t + rng.randint(0, 4000)
+        end = start + rng.randint(300, 6000)
+        t = end
+        text = " ".join(rng.choices(vocab, k=rng.randint(2, 24)))
+        if rng.random() < 0.4:
+            text += rng.choice(".!?")
+        parts.append(f"{i}\n{ms_to_ts(start)} --> {ms_to_ts(end)}\n{text}\n")
+    return "\n".join(parts) + "\n"
+
+
+def bench(n_files=2000, blocks_per_file=400, workers=None, seed=11):
+    """Stream pipeline vs the old list code (srt_baseline.py, a verbatim copy of reformat-srt.py)."""
+    from srt_baseline import reformat_text as list_reformat
+    rng = random.Random(seed)
+    vocab = ("i told you she never came home what are you doing here baby we need to talk "
+             "about this family money church pastor mama daddy love lie truth").split()
+    tmp = tempfile.mkdtemp(prefix="srt-bench-")
+    try:
+        src = os.path.join(tmp, "in")
+        os.makedirs(src)
+        for i in range(n_files):
+            with open(os.path.join(src, f"ep{i:05d}.srt"), "w") as f:
+                f.write(_synthetic_srt(rng, blocks_per_file, vocab))
+        opts = {"merge_gap": MERGE_GAP_MS}
+        list_opts = {"merge": True, "merge_gap": MERGE_GAP_MS}
+        print(f"Corpus: {n_files} SRTs x {blocks_per_file} blocks")
+
+        sample = os.path.join(src, "ep00000.srt")
+        with open(sample) as f:
+            assert list_reformat(f.read(), **list_opts) == "".join(emit(reformat(read_srt(sample), **opts)))
+
+        # Peak memory on one long file (a full feature's worth of blocks, x50).
+        big = os.path.join(tmp, "big.srt")
+        with open(big, "w") as f:
+            f.write(_synthetic_srt(rng, blocks_per_file * 50, vocab))
+        for label, fn in (("list", lambda: list_reformat(open(big).read(), **list_opts)),
+                          ("stream", lambda: write_srt(reformat(read_srt(big), **opts), big + ".out"))):
+            tracemalloc.start()
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"  peak memory ({label:<6}) {peak / 1e6:8.1f} MB")
+
+        t0 = time.perf_counter()
+        for name in sorted(os.listdir(src)):
+            with open(os.path.join(src, name)) as f:
+                out = list_reformat(f.read(), **list_opts)
+            with open(os.path.join(tmp, "list.out"), "w") as f:
+                f.write(out)
+        t_list = time.perf_counter() - t0
+        runs = [("list, 1 proc", t_list)]
+        for w in dict.fromkeys((1, workers or os.cpu_count() or 1)):
+            t0 = time.perf_counter()
+            results = list(reformat_tree(src, os.path.join(tmp, f"out{w}"), workers=w, **opts))
+            runs.append((f"stream, {w} proc", time.perf_counter() - t0))
+            assert not any(err for _, _, err in results)
+        for label, t in runs:
+            print(f"  {label:<16} {t:6.2f}s  {n_files / t:8.0f} files/s  {n_files * blocks_per_file / t:10.0f} blocks/s")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Streaming SRT toolkit")
+    p.add_argument("--bench", action="store_true", help="Benchmark on a synthetic SRT corpus")
+    p.add_argument("--files", type=int, default=2000)
+    p.add_argument("--blocks", type=int, default=400)
+    p.add_argument("--workers", type=int, default=None)
+    args = p.parse_args()
+    if args.bench:
+        bench(args.files, args.blocks, args.workers)
+    else:
+        p.print_help()
+
+
+if __name__ == "__main__":
+    main()